@@ -11,6 +11,7 @@ The skeleton means each recipe call has a tight focus:
   - Keto / diet-type constraints are injected as hard rules, not hopes
 
 Model: gpt-4 (or RECIPE_MODEL env override) — quality matters here.
+Slow days are hedged with a duplicate request (RECIPE_HEDGE_* env settings).
 """
 
 from __future__ import annotations
@@ -20,10 +21,13 @@ import json
 import logging
 import os
 import time
+from collections import deque
 from typing import Any
 
 import openai
 
+from app.ai.response_parser import IncrementalJSONParser, json_mode_kwargs, parse_json_response
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -78,8 +82,14 @@ def _build_day_prompt(
     day_skeleton: dict,
     global_constraints: dict,
     day_index: int,
+    only_meal_times: list[str] | None = None,
 ) -> tuple[str, str]:
-    """Build system + user prompt for a single day's recipe generation."""
+    """Build system + user prompt for a single day's recipe generation.
+
+    only_meal_times restricts the requested slots (used to re-request meals that
+    were missing from a truncated response) while keeping the full day's
+    calorie split.
+    """
 
     calorie_goal: int = global_constraints.get("calorie_goal", 2000)
     protein_pct: int = global_constraints.get("macro_protein_pct", 30)
@@ -212,6 +222,8 @@ def _build_day_prompt(
     meal_slots = []
     for meal in day_skeleton.get("meals", []):
         mt = meal["meal_time"]
+        if only_meal_times and mt not in only_meal_times:
+            continue
         is_snack = mt.startswith("snack")
         tc_key = "weekday-" + mt if not is_snack else None
         tc_mins = time_constraints.get(tc_key, 30) if tc_key else 15
@@ -267,6 +279,237 @@ def _build_day_prompt(
     return system_prompt, user_prompt
 
 
+# ---------------------------------------------------------------------------
+# Hedged requests
+# ---------------------------------------------------------------------------
+#
+# A single stuck OpenAI request used to dominate the whole plan's latency: each
+# attempt could wait the full request_timeout before the retry kicked in.  When
+# hedging is enabled, a day that runs past the recent latency percentile gets a
+# duplicate request (optionally on a cheaper model) and whichever call returns
+# valid JSON first wins.  Extra spend is capped per plan by a token budget.
+
+HEDGE_ENABLED = os.getenv("RECIPE_HEDGE_ENABLED", "true").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("RECIPE_HEDGE_PERCENTILE", "90"))
+HEDGE_MODEL = os.getenv("RECIPE_HEDGE_MODEL", "")  # empty → same model as primary
+HEDGE_DEFAULT_DELAY_S = float(os.getenv("RECIPE_HEDGE_DEFAULT_DELAY_S", "45"))
+HEDGE_MIN_DELAY_S = float(os.getenv("RECIPE_HEDGE_MIN_DELAY_S", "10"))
+HEDGE_MIN_SAMPLES = int(os.getenv("RECIPE_HEDGE_MIN_SAMPLES", "5"))
+HEDGE_MAX_EXTRA_TOKENS = int(os.getenv("RECIPE_HEDGE_MAX_EXTRA_TOKENS", "4000"))
+
+# Stream responses so a truncated/failed stream still yields its finished meals
+STREAM_ENABLED = os.getenv("RECIPE_STREAM_ENABLED", "false").lower() == "true"
+
+REQUEST_MAX_TOKENS = 2000
+REQUEST_TIMEOUT_S = 120
+
+
+class LatencyTracker:
+    """Rolling window of per-day request latencies used to pick the hedge delay."""
+
+    def __init__(self, window: int = 50):
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> float | None:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+        return ordered[idx]
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait on the primary request before launching a hedge."""
+        if len(self._samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY_S
+        return max(HEDGE_MIN_DELAY_S, self.percentile(HEDGE_PERCENTILE) or HEDGE_DEFAULT_DELAY_S)
+
+
+class HedgeBudget:
+    """Caps the extra tokens hedged requests may spend during one plan generation.
+
+    A hedge reserves ``REQUEST_MAX_TOKENS`` up front (the worst case, since the
+    losing request cannot be cancelled once it reaches OpenAI).
+    """
+
+    def __init__(self, max_extra_tokens: int):
+        self.remaining = max_extra_tokens
+        self.hedges_launched = 0
+        self.hedges_won = 0
+
+    def try_reserve(self, tokens: int) -> bool:
+        if tokens > self.remaining:
+            return False
+        self.remaining -= tokens
+        self.hedges_launched += 1
+        return True
+
+
+# Process-wide so the threshold keeps learning across plans.
+_latency_tracker = LatencyTracker()
+
+
+def _call_model(model: str, system_prompt: str, user_prompt: str) -> tuple[IncrementalJSONParser, int]:
+    """Blocking chat completion call; returns (parser fed with the response, tokens_used).
+
+    With RECIPE_STREAM_ENABLED the response is streamed into the parser so that
+    meals which finished before a mid-stream failure are kept.
+    """
+    parser = IncrementalJSONParser()
+    kwargs = dict(
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user",   "content": user_prompt},
+        ],
+        max_tokens=REQUEST_MAX_TOKENS,
+        temperature=0.4,
+        request_timeout=REQUEST_TIMEOUT_S,
+        **json_mode_kwargs(model),
+    )
+
+    if not STREAM_ENABLED:
+        response = openai.ChatCompletion.create(**kwargs)
+        parser.feed(response.choices[0].message.content)
+        return parser, response.usage.total_tokens if response.usage else 0
+
+    try:
+        for chunk in openai.ChatCompletion.create(stream=True, **kwargs):
+            parser.feed(chunk.choices[0].delta.get("content") or "")
+    except Exception as exc:
+        if not parser.completed_items("meals"):
+            raise
+        logger.warning("recipe_agent: stream interrupted, keeping completed meals: %s", exc)
+    # openai 0.x does not report usage for streamed responses; estimate ~4 chars/token
+    return parser, (len(system_prompt) + len(user_prompt) + len(parser.text)) // 4
+
+
+def _day_from_parser(parser: IncrementalJSONParser, day_index: int) -> dict:
+    """Build the day dict from a (possibly partial) response; raise ValueError if unusable."""
+    if parser.complete:
+        return parse_json_response(parser.text, label=f"recipe_agent day {day_index + 1}")
+    meals = parser.completed_items("meals")
+    if not meals:
+        return parse_json_response(parser.text, label=f"recipe_agent day {day_index + 1}")
+    logger.warning(
+        "recipe_agent day %d: response truncated, keeping %d completed meal(s)", day_index + 1, len(meals),
+    )
+    return {"day_number": day_index + 1, "meals": meals}
+
+
+def _missing_meal_times(day_result: dict, expected: list[str]) -> list[str]:
+    """Meal slots from the skeleton that have no usable recipe in day_result."""
+    have = {
+        m.get("meal_time")
+        for m in day_result.get("meals", [])
+        if isinstance(m, dict) and m.get("title") and m.get("ingredients") and m.get("instructions")
+    }
+    return [mt for mt in expected if mt not in have]
+
+
+async def _request_day(model: str, system_prompt: str, user_prompt: str, day_index: int) -> tuple[dict, int]:
+    """Make one chat completion call and parse it. Returns (day_result, tokens_used)."""
+    # openai library v0.x (synchronous) — wrap in executor for async context
+    loop = asyncio.get_event_loop()
+    parser, tokens_used = await loop.run_in_executor(
+        None, lambda: _call_model(model, system_prompt, user_prompt),
+    )
+    return _day_from_parser(parser, day_index), tokens_used
+
+
+async def _fill_missing_meals(
+    day_result: dict,
+    missing: list[str],
+    day_skeleton: dict,
+    global_constraints: dict,
+    day_index: int,
+    model: str,
+) -> int:
+    """Re-request only the missing meal slots and merge them into day_result in place.
+
+    Returns the extra tokens used.  Raises ValueError if slots are still missing.
+    """
+    expected = [m["meal_time"] for m in day_skeleton.get("meals", [])]
+    tokens_used = 0
+    for attempt in range(2):
+        logger.info("recipe_agent day %d: re-requesting missing meals %s", day_index + 1, missing)
+        system_prompt, user_prompt = _build_day_prompt(
+            day_skeleton, global_constraints, day_index, only_meal_times=missing,
+        )
+        try:
+            partial, tokens = await _request_day(model, system_prompt, user_prompt, day_index)
+        except Exception as exc:
+            logger.warning("recipe_agent day %d: missing-meal attempt %d failed: %s", day_index + 1, attempt + 1, exc)
+            continue
+        tokens_used += tokens
+        by_time = {m.get("meal_time"): m for m in day_result.get("meals", []) if isinstance(m, dict)}
+        for meal in partial.get("meals", []):
+            if isinstance(meal, dict) and meal.get("meal_time") in missing:
+                by_time[meal["meal_time"]] = meal
+        day_result["meals"] = [by_time[mt] for mt in expected if mt in by_time]
+        missing = _missing_meal_times(day_result, expected)
+        if not missing:
+            return tokens_used
+    raise ValueError(f"Recipe agent day {day_index + 1} still missing meals: {', '.join(missing)}")
+
+
+async def _hedged_request(
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    day_index: int,
+    budget: HedgeBudget | None,
+) -> tuple[dict, int, str]:
+    """Run the primary request, hedging with a duplicate if it runs long.
+
+    Returns (day_result, tokens_used, model_that_won).  Raises the primary's
+    exception if every launched request fails.
+    """
+    primary = asyncio.ensure_future(_request_day(model, system_prompt, user_prompt, day_index))
+    if not HEDGE_ENABLED or budget is None:
+        result, tokens = await primary
+        return result, tokens, model
+
+    delay = _latency_tracker.hedge_delay()
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        result, tokens = primary.result()
+        return result, tokens, model
+
+    hedge_model = HEDGE_MODEL or model
+    if not budget.try_reserve(REQUEST_MAX_TOKENS):
+        logger.info("recipe_agent day %d: hedge skipped, extra-token budget exhausted", day_index + 1)
+        result, tokens = await primary
+        return result, tokens, model
+
+    logger.info(
+        "recipe_agent day %d: primary exceeded %.1fs, launching hedge on %s",
+        day_index + 1, delay, hedge_model,
+    )
+    hedge = asyncio.ensure_future(_request_day(hedge_model, system_prompt, user_prompt, day_index))
+    owners = {primary: model, hedge: hedge_model}
+    pending = set(owners)
+
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            exc = task.exception()
+            if exc is not None:
+                logger.warning("recipe_agent day %d: %s request failed: %s", day_index + 1, owners[task], exc)
+                continue
+            for other in pending:
+                other.cancel()  # the executor thread still finishes; we just ignore it
+            if task is hedge:
+                budget.hedges_won += 1
+            result, tokens = task.result()
+            return result, tokens, owners[task]
+
+    # Both failed; the hedge's error was logged above
+    raise primary.exception()
+
+
 # ---------------------------------------------------------------------------
 # Single-day runner (async, semaphore-bounded)
 # ---------------------------------------------------------------------------
@@ -279,6 +522,7 @@ async def _run_day(
     model: str,
     cursor,
     user_id: int,
+    hedge_budget: HedgeBudget | None = None,
 ) -> dict:
     """Generate recipes for one day. Runs inside a semaphore."""
     async with semaphore:
@@ -286,60 +530,47 @@ async def _run_day(
         t0 = time.time()
         tokens_used = 0
         last_exc = None
+        used_model = model
 
         for attempt in range(2):
+            attempt_t0 = time.time()
             try:
-                # openai library v0.x (synchronous) — wrap in executor for async context
-                loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: openai.ChatCompletion.create(
-                        model=model,
-                        messages=[
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user",   "content": user_prompt},
-                        ],
-                        max_tokens=2000,
-                        temperature=0.4,
-                        request_timeout=120,
-                    ),
+                day_result, tokens_used, used_model = await _hedged_request(
+                    model, system_prompt, user_prompt, day_index, hedge_budget,
                 )
-                raw = response.choices[0].message.content.strip()
-                tokens_used = response.usage.total_tokens if response.usage else 0
+                _latency_tracker.record(time.time() - attempt_t0)
                 break
             except Exception as exc:
                 last_exc = exc
                 logger.warning("recipe_agent day %d attempt %d failed: %s", day_index + 1, attempt + 1, exc)
                 await asyncio.sleep(2)
         else:
+            if isinstance(last_exc, ValueError):
+                raise last_exc
             raise RuntimeError(f"recipe_agent: day {day_index + 1} failed after 2 attempts: {last_exc}") from last_exc
 
-        duration_ms = int((time.time() - t0) * 1000)
+        expected = [m["meal_time"] for m in day_skeleton.get("meals", [])]
+        missing = _missing_meal_times(day_result, expected)
+        if missing:
+            tokens_used += await _fill_missing_meals(
+                day_result, missing, day_skeleton, global_constraints, day_index, model,
+            )
 
-        # Strip markdown fences
-        if raw.startswith("```"):
-            raw = raw.split("```")[1]
-            if raw.startswith("json"):
-                raw = raw[4:]
-        try:
-            day_result = json.loads(raw.strip())
-        except json.JSONDecodeError as exc:
-            logger.error("recipe_agent day %d JSON parse error: %s\nRaw: %.500s", day_index + 1, exc, raw)
-            raise ValueError(f"Recipe agent day {day_index + 1} returned invalid JSON: {exc}") from exc
+        duration_ms = int((time.time() - t0) * 1000)
 
         _log_pipeline_stage(
             cursor=cursor,
             user_id=user_id,
             stage=f"recipe_day_{day_index + 1}",
-            model=model,
+            model=used_model,
             tokens=tokens_used,
             duration_ms=duration_ms,
             output=day_result,
         )
 
         logger.info(
-            "recipe_agent: day %d done in %dms (%d tokens)",
-            day_index + 1, duration_ms, tokens_used,
+            "recipe_agent: day %d done in %dms (%d tokens, %s)",
+            day_index + 1, duration_ms, tokens_used, used_model,
         )
         return day_result
 
@@ -370,6 +601,7 @@ async def run(
     model = os.getenv("RECIPE_MODEL", "gpt-4o")
     max_parallel = int(os.getenv("MAX_PARALLEL_DAYS", "3"))
     semaphore = asyncio.Semaphore(max_parallel)
+    hedge_budget = HedgeBudget(HEDGE_MAX_EXTRA_TOKENS)
 
     days = skeleton.get("days", [])
     tasks = [
@@ -381,12 +613,19 @@ async def run(
             model=model,
             cursor=cursor,
             user_id=user_id,
+            hedge_budget=hedge_budget,
         )
         for i, day in enumerate(days)
     ]
 
     results = await asyncio.gather(*tasks, return_exceptions=True)
 
+    if hedge_budget.hedges_launched:
+        logger.info(
+            "recipe_agent: %d hedged request(s), %d won, %d extra tokens left in budget",
+            hedge_budget.hedges_launched, hedge_budget.hedges_won, hedge_budget.remaining,
+        )
+
     # Surface any per-day failures
     day_results = []
     for i, r in enumerate(results):
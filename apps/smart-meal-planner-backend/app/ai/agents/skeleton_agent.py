@@ -21,6 +21,9 @@ from typing import Any
 
 import openai
 
+from app.ai.response_parser import json_mode_kwargs, parse_json_response
+from app.utils.ingredient_usage import recent_ingredients
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -138,22 +141,9 @@ def _carb_schedule(prefs: dict, days: int) -> list[dict | None]:
 
 
 def _get_recent_ingredients(cursor, user_id: int, days: int = 3) -> list[str]:
-    """Query ingredient_usage_log for the cooldown window."""
+    """Ingredient cooldown list from ingredient_usage_log, via the per-user cache."""
     try:
-        cursor.execute(
-            """
-            SELECT DISTINCT ingredient_name
-            FROM ingredient_usage_log
-            WHERE user_id = %s
-              AND used_on_date >= CURRENT_DATE - INTERVAL '%s days'
-            ORDER BY ingredient_name
-            """,
-            (user_id, days),
-        )
-        rows = cursor.fetchall()
-        if rows and isinstance(rows[0], dict):
-            return [r["ingredient_name"] for r in rows]
-        return [r[0] for r in rows]
+        return recent_ingredients(cursor, user_id, days)
     except Exception as exc:
         logger.warning("skeleton_agent: could not fetch ingredient cooldown list: %s", exc)
         return []
@@ -274,6 +264,22 @@ Return this exact JSON structure with all ASSIGN values filled:
     return system_prompt, user_prompt
 
 
+def _check_skeleton(skeleton: Any, days: int, meal_times: list[str], snacks_per_day: int) -> None:
+    """Raise ValueError unless every requested day has every meal slot."""
+    if not isinstance(skeleton, dict) or not isinstance(skeleton.get("days"), list):
+        raise ValueError("Skeleton agent returned no days")
+    if len(skeleton["days"]) != days:
+        raise ValueError(f"Skeleton agent returned {len(skeleton['days'])} days, expected {days}")
+
+    expected = list(meal_times) + [f"snack_{s + 1}" for s in range(snacks_per_day)]
+    for i, day in enumerate(skeleton["days"]):
+        meals = day.get("meals") if isinstance(day, dict) else None
+        have = {m.get("meal_time") for m in meals or [] if isinstance(m, dict)}
+        missing = [mt for mt in expected if mt not in have]
+        if missing:
+            raise ValueError(f"Skeleton agent day {i + 1} is missing meals: {', '.join(missing)}")
+
+
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
@@ -333,6 +339,7 @@ async def run(
             max_tokens=800,
             temperature=0.7,
             request_timeout=60,
+            **json_mode_kwargs(model),
         )
         raw = response.choices[0].message.content.strip()
         tokens_used = response.usage.total_tokens if response.usage else 0
@@ -342,16 +349,9 @@ async def run(
 
     duration_ms = int((time.time() - t0) * 1000)
 
-    # Parse JSON — strip markdown fences if model wrapped it
-    if raw.startswith("```"):
-        raw = raw.split("```")[1]
-        if raw.startswith("json"):
-            raw = raw[4:]
-    try:
-        skeleton = json.loads(raw.strip())
-    except json.JSONDecodeError as exc:
-        logger.error("skeleton_agent: could not parse JSON response: %s\nRaw: %s", exc, raw[:500])
-        raise ValueError(f"Skeleton agent returned invalid JSON: {exc}") from exc
+    # Parse strictly: a repaired truncation would silently become a shorter plan
+    skeleton = parse_json_response(raw, label="skeleton_agent", repair=False)
+    _check_skeleton(skeleton, days, meal_times, snacks_per_day)
 
     # Attach the computed carb schedule data so downstream agents don't re-derive it
     for i, day in enumerate(skeleton.get("days", [])):
@@ -29,6 +29,8 @@ from typing import Any
 
 import openai
 
+from app.ai.response_parser import json_mode_kwargs, parse_json_response
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -330,6 +332,7 @@ async def _fix_meal(
                 max_tokens=800,
                 temperature=0.5,
                 request_timeout=60,
+                **json_mode_kwargs(model),
             ),
         )
         raw = response.choices[0].message.content.strip()
@@ -340,13 +343,9 @@ async def _fix_meal(
 
     duration_ms = int((time.time() - t0) * 1000)
 
-    if raw.startswith("```"):
-        raw = raw.split("```")[1]
-        if raw.startswith("json"):
-            raw = raw[4:]
     try:
-        replacement = json.loads(raw.strip())
-    except json.JSONDecodeError:
+        replacement = parse_json_response(raw, label="validator_agent fix_meal")
+    except ValueError:
         logger.warning("validator_agent: fix_meal returned invalid JSON for day=%d %s", day_num, meal_time)
         return None
 
@@ -133,7 +133,7 @@ def _normalize_ingredient_name(name: str) -> str:
 def _log_ingredient_usage(cursor, user_id: int, menu_id: int | None, day_results: list[dict]) -> None:
     """Bulk-insert ingredients from the completed plan into ingredient_usage_log.
 
-    Also prunes rows older than 14 days so the table stays lean.
+    Old rows are removed by the periodic sweeper in app.utils.ingredient_usage.
     """
     rows = []
     plan_start = date.today()
@@ -157,25 +157,10 @@ def _log_ingredient_usage(cursor, user_id: int, menu_id: int | None, day_results
     if not rows:
         return
 
+    from ..utils.ingredient_usage import write_ingredient_usage
+
     try:
-        cursor.executemany(
-            """
-            INSERT INTO ingredient_usage_log
-                (user_id, menu_id, ingredient_name, used_on_date, meal_time)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT DO NOTHING
-            """,
-            rows,
-        )
-        # Prune old rows
-        cursor.execute(
-            """
-            DELETE FROM ingredient_usage_log
-            WHERE user_id = %s
-              AND used_on_date < CURRENT_DATE - INTERVAL '14 days'
-            """,
-            (user_id,),
-        )
+        write_ingredient_usage(cursor, rows)
         logger.info(
             "pipeline_orchestrator: logged %d ingredient usages for user %s",
             len(rows), user_id,
@@ -450,8 +435,12 @@ async def run_pipeline(
     # Log ingredient usage (non-fatal)
     _log_ingredient_usage(cursor, user_id, None, day_results)
 
+    from ..utils.ingredient_usage import forget_recent_ingredients
+
     try:
         conn.commit()
+        # Only now can a cooldown read see this plan's ingredients
+        forget_recent_ingredients([user_id])
     except Exception as exc:
         logger.warning("pipeline_orchestrator: commit failed: %s", exc)
 
@@ -0,0 +1,259 @@
+# app/ai/preference_profile.py - Incrementally maintained rating preference profiles
+"""
+Running aggregates behind RatingAnalytics.extract_user_preferences.
+
+Every aggregate the preference analysis reports (average rating per cuisine,
+complexity and time bucket, aspect scores, behaviour counters...) is a sum or
+a count, so it can be kept up to date by adding a rating's contribution when it
+is written and subtracting the previous version when it is changed. The stats
+dict built here is stored per user in user_preference_profiles and rendered
+back into the same shape the full recomputation used to return.
+"""
+
+import json
+import math
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+# Bump when the stats layout changes; older profiles are rebuilt on read
+PROFILE_VERSION = 1
+
+# Window for behavioral_insights.recent_activity
+RECENT_ACTIVITY_DAYS = 30
+
+TIME_BUCKETS = ("quick", "medium", "long")
+
+
+def empty_profile() -> Dict:
+    return {
+        "version": PROFILE_VERSION,
+        "count": 0,
+        "rating_sum": 0.0,
+        "distribution": {},
+        "cuisines": {},
+        "complexities": {},
+        "difficulty": {"n": 0, "sum": 0.0},
+        "time_buckets": {},
+        "time_accuracy": {"n": 0, "sum": 0.0},
+        "aspects": {},
+        "made": 0,
+        "would_make_again": 0,
+        "recipes": {},
+        "recent_days": {},
+    }
+
+
+def _add_mean(entry: Dict, value: float, sign: int, squares: bool = False) -> None:
+    entry["n"] = entry.get("n", 0) + sign
+    entry["sum"] = entry.get("sum", 0.0) + sign * value
+    if squares:
+        entry["sumsq"] = entry.get("sumsq", 0.0) + sign * value * value
+
+
+def _add_keyed_mean(table: Dict, key: str, value: float, sign: int, squares: bool = False) -> None:
+    if sign < 0 and key not in table:
+        return
+    entry = table.setdefault(key, {"n": 0, "sum": 0.0})
+    _add_mean(entry, value, sign, squares)
+    if entry["n"] <= 0:
+        del table[key]
+
+
+def _add_count(table: Dict, key: str, sign: int) -> None:
+    if sign < 0 and key not in table:
+        return
+    table[key] = table.get(key, 0) + sign
+    if table[key] <= 0:
+        del table[key]
+
+
+def _time_bucket(total_time) -> str:
+    if total_time < 30:
+        return "quick"
+    if total_time <= 60:
+        return "medium"
+    return "long"
+
+
+def _as_date(value) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if value:
+        try:
+            return datetime.fromisoformat(str(value).replace("Z", "+00:00")).date()
+        except ValueError:
+            return None
+    return None
+
+
+def _aspects(value) -> Dict:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return {}
+    return value if isinstance(value, dict) else {}
+
+
+def _recent_cutoff() -> str:
+    return (date.today() - timedelta(days=RECENT_ACTIVITY_DAYS)).isoformat()
+
+
+def prune_recent_days(stats: Dict) -> str:
+    """Drop days that fell out of the activity window; returns the cutoff day."""
+    cutoff = _recent_cutoff()
+    stats["recent_days"] = {day: n for day, n in stats["recent_days"].items() if day > cutoff}
+    return cutoff
+
+
+def apply_rating(stats: Dict, row: Optional[Dict], sign: int = 1) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) one rating row's contribution.
+
+    ``row`` has the columns of RatingAnalytics' rating query (rating_score,
+    cuisine, complexity, total_time, rating_aspects, made_recipe, ...).
+    """
+    if not row or row.get("rating_score") is None:
+        return
+    score = row["rating_score"]
+
+    stats["count"] += sign
+    stats["rating_sum"] += sign * score
+    _add_count(stats["distribution"], str(score), sign)
+
+    if row.get("cuisine"):
+        _add_keyed_mean(stats["cuisines"], row["cuisine"], score, sign)
+    if row.get("complexity"):
+        _add_keyed_mean(stats["complexities"], row["complexity"], score, sign)
+    if row.get("difficulty_rating"):
+        _add_mean(stats["difficulty"], row["difficulty_rating"], sign)
+    if row.get("total_time") and score:
+        _add_keyed_mean(stats["time_buckets"], _time_bucket(row["total_time"]), score, sign)
+    if row.get("time_accuracy"):
+        _add_mean(stats["time_accuracy"], row["time_accuracy"], sign)
+
+    for aspect, value in _aspects(row.get("rating_aspects")).items():
+        # Only aspects the user actually scored
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0:
+            _add_keyed_mean(stats["aspects"], aspect, value, sign, squares=True)
+
+    if row.get("made_recipe"):
+        stats["made"] += sign
+    if row.get("would_make_again") is True:
+        stats["would_make_again"] += sign
+    if row.get("recipe_id"):
+        _add_count(stats["recipes"], str(row["recipe_id"]), sign)
+
+    rated_on = _as_date(row.get("rating_time"))
+    if rated_on:
+        cutoff = prune_recent_days(stats)
+        if rated_on.isoformat() > cutoff:
+            _add_count(stats["recent_days"], rated_on.isoformat(), sign)
+
+
+def _mean(entry: Dict) -> Optional[float]:
+    return entry["sum"] / entry["n"] if entry.get("n") else None
+
+
+def _stdev(entry: Dict) -> float:
+    n = entry["n"]
+    variance = (entry.get("sumsq", 0.0) - entry["sum"] ** 2 / n) / (n - 1)
+    return math.sqrt(max(variance, 0.0))
+
+
+def _score_key(key: str):
+    try:
+        number = float(key)
+    except ValueError:
+        return key
+    return int(number) if number.is_integer() else number
+
+
+def profile_to_preferences(user_id: int, stats: Dict, last_updated=None) -> Dict:
+    """Render stored stats in the shape extract_user_preferences returns."""
+    count = stats["count"]
+    average = stats["rating_sum"] / count
+
+    cuisines = {
+        cuisine: {
+            "average_rating": _mean(entry),
+            "count": entry["n"],
+            "preference_strength": entry["n"] * _mean(entry),
+        }
+        for cuisine, entry in stats["cuisines"].items()
+    }
+    sorted_cuisines = sorted(cuisines.items(), key=lambda x: x[1]["preference_strength"], reverse=True)
+
+    complexity_scores = {name: _mean(entry) for name, entry in stats["complexities"].items()}
+
+    time_preferences = {
+        bucket: _mean(stats["time_buckets"][bucket]) for bucket in TIME_BUCKETS if bucket in stats["time_buckets"]
+    }
+
+    aspect_scores = {
+        aspect: {
+            "average_score": _mean(entry),
+            "importance": entry["n"],
+            "consistency": 1 - (_stdev(entry) / 5) if entry["n"] > 1 else 1,
+        }
+        for aspect, entry in stats["aspects"].items()
+    }
+    importance_ranking = sorted(
+        aspect_scores.items(), key=lambda x: x[1]["importance"] * x[1]["average_score"], reverse=True
+    )
+
+    cutoff = _recent_cutoff()
+    made = stats["made"]
+
+    if isinstance(last_updated, datetime):
+        last_updated = last_updated.isoformat()
+
+    return {
+        "user_id": user_id,
+        "total_ratings": count,
+        "average_rating": average,
+        "cuisine_preferences": {
+            "top_cuisines": [cuisine for cuisine, _ in sorted_cuisines[:5]],
+            "detailed_scores": dict(sorted_cuisines),
+            "diversity_score": len(cuisines),
+        },
+        "complexity_preferences": {
+            "complexity_scores": complexity_scores,
+            "preferred_difficulty": _mean(stats["difficulty"]),
+            "complexity_tolerance": (
+                max(complexity_scores.values()) - min(complexity_scores.values()) if complexity_scores else 0
+            ),
+        },
+        "time_preferences": {
+            "time_bucket_preferences": time_preferences,
+            "average_time_accuracy_expectation": _mean(stats["time_accuracy"]),
+            "preferred_time_range": (
+                max(time_preferences, key=time_preferences.get) if time_preferences else "medium"
+            ),
+        },
+        "aspect_preferences": {
+            "aspect_scores": aspect_scores,
+            "most_important_aspects": [aspect for aspect, _ in importance_ranking[:3]],
+            "aspect_priorities": dict(importance_ranking),
+        },
+        # No ingredient, diet or flavour columns exist on scraped_recipes yet
+        "ingredient_preferences": {
+            "frequently_liked_ingredients": {},
+            "frequently_disliked_ingredients": {},
+            "ingredient_adventure_score": 0.0,
+        },
+        "dietary_preferences": {"dietary_patterns": {}, "dietary_flexibility": 0},
+        "flavor_preferences": {"flavor_preferences": {}, "spice_tolerance": "mild", "flavor_variety": 0},
+        "behavioral_insights": {
+            "cooking_engagement": made / count,
+            "recipe_satisfaction": stats["would_make_again"] / made if made else 0,
+            "rating_generosity": average,
+            "rating_distribution": {_score_key(k): n for k, n in stats["distribution"].items()},
+            "recent_activity": sum(n for day, n in stats["recent_days"].items() if day > cutoff),
+            "total_recipes_made": made,
+            "exploration_tendency": len(stats["recipes"]) / count,
+        },
+        "last_updated": last_updated or datetime.now().isoformat(),
+    }
@@ -3,13 +3,127 @@
 import logging
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+from contextlib import contextmanager
 import statistics
 import json
 from collections import defaultdict, Counter
-from psycopg2.extras import RealDictCursor
+from ..db import get_db_cursor, RATING_POOL
+from .preference_profile import PROFILE_VERSION, empty_profile, apply_rating, profile_to_preferences
 
 logger = logging.getLogger(__name__)
 
+# A user's ratings: scraped recipes via recipe_interactions, plus AI-generated meal
+# ratings stored only in saved_recipes.quick_rating (AI meals have no scraped_recipe_id
+# so quick_rate never creates a recipe_interactions row). {where} narrows each side.
+INTERACTION_RATINGS_SQL = """
+    SELECT
+        ri.id,
+        ri.user_id,
+        ri.recipe_id,
+        ri.rating_score,
+        ri.rating_aspects,
+        ri.made_recipe,
+        ri.would_make_again,
+        ri.difficulty_rating,
+        ri.time_accuracy,
+        ri.updated_at          AS rating_time,
+        sr.title,
+        sr.cuisine,
+        sr.complexity,
+        sr.prep_time,
+        sr.cook_time,
+        sr.total_time,
+        sr.servings
+    FROM recipe_interactions ri
+    LEFT JOIN scraped_recipes sr ON ri.recipe_id = sr.id
+    WHERE {where}
+    AND ri.rating_score IS NOT NULL
+"""
+
+SAVED_RATINGS_SQL = """
+    SELECT
+        sv.id,
+        sv.user_id,
+        NULL                   AS recipe_id,
+        sv.quick_rating        AS rating_score,
+        NULL                   AS rating_aspects,
+        NULL                   AS made_recipe,
+        NULL                   AS would_make_again,
+        NULL                   AS difficulty_rating,
+        NULL                   AS time_accuracy,
+        sv.created_at          AS rating_time,
+        sv.recipe_name         AS title,
+        NULL                   AS cuisine,
+        sv.complexity_level    AS complexity,
+        NULL                   AS prep_time,
+        NULL                   AS cook_time,
+        NULL                   AS total_time,
+        sv.servings
+    FROM saved_recipes sv
+    WHERE {where}
+    AND sv.quick_rating IS NOT NULL
+    AND sv.scraped_recipe_id IS NULL
+    AND sv.recipe_id IS NULL
+"""
+
+
+class ProfileUpdate:
+    """Rating rows touched by one write, read before and after it (see RatingAnalytics.profile_update)"""
+
+    def __init__(self, cur, user_id: int, stats: Optional[Dict]):
+        self.cur = cur
+        self.user_id = user_id
+        self.stats = stats
+        self._tracked = []
+
+    def _track(self, sql: str, params: Tuple):
+        self.cur.execute(sql, params)
+        self._tracked.append((sql, params, self.cur.fetchone()))
+
+    def track_interaction(self, recipe_id: int, interaction_type: str = 'rating'):
+        self._track(
+            INTERACTION_RATINGS_SQL.format(
+                where="ri.user_id = %s AND ri.recipe_id = %s AND ri.interaction_type = %s"
+            ),
+            (self.user_id, recipe_id, interaction_type)
+        )
+
+    def track_saved(self, saved_recipe_id: int):
+        self._track(
+            SAVED_RATINGS_SQL.format(where="sv.user_id = %s AND sv.id = %s"),
+            (self.user_id, saved_recipe_id)
+        )
+
+    def delete_saved(self, where: str, params: Tuple = ()) -> int:
+        """
+        Delete the user's saved_recipes rows matching ``where`` (alias sv) and
+        remove their quick ratings from the profile. Returns the rows deleted.
+        """
+        self.cur.execute(
+            SAVED_RATINGS_SQL.format(where=f"sv.user_id = %s AND {where}") + " FOR UPDATE",
+            (self.user_id, *params)
+        )
+        rated = self.cur.fetchall()
+        self.cur.execute(
+            f"DELETE FROM saved_recipes sv WHERE sv.user_id = %s AND {where}",
+            (self.user_id, *params)
+        )
+        if self.stats is not None:
+            for row in rated:
+                apply_rating(self.stats, row, -1)
+        return self.cur.rowcount
+
+    def apply(self):
+        """Swap each tracked row's old contribution for its current one"""
+        if self.stats is None:
+            return
+        for sql, params, before in self._tracked:
+            self.cur.execute(sql, params)
+            after = self.cur.fetchone()
+            apply_rating(self.stats, before, -1)
+            apply_rating(self.stats, after, 1)
+
+
 class RatingAnalytics:
     """
     Advanced analytics system for extracting user preferences and insights from rating data.
@@ -19,34 +133,10 @@ class RatingAnalytics:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
     
-    def get_rating_db_connection(self):
-        """Get isolated database connection for rating analytics"""
-        try:
-            from ..config import DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT
-            import psycopg2
-            
-            conn = psycopg2.connect(
-                dbname=DB_NAME,
-                user=DB_USER,
-                password=DB_PASSWORD,
-                host=DB_HOST,
-                port=DB_PORT,
-                connect_timeout=10
-            )
-            return conn
-        except Exception as e:
-            logger.error(f"Failed to create analytics database connection: {str(e)}")
-            raise
-    
     def execute_analytics_query(self, query, params=None, fetch_one=False, fetch_all=False):
-        """Execute analytics query with isolated connection"""
-        conn = None
+        """Execute analytics query on the rating pool, isolated from core traffic"""
         try:
-            conn = self.get_rating_db_connection()
-            conn.autocommit = True
-            
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute("SET statement_timeout = 30000")  # 30 second timeout
+            with get_db_cursor(dict_cursor=True, autocommit=True, pool_type=RATING_POOL) as (cur, conn):
                 cur.execute(query, params)
                 
                 if fetch_one:
@@ -59,96 +149,33 @@ class RatingAnalytics:
         except Exception as e:
             logger.error(f"Analytics database operation failed: {str(e)}")
             raise
-        finally:
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
     
     def extract_user_preferences(self, user_id: int) -> Dict:
         """
         Extract comprehensive user preferences from rating data
         Returns preference profile for AI integration
+
+        Reads the incrementally maintained row in user_preference_profiles;
+        the profile is only rebuilt from every rating when it is missing or
+        was written by an older PROFILE_VERSION.
         """
         logger.info(f"Extracting preferences for user {user_id}")
         
         try:
-            # Get all user ratings — scraped recipes via recipe_interactions,
-            # plus AI-generated meal ratings stored only in saved_recipes.quick_rating
-            # (AI meals have no scraped_recipe_id so quick_rate never creates a recipe_interactions row)
-            user_ratings = self.execute_analytics_query("""
-                SELECT
-                    ri.id,
-                    ri.user_id,
-                    ri.recipe_id,
-                    ri.rating_score,
-                    ri.rating_aspects,
-                    ri.made_recipe,
-                    ri.would_make_again,
-                    ri.difficulty_rating,
-                    ri.time_accuracy,
-                    ri.updated_at          AS rating_time,
-                    sr.title,
-                    sr.cuisine,
-                    sr.complexity,
-                    sr.prep_time,
-                    sr.cook_time,
-                    sr.total_time,
-                    sr.servings
-                FROM recipe_interactions ri
-                LEFT JOIN scraped_recipes sr ON ri.recipe_id = sr.id
-                WHERE ri.user_id = %s
-                AND ri.rating_score IS NOT NULL
-
-                UNION ALL
-
-                SELECT
-                    sv.id,
-                    sv.user_id,
-                    NULL                   AS recipe_id,
-                    sv.quick_rating        AS rating_score,
-                    NULL                   AS rating_aspects,
-                    NULL                   AS made_recipe,
-                    NULL                   AS would_make_again,
-                    NULL                   AS difficulty_rating,
-                    NULL                   AS time_accuracy,
-                    sv.created_at          AS rating_time,
-                    sv.recipe_name         AS title,
-                    NULL                   AS cuisine,
-                    sv.complexity_level    AS complexity,
-                    NULL                   AS prep_time,
-                    NULL                   AS cook_time,
-                    NULL                   AS total_time,
-                    sv.servings
-                FROM saved_recipes sv
-                WHERE sv.user_id = %s
-                AND sv.quick_rating IS NOT NULL
-                AND sv.scraped_recipe_id IS NULL
-                AND sv.recipe_id IS NULL
-
-                ORDER BY rating_time DESC
-            """, (user_id, user_id), fetch_all=True)
+            profile = self.execute_analytics_query(
+                "SELECT stats, updated_at FROM user_preference_profiles WHERE user_id = %s",
+                (user_id,),
+                fetch_one=True
+            )
+            if profile and (profile['stats'] or {}).get('version') == PROFILE_VERSION:
+                stats, updated_at = profile['stats'], profile['updated_at']
+            else:
+                stats, updated_at = self.rebuild_user_profile(user_id)
             
-            if not user_ratings:
+            if not stats['count']:
                 return self._default_preferences()
             
-            # Extract preferences from rating patterns
-            preferences = {
-                'user_id': user_id,
-                'total_ratings': len(user_ratings),
-                'average_rating': statistics.mean([r['rating_score'] for r in user_ratings]),
-                'cuisine_preferences': self._analyze_cuisine_preferences(user_ratings),
-                'complexity_preferences': self._analyze_complexity_preferences(user_ratings),
-                'time_preferences': self._analyze_time_preferences(user_ratings),
-                'aspect_preferences': self._analyze_aspect_preferences(user_ratings),
-                'ingredient_preferences': self._analyze_ingredient_preferences(user_ratings),
-                'dietary_preferences': self._analyze_dietary_preferences(user_ratings),
-                'flavor_preferences': self._analyze_flavor_preferences(user_ratings),
-                'behavioral_insights': self._analyze_behavioral_patterns(user_ratings),
-                'last_updated': datetime.now().isoformat()
-            }
-            
+            preferences = profile_to_preferences(user_id, stats, updated_at)
             logger.info(f"Extracted preferences for user {user_id}: {preferences['total_ratings']} ratings analyzed")
             return preferences
             
@@ -156,259 +183,87 @@ class RatingAnalytics:
             logger.error(f"Error extracting preferences for user {user_id}: {str(e)}")
             return self._default_preferences()
     
-    def _analyze_cuisine_preferences(self, ratings: List) -> Dict:
-        """Analyze cuisine preferences from ratings"""
-        cuisine_scores = defaultdict(list)
-        
-        for rating in ratings:
-            if rating['cuisine']:
-                cuisine_scores[rating['cuisine']].append(rating['rating_score'])
-        
-        preferences = {}
-        for cuisine, scores in cuisine_scores.items():
-            preferences[cuisine] = {
-                'average_rating': statistics.mean(scores),
-                'count': len(scores),
-                'preference_strength': len(scores) * statistics.mean(scores)  # Weight by frequency
-            }
-        
-        # Sort by preference strength
-        sorted_cuisines = sorted(preferences.items(), key=lambda x: x[1]['preference_strength'], reverse=True)
-        
-        return {
-            'top_cuisines': [cuisine for cuisine, data in sorted_cuisines[:5]],
-            'detailed_scores': dict(sorted_cuisines),
-            'diversity_score': len(cuisine_scores)  # How many different cuisines they try
-        }
+    def _lock_profile(self, cur, user_id: int) -> Dict:
+        """Lock (creating if needed) a user's profile row; rating writes for the user queue behind it"""
+        cur.execute("""
+            INSERT INTO user_preference_profiles (user_id, stats)
+            VALUES (%s, %s::jsonb)
+            ON CONFLICT (user_id) DO NOTHING
+        """, (user_id, json.dumps(empty_profile())))
+        cur.execute("SELECT stats FROM user_preference_profiles WHERE user_id = %s FOR UPDATE", (user_id,))
+        stats = cur.fetchone()['stats']
+        return stats if (stats or {}).get('version') == PROFILE_VERSION else None
     
-    def _analyze_complexity_preferences(self, ratings: List) -> Dict:
-        """Analyze complexity/difficulty preferences"""
-        complexity_scores = defaultdict(list)
-        difficulty_scores = []
-        
-        for rating in ratings:
-            if rating['complexity']:
-                complexity_scores[rating['complexity']].append(rating['rating_score'])
-            if rating['difficulty_rating']:
-                difficulty_scores.append(rating['difficulty_rating'])
-        
-        # Calculate average preferred difficulty
-        preferred_difficulty = statistics.mean(difficulty_scores) if difficulty_scores else None
-        
-        complexity_prefs = {}
-        for complexity, scores in complexity_scores.items():
-            complexity_prefs[complexity] = statistics.mean(scores)
-        
-        return {
-            'complexity_scores': complexity_prefs,
-            'preferred_difficulty': preferred_difficulty,
-            'complexity_tolerance': max(complexity_prefs.values()) - min(complexity_prefs.values()) if complexity_prefs else 0
-        }
+    def _save_profile(self, cur, user_id: int, stats: Dict):
+        cur.execute("""
+            UPDATE user_preference_profiles
+            SET stats = %s::jsonb, updated_at = CURRENT_TIMESTAMP
+            WHERE user_id = %s
+            RETURNING updated_at
+        """, (json.dumps(stats), user_id))
+        return cur.fetchone()['updated_at']
     
-    def _analyze_time_preferences(self, ratings: List) -> Dict:
-        """Analyze cooking time preferences"""
-        time_ratings = []
-        time_accuracy_scores = []
-        
-        for rating in ratings:
-            if rating['total_time'] and rating['rating_score']:
-                time_ratings.append({
-                    'time': rating['total_time'],
-                    'rating': rating['rating_score']
-                })
-            if rating['time_accuracy']:
-                time_accuracy_scores.append(rating['time_accuracy'])
-        
-        # Group by time ranges
-        time_buckets = {
-            'quick': [],      # < 30 min
-            'medium': [],     # 30-60 min
-            'long': []        # > 60 min
-        }
-        
-        for tr in time_ratings:
-            if tr['time'] < 30:
-                time_buckets['quick'].append(tr['rating'])
-            elif tr['time'] <= 60:
-                time_buckets['medium'].append(tr['rating'])
-            else:
-                time_buckets['long'].append(tr['rating'])
-        
-        time_preferences = {}
-        for bucket, ratings in time_buckets.items():
-            if ratings:
-                time_preferences[bucket] = statistics.mean(ratings)
-        
-        return {
-            'time_bucket_preferences': time_preferences,
-            'average_time_accuracy_expectation': statistics.mean(time_accuracy_scores) if time_accuracy_scores else None,
-            'preferred_time_range': max(time_preferences, key=time_preferences.get) if time_preferences else 'medium'
-        }
-    
-    def _analyze_aspect_preferences(self, ratings: List) -> Dict:
-        """Analyze detailed rating aspects (taste, presentation, etc.)"""
-        aspect_scores = defaultdict(list)
-        
-        for rating in ratings:
-            if rating['rating_aspects']:
-                try:
-                    if isinstance(rating['rating_aspects'], str):
-                        aspects = json.loads(rating['rating_aspects'])
-                    else:
-                        aspects = rating['rating_aspects']
-                    
-                    for aspect, score in aspects.items():
-                        if score > 0:  # Only count rated aspects
-                            aspect_scores[aspect].append(score)
-                except:
-                    continue
-        
-        aspect_preferences = {}
-        for aspect, scores in aspect_scores.items():
-            aspect_preferences[aspect] = {
-                'average_score': statistics.mean(scores),
-                'importance': len(scores),  # How often they rate this aspect
-                'consistency': 1 - (statistics.stdev(scores) / 5) if len(scores) > 1 else 1
-            }
-        
-        # Identify most important aspects (frequently rated + high scores)
-        importance_ranking = sorted(
-            aspect_preferences.items(), 
-            key=lambda x: x[1]['importance'] * x[1]['average_score'], 
-            reverse=True
+    def _rebuild_locked(self, cur, user_id: int) -> Dict:
+        stats = empty_profile()
+        cur.execute(
+            f"{INTERACTION_RATINGS_SQL.format(where='ri.user_id = %s')} UNION ALL "
+            f"{SAVED_RATINGS_SQL.format(where='sv.user_id = %s')}",
+            (user_id, user_id)
         )
-        
-        return {
-            'aspect_scores': aspect_preferences,
-            'most_important_aspects': [aspect for aspect, _ in importance_ranking[:3]],
-            'aspect_priorities': dict(importance_ranking)
-        }
+        for row in cur.fetchall():
+            apply_rating(stats, row)
+        return stats
     
-    def _analyze_ingredient_preferences(self, ratings: List) -> Dict:
-        """Analyze ingredient preferences from highly rated recipes"""
-        high_rated_ingredients = []
-        low_rated_ingredients = []
-        
-        for rating in ratings:
-            # Skip - ingredients column doesn't exist in scraped_recipes
-            # if rating.get('ingredients') and rating['rating_score']:
-            #     try:
-            #         ingredients = rating['ingredients'] if isinstance(rating['ingredients'], list) else []
-            #         
-            #         if rating['rating_score'] >= 4:
-            #             high_rated_ingredients.extend(ingredients)
-            #         elif rating['rating_score'] <= 2:
-            #             low_rated_ingredients.extend(ingredients)
-            #     except:
-            #         continue
-            pass
-        
-        # Count ingredient frequencies
-        liked_ingredients = Counter(high_rated_ingredients)
-        disliked_ingredients = Counter(low_rated_ingredients)
-        
-        return {
-            'frequently_liked_ingredients': dict(liked_ingredients.most_common(10)),
-            'frequently_disliked_ingredients': dict(disliked_ingredients.most_common(5)),
-            'ingredient_adventure_score': len(set(high_rated_ingredients)) / max(len(high_rated_ingredients), 1)
-        }
+    def rebuild_user_profile(self, user_id: int) -> Tuple[Dict, Optional[datetime]]:
+        """Recompute a user's profile from all of their ratings and persist it (backfill / version bumps)"""
+        with get_db_cursor(dict_cursor=True, pool_type=RATING_POOL) as (cur, conn):
+            self._lock_profile(cur, user_id)
+            stats = self._rebuild_locked(cur, user_id)
+            updated_at = self._save_profile(cur, user_id, stats)
+            conn.commit()
+        return stats, updated_at
     
-    def _analyze_dietary_preferences(self, ratings: List) -> Dict:
-        """Analyze dietary pattern preferences"""
-        diet_scores = defaultdict(list)
-        
-        for rating in ratings:
-            # Skip - diet_tags column doesn't exist in scraped_recipes
-            # if rating.get('diet_tags') and rating['rating_score']:
-            #     try:
-            #         diet_tags = rating['diet_tags'] if isinstance(rating['diet_tags'], dict) else {}
-            #         
-            #         for diet_type, applicable in diet_tags.items():
-            #             if applicable:
-            #                 diet_scores[diet_type].append(rating['rating_score'])
-            #     except:
-            #         continue
-            pass
-        
-        diet_preferences = {}
-        for diet_type, scores in diet_scores.items():
-            diet_preferences[diet_type] = {
-                'average_rating': statistics.mean(scores),
-                'frequency': len(scores)
-            }
-        
-        return {
-            'dietary_patterns': diet_preferences,
-            'dietary_flexibility': len(diet_scores)  # How many different dietary patterns they enjoy
-        }
-    
-    def _analyze_flavor_preferences(self, ratings: List) -> Dict:
-        """Analyze flavor profile preferences"""
-        flavor_scores = defaultdict(list)
-        spice_tolerance = []
-        
-        for rating in ratings:
-            # Skip - flavor_profile and spice_level columns don't exist in scraped_recipes
-            # if rating.get('flavor_profile') and rating['rating_score']:
-            #     try:
-            #         flavors = rating['flavor_profile'] if isinstance(rating['flavor_profile'], dict) else {}
-            #         
-            #         for flavor, intensity in flavors.items():
-            #             if intensity > 0:
-            #                 flavor_scores[flavor].append(rating['rating_score'])
-            #     except:
-            #         continue
-            # 
-            # if rating.get('spice_level') and rating['rating_score'] >= 4:
-            #     spice_tolerance.append(rating['spice_level'])
-            pass
-        
-        flavor_preferences = {}
-        for flavor, scores in flavor_scores.items():
-            flavor_preferences[flavor] = statistics.mean(scores)
-        
-        return {
-            'flavor_preferences': flavor_preferences,
-            'spice_tolerance': max(spice_tolerance) if spice_tolerance else 'mild',
-            'flavor_variety': len(flavor_scores)
-        }
-    
-    def _analyze_behavioral_patterns(self, ratings: List) -> Dict:
-        """Analyze user rating and cooking behaviors"""
-        made_recipes = [r for r in ratings if r.get('made_recipe')]
-        would_remake = [r for r in ratings if r.get('would_make_again') is True]
-
-        made_percentage = len(made_recipes) / len(ratings) if ratings else 0
-        remake_rate = len(would_remake) / len(made_recipes) if made_recipes else 0
-
-        rating_distribution = Counter([r['rating_score'] for r in ratings])
-
-        # Use rating_time alias (set in UNION query for both sources)
-        recent_ratings = 0
-        cutoff = datetime.now() - timedelta(days=30)
-        for r in ratings:
-            try:
-                rt = r.get('rating_time')
-                if rt:
-                    ts = rt if isinstance(rt, datetime) else datetime.fromisoformat(str(rt).replace('Z', '+00:00'))
-                    if ts.replace(tzinfo=None) > cutoff:
-                        recent_ratings += 1
-            except Exception:
-                pass
-
-        unique_recipes = len(set(r['recipe_id'] for r in ratings if r.get('recipe_id')))
-        exploration = unique_recipes / len(ratings) if ratings else 0
+    @contextmanager
+    def profile_update(self, user_id: int):
+        """
+        Transaction for a rating write that keeps the user's profile in step.
 
-        return {
-            'cooking_engagement': made_percentage,
-            'recipe_satisfaction': remake_rate,
-            'rating_generosity': statistics.mean([r['rating_score'] for r in ratings]),
-            'rating_distribution': dict(rating_distribution),
-            'recent_activity': recent_ratings,
-            'total_recipes_made': len(made_recipes),
-            'exploration_tendency': exploration
-        }
+        Register the rating rows the write touches with track_interaction /
+        track_saved *before* writing them through ``update.cur``; on exit their
+        old contribution is subtracted, the new one added and everything is
+        committed together. The profile row lock serializes a user's writes.
+        """
+        # get_db_cursor rolls the transaction back if the write or the profile update fails
+        with get_db_cursor(dict_cursor=True, pool_type=RATING_POOL) as (cur, conn):
+            cur.execute("SET LOCAL statement_timeout = 15000")
+            update = ProfileUpdate(cur, user_id, self._lock_profile(cur, user_id))
+            yield update
+            update.apply()
+            if update.stats is None:
+                # Missing or outdated profile: recompute it while still holding the lock
+                update.stats = self._rebuild_locked(cur, user_id)
+            self._save_profile(cur, user_id, update.stats)
+            conn.commit()
     
+    def mark_profiles_for_rebuild(self, cur, where: str, params: Tuple = ()):
+        """
+        Flag the profiles of every user with a counted quick rating among the
+        saved_recipes rows matching ``where`` (alias sv), so they are rebuilt on
+        next use. For deletes that span users (a whole menu): call it on the
+        deleting transaction's cursor *before* the delete.
+        """
+        cur.execute(f"""
+            UPDATE user_preference_profiles
+            SET stats = stats - 'version'
+            WHERE user_id IN (
+                SELECT sv.user_id FROM saved_recipes sv
+                WHERE {where}
+                AND sv.quick_rating IS NOT NULL
+                AND sv.scraped_recipe_id IS NULL
+                AND sv.recipe_id IS NULL
+            )
+        """, params)
+
     def _default_preferences(self) -> Dict:
         """Return default preferences for new users"""
         return {
@@ -0,0 +1,219 @@
+# app/ai/rating_rollups.py - Daily rating rollups for platform trend endpoints
+"""
+Pre-aggregated rating trends.
+
+The cuisine-popularity and recipe-performance endpoints used to aggregate the
+whole recipe_interactions x scraped_recipes join on every request. Ratings are
+now rolled up into per-day buckets (recipe_rating_daily, cuisine_rating_daily)
+by a scheduled refresh, and the endpoints sum the buckets of whatever window
+they are asked for.
+
+A rating is bucketed by the day it was first made (recipe_interactions.timestamp,
+which re-rating leaves alone). Every rating write bumps updated_at, so an
+incremental refresh only recomputes the days that hold a rating changed since
+the previous refresh. A full refresh (scripts/refresh_rating_rollups.py --full)
+also picks up deleted ratings and recipe cuisine changes.
+"""
+
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from ..utils.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+RATING_ROLLUP_REFRESH_MINUTES = float(os.getenv("RATING_ROLLUP_REFRESH_MINUTES", "15"))
+
+# Changes committed slightly after a refresh started can carry an earlier
+# updated_at; re-scan this much before the previous watermark
+ROLLUP_WATERMARK_OVERLAP = "10 minutes"
+
+# Transaction-scoped advisory lock so refreshes from several workers never overlap ("SMPROLL")
+ROLLUP_LOCK_KEY = 0x534d50524f4c4c
+
+ROLLUP_STATE_NAME = "daily_ratings"
+
+RECIPE_DAILY_SQL = """
+    INSERT INTO recipe_rating_daily
+        (day, recipe_id, rating_count, rating_sum, high_ratings, times_made, would_remake)
+    SELECT
+        ri.timestamp::date,
+        ri.recipe_id,
+        COUNT(*),
+        SUM(ri.rating_score),
+        COUNT(*) FILTER (WHERE ri.rating_score >= 4),
+        COUNT(*) FILTER (WHERE ri.made_recipe = true),
+        COUNT(*) FILTER (WHERE ri.would_make_again = true)
+    FROM recipe_interactions ri
+    WHERE ri.rating_score IS NOT NULL
+    AND ri.recipe_id IS NOT NULL
+    AND ri.timestamp IS NOT NULL
+    {days_filter}
+    GROUP BY 1, 2
+"""
+
+CUISINE_DAILY_SQL = """
+    INSERT INTO cuisine_rating_daily (day, cuisine, rating_count, rating_sum, high_ratings)
+    SELECT
+        ri.timestamp::date,
+        sr.cuisine,
+        COUNT(*),
+        SUM(ri.rating_score),
+        COUNT(*) FILTER (WHERE ri.rating_score >= 4)
+    FROM recipe_interactions ri
+    JOIN scraped_recipes sr ON ri.recipe_id = sr.id
+    WHERE ri.rating_score IS NOT NULL
+    AND sr.cuisine IS NOT NULL
+    AND ri.timestamp IS NOT NULL
+    {days_filter}
+    GROUP BY 1, 2
+"""
+
+# The range bounds let the timestamp index narrow the scan; ANY() keeps only the listed days
+DAYS_FILTER = """
+    AND ri.timestamp >= %(first_day)s
+    AND ri.timestamp < %(last_day)s + INTERVAL '1 day'
+    AND ri.timestamp::date = ANY(%(days)s)
+"""
+
+
+def _changed_days(cur, watermark) -> List:
+    cur.execute(f"""
+        SELECT DISTINCT timestamp::date
+        FROM recipe_interactions
+        WHERE rating_score IS NOT NULL
+        AND timestamp IS NOT NULL
+        AND COALESCE(updated_at, timestamp) > %s - INTERVAL '{ROLLUP_WATERMARK_OVERLAP}'
+    """, (watermark,))
+    return sorted(row[0] for row in cur.fetchall())
+
+
+def refresh_rating_rollups(full: bool = False) -> Dict:
+    """
+    Bring the daily rollup tables up to date.
+
+    Incremental by default: only days containing ratings written since the last
+    refresh are recomputed. ``full`` rebuilds every bucket.
+    """
+    from app.db import get_db_cursor, RATING_POOL
+
+    started = time.perf_counter()
+    with get_db_cursor(dict_cursor=False, pool_type=RATING_POOL) as (cur, conn):
+        cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (ROLLUP_LOCK_KEY,))
+        if not cur.fetchone()[0]:
+            conn.rollback()
+            return {"status": "skipped", "reason": "refresh already running"}
+
+        cur.execute("SELECT CURRENT_TIMESTAMP")
+        refreshed_at = cur.fetchone()[0]
+        cur.execute(
+            "SELECT refreshed_through FROM rating_rollup_state WHERE name = %s",
+            (ROLLUP_STATE_NAME,)
+        )
+        row = cur.fetchone()
+        watermark = row[0] if row else None
+
+        if full or watermark is None:
+            mode, days = "full", None
+            cur.execute("DELETE FROM recipe_rating_daily")
+            cur.execute("DELETE FROM cuisine_rating_daily")
+            params = {}
+            days_filter = ""
+        else:
+            mode, days = "incremental", _changed_days(cur, watermark)
+            params = {"first_day": days[0], "last_day": days[-1], "days": days} if days else {}
+            days_filter = DAYS_FILTER
+            if days:
+                cur.execute("DELETE FROM recipe_rating_daily WHERE day = ANY(%s)", (days,))
+                cur.execute("DELETE FROM cuisine_rating_daily WHERE day = ANY(%s)", (days,))
+
+        if days is None or days:
+            cur.execute(RECIPE_DAILY_SQL.format(days_filter=days_filter), params)
+            cur.execute(CUISINE_DAILY_SQL.format(days_filter=days_filter), params)
+
+        cur.execute("""
+            INSERT INTO rating_rollup_state (name, refreshed_through)
+            VALUES (%s, %s)
+            ON CONFLICT (name) DO UPDATE SET refreshed_through = EXCLUDED.refreshed_through
+        """, (ROLLUP_STATE_NAME, refreshed_at))
+        conn.commit()
+
+    result = {
+        "status": "success",
+        "mode": mode,
+        "days_refreshed": len(days) if days is not None else "all",
+        "duration_s": round(time.perf_counter() - started, 2),
+    }
+    if mode == "full" or days:
+        logger.info(f"Refreshed rating rollups: {result}")
+    return result
+
+
+def _window_clause(days: Optional[int]) -> str:
+    return "WHERE d.day > CURRENT_DATE - %(days)s" if days else ""
+
+
+def get_cuisine_trends(days: int = 90, limit: int = 10, min_ratings: int = 3) -> List[Dict]:
+    """Cuisines ranked by total rating points (average x count) over the last ``days`` days."""
+    from app.db import get_db_cursor, RATING_POOL
+
+    with get_db_cursor(dict_cursor=True, autocommit=True, pool_type=RATING_POOL) as (cur, conn):
+        cur.execute(f"""
+            SELECT
+                d.cuisine,
+                SUM(d.rating_count) AS rating_count,
+                SUM(d.rating_sum)::float / SUM(d.rating_count) AS average_rating,
+                SUM(d.high_ratings) AS high_ratings
+            FROM cuisine_rating_daily d
+            {_window_clause(days)}
+            GROUP BY d.cuisine
+            HAVING SUM(d.rating_count) >= %(min_ratings)s
+            ORDER BY SUM(d.rating_sum) DESC, SUM(d.rating_count) DESC
+            LIMIT %(limit)s
+        """, {"days": days, "min_ratings": min_ratings, "limit": limit})
+        return cur.fetchall()
+
+
+def get_recipe_performance(days: Optional[int] = None, limit: int = 20, min_ratings: int = 2) -> List[Dict]:
+    """Best-rated recipes, all-time or over the last ``days`` days."""
+    from app.db import get_db_cursor, RATING_POOL
+
+    with get_db_cursor(dict_cursor=True, autocommit=True, pool_type=RATING_POOL) as (cur, conn):
+        cur.execute(f"""
+            SELECT
+                t.recipe_id,
+                sr.title,
+                sr.cuisine,
+                sr.complexity,
+                sr.total_time,
+                t.rating_count,
+                t.average_rating,
+                t.times_made,
+                t.would_remake
+            FROM (
+                SELECT
+                    d.recipe_id,
+                    SUM(d.rating_count) AS rating_count,
+                    SUM(d.rating_sum)::float / SUM(d.rating_count) AS average_rating,
+                    SUM(d.times_made) AS times_made,
+                    SUM(d.would_remake) AS would_remake
+                FROM recipe_rating_daily d
+                {_window_clause(days)}
+                GROUP BY d.recipe_id
+                HAVING SUM(d.rating_count) >= %(min_ratings)s
+            ) t
+            JOIN scraped_recipes sr ON sr.id = t.recipe_id
+            ORDER BY t.average_rating DESC, t.rating_count DESC
+            LIMIT %(limit)s
+        """, {"days": days, "min_ratings": min_ratings, "limit": limit})
+        return cur.fetchall()
+
+
+rating_rollup_refresher = PeriodicTask(
+    "rating-rollup-refresher",
+    refresh_rating_rollups,
+    interval_s=RATING_ROLLUP_REFRESH_MINUTES * 60,
+    initial_delay_s=30,
+)
@@ -0,0 +1,310 @@
+# app/ai/recipe_neighbors.py - Item-to-item collaborative filtering for recipe recommendations
+"""
+Recipe recommendations from precomputed item-item similarity.
+
+The recommendation endpoint used to self-join recipe_interactions on every
+request (every rating of the user against every other user's rating). Instead,
+a periodic builder computes the cosine similarity between recipes' rating
+vectors and keeps the top-K neighbours of each recipe in recipe_neighbors.
+The build is CPU-bound and loads every rating, so it runs out of process
+(scripts/build_recipe_neighbors.py from cron); web workers only run it when
+RECOMMENDATION_BUILD_IN_APP is set.
+Serving a user is then one indexed lookup for the neighbour lists of the
+recipes they rated highly, merged in memory.
+
+Similarity is adjusted cosine: each rating is centred on the user's mean
+first, so two recipes are similar when the same users liked (or disliked)
+both, not merely because both were rated. It is computed as a sparse product
+of the centred rating matrix with its transpose, one recipe row at a time, so
+memory stays proportional to the number of ratings rather than recipe pairs.
+"""
+
+import heapq
+import logging
+import math
+import os
+import time
+from collections import defaultdict
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..utils.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+# Neighbours kept per recipe
+RECOMMENDATION_NEIGHBORS_K = int(os.getenv("RECOMMENDATION_NEIGHBORS_K", "50"))
+# Minimum number of users who rated both recipes for a similarity to count
+RECOMMENDATION_MIN_SUPPORT = int(os.getenv("RECOMMENDATION_MIN_SUPPORT", "2"))
+# Ratings at or above this score seed a user's recommendations
+RECOMMENDATION_SEED_RATING = float(os.getenv("RECOMMENDATION_SEED_RATING", "4"))
+# Cap on ratings used per user (most recent first); heavy raters dominate the pair count
+RECOMMENDATION_MAX_ITEMS_PER_USER = int(os.getenv("RECOMMENDATION_MAX_ITEMS_PER_USER", "500"))
+# How old the table may get before a build is due; 0 disables the in-app builder
+RECOMMENDATION_REBUILD_INTERVAL_HOURS = float(os.getenv("RECOMMENDATION_REBUILD_INTERVAL_HOURS", "6"))
+# Run the builder inside web workers too (off: it competes with requests for the GIL and pool)
+RECOMMENDATION_BUILD_IN_APP = os.getenv("RECOMMENDATION_BUILD_IN_APP", "false").lower() == "true"
+
+# Application-wide key for pg_try_advisory_lock so only one worker rebuilds ("SMPRECN" in ASCII)
+NEIGHBOR_BUILD_LOCK_KEY = 0x534d505245434e
+
+RATINGS_SQL = """
+    SELECT user_id, recipe_id, rating_score
+    FROM recipe_interactions
+    WHERE rating_score IS NOT NULL AND recipe_id IS NOT NULL
+    ORDER BY user_id, timestamp DESC
+"""
+
+RECORD_BUILD_SQL = """
+    INSERT INTO recipe_neighbor_builds (id, built_at, recipes, pairs)
+    VALUES (1, CURRENT_TIMESTAMP, %s, %s)
+    ON CONFLICT (id) DO UPDATE
+    SET built_at = EXCLUDED.built_at, recipes = EXCLUDED.recipes, pairs = EXCLUDED.pairs
+"""
+
+# Tables built before recipe_neighbor_builds existed only have their rows' built_at
+LAST_BUILD_AGE_SQL = """
+    SELECT EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - GREATEST(
+        (SELECT built_at FROM recipe_neighbor_builds WHERE id = 1),
+        (SELECT MAX(built_at) FROM recipe_neighbors)
+    )))
+"""
+
+Neighbor = Tuple[int, float, int]  # (neighbor_id, similarity, support)
+
+
+def compute_item_neighbors(
+    ratings: Iterable[Tuple[int, int, float]],
+    k: int = RECOMMENDATION_NEIGHBORS_K,
+    min_support: int = RECOMMENDATION_MIN_SUPPORT,
+    max_items_per_user: int = RECOMMENDATION_MAX_ITEMS_PER_USER,
+) -> Dict[int, List[Neighbor]]:
+    """
+    Top-k adjusted-cosine neighbours for every rated recipe.
+
+    ``ratings`` yields (user_id, recipe_id, score). A user's first rating of a
+    recipe wins, so pass them most recent first.
+    """
+    # User rows of the rating matrix (CSR-style)
+    user_items: Dict[int, Dict[int, float]] = defaultdict(dict)
+    for user_id, recipe_id, score in ratings:
+        items = user_items[user_id]
+        if recipe_id not in items and len(items) < max_items_per_user:
+            items[recipe_id] = float(score)
+
+    # Centre each user's row on their mean rating
+    rows = {}
+    for user_id, items in user_items.items():
+        mean = sum(items.values()) / len(items)
+        rows[user_id] = [(recipe_id, score - mean) for recipe_id, score in items.items()]
+
+    # Recipe columns (CSC-style) and their vector norms
+
+    item_users: Dict[int, List[Tuple[int, float]]] = defaultdict(list)
+    squares: Dict[int, float] = defaultdict(float)
+    for user_id, row in rows.items():
+        for recipe_id, score in row:
+            item_users[recipe_id].append((user_id, score))
+            squares[recipe_id] += score * score
+    norms = {recipe_id: math.sqrt(total) for recipe_id, total in squares.items()}
+    del user_items, squares
+
+    neighbors: Dict[int, List[Neighbor]] = {}
+    for recipe_id, raters in item_users.items():
+        norm = norms[recipe_id]
+        if not norm:
+            # Every rating of this recipe equals its rater's mean; nothing to compare
+            continue
+        # Row recipe_id of R^T R: dot products with every co-rated recipe
+        dots: Dict[int, float] = {}
+        support: Dict[int, int] = {}
+        dots_get = dots.get
+        support_get = support.get
+        for user_id, score in raters:
+            for other_id, other_score in rows[user_id]:
+                dots[other_id] = dots_get(other_id, 0.0) + score * other_score
+                support[other_id] = support_get(other_id, 0) + 1
+        dots.pop(recipe_id, None)
+
+        candidates = (
+            (other_id, dot / (norm * norms[other_id]), support[other_id])
+            for other_id, dot in dots.items()
+            if dot > 0 and support[other_id] >= min_support
+        )
+        top = heapq.nlargest(k, candidates, key=itemgetter(1))
+        if top:
+            neighbors[recipe_id] = [(other_id, round(sim, 6), count) for other_id, sim, count in top]
+    return neighbors
+
+
+def merge_neighbor_lists(
+    rated: Dict[int, float],
+    neighbor_rows: Iterable[Tuple[int, int, float]],
+    seed_rating: float = RECOMMENDATION_SEED_RATING,
+) -> List[Dict]:
+    """
+    Score candidate recipes from the neighbour lists of a user's high-rated recipes.
+
+    ``rated`` maps the user's rated recipe ids to their scores; ``neighbor_rows``
+    are (recipe_id, neighbor_id, similarity) rows for those recipes. Candidates
+    are ranked by the similarity-weighted sum of the seed ratings, so a recipe
+    close to several loved recipes outranks one close to a single recipe.
+    """
+    weights: Dict[int, float] = defaultdict(float)
+    weighted: Dict[int, float] = defaultdict(float)
+    because: Dict[int, List[int]] = defaultdict(list)
+
+    for recipe_id, neighbor_id, similarity in neighbor_rows:
+        seed = rated.get(recipe_id)
+        if seed is None or seed < seed_rating or neighbor_id in rated or similarity <= 0:
+            continue
+        weights[neighbor_id] += similarity
+        weighted[neighbor_id] += similarity * seed
+        because[neighbor_id].append(recipe_id)
+
+    return [
+        {
+            "recipe_id": neighbor_id,
+            "score": round(weighted[neighbor_id], 4),
+            "predicted_rating": round(weighted[neighbor_id] / weight, 2),
+            "because_of": because[neighbor_id][:3],
+        }
+        for neighbor_id, weight in weights.items()
+    ]
+
+
+def recommend_recipes(user_id: int, limit: int = 10) -> List[Dict]:
+    """Recommendations for a user from the precomputed neighbour table."""
+    from app.db import get_db_cursor, RATING_POOL
+
+    with get_db_cursor(dict_cursor=False, autocommit=True, pool_type=RATING_POOL) as (cur, conn):
+        cur.execute("""
+            SELECT recipe_id, rating_score
+            FROM recipe_interactions
+            WHERE user_id = %s AND rating_score IS NOT NULL AND recipe_id IS NOT NULL
+        """, (user_id,))
+        rated = {recipe_id: float(score) for recipe_id, score in cur.fetchall()}
+        seeds = [recipe_id for recipe_id, score in rated.items() if score >= RECOMMENDATION_SEED_RATING]
+        if not seeds:
+            return []
+
+        cur.execute("""
+            SELECT recipe_id, neighbor_id, similarity
+            FROM recipe_neighbors
+            WHERE recipe_id = ANY(%s)
+        """, (seeds,))
+        candidates = merge_neighbor_lists(rated, cur.fetchall())
+        top = heapq.nlargest(limit, candidates, key=itemgetter("score"))
+        if not top:
+            return []
+
+        # Community rating for display, as the previous endpoint returned
+        cur.execute("""
+            SELECT recipe_id, AVG(rating_score)::float AS avg_rating, COUNT(*) AS rating_count
+            FROM recipe_interactions
+            WHERE recipe_id = ANY(%s) AND rating_score IS NOT NULL
+            GROUP BY recipe_id
+        """, ([rec["recipe_id"] for rec in top],))
+        community = {recipe_id: (avg, count) for recipe_id, avg, count in cur.fetchall()}
+
+    for rec in top:
+        avg_rating, rating_count = community.get(rec["recipe_id"], (None, 0))
+        rec["avg_rating"] = round(avg_rating, 2) if avg_rating is not None else None
+        rec["rating_count"] = rating_count
+    return top
+
+
+def store_neighbors(cur, neighbors: Dict[int, List[Neighbor]]) -> int:
+    """Replace the neighbour table in the cursor's transaction. Returns the row count."""
+    from psycopg2.extras import execute_values
+
+    rows = [
+        (recipe_id, neighbor_id, similarity, support)
+        for recipe_id, items in neighbors.items()
+        for neighbor_id, similarity, support in items
+    ]
+    # DELETE rather than TRUNCATE so readers keep seeing the old lists until commit
+    cur.execute("DELETE FROM recipe_neighbors")
+    execute_values(
+        cur,
+        "INSERT INTO recipe_neighbors (recipe_id, neighbor_id, similarity, support) VALUES %s",
+        rows,
+        page_size=5000,
+    )
+    return len(rows)
+
+
+def build_recipe_neighbors(k: int = RECOMMENDATION_NEIGHBORS_K,
+                           min_support: int = RECOMMENDATION_MIN_SUPPORT) -> Dict:
+    """Recompute recipe_neighbors from all ratings. Returns timing and size stats."""
+    from app.db import get_db_cursor, RATING_POOL
+
+    started = time.perf_counter()
+    with get_db_cursor(dict_cursor=False, pool_type=RATING_POOL) as (cur, conn):
+        # Server-side cursor so a large table is streamed rather than fetched at once
+        with conn.cursor(name="recipe_neighbor_ratings") as ratings_cur:
+            ratings_cur.itersize = 50000
+            ratings_cur.execute(RATINGS_SQL)
+            ratings = [(user_id, recipe_id, score) for user_id, recipe_id, score in ratings_cur]
+        loaded = time.perf_counter()
+
+        neighbors = compute_item_neighbors(ratings, k=k, min_support=min_support)
+        computed = time.perf_counter()
+
+        pairs = store_neighbors(cur, neighbors)
+        # Stamped even when nothing was stored, so an empty table isn't rebuilt on every check
+        cur.execute(RECORD_BUILD_SQL, (len(neighbors), pairs))
+        conn.commit()
+    stored = time.perf_counter()
+
+    stats = {
+        "ratings": len(ratings),
+        "recipes": len(neighbors),
+        "pairs": pairs,
+        "load_s": round(loaded - started, 2),
+        "compute_s": round(computed - loaded, 2),
+        "store_s": round(stored - computed, 2),
+    }
+    logger.info(f"Rebuilt recipe_neighbors: {stats}")
+    return stats
+
+
+def _seconds_since_last_build(cur) -> Optional[float]:
+    cur.execute(LAST_BUILD_AGE_SQL)
+    row = cur.fetchone()
+    return float(row[0]) if row and row[0] is not None else None
+
+
+def build_neighbors_if_due(**build_kwargs) -> Optional[Dict]:
+    """
+    Rebuild when the last build is older than the rebuild interval and no
+    other worker is building. Judging by the recorded build time (not the
+    worker's own clock) means worker restarts don't trigger extra rebuilds.
+    """
+    from app.db import get_db_cursor, RATING_POOL
+
+    interval_s = RECOMMENDATION_REBUILD_INTERVAL_HOURS * 3600
+    with get_db_cursor(dict_cursor=False, autocommit=True, pool_type=RATING_POOL) as (cur, conn):
+        age = _seconds_since_last_build(cur)
+        if age is not None and age < interval_s:
+            return None
+        cur.execute("SELECT pg_try_advisory_lock(%s)", (NEIGHBOR_BUILD_LOCK_KEY,))
+        if not cur.fetchone()[0]:
+            return None
+        try:
+            # Re-check under the lock: another worker may have just finished
+            age = _seconds_since_last_build(cur)
+            if age is not None and age < interval_s:
+                return None
+            return build_recipe_neighbors(**build_kwargs)
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (NEIGHBOR_BUILD_LOCK_KEY,))
+
+
+# Checks every few minutes (at most the rebuild interval); build_neighbors_if_due decides.
+# Only started when RECOMMENDATION_BUILD_IN_APP is set.
+recipe_neighbor_builder = PeriodicTask(
+    "recipe-neighbor-builder",
+    build_neighbors_if_due,
+    interval_s=min(RECOMMENDATION_REBUILD_INTERVAL_HOURS * 3600, 600) if RECOMMENDATION_BUILD_IN_APP else 0,
+)
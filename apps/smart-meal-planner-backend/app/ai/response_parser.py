@@ -0,0 +1,268 @@
+"""Shared parsing for agent (LLM) JSON responses.
+
+Every agent used to strip markdown fences by hand and call ``json.loads``, so a
+single truncated or slightly malformed response forced a full retry.  This
+module centralises that work:
+
+  - ``json_mode_kwargs``       request JSON mode from models that support it
+  - ``strip_fences``           remove ```json fences and surrounding prose
+  - ``IncrementalJSONParser``  scan a (possibly streamed) response chunk by chunk,
+                               tracking which top-level array items have closed
+  - ``repair_json``            drop trailing commas and close truncated documents
+  - ``parse_json_response``    strict parse, then repair, then ValueError
+                               (``repair=False`` for responses where a shortened
+                               document is worse than an error, e.g. the skeleton)
+
+Regression fixtures for captured bad responses live in
+``tests/fixtures/agent_responses``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Chat models that accept response_format={"type": "json_object"}.
+JSON_MODE_MODEL_PREFIXES = (
+    "gpt-4o",
+    "gpt-4.1",
+    "gpt-4-turbo",
+    "gpt-4-1106",
+    "gpt-4-0125",
+    "gpt-3.5-turbo",
+)
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def json_mode_kwargs(model: str) -> dict:
+    """Extra ChatCompletion kwargs that ask the model for a bare JSON object.
+
+    Returns an empty dict for models without JSON mode or when AGENT_JSON_MODE=false.
+    """
+    if os.getenv("AGENT_JSON_MODE", "true").lower() != "true":
+        return {}
+    if (model or "").startswith(JSON_MODE_MODEL_PREFIXES):
+        return {"response_format": {"type": "json_object"}}
+    return {}
+
+
+def strip_fences(raw: str) -> str:
+    """Remove markdown code fences and any prose before the first JSON bracket."""
+    text = (raw or "").strip()
+    if text.startswith("```"):
+        parts = text.split("```")
+        text = parts[1] if len(parts) > 1 else text.lstrip("`")
+        if text.startswith("json"):
+            text = text[4:]
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    return text[min(starts):] if starts else text.strip()
+
+
+class IncrementalJSONParser:
+    """Single-pass scanner for a JSON document that may arrive in chunks.
+
+    ``feed`` can be called with each streamed delta.  The scanner keeps a
+    cleaned copy of the text (trailing commas dropped, anything after the
+    root value ignored) and records:
+
+      - the last position where the document could be cut and still be
+        closed into valid JSON (used by ``repaired``), and
+      - the span of every container element that fully closed inside an
+        array directly under the root object (used by ``completed_items``),
+        e.g. each finished meal in ``{"meals": [...]}``.
+    """
+
+    def __init__(self):
+        self._buf: list[str] = []
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._pending_comma = False
+        self._started = False
+        self._done = False
+        self._last = None           # '{', '[', ',', ':', 'key', 'value', 'bare'
+        self._string_start = 0
+        self._string_is_key = False
+        self._root_key = None       # last key seen at depth 1
+        self._array_key = None      # key owning the current depth-2 array
+        self._item_start = None
+        self._items: list[tuple[str, int, int]] = []
+        self._safe_len = 0
+        self._safe_stack: tuple[str, ...] = ()
+
+    # -- scanning -----------------------------------------------------------
+
+    @property
+    def text(self) -> str:
+        return "".join(self._buf)
+
+    @property
+    def complete(self) -> bool:
+        return self._done
+
+    def _mark_safe(self) -> None:
+        self._safe_len = len(self._buf)
+        self._safe_stack = tuple(self._stack)
+
+    def _emit(self, ch: str) -> None:
+        if self._pending_comma:
+            self._pending_comma = False
+            if ch not in "}]":
+                self._buf.append(",")
+        self._buf.append(ch)
+
+    def feed(self, chunk: str) -> None:
+        for ch in chunk or "":
+            if self._done:
+                return
+            if not self._started:
+                # Skip fences / prose until the root value opens
+                if ch in "{[":
+                    self._started = True
+                else:
+                    continue
+
+            if self._in_string:
+                self._buf.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._close_string()
+                continue
+
+            if ch in " \t\r\n":
+                if not self._pending_comma:
+                    self._buf.append(ch)
+                continue
+
+            if self._last == "bare" and ch in ",]}":
+                self._last = "value"
+                self._mark_safe()
+
+            if ch == '"':
+                self._emit(ch)
+                self._in_string = True
+                self._string_start = len(self._buf)
+                self._string_is_key = bool(self._stack) and self._stack[-1] == "{" and self._last in ("{", ",")
+            elif ch in "{[":
+                self._emit(ch)
+                self._stack.append(ch)
+                if len(self._stack) == 2 and ch == "[" and self._stack[0] == "{":
+                    self._array_key = self._root_key
+                elif len(self._stack) == 3 and self._stack[1] == "[" and self._array_key:
+                    self._item_start = len(self._buf) - 1
+                self._last = ch
+                self._mark_safe()
+            elif ch in "}]":
+                if not self._stack or _CLOSERS[self._stack[-1]] != ch:
+                    continue  # stray closer; ignore rather than corrupt the buffer
+                self._emit(ch)
+                self._stack.pop()
+                if len(self._stack) == 2 and self._item_start is not None:
+                    self._items.append((self._array_key, self._item_start, len(self._buf)))
+                    self._item_start = None
+                elif len(self._stack) == 1 and ch == "]":
+                    self._array_key = None
+                self._last = "value"
+                if not self._stack:
+                    self._done = True
+                self._mark_safe()
+            elif ch == ",":
+                self._pending_comma = True
+                self._last = ","
+            elif ch == ":":
+                self._emit(ch)
+                self._last = ":"
+            else:
+                self._emit(ch)
+                self._last = "bare"
+
+    def _close_string(self) -> None:
+        if self._string_is_key:
+            self._last = "key"
+            if len(self._stack) == 1:
+                self._root_key = "".join(self._buf[self._string_start:-1])
+        else:
+            self._last = "value"
+            self._mark_safe()
+
+    # -- results ------------------------------------------------------------
+
+    def completed_items(self, key: str) -> list:
+        """Parsed elements of the root-level array ``key`` that fully closed."""
+        text = self.text
+        items = []
+        for item_key, start, end in self._items:
+            if item_key != key:
+                continue
+            try:
+                items.append(json.loads(text[start:end]))
+            except json.JSONDecodeError:
+                continue
+        return items
+
+    def repaired(self) -> str:
+        """Best-effort valid JSON text for whatever has been fed so far."""
+        if not self._started:
+            return ""
+        text = self.text
+        if self._done:
+            return text
+
+        # First try closing everything exactly where the text stopped
+        tail = '"' if self._in_string else ""
+        closers = "".join(_CLOSERS[c] for c in reversed(self._stack))
+        candidate = text + tail + closers
+        if self._last not in (":", "key"):
+            try:
+                json.loads(candidate)
+                return candidate
+            except json.JSONDecodeError:
+                pass
+
+        # Otherwise roll back to the last point where a value was complete
+        closers = "".join(_CLOSERS[c] for c in reversed(self._safe_stack))
+        return text[: self._safe_len] + closers
+
+
+def repair_json(raw: str) -> str:
+    """Return ``raw`` with fences stripped, trailing commas removed and truncation closed."""
+    parser = IncrementalJSONParser()
+    parser.feed(raw)
+    return parser.repaired()
+
+
+def parse_json_response(raw: str, label: str = "agent", repair: bool = True) -> dict | list:
+    """Parse an agent response, repairing common damage before giving up.
+
+    With repair=False only fences and surrounding prose are stripped, so a
+    truncated response fails instead of parsing as a shorter document.
+    Raises ValueError (the exception agents already surface) if the response
+    cannot be turned into JSON.
+    """
+    text = strip_fences(raw)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as exc:
+        first_error = exc
+
+    if not repair:
+        logger.error("%s: could not parse JSON response: %s\nRaw: %.500s", label, first_error, raw)
+        raise ValueError(f"{label} returned invalid JSON: {first_error}") from first_error
+
+    repaired = repair_json(raw)
+    try:
+        result = json.loads(repaired)
+    except json.JSONDecodeError:
+        logger.error("%s: could not parse JSON response: %s\nRaw: %.500s", label, first_error, raw)
+        raise ValueError(f"{label} returned invalid JSON: {first_error}") from first_error
+
+    logger.warning("%s: repaired malformed JSON response (%s)", label, first_error)
+    return result
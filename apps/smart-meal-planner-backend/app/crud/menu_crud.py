@@ -2,6 +2,7 @@
 
 import json
 from ..db import get_db_connection
+from ..utils.menu_summary import menu_summary_json
 
 def create_menu_in_db(menu_plan_dict: dict) -> int:
     """
@@ -14,10 +15,10 @@ def create_menu_in_db(menu_plan_dict: dict) -> int:
     try:
         with conn.cursor() as cur:
             cur.execute("""
-                INSERT INTO menus (meal_plan_json)
-                VALUES (%s)
+                INSERT INTO menus (meal_plan_json, summary)
+                VALUES (%s, %s)
                 RETURNING id
-            """, (menu_plan_str,))
+            """, (menu_plan_str, menu_summary_json(menu_plan_dict)))
             new_id = cur.fetchone()[0]
         conn.commit()
         return new_id
@@ -3,15 +3,24 @@ Ultra-simplified database connection module.
 This version strips away all complexity to ensure reliable operation.
 """
 
+import base64
+import json
 import psycopg2
+import psycopg2.extensions
 from psycopg2.extras import RealDictCursor
 from psycopg2 import pool
 from fastapi import HTTPException
+import contextvars
+import itertools
 import logging
+import os
 import time
 import threading
+import traceback
 from contextlib import contextmanager
+from datetime import datetime
 from app.config import DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT
+from app.utils.periodic import PeriodicTask
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -22,6 +31,267 @@ _total_connections = 0
 _peak_connections = 0
 _last_reset_time = time.time()
 
+# Named pools. Rating and analytics traffic gets its own, smaller pool so a
+# burst of analytics queries can't starve core requests (and vice versa).
+DEFAULT_POOL = "default"
+RATING_POOL = "ratings"
+POOL_SIZES = {
+    DEFAULT_POOL: (10, 100),
+    RATING_POOL: (
+        int(os.getenv("RATING_DB_POOL_MIN", "1")),
+        int(os.getenv("RATING_DB_POOL_MAX", "20")),
+    ),
+}
+
+# Secondary pools are created on first use; the default pool stays in connection_pool
+_named_pools = {}
+_named_pools_lock = threading.Lock()
+
+# Per-pool checkout counters for /admin/db-stats
+_pool_stats = {name: {"active": 0, "total": 0, "peak": 0} for name in POOL_SIZES}
+
+# Checkout instrumentation. Every connection handed out by get_db_connection is
+# tagged with the route (or background thread) that took it; queries and hold
+# time are attributed to that route, and checkouts held longer than
+# DB_LEAK_THRESHOLD_S are reported. Capturing the stack that took each
+# checkout costs a traceback walk per checkout, so it is opt-in for chasing a
+# leak (DB_CAPTURE_CHECKOUT_STACKS=true).
+DB_LEAK_THRESHOLD_S = float(os.getenv("DB_LEAK_THRESHOLD_S", "30"))
+DB_LEAK_CHECK_INTERVAL_S = float(os.getenv("DB_LEAK_CHECK_INTERVAL_S", "30"))
+DB_CAPTURE_CHECKOUT_STACKS = os.getenv("DB_CAPTURE_CHECKOUT_STACKS", "false").lower() == "true"
+
+# Pool keys for get_db_cursor: one per checkout, so a cursor opened inside
+# another on the same thread gets its own connection and checkout
+_checkout_keys = itertools.count()
+
+_current_request = contextvars.ContextVar("db_request_usage", default=None)
+_open_checkouts = {}
+_route_stats = {}
+_instrumentation_lock = threading.Lock()
+
+
+class RequestDbUsage:
+    """DB usage of one HTTP request; the route template is read once routing has run"""
+
+    __slots__ = ("scope", "checkouts", "queries", "query_time", "hold_time", "_session")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.checkouts = 0
+        self.queries = 0
+        self.query_time = 0.0
+        self.hold_time = 0.0
+        self._session = None
+
+    @property
+    def session(self):
+        """The request's RequestSession, created on first use"""
+        if self._session is None:
+            self._session = RequestSession()
+        return self._session
+
+    @property
+    def route(self):
+        path = getattr(self.scope.get("route"), "path", None) or "unmatched"
+        return f"{self.scope.get('method', '')} {path}"
+
+
+class Checkout:
+    __slots__ = ("request", "owner", "pool", "pooled", "started", "stack", "queries", "query_time", "flagged")
+
+    def __init__(self, request, pool_name, pooled):
+        self.request = request
+        self.owner = None if request else f"background:{threading.current_thread().name}"
+        self.pool = pool_name
+        self.pooled = pooled
+        self.started = time.monotonic()
+        self.stack = traceback.extract_stack(limit=16)[:-3] if DB_CAPTURE_CHECKOUT_STACKS else None
+        self.queries = 0
+        self.query_time = 0.0
+        self.flagged = False
+
+    @property
+    def route(self):
+        return self.request.route if self.request else self.owner
+
+
+def _route_entry(route):
+    entry = _route_stats.get(route)
+    if entry is None:
+        entry = _route_stats[route] = {
+            "requests": 0, "checkouts": 0, "queries": 0, "query_time_s": 0.0,
+            "hold_time_s": 0.0, "max_hold_s": 0.0, "unreturned": 0,
+        }
+    return entry
+
+
+def _begin_checkout(conn, pool_name, pooled):
+    if getattr(conn, "_checkout", None) is not None:
+        # Direct get_db_connection calls are keyed by thread, so a nested one
+        # gets the same connection back; keep attributing it to the outer one
+        return
+    request = _current_request.get()
+    if request is not None:
+        request.checkouts += 1
+    checkout = Checkout(request, pool_name, pooled)
+    conn._checkout = checkout
+    with _instrumentation_lock:
+        _open_checkouts[id(conn)] = checkout
+
+
+def _end_checkout(conn, returned=True):
+    checkout = getattr(conn, "_checkout", None)
+    if checkout is None:
+        return
+    conn._checkout = None
+    held = time.monotonic() - checkout.started
+    if checkout.request is not None:
+        checkout.request.queries += checkout.queries
+        checkout.request.query_time += checkout.query_time
+        checkout.request.hold_time += held
+    with _instrumentation_lock:
+        _open_checkouts.pop(id(conn), None)
+        entry = _route_entry(checkout.route)
+        entry["checkouts"] += 1
+        entry["queries"] += checkout.queries
+        entry["query_time_s"] += checkout.query_time
+        entry["hold_time_s"] += held
+        entry["max_hold_s"] = max(entry["max_hold_s"], held)
+        if checkout.pooled and not returned:
+            # conn.close() on a pooled connection: the pool still counts it as in use
+            entry["unreturned"] += 1
+    if checkout.flagged:
+        logger.warning(f"Flagged DB checkout from {checkout.route} released after {held:.1f}s")
+
+
+def _note_query(conn, elapsed):
+    checkout = getattr(conn, "_checkout", None)
+    if checkout is not None:
+        checkout.queries += 1
+        checkout.query_time += elapsed
+
+
+class _InstrumentedCursorMixin:
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _note_query(self.connection, time.perf_counter() - started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _note_query(self.connection, time.perf_counter() - started)
+
+
+class InstrumentedCursor(_InstrumentedCursorMixin, psycopg2.extensions.cursor):
+    pass
+
+
+class InstrumentedDictCursor(_InstrumentedCursorMixin, RealDictCursor):
+    pass
+
+
+_INSTRUMENTED_CURSORS = {
+    None: InstrumentedCursor,
+    psycopg2.extensions.cursor: InstrumentedCursor,
+    RealDictCursor: InstrumentedDictCursor,
+}
+
+
+class TrackedConnection(psycopg2.extensions.connection):
+    """Connection whose cursors count queries and whose close() ends its checkout"""
+
+    _checkout = None
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get("cursor_factory")
+        if factory in _INSTRUMENTED_CURSORS:
+            kwargs["cursor_factory"] = _INSTRUMENTED_CURSORS[factory]
+        return super().cursor(*args, **kwargs)
+
+    def close(self):
+        _end_checkout(self, returned=False)
+        super().close()
+
+
+def start_request_tracking(scope):
+    """Begin attributing DB checkouts in this context to the request (see main.db_request_scope)"""
+    usage = RequestDbUsage(scope)
+    return usage, _current_request.set(usage)
+
+
+def finish_request_tracking(usage, token):
+    """Return the request's shared connection, if it took one, and record the request"""
+    _current_request.reset(token)
+    if usage._session is not None:
+        usage._session.close()
+    with _instrumentation_lock:
+        _route_entry(usage.route)["requests"] += 1
+
+
+def get_route_db_stats(limit=25):
+    """Per-route DB usage, worst total query time first"""
+    with _instrumentation_lock:
+        routes = [dict(stats, route=route) for route, stats in _route_stats.items()]
+    for stats in routes:
+        requests = stats["requests"] or 1
+        stats["queries_per_request"] = round(stats["queries"] / requests, 2)
+        stats["db_ms_per_request"] = round(stats["query_time_s"] * 1000 / requests, 2)
+        for key in ("query_time_s", "hold_time_s", "max_hold_s"):
+            stats[key] = round(stats[key], 3)
+    routes.sort(key=lambda stats: stats["query_time_s"], reverse=True)
+    return routes[:limit]
+
+
+def find_leaked_checkouts(threshold_s=None):
+    """Checkouts held longer than threshold_s, oldest first, with the stack that took them"""
+    threshold_s = DB_LEAK_THRESHOLD_S if threshold_s is None else threshold_s
+    now = time.monotonic()
+    with _instrumentation_lock:
+        checkouts = list(_open_checkouts.values())
+    leaks = []
+    for checkout in sorted(checkouts, key=lambda c: c.started):
+        held = now - checkout.started
+        if held < threshold_s:
+            break
+        leaks.append({
+            "route": checkout.route,
+            "pool": checkout.pool,
+            "held_s": round(held, 1),
+            "queries": checkout.queries,
+            "stack": traceback.format_list(checkout.stack) if checkout.stack else None,
+            "checkout": checkout,
+        })
+    return leaks
+
+
+def check_for_leaks():
+    """Log checkouts that crossed the leak threshold since the last check"""
+    leaks = find_leaked_checkouts()
+    for leak in leaks:
+        checkout = leak.pop("checkout")
+        if checkout.flagged:
+            continue
+        checkout.flagged = True
+        stack = "".join(leak["stack"] or ["(set DB_CAPTURE_CHECKOUT_STACKS=true to capture)\n"])
+        logger.warning(
+            f"Possible connection leak: {leak['route']} has held a '{leak['pool']}' connection "
+            f"for {leak['held_s']}s ({leak['queries']} queries). Checked out at:\n{stack}"
+        )
+    return {"open_over_threshold": len(leaks)}
+
+
+db_leak_detector = PeriodicTask(
+    "db-leak-detector",
+    check_for_leaks,
+    interval_s=DB_LEAK_CHECK_INTERVAL_S,
+    initial_delay_s=DB_LEAK_CHECK_INTERVAL_S,
+)
+
 # Create a single connection pool with more capacity
 # Thread-local storage for tracking connections in each thread
 thread_local = threading.local()
@@ -39,36 +309,41 @@ def is_connection_stale(conn_id, max_age_seconds=300):
     age = time.time() - _connection_creation_times[conn_id]
     return age > max_age_seconds
 
-# Connection pool creation with retry logic
-def create_connection_pool():
-    """Create or recreate the connection pool with retries"""
-    global connection_pool
+def _create_pool(pool_type, max_retries=3):
+    """Create a ThreadedConnectionPool sized for pool_type, with retries"""
+    minconn, maxconn = POOL_SIZES[pool_type]
     retry_count = 0
-    max_retries = 3
 
     while retry_count < max_retries:
         try:
-            connection_pool = pool.ThreadedConnectionPool(
-                minconn=10,     # Minimum connections
-                maxconn=100,    # Maximum connections - increased for high concurrency
+            new_pool = pool.ThreadedConnectionPool(
+                minconn=minconn,
+                maxconn=maxconn,
                 dbname=DB_NAME,
                 user=DB_USER,
                 password=DB_PASSWORD,
                 host=DB_HOST,
-                port=DB_PORT
+                port=DB_PORT,
+                connection_factory=TrackedConnection
             )
-            logger.info(f"Database connection pool created with 10-100 connections")
-            return connection_pool
+            logger.info(f"Database connection pool '{pool_type}' created with {minconn}-{maxconn} connections")
+            return new_pool
         except Exception as e:
             retry_count += 1
-            logger.error(f"Failed to create database connection pool (attempt {retry_count}/{max_retries}): {str(e)}")
+            logger.error(f"Failed to create database connection pool '{pool_type}' (attempt {retry_count}/{max_retries}): {str(e)}")
             if retry_count < max_retries:
                 time.sleep(1)  # Wait before retrying
             else:
-                logger.critical("Failed to create connection pool after maximum retries")
-                connection_pool = None
+                logger.critical(f"Failed to create connection pool '{pool_type}' after maximum retries")
                 return None
 
+# Connection pool creation with retry logic
+def create_connection_pool():
+    """Create or recreate the connection pool with retries"""
+    global connection_pool
+    connection_pool = _create_pool(DEFAULT_POOL)
+    return connection_pool
+
 # Initialize the connection pool
 try:
     connection_pool = create_connection_pool()
@@ -76,9 +351,33 @@ except Exception as e:
     logger.error(f"Failed to create database connection pool: {str(e)}")
     connection_pool = None
 
-def get_db_connection():
-    """Get a database connection from the pool or create a new one"""
+def get_pool(pool_type=None):
+    """Return the pool for pool_type (None means the default pool), creating secondary pools lazily"""
+    if pool_type in (None, DEFAULT_POOL):
+        return connection_pool
+    if pool_type not in POOL_SIZES:
+        raise ValueError(f"Unknown pool type: {pool_type}")
+
+    named_pool = _named_pools.get(pool_type)
+    if named_pool is None or named_pool.closed:
+        with _named_pools_lock:
+            named_pool = _named_pools.get(pool_type)
+            if named_pool is None or named_pool.closed:
+                # A single attempt: callers fall back to a direct connection if it fails
+                named_pool = _create_pool(pool_type, max_retries=1)
+                if named_pool:
+                    _named_pools[pool_type] = named_pool
+    return named_pool
+
+def get_db_connection(pool_type=None, key=None):
+    """
+    Get a database connection from the pool (default or named) or create a new one.
+
+    Pooled connections are keyed by the current thread unless ``key`` is given;
+    return them with the same key.
+    """
     global _active_connections, _total_connections, _peak_connections, connection_pool
+    pool_name = pool_type or DEFAULT_POOL
 
     try:
         # Temporarily disable thread-local connection reuse to prevent closed connection issues
@@ -92,19 +391,20 @@ def get_db_connection():
             thread_local.connection = None
 
         # Get connection from pool if available
-        if connection_pool:
+        conn_pool = get_pool(pool_type)
+        if conn_pool:
             max_retries = 3
             for attempt in range(max_retries):
                 try:
                     # Get connection from pool
-                    conn = connection_pool.getconn(key=id(threading.current_thread()))
+                    conn = conn_pool.getconn(key=key or id(threading.current_thread()))
                     
                     # Validate connection is actually open and working
                     if conn.closed:
                         logger.warning(f"Pool returned closed connection, attempt {attempt + 1}")
                         # Return the bad connection and try again
                         try:
-                            connection_pool.putconn(conn, close=True)
+                            conn_pool.putconn(conn, key=key, close=True)
                         except:
                             pass
                         continue
@@ -118,7 +418,7 @@ def get_db_connection():
                         logger.warning(f"Connection failed test query: {str(e)}, attempt {attempt + 1}")
                         # Return the bad connection and try again
                         try:
-                            connection_pool.putconn(conn, close=True)
+                            conn_pool.putconn(conn, key=key, close=True)
                         except:
                             pass
                         continue
@@ -127,6 +427,10 @@ def get_db_connection():
                     _active_connections += 1
                     _total_connections += 1
                     _peak_connections = max(_peak_connections, _active_connections)
+                    pool_stats = _pool_stats[pool_name]
+                    pool_stats["active"] += 1
+                    pool_stats["total"] += 1
+                    pool_stats["peak"] = max(pool_stats["peak"], pool_stats["active"])
 
                     # Log connection stats periodically
                     if _total_connections % 100 == 0 or _active_connections > 50:
@@ -138,6 +442,7 @@ def get_db_connection():
                     except Exception as e:
                         logger.warning(f"Could not rollback connection: {str(e)}")
 
+                    _begin_checkout(conn, pool_name, pooled=True)
                     return conn
                 except Exception as pool_error:
                     logger.warning(f"Pool connection attempt {attempt + 1} failed: {str(pool_error)}")
@@ -154,20 +459,30 @@ def get_db_connection():
             password=DB_PASSWORD,
             host=DB_HOST,
             port=DB_PORT,
-            connect_timeout=10
+            connect_timeout=10,
+            connection_factory=TrackedConnection
         )
         # Set statement timeout for direct connections
         with conn.cursor() as cursor:
             cursor.execute("SET statement_timeout = 30000")  # 30 seconds
+        _begin_checkout(conn, pool_name, pooled=False)
         return conn
     
     except Exception as e:
         logger.error(f"Failed to connect to database: {str(e)}")
         raise HTTPException(status_code=500, detail="Database connection error")
 
+def _release_pool_slot(pool_type):
+    pool_stats = _pool_stats[pool_type or DEFAULT_POOL]
+    pool_stats["active"] = max(pool_stats["active"] - 1, 0)
+
 @contextmanager
 def get_db_cursor(dict_cursor=True, autocommit=False, pool_type=None):
-    """Context manager for database connections and cursors"""
+    """
+    Context manager for database connections and cursors.
+
+    pool_type selects a named pool (e.g. RATING_POOL); None uses the default pool.
+    """
     global _active_connections
 
     conn = None
@@ -179,9 +494,11 @@ def get_db_cursor(dict_cursor=True, autocommit=False, pool_type=None):
     try:
         # Always get a fresh connection for the cursor operation
         # This is safer than reusing thread-local connections at this level
-        conn = get_db_connection()
+        conn_pool = get_pool(pool_type)
+        checkout_key = ("cursor", next(_checkout_keys))
+        conn = get_db_connection(pool_type, key=checkout_key)
         connection_owner = True
-        pooled = connection_pool is not None
+        pooled = conn_pool is not None
 
         # Set autocommit if requested
         if autocommit:
@@ -236,14 +553,15 @@ def get_db_cursor(dict_cursor=True, autocommit=False, pool_type=None):
         # Handle the connection based on ownership
         if conn and connection_owner:
             # We own the connection, so clean it up
-            if pooled and connection_pool:
+            if pooled and conn_pool:
                 try:
                     # Clear thread local connection reference
                     if hasattr(thread_local, 'connection') and thread_local.connection is conn:
                         thread_local.connection = None
 
                     # Return connection to pool
-                    connection_pool.putconn(conn, key=id(threading.current_thread()), close=False)
+                    _end_checkout(conn)
+                    conn_pool.putconn(conn, key=checkout_key, close=False)
                     connection_returned = True
                     logger.debug("Connection returned to pool")
 
@@ -252,6 +570,7 @@ def get_db_cursor(dict_cursor=True, autocommit=False, pool_type=None):
                     if _active_connections < 0:  # Sanity check
                         logger.warning("Active connections count went negative - resetting to 0")
                         _active_connections = 0
+                    _release_pool_slot(pool_type)
                 except Exception as e:
                     logger.warning(f"Error returning connection to pool: {str(e)}")
             else:
@@ -273,6 +592,7 @@ def get_db_cursor(dict_cursor=True, autocommit=False, pool_type=None):
                 _active_connections -= 1
                 if _active_connections < 0:  # Sanity check
                     _active_connections = 0
+                _release_pool_slot(pool_type)
 
                 # Try one more time to clean up the connection
                 try:
@@ -282,6 +602,117 @@ def get_db_cursor(dict_cursor=True, autocommit=False, pool_type=None):
                 except:
                     pass
 
+class RequestSession:
+    """
+    One connection shared by every helper called during a request.
+
+    The connection is checked out on first use, runs in autocommit mode (the
+    shared helpers are single-statement reads and writes) and goes back to the
+    pool when the request ends, in the db_request_scope middleware. It is keyed
+    by the session rather than the thread, so sync endpoints and the middleware
+    may touch it from different threads.
+    """
+
+    def __init__(self, pool_type=None):
+        self.pool_type = pool_type
+        self.conn = None
+        self._lock = threading.Lock()
+
+    def connection(self):
+        with self._lock:
+            if self.conn is None or self.conn.closed:
+                conn = get_db_connection(self.pool_type, key=id(self))
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute("SET statement_timeout = 30000")  # 30 seconds
+                self.conn = conn
+            return self.conn
+
+    @contextmanager
+    def cursor(self, dict_cursor=True):
+        """Yield (cursor, connection) on the shared connection"""
+        conn = self.connection()
+        cursor = conn.cursor(cursor_factory=RealDictCursor) if dict_cursor else conn.cursor()
+        try:
+            yield cursor, conn
+        finally:
+            try:
+                cursor.close()
+            except Exception as e:
+                logger.warning(f"Error closing session cursor: {str(e)}")
+
+    def close(self):
+        """Return the connection to its pool (or close it if it was a direct connection)"""
+        global _active_connections
+        with self._lock:
+            conn, self.conn = self.conn, None
+        if conn is None:
+            return
+        conn_pool = get_pool(self.pool_type)
+        pooled = getattr(conn, "_checkout", None) is not None and conn._checkout.pooled
+        try:
+            if conn.closed:
+                _end_checkout(conn, returned=False)
+                if conn_pool:
+                    conn_pool.putconn(conn, key=id(self), close=True)
+            elif pooled and conn_pool:
+                conn.autocommit = False
+                _end_checkout(conn)
+                conn_pool.putconn(conn, key=id(self), close=False)
+            else:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"Error returning request session connection: {str(e)}")
+            try:
+                conn.close()
+            except Exception:
+                pass
+        _active_connections = max(_active_connections - 1, 0)
+        _release_pool_slot(self.pool_type)
+
+
+def get_request_session():
+    """The current request's RequestSession, or None outside a request"""
+    usage = _current_request.get()
+    return usage.session if usage is not None else None
+
+
+@contextmanager
+def session_cursor(dict_cursor=True):
+    """
+    Yield (cursor, connection) on the request's shared connection.
+
+    Outside a request (scripts, background threads) this falls back to an
+    autocommit get_db_cursor.
+    """
+    session = get_request_session()
+    if session is None:
+        with get_db_cursor(dict_cursor=dict_cursor, autocommit=True) as (cur, conn):
+            yield cur, conn
+        return
+    with session.cursor(dict_cursor) as (cur, conn):
+        yield cur, conn
+
+
+def get_db_session():
+    """
+    FastAPI dependency yielding the request's RequestSession.
+
+    Usage: ``db: RequestSession = Depends(get_db_session)`` then
+    ``with db.cursor() as (cur, conn): ...``
+    """
+    session = get_request_session()
+    if session is not None:
+        yield session
+        return
+    # Called without the middleware (e.g. tests mounting a bare router)
+    session = RequestSession()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
 def close_all_connections():
     """Close all connections in the pool"""
     global _active_connections, _total_connections, _peak_connections, _last_reset_time, connection_pool
@@ -317,6 +748,18 @@ def close_all_connections():
     except Exception as e:
         logger.warning(f"Error clearing thread connections: {str(e)}")
 
+    # Close secondary pools; they are recreated on next use
+    with _named_pools_lock:
+        for pool_type, named_pool in list(_named_pools.items()):
+            try:
+                named_pool.closeall()
+                logger.info(f"Closed connection pool '{pool_type}'")
+            except Exception as e:
+                logger.warning(f"Error closing connection pool '{pool_type}': {str(e)}")
+        _named_pools.clear()
+    for pool_stats in _pool_stats.values():
+        pool_stats["active"] = 0
+
     # Close the pool
     if connection_pool:
         try:
@@ -352,12 +795,42 @@ def get_connection_stats():
         "pool_status": "active" if connection_pool else "unavailable"
     }
 
+def get_pool_stats():
+    """Size, usage and checkout counters for every named pool"""
+    pools = {}
+    for pool_type, (minconn, maxconn) in POOL_SIZES.items():
+        conn_pool = connection_pool if pool_type == DEFAULT_POOL else _named_pools.get(pool_type)
+        info = dict(_pool_stats[pool_type])
+        info.update({
+            "min_connections": minconn,
+            "max_connections": maxconn,
+            "status": "active" if conn_pool and not conn_pool.closed else "not created",
+        })
+        if conn_pool:
+            try:
+                info["used_connections"] = len(conn_pool._used)
+                info["free_connections"] = len(conn_pool._pool)
+            except (AttributeError, TypeError):
+                pass
+        pools[pool_type] = info
+    return pools
+
 # Recipe interaction functions
 def track_recipe_interaction(user_id, recipe_id, interaction_type, rating=None):
-    """Record user interaction with a recipe"""
+    """
+    Record user interaction with a recipe.
+
+    While the background flusher is running (started in main.startup_event) the
+    event is queued and written in a batch; returns True if queued. Without it
+    (scripts, tests) the row is inserted inline and its id is returned.
+    """
+    from app.utils.interaction_events import interaction_events
+    if interaction_events.running:
+        return interaction_events.enqueue(user_id, recipe_id, interaction_type, rating)
+
     try:
         logger.info(f"Tracking recipe interaction: user={user_id}, recipe={recipe_id}, type={interaction_type}")
-        with get_db_cursor(dict_cursor=False) as (cur, conn):
+        with session_cursor(dict_cursor=False) as (cur, conn):
             cur.execute("""
                 INSERT INTO recipe_interactions 
                 (user_id, recipe_id, interaction_type, rating, timestamp)
@@ -365,7 +838,6 @@ def track_recipe_interaction(user_id, recipe_id, interaction_type, rating=None):
                 RETURNING id
             """, (user_id, recipe_id, interaction_type, rating))
             interaction_id = cur.fetchone()[0]
-            conn.commit()
             logger.info(f"Recorded interaction with ID: {interaction_id}")
             return interaction_id
     except Exception as e:
@@ -376,7 +848,7 @@ def is_recipe_saved(user_id, menu_id, recipe_id=None, meal_time=None):
     """Check if a recipe is saved by the user"""
     try:
         logger.info(f"Checking if recipe is saved: user={user_id}, menu={menu_id}, recipe={recipe_id}")
-        with get_db_cursor(dict_cursor=False) as (cur, conn):
+        with session_cursor(dict_cursor=False) as (cur, conn):
             if recipe_id and meal_time:
                 cur.execute("""
                     SELECT COUNT(*) FROM saved_recipes
@@ -395,11 +867,89 @@ def is_recipe_saved(user_id, menu_id, recipe_id=None, meal_time=None):
         logger.error(f"Error checking if recipe is saved: {str(e)}")
         return False
 
+def _saved_key(menu_id, recipe_id=None, meal_time=None):
+    """
+    Normalized lookup key; meal ids arrive as ints from JSON and strings from
+    query params. Only a NULL recipe_id means a whole-menu save: a blank one
+    keys on its own so it can't mark the whole menu saved.
+    """
+    return (
+        int(menu_id) if menu_id is not None else None,
+        str(recipe_id) if recipe_id is not None else None,
+        meal_time or None,
+    )
+
+def get_saved_status_map(user_id, menu_ids, cur=None):
+    """
+    Fetch every saved entry a user has for one or more menus in a single query.
+
+    Pass the caller's open cursor as ``cur`` to avoid checking out a second
+    pooled connection. Returns {(menu_id, recipe_id, meal_time): saved_id};
+    a whole-menu save is keyed (menu_id, None, None). Look entries up with
+    ``saved_id_for``.
+    """
+    if menu_ids is None:
+        return {}
+    if not isinstance(menu_ids, (list, tuple, set)):
+        menu_ids = [menu_ids]
+    menu_ids = [int(m) for m in menu_ids if m is not None]
+    if not user_id or not menu_ids:
+        return {}
+
+    query = """
+        SELECT id, menu_id, recipe_id, meal_time
+        FROM saved_recipes
+        WHERE user_id = %s AND menu_id = ANY(%s)
+    """
+
+    def _collect(cursor):
+        cursor.execute(query, (user_id, menu_ids))
+        saved = {}
+        for row in cursor.fetchall():
+            if isinstance(row, dict):
+                row = (row["id"], row["menu_id"], row["recipe_id"], row["meal_time"])
+            saved_id, menu_id, recipe_id, meal_time = row
+            if recipe_id is None:
+                # Menu-level saves are keyed without recipe/meal_time
+                meal_time = None
+            saved.setdefault(_saved_key(menu_id, recipe_id, meal_time), saved_id)
+        return saved
+
+    try:
+        if cur is not None:
+            return _collect(cur)
+        with session_cursor(dict_cursor=False) as (own_cur, conn):
+            return _collect(own_cur)
+    except Exception as e:
+        logger.error(f"Error fetching saved status map: {str(e)}")
+        return {}
+
+def saved_id_for(saved_map, menu_id, recipe_id=None, meal_time=None):
+    """Saved id for a menu (no recipe_id) or a recipe/meal_time in it, from get_saved_status_map."""
+    if recipe_id == "":
+        return None
+    if recipe_id is None or not meal_time:
+        return saved_map.get(_saved_key(menu_id))
+    return saved_map.get(_saved_key(menu_id, recipe_id, meal_time))
+
+def annotate_saved_meals(meal_plan, menu_id, saved_map):
+    """Set is_saved (and saved_id) on every meal with an id in a parsed meal plan."""
+    if not isinstance(meal_plan, dict):
+        return meal_plan
+    for day in meal_plan.get('days') or []:
+        for meal in day.get('meals') or []:
+            recipe_id = meal.get('id')
+            if recipe_id:
+                saved_id = saved_id_for(saved_map, menu_id, recipe_id, meal.get('meal_time'))
+                meal['is_saved'] = saved_id is not None
+                meal['saved_id'] = saved_id
+    return meal_plan
+
 def get_saved_recipe_id(user_id, menu_id, recipe_id=None, meal_time=None):
     """Get the saved_id for a recipe if it exists"""
     try:
         logger.info(f"Getting saved recipe ID: user={user_id}, menu={menu_id}, recipe={recipe_id}")
-        with get_db_cursor(dict_cursor=False) as (cur, conn):
+        with session_cursor(dict_cursor=False) as (cur, conn):
             if recipe_id and meal_time:
                 cur.execute("""
                     SELECT id FROM saved_recipes
@@ -422,6 +972,10 @@ def save_recipe(user_id, menu_id=None, recipe_id=None, recipe_name=None, day_num
                instructions=None, complexity_level=None, appliance_used=None, servings=None,
                scraped_recipe_id=None, recipe_source=None):
     """Save a recipe or entire menu to user's favorites with complete recipe data"""
+    if recipe_id == "":
+        # Stored as-is it would read back as neither this recipe nor the whole menu
+        logger.warning(f"Refusing to save a blank recipe_id: user={user_id}, menu={menu_id}")
+        return None
     try:
         logger.info(f"Saving recipe: user={user_id}, menu={menu_id}, recipe={recipe_id}, meal_time={meal_time}")
         
@@ -506,116 +1060,119 @@ def save_recipe(user_id, menu_id=None, recipe_id=None, recipe_name=None, day_num
 
 def unsave_recipe(user_id, saved_id=None, menu_id=None, recipe_id=None, meal_time=None, scraped_recipe_id=None):
     """Remove a saved recipe"""
+    if saved_id:
+        # Delete by direct ID
+        where, params = "sv.id = %s", (saved_id,)
+    elif scraped_recipe_id:
+        # Delete by scraped recipe ID
+        where, params = "sv.scraped_recipe_id = %s", (scraped_recipe_id,)
+    elif recipe_id and menu_id and meal_time:
+        # Delete by recipe, menu and meal time
+        where, params = "sv.menu_id = %s AND sv.recipe_id = %s AND sv.meal_time = %s", (menu_id, recipe_id, meal_time)
+    elif menu_id:
+        # Delete entire menu
+        where, params = "sv.menu_id = %s AND sv.recipe_id IS NULL", (menu_id,)
+    else:
+        logger.warning("No valid identifiers provided for recipe deletion")
+        return False
+
+    from .ai.rating_analytics import rating_analytics
+
     try:
         logger.info(f"Unsaving recipe: user={user_id}, saved_id={saved_id}, menu={menu_id}, recipe={recipe_id}")
-        with get_db_cursor() as (cur, conn):
-            if saved_id:
-                # Delete by direct ID
-                cur.execute("""
-                    DELETE FROM saved_recipes
-                    WHERE id = %s AND user_id = %s
-                    RETURNING id
-                """, (saved_id, user_id))
-            elif scraped_recipe_id:
-                # Delete by scraped recipe ID
-                cur.execute("""
-                    DELETE FROM saved_recipes
-                    WHERE user_id = %s AND scraped_recipe_id = %s
-                    RETURNING id
-                """, (user_id, scraped_recipe_id))
-            elif recipe_id and menu_id and meal_time:
-                # Delete by recipe, menu and meal time
-                cur.execute("""
-                    DELETE FROM saved_recipes
-                    WHERE user_id = %s AND menu_id = %s AND recipe_id = %s AND meal_time = %s
-                    RETURNING id
-                """, (user_id, menu_id, recipe_id, meal_time))
-            elif menu_id:
-                # Delete entire menu
-                cur.execute("""
-                    DELETE FROM saved_recipes
-                    WHERE user_id = %s AND menu_id = %s AND recipe_id IS NULL
-                    RETURNING id
-                """, (user_id, menu_id))
-            else:
-                logger.warning("No valid identifiers provided for recipe deletion")
-                return False
-                
-            deleted = cur.fetchone()
-            conn.commit()
-            return deleted is not None
+        # The delete and the removal of its quick ratings from the preference profile commit together
+        with rating_analytics.profile_update(user_id) as profile:
+            deleted = profile.delete_saved(where, params)
+        return deleted > 0
     except Exception as e:
         logger.error(f"Error unsaving recipe: {str(e)}")
         return False
 
-def get_user_saved_recipes(user_id):
-    """Get all saved recipes for a user"""
-    if not user_id:
-        logger.error("get_user_saved_recipes called with empty user_id")
-        return []
+# Columns for saved-recipe list cards; the JSON-heavy ones only come with details
+SAVED_RECIPE_SUMMARY_COLUMNS = (
+    "id", "menu_id", "recipe_id", "recipe_name", "day_number", "meal_time", "notes",
+    "scraped_recipe_id", "recipe_source", "complexity_level", "servings", "prep_time", "quick_rating",
+    "created_at",
+)
+SAVED_RECIPE_DETAIL_COLUMNS = ("macros", "ingredients", "instructions", "appliance_used")
+
+SAVED_RECIPES_PAGE_SIZE = 50
+SAVED_RECIPES_MAX_PAGE_SIZE = 200
+
+
+def encode_saved_recipes_cursor(created_at, saved_id):
+    payload = json.dumps([created_at.isoformat() if created_at else None, saved_id])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
 
-    logger.info(f"Getting saved recipes for user: {user_id}")
 
-    # Try with the simpler approach first - no joins
+def decode_saved_recipes_cursor(cursor):
+    """(created_at, id) of the last row of the previous page; ValueError if malformed"""
     try:
-        with get_db_cursor(dict_cursor=True, autocommit=True) as (cur, conn):
-            # Simple query without join to get basic recipe data
-            cur.execute("""
-                SELECT * FROM saved_recipes
-                WHERE user_id = %s
-                ORDER BY created_at DESC
-            """, (user_id,))
+        created_at, saved_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        # Rows saved before created_at had a default carry NULL
+        return (datetime.fromisoformat(created_at) if created_at is not None else None), int(saved_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
 
-            recipes = cur.fetchall()
-            logger.info(f"Successfully fetched {len(recipes)} saved recipes for user {user_id}")
 
-            # If that worked, try to get menu nicknames separately
-            if recipes:
-                try:
-                    # Get menu IDs from recipes
-                    menu_ids = {r['menu_id'] for r in recipes if r['menu_id'] is not None}
-
-                    if menu_ids:
-                        # Get menu nicknames
-                        menu_id_list = list(menu_ids)
-                        placeholders = ', '.join(['%s'] * len(menu_id_list))
-                        cur.execute(f"""
-                            SELECT id, nickname FROM menus
-                            WHERE id IN ({placeholders})
-                        """, menu_id_list)
-
-                        menu_nicknames = {m['id']: m['nickname'] for m in cur.fetchall()}
-
-                        # Add menu nicknames to recipes
-                        for recipe in recipes:
-                            if recipe['menu_id'] in menu_nicknames:
-                                recipe['menu_nickname'] = menu_nicknames[recipe['menu_id']]
-                except Exception as menu_e:
-                    # If menu query fails, just continue with the recipes we have
-                    logger.warning(f"Error fetching menu nicknames: {str(menu_e)}")
-
-            return recipes
-    except Exception as e:
-        logger.error(f"Error with simple saved recipes query: {str(e)}")
+def get_saved_recipes_page(user_id, limit=SAVED_RECIPES_PAGE_SIZE, cursor=None, include_details=False):
+    """
+    One page of a user's saved recipes, newest first, with menu nicknames.
+
+    Keyset-paged on (created_at, id) along idx_saved_recipes_user_created;
+    pass the returned next_cursor back as ``cursor`` for the following page.
+    Rows with a NULL created_at sort first (Postgres' DESC order) and page
+    by id alone.
+    Rows carry SAVED_RECIPE_SUMMARY_COLUMNS, plus SAVED_RECIPE_DETAIL_COLUMNS
+    when include_details is set (the full row is at /saved-recipes/{saved_id}).
+    Raises ValueError for a malformed cursor.
+    """
+    columns = SAVED_RECIPE_SUMMARY_COLUMNS + (SAVED_RECIPE_DETAIL_COLUMNS if include_details else ())
+    params = [user_id]
+    after = ""
+    if cursor:
+        created_at, saved_id = decode_saved_recipes_cursor(cursor)
+        if created_at is None:
+            # Still inside the NULL group, which every dated row follows
+            after = "AND (sr.created_at IS NOT NULL OR sr.id < %s)"
+            params.append(saved_id)
+        else:
+            after = "AND (sr.created_at, sr.id) < (%s, %s)"
+            params.extend([created_at, saved_id])
+    params.append(limit + 1)
+
+    with session_cursor(dict_cursor=True) as (cur, conn):
+        cur.execute(f"""
+            SELECT {', '.join('sr.' + column for column in columns)}, m.nickname AS menu_nickname
+            FROM saved_recipes sr
+            LEFT JOIN menus m ON m.id = sr.menu_id
+            WHERE sr.user_id = %s {after}
+            ORDER BY sr.created_at DESC, sr.id DESC
+            LIMIT %s
+        """, params)
+        rows = cur.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_saved_recipes_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return {"saved_recipes": rows, "next_cursor": next_cursor}
 
-        # As a fallback, try an even simpler approach with minimal fields
-        try:
-            with get_db_cursor(dict_cursor=True, autocommit=True) as (cur, conn):
-                cur.execute("""
-                    SELECT id, user_id, menu_id, recipe_id, recipe_name,
-                           meal_time, scraped_recipe_id, recipe_source, created_at
-                    FROM saved_recipes
-                    WHERE user_id = %s
-                    ORDER BY created_at DESC
-                """, (user_id,))
-
-                minimal_recipes = cur.fetchall()
-                logger.info(f"Fallback query returned {len(minimal_recipes)} recipes")
-                return minimal_recipes
-        except Exception as fallback_e:
-            logger.error(f"Even fallback recipe query failed: {str(fallback_e)}")
-            # Last resort - return empty list instead of failing
-            return []
+def get_user_saved_recipes(user_id):
+    """
+    Every saved recipe for a user as full rows, newest first, with menu nicknames.
+    Only for clients that predate paging (the mobile app calls GET /saved-recipes/
+    without a limit); everything else should use get_saved_recipes_page.
+    """
+    with session_cursor(dict_cursor=True) as (cur, conn):
+        cur.execute("""
+            SELECT sr.*, m.nickname AS menu_nickname
+            FROM saved_recipes sr
+            LEFT JOIN menus m ON m.id = sr.menu_id
+            WHERE sr.user_id = %s
+            ORDER BY sr.created_at DESC, sr.id DESC
+        """, (user_id,))
+        return cur.fetchall()
 
 def get_saved_recipe_by_id(user_id, saved_id):
     """Get saved recipe details by ID"""
@@ -628,7 +1185,7 @@ def get_saved_recipe_by_id(user_id, saved_id):
 
         # Try with join query first
         try:
-            with get_db_cursor(dict_cursor=True, autocommit=True) as (cur, conn):
+            with session_cursor(dict_cursor=True) as (cur, conn):
                 cur.execute("""
                     SELECT sr.*, m.nickname as menu_nickname
                     FROM saved_recipes sr
@@ -647,7 +1204,7 @@ def get_saved_recipe_by_id(user_id, saved_id):
             logger.warning(f"Error with joined query for saved recipe: {str(e)}")
 
             # Try with simpler query as fallback
-            with get_db_cursor(dict_cursor=True, autocommit=True) as (cur, conn):
+            with session_cursor(dict_cursor=True) as (cur, conn):
                 cur.execute("""
                     SELECT * FROM saved_recipes
                     WHERE id = %s AND user_id = %s
@@ -675,53 +1232,31 @@ def get_recent_ingredients(user_id: int, days: int = 3) -> list:
     Used by the skeleton agent to build the ingredient cooldown blocklist.
     Returns an empty list if the table doesn't exist yet or on any error.
     """
+    from app.utils.ingredient_usage import recent_ingredients
+
     try:
         with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
-            cur.execute(
-                """
-                SELECT DISTINCT ingredient_name
-                FROM ingredient_usage_log
-                WHERE user_id = %s
-                  AND used_on_date >= CURRENT_DATE - INTERVAL '%s days'
-                ORDER BY ingredient_name
-                """,
-                (user_id, days),
-            )
-            rows = cur.fetchall()
-            return [r[0] for r in rows] if rows else []
+            return recent_ingredients(cur, user_id, days)
     except Exception as exc:
         logger.warning("get_recent_ingredients failed for user %s: %s", user_id, exc)
         return []
 
 
 def bulk_insert_ingredient_usage(user_id: int, menu_id, rows: list) -> None:
-    """Bulk-insert ingredient usage rows and prune entries older than 14 days.
+    """Bulk-insert ingredient usage rows in one execute_values batch.
 
     Each item in rows: (user_id, menu_id, ingredient_name, used_on_date, meal_time)
-    This is a convenience wrapper; the orchestrator also calls the same SQL directly
-    when it has an open cursor.
+    This is a convenience wrapper; the orchestrator calls write_ingredient_usage
+    directly when it has an open cursor. Old rows are pruned by the periodic sweeper.
     """
     if not rows:
         return
+    from app.utils.ingredient_usage import forget_recent_ingredients, write_ingredient_usage
+
     try:
         with get_db_cursor(dict_cursor=False) as (cur, conn):
-            cur.executemany(
-                """
-                INSERT INTO ingredient_usage_log
-                    (user_id, menu_id, ingredient_name, used_on_date, meal_time)
-                VALUES (%s, %s, %s, %s, %s)
-                ON CONFLICT DO NOTHING
-                """,
-                rows,
-            )
-            cur.execute(
-                """
-                DELETE FROM ingredient_usage_log
-                WHERE user_id = %s
-                  AND used_on_date < CURRENT_DATE - INTERVAL '14 days'
-                """,
-                (user_id,),
-            )
+            write_ingredient_usage(cur, rows)
             conn.commit()
+        forget_recent_ingredients(row[0] for row in rows)
     except Exception as exc:
         logger.warning("bulk_insert_ingredient_usage failed for user %s: %s", user_id, exc)
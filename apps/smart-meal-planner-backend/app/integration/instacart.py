@@ -15,6 +15,8 @@ import requests
 from typing import Dict, List, Optional, Any, Union
 from fastapi import HTTPException, status
 
+from app.utils.logging_config import LazyJson
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -86,15 +88,14 @@ class InstacartClient:
             API response as dictionary
         """
         url = f"{BASE_URL}/{API_VERSION}/{endpoint}"
-        logger.info(f"Making {method} request to {url}")
+        started = time.perf_counter()
         
         try:
-            # Log the request details for debugging
-            logger.info(f"Making {method} request to {url}")
+            # Request details only at DEBUG; bodies can hold a whole shopping list
             if params:
-                logger.info(f"Request params: {params}")
+                logger.debug("Request params: %s", params)
             if data:
-                logger.info(f"Request data: {json.dumps(data)[:100]}...")
+                logger.debug("Request data: %s", LazyJson(data))
 
             # Make the request
             if method.upper() == "GET":
@@ -108,8 +109,8 @@ class InstacartClient:
             else:
                 raise ValueError(f"Unsupported HTTP method: {method}")
 
-            # Log response info for debugging
-            logger.info(f"Response status: {response.status_code}")
+            logger.info("Instacart %s %s -> %s", method, endpoint, response.status_code,
+                        extra={"duration_ms": round((time.perf_counter() - started) * 1000, 1)})
 
             # Check for HTTP errors
             response.raise_for_status()
@@ -119,7 +120,7 @@ class InstacartClient:
 
             # Parse and return the JSON response
             json_data = response.json()
-            logger.info(f"Response data sample: {str(json_data)[:200]}...")
+            logger.debug("Response data: %s", LazyJson(json_data))
             return json_data
 
         except requests.exceptions.HTTPError as e:
@@ -407,21 +408,17 @@ class InstacartClient:
         }
 
         # Log the request format with retailer ID information
-        logger.info(f"Using retailer_id: {retailer_id} for API request")
-        logger.info(f"Sending {len(data['line_items'])} items to Instacart:")
-        for i, item in enumerate(data['line_items'][:3]):  # Log first 3 items
-            logger.info(f"  Item {i+1}: {item}")
-        logger.info(f"Full request data: {json.dumps(data, indent=2)}")
+        logger.debug("Full request data: %s", LazyJson(data, indent=2))
 
         # Use the correct endpoint from official documentation
         endpoint = "products/products_link"  # This is the correct endpoint according to docs
-        logger.info(f"Creating shopping list URL for retailer {retailer_id} with {len(cleaned_items)} items")
+        logger.info("Creating shopping list URL for retailer %s with %d items", retailer_id, len(cleaned_items))
 
         try:
             response = self._make_request("POST", endpoint, data=data)
 
-            # Log the full response to debug URL extraction
-            logger.info(f"Full response from Instacart API: {json.dumps(response, indent=2)}")
+            # The full response helps debug URL extraction
+            logger.debug("Full response from Instacart API: %s", LazyJson(response, indent=2))
 
             # Try multiple possible response formats to extract URL
             url = None
@@ -676,15 +673,11 @@ def create_shopping_list_url_from_items(
     logger.info(f"Using retailer_id: {retailer_id}")
     
     # Log sample items
-    if item_names and len(item_names) > 0:
-        sample_items = item_names[:3]
-        logger.info(f"Sample items: {sample_items}")
+    if item_names:
+        logger.debug("Sample items: %s", item_names[:3])
     
     # Use the official API - without any fallback
-    # Enable verbose logging to diagnose API issues
-    old_level = logging.getLogger().level
-    logging.getLogger().setLevel(logging.DEBUG)
-    
+    # (for verbose request logging set LOG_LEVELS=app.integration.instacart=DEBUG)
     try:
         # Clean items to ensure proper format
         cleaned_items = []
@@ -711,7 +704,7 @@ def create_shopping_list_url_from_items(
         # Log API request details
         logger.info(f"Calling products/products_link endpoint for retailer: {retailer_id}")
         logger.info(f"Using postal_code: {postal_code}, country_code: {country_code}")
-        logger.info(f"First few items: {cleaned_items[:3] if cleaned_items else []}")
+        logger.debug("First few items: %s", cleaned_items[:3])
         
         # Call the official API method
         url = client.create_shopping_list_url(
@@ -737,7 +730,4 @@ def create_shopping_list_url_from_items(
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
             detail=f"Failed to create Instacart shopping list: {str(e)}"
-        )
-    finally:
-        # Always restore the original logging level
-        logging.getLogger().setLevel(old_level)
\ No newline at end of file
+        )
\ No newline at end of file
@@ -0,0 +1,267 @@
+# app/integration/instacart_retailers.py
+"""
+Instacart retailer directory, cached by (postal_code, country_code).
+
+The retailer list for a ZIP changes rarely, many users share a ZIP, and
+everyone without one gets the 80538 default, yet /instacart/retailers and
+/instacart/retailers/nearby asked the Instacart API on every request. Lookups
+now go through three layers:
+
+1. an in-process copy, valid for RETAILER_DIRECTORY_TTL_HOURS (an empty list,
+   usually a mistyped ZIP, only for RETAILER_EMPTY_TTL_MINUTES) and capped at
+   RETAILER_DIRECTORY_CACHE_SIZE postal codes;
+2. the instacart_retailer_directory table, so every worker (and a restarted
+   one) reuses what any of them fetched;
+3. the Instacart API. Concurrent lookups of one ZIP in a process share a
+   single upstream call, and a stale stored list is served if the API fails.
+
+A periodic refresher records how often each ZIP was requested and re-fetches
+the busiest ones shortly before they expire, so hot ZIPs never wait on the
+API.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from app.utils.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+RETAILER_DIRECTORY_TTL_HOURS = float(os.getenv("RETAILER_DIRECTORY_TTL_HOURS", "24"))
+RETAILER_EMPTY_TTL_MINUTES = float(os.getenv("RETAILER_EMPTY_TTL_MINUTES", "30"))
+# Postal codes are user input; bounds both the cached lists and the request counts
+RETAILER_DIRECTORY_CACHE_SIZE = int(os.getenv("RETAILER_DIRECTORY_CACHE_SIZE", "5000"))
+RETAILER_REFRESH_MINUTES = float(os.getenv("RETAILER_REFRESH_MINUTES", "30"))
+RETAILER_REFRESH_BATCH = int(os.getenv("RETAILER_REFRESH_BATCH", "25"))
+# A ZIP counts as hot if it was requested within this many hours
+RETAILER_HOT_WINDOW_HOURS = float(os.getenv("RETAILER_HOT_WINDOW_HOURS", "48"))
+
+# Session-scoped advisory lock so one worker runs the refresh at a time ("SMPRTLR")
+RETAILER_REFRESH_LOCK_KEY = 0x534d5052544c52
+
+TTL_S = RETAILER_DIRECTORY_TTL_HOURS * 3600
+EMPTY_TTL_S = RETAILER_EMPTY_TTL_MINUTES * 60
+
+LOAD_SQL = """
+    SELECT retailers, EXTRACT(EPOCH FROM fetched_at) AS fetched_at
+    FROM instacart_retailer_directory
+    WHERE postal_code = %s AND country_code = %s
+"""
+
+STORE_SQL = """
+    INSERT INTO instacart_retailer_directory (postal_code, country_code, retailers, fetched_at, last_requested_at)
+    VALUES (%s, %s, %s::jsonb, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+    ON CONFLICT (postal_code, country_code) DO UPDATE
+    SET retailers = EXCLUDED.retailers, fetched_at = EXCLUDED.fetched_at
+"""
+
+RECORD_REQUESTS_SQL = """
+    UPDATE instacart_retailer_directory
+    SET request_count = request_count + %s, last_requested_at = CURRENT_TIMESTAMP
+    WHERE postal_code = %s AND country_code = %s
+"""
+
+# Hot entries that will expire before the next refresh run comes around
+DUE_FOR_REFRESH_SQL = """
+    SELECT postal_code, country_code
+    FROM instacart_retailer_directory
+    WHERE last_requested_at > CURRENT_TIMESTAMP - %s * INTERVAL '1 hour'
+    AND fetched_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 second'
+    ORDER BY request_count DESC
+    LIMIT %s
+"""
+
+
+def normalize_key(postal_code, country_code="US"):
+    return (str(postal_code).strip().upper(), (country_code or "US").strip().upper())
+
+
+class _Flight:
+    """One in-progress upstream lookup that concurrent callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RetailerDirectory:
+    def __init__(self, ttl_s=TTL_S, empty_ttl_s=EMPTY_TTL_S, max_entries=RETAILER_DIRECTORY_CACHE_SIZE):
+        self.ttl_s = ttl_s
+        self.empty_ttl_s = empty_ttl_s
+        self.max_entries = max_entries
+        self._entries = {}
+        self._flights = {}
+        self._requests = Counter()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.db_hits = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self.stale_served = 0
+        self.uncounted_requests = 0
+
+    def _fresh(self, retailers, fetched_at):
+        return time.time() - fetched_at < (self.ttl_s if retailers else self.empty_ttl_s)
+
+    def get(self, postal_code, country_code="US"):
+        """Raw Instacart retailer objects for the postal code"""
+        key = normalize_key(postal_code, country_code)
+        with self._lock:
+            if key in self._requests or len(self._requests) < self.max_entries:
+                self._requests[key] += 1
+            else:
+                # Drained by every refresh run; until then only known ZIPs are counted
+                self.uncounted_requests += 1
+            entry = self._entries.get(key)
+            if entry is not None and self._fresh(*entry):
+                self.hits += 1
+                return entry[0]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._load(key)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _remember(self, key, retailers, fetched_at):
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (retailers, fetched_at)
+
+    def _load(self, key):
+        stored = _load_stored(key)
+        if stored is not None and self._fresh(*stored):
+            self.db_hits += 1
+            self._remember(key, *stored)
+            return stored[0]
+
+        try:
+            return self.refresh(key)
+        except Exception as e:
+            if stored is None:
+                raise
+            logger.warning(f"Instacart retailers for {key} unavailable, serving stored list: {str(e)}")
+            self.stale_served += 1
+            return stored[0]
+
+    def refresh(self, key):
+        """Fetch the retailers for ``key`` from Instacart and store them"""
+        from app.integration import instacart
+
+        self.upstream_calls += 1
+        retailers = instacart.get_instacart_client().get_retailers(postal_code=key[0], country_code=key[1])
+        _store(key, retailers)
+        self._remember(key, retailers, time.time())
+        return retailers
+
+    def take_request_counts(self):
+        with self._lock:
+            counts, self._requests = self._requests, Counter()
+        return counts
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "db_hits": self.db_hits,
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "stale_served": self.stale_served,
+            "uncounted_requests": self.uncounted_requests,
+        }
+
+
+def _load_stored(key):
+    from app.db import get_db_cursor
+
+    try:
+        with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
+            cur.execute(LOAD_SQL, key)
+            row = cur.fetchone()
+    except Exception as e:
+        logger.error(f"Error reading stored Instacart retailers for {key}: {str(e)}")
+        return None
+    if not row:
+        return None
+    retailers = row[0] if not isinstance(row[0], str) else json.loads(row[0])
+    return retailers, float(row[1])
+
+
+def _store(key, retailers):
+    from app.db import get_db_cursor
+
+    try:
+        with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
+            cur.execute(STORE_SQL, (key[0], key[1], json.dumps(retailers)))
+    except Exception as e:
+        logger.error(f"Error storing Instacart retailers for {key}: {str(e)}")
+
+
+retailer_directory = RetailerDirectory()
+
+
+def get_retailers(postal_code, country_code="US"):
+    return retailer_directory.get(postal_code, country_code)
+
+
+def refresh_hot_retailers(batch_size=RETAILER_REFRESH_BATCH):
+    """Record request counts, then re-fetch the busiest ZIPs that expire before the next run."""
+    from app.db import get_db_cursor
+
+    counts = retailer_directory.take_request_counts()
+    refreshed = failed = 0
+    with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
+        for (postal_code, country_code), count in counts.items():
+            cur.execute(RECORD_REQUESTS_SQL, (count, postal_code, country_code))
+
+        cur.execute("SELECT pg_try_advisory_lock(%s)", (RETAILER_REFRESH_LOCK_KEY,))
+        if not cur.fetchone()[0]:
+            return {"status": "skipped", "reason": "refresh already running", "recorded": len(counts)}
+        try:
+            refresh_before_s = max(retailer_directory.ttl_s - RETAILER_REFRESH_MINUTES * 60 * 2, 0)
+            cur.execute(DUE_FOR_REFRESH_SQL, (RETAILER_HOT_WINDOW_HOURS, refresh_before_s, batch_size))
+            due = cur.fetchall()
+            for key in due:
+                try:
+                    retailer_directory.refresh(tuple(key))
+                    refreshed += 1
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"Background refresh of Instacart retailers for {tuple(key)} failed: {str(e)}")
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (RETAILER_REFRESH_LOCK_KEY,))
+
+    if refreshed or failed:
+        logger.info(f"Refreshed Instacart retailers for {refreshed} ZIPs ({failed} failed)")
+    return {"status": "success", "recorded": len(counts), "refreshed": refreshed, "failed": failed}
+
+
+retailer_directory_refresher = PeriodicTask(
+    "instacart-retailer-refresher",
+    refresh_hot_retailers,
+    interval_s=RETAILER_REFRESH_MINUTES * 60,
+    initial_delay_s=120,
+)
@@ -2,6 +2,8 @@ import os
 import requests
 import base64
 import re  
+import threading
+import time
 from typing import Optional, Dict, List, Any
 import logging
 from urllib.parse import urlencode
@@ -89,6 +91,22 @@ def get_kroger_access_token() -> Dict[str, Any]:
             "message": str(e)
         }
 
+# Client-credentials tokens aren't tied to a user, so product searches share one
+_app_token = {"access_token": None, "expires_at": 0.0}
+_app_token_lock = threading.Lock()
+
+def get_app_access_token() -> Dict[str, Any]:
+    """get_kroger_access_token, reused until a minute before it expires"""
+    with _app_token_lock:
+        if _app_token["access_token"] and time.monotonic() < _app_token["expires_at"]:
+            return {"success": True, "access_token": _app_token["access_token"]}
+        token_response = get_kroger_access_token()
+        if token_response.get("success") and token_response.get("access_token"):
+            _app_token["access_token"] = token_response["access_token"]
+            lifetime = float(token_response.get("expires_in") or 1800)
+            _app_token["expires_at"] = time.monotonic() + max(lifetime - 60, 0)
+        return token_response
+
 def clean_search_term(item: str) -> str:
     """
     Clean and standardize search terms for Kroger API
@@ -139,14 +157,14 @@ def clean_search_term(item: str) -> str:
     logger.debug(f"Cleaned search term: '{item}'")
     return item
 
-def kroger_search_item(query: str, location_id: Optional[str] = None) -> Dict[str, Any]:
+def kroger_search_item(query: str, location_id: Optional[str] = None, limit: int = 50) -> Dict[str, Any]:
     try:
         # Clean search term
         cleaned_query = clean_search_term(query)
         logger.info(f"Original query: {query}, Cleaned query: {cleaned_query}")
         
-        # Get token using our working function
-        token_response = get_kroger_access_token()
+        # Get token using our working function (shared until it expires)
+        token_response = get_app_access_token()
         
         if not token_response['success']:
             logger.error("Failed to get access token")
@@ -182,15 +200,12 @@ def kroger_search_item(query: str, location_id: Optional[str] = None) -> Dict[st
         # Prepare params WITH location ID and fulfillment filter for availability
         params = {
             'filter.term': cleaned_query,
-            'filter.limit': '50',
+            'filter.limit': str(limit),
             'filter.locationId': effective_location_id,  # ALWAYS include location ID
             'filter.fulfillment': 'ais'  # Filter for items available in store
         }
         
-        logger.debug(f"Making search request to: {search_url}")
-        logger.debug(f"Search params: {params}")
-        logger.debug(f"Search headers: {search_headers}")
-        logger.debug(f"Using Location ID: {effective_location_id}")
+        logger.debug("Making search request to: %s, params: %s", search_url, params)
         
         # Send the search request
         search_response = requests.get(
@@ -201,13 +216,14 @@ def kroger_search_item(query: str, location_id: Optional[str] = None) -> Dict[st
             verify=True
         )
         
-        # Enhanced logging
-        logger.debug(f"Search response status: {search_response.status_code}")
-        logger.debug(f"Search response headers: {dict(search_response.headers)}")
-        logger.debug(f"Search response content: {search_response.text}")
+        logger.debug("Search response status: %s", search_response.status_code)
         
         if search_response.status_code != 200:
             logger.error(f"Search failed: {search_response.text}")
+            if search_response.status_code == 401:
+                # Revoked or expired early; the next search fetches a new one
+                with _app_token_lock:
+                    _app_token["access_token"] = None
             return {
                 "success": False,
                 "message": f"Search failed with status {search_response.status_code}",
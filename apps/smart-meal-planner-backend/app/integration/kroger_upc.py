@@ -0,0 +1,231 @@
+# app/integration/kroger_upc.py
+"""
+Kroger UPC resolution: grocery item names to products at a store location.
+
+Adding a menu to a Kroger cart used to search every ingredient one by one
+through /kroger/search-and-suggest, then post the picked UPCs to /kroger/cart/add,
+which answered needs_search for anything still without one. Names are now
+resolved through the kroger_upc_resolutions table, keyed by store location and
+normalized item name, so a list built from any menu reuses earlier answers:
+
+1. the UPC this user last added to a cart for the name (kept for
+   KROGER_UPC_CHOICE_TTL_DAYS);
+2. the top-ranked search result anyone got for the name at that location
+   (kept for KROGER_UPC_SEARCH_TTL_HOURS, as assortments and prices change);
+3. a product search. Searches for the remaining names run concurrently, at
+   most KROGER_SEARCH_CONCURRENCY at a time, and their top results are stored.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List
+
+from starlette.concurrency import run_in_threadpool
+
+from app.integration.kroger import clean_search_term, kroger_search_item
+
+logger = logging.getLogger(__name__)
+
+KROGER_SEARCH_CONCURRENCY = int(os.getenv("KROGER_SEARCH_CONCURRENCY", "5"))
+KROGER_UPC_SEARCH_TTL_HOURS = float(os.getenv("KROGER_UPC_SEARCH_TTL_HOURS", "72"))
+KROGER_UPC_CHOICE_TTL_DAYS = float(os.getenv("KROGER_UPC_CHOICE_TTL_DAYS", "90"))
+# Suggestions returned per searched item; the API is asked for a few more
+SUGGESTIONS_PER_ITEM = 3
+SEARCH_LIMIT = 10
+
+# user_id stored on rows that hold the shared top-ranked search result
+SHARED_USER_ID = 0
+
+LOOKUP_SQL = """
+    SELECT DISTINCT ON (ingredient_key) ingredient_key, user_id, upc, product
+    FROM kroger_upc_resolutions
+    WHERE location_id = %s
+      AND ingredient_key = ANY(%s)
+      AND (
+          (user_id = %s AND resolved_at > CURRENT_TIMESTAMP - %s * INTERVAL '1 day')
+          OR (user_id = 0 AND resolved_at > CURRENT_TIMESTAMP - %s * INTERVAL '1 hour')
+      )
+    ORDER BY ingredient_key, user_id DESC
+"""
+
+# Rows are (user_id, location_id, ingredient_key, upc, product). A choice that
+# arrives without product details borrows them from the shared row for that UPC.
+RECORD_SQL = """
+    INSERT INTO kroger_upc_resolutions AS r (user_id, location_id, ingredient_key, upc, product)
+    SELECT v.user_id, v.location_id, v.ingredient_key, v.upc, COALESCE(v.product::jsonb, s.product)
+    FROM (VALUES %s) AS v(user_id, location_id, ingredient_key, upc, product)
+    LEFT JOIN kroger_upc_resolutions s
+           ON s.user_id = 0 AND s.location_id = v.location_id
+          AND s.ingredient_key = v.ingredient_key AND s.upc = v.upc
+    ON CONFLICT (user_id, location_id, ingredient_key) DO UPDATE SET
+        upc = EXCLUDED.upc,
+        product = CASE WHEN r.upc = EXCLUDED.upc THEN COALESCE(EXCLUDED.product, r.product)
+                       ELSE EXCLUDED.product END,
+        use_count = CASE WHEN r.upc = EXCLUDED.upc THEN r.use_count + 1 ELSE 1 END,
+        resolved_at = CURRENT_TIMESTAMP
+"""
+
+RECORD_TEMPLATE = "(%s::integer, %s::varchar, %s::varchar, %s::varchar, %s::text)"
+
+
+def normalize_item_name(name: Any) -> str:
+    """'2 cups Brown Rice: 4 cups' and 'brown rice' share the key 'brown rice'"""
+    text = str(name or "").split(":", 1)[0]
+    text = clean_search_term(text).lower()
+    text = re.sub(r"[^a-z0-9 ]+", " ", text)
+    return " ".join(text.split())[:255]
+
+
+class UpcResolver:
+    def __init__(self, concurrency: int = KROGER_SEARCH_CONCURRENCY):
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        self.chosen_hits = 0
+        self.shared_hits = 0
+        self.searches = 0
+        self.search_failures = 0
+        self.choices_recorded = 0
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    async def resolve(self, user_id: int, location_id: str, names: Iterable[str],
+                      refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        {name: {"source", "suggestions", ...}} for each distinct name.
+        source is "chosen" or "cached" for stored answers (a single suggestion)
+        and "search" for names searched now (up to SUGGESTIONS_PER_ITEM); a
+        failed or empty search carries "message" or "error" instead.
+        refresh=True ignores stored answers.
+        """
+        keys = {}
+        for name in names:
+            if name and name not in keys:
+                keys[name] = normalize_item_name(name)
+
+        stored = {}
+        wanted = sorted({key for key in keys.values() if key})
+        if wanted and not refresh:
+            stored = await run_in_threadpool(self._lookup, user_id, location_id, wanted)
+
+        resolved = {}
+        # Names that normalize alike are searched once
+        to_search = {}
+        for name, key in keys.items():
+            row = stored.get(key)
+            if row:
+                resolved[name] = _stored_resolution(name, row)
+            elif key:
+                to_search.setdefault(key, name)
+            else:
+                resolved[name] = {"source": "search", "suggestions": [],
+                                  "message": f"No results found for '{name}'"}
+        chosen = sum(1 for r in resolved.values() if r["source"] == "chosen")
+        cached = sum(1 for r in resolved.values() if r["source"] == "cached")
+        self._count(chosen_hits=chosen, shared_hits=cached)
+
+        if to_search:
+            searched = await self._search_many(list(to_search.values()), location_id)
+            top_results = []
+            for key, term in to_search.items():
+                top = (searched[term].get("suggestions") or [None])[0]
+                if top and top.get("upc"):
+                    top_results.append((SHARED_USER_ID, location_id, key, top["upc"], json.dumps(top)))
+            for name, key in keys.items():
+                if name not in resolved:
+                    resolved[name] = searched[to_search[key]]
+            if top_results:
+                await run_in_threadpool(self._record, top_results)
+
+        logger.info("Resolved %d Kroger items at %s: %d chosen before, %d cached, %d searched",
+                    len(resolved), location_id, chosen, cached, len(to_search))
+        return resolved
+
+    def record_choices(self, user_id: int, location_id: str, items: List[Dict[str, Any]]) -> None:
+        """Remember the UPC a user put in their cart for each named item"""
+        rows = {}
+        for item in items:
+            key = normalize_item_name(item.get("name"))
+            if key and item.get("upc"):
+                product = item.get("product")
+                rows[key] = (user_id, location_id, key, str(item["upc"]),
+                             json.dumps(product) if product else None)
+        if rows:
+            self._record(list(rows.values()))
+            self._count(choices_recorded=len(rows))
+
+    async def _search_many(self, terms: List[str], location_id: str) -> Dict[str, Dict[str, Any]]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def search(term):
+            async with semaphore:
+                return await run_in_threadpool(kroger_search_item, term, location_id, SEARCH_LIMIT)
+
+        results = await asyncio.gather(*(search(term) for term in terms), return_exceptions=True)
+        self._count(searches=len(terms))
+
+        searched = {}
+        for term, result in zip(terms, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error searching for item '{term}': {result}")
+                self._count(search_failures=1)
+                searched[term] = {"source": "search", "suggestions": [], "error": str(result)}
+            elif result.get("success") and result.get("results"):
+                searched[term] = {"source": "search", "suggestions": result["results"][:SUGGESTIONS_PER_ITEM]}
+            else:
+                if not result.get("success"):
+                    self._count(search_failures=1)
+                searched[term] = {"source": "search", "suggestions": [],
+                                  "message": result.get("message") or f"No results found for '{term}'"}
+        return searched
+
+    def _lookup(self, user_id, location_id, keys):
+        from app.db import get_db_cursor
+
+        try:
+            with get_db_cursor(dict_cursor=True, autocommit=True) as (cur, conn):
+                cur.execute(LOOKUP_SQL, (location_id, keys, user_id,
+                                         KROGER_UPC_CHOICE_TTL_DAYS, KROGER_UPC_SEARCH_TTL_HOURS))
+                return {row["ingredient_key"]: row for row in cur.fetchall()}
+        except Exception as e:
+            logger.error(f"Error reading Kroger UPC resolutions for {location_id}: {str(e)}")
+            return {}
+
+    def _record(self, rows):
+        from app.db import get_db_cursor
+        from psycopg2.extras import execute_values
+
+        try:
+            with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
+                execute_values(cur, RECORD_SQL, rows, template=RECORD_TEMPLATE)
+        except Exception as e:
+            logger.error(f"Error storing Kroger UPC resolutions: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "concurrency": self.concurrency,
+                "chosen_hits": self.chosen_hits,
+                "shared_hits": self.shared_hits,
+                "searches": self.searches,
+                "search_failures": self.search_failures,
+                "choices_recorded": self.choices_recorded,
+            }
+
+
+def _stored_resolution(name, row):
+    product = row["product"]
+    if isinstance(product, str):
+        product = json.loads(product)
+    product = dict(product or {"name": name})
+    product["upc"] = row["upc"]
+    return {"source": "chosen" if row["user_id"] != SHARED_USER_ID else "cached", "suggestions": [product]}
+
+
+upc_resolver = UpcResolver()
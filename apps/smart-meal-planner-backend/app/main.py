@@ -1,6 +1,11 @@
 import os
+import time
 import logging
 from typing import List
+
+# Recorded before the heavy imports below so startup can report worker boot time
+_BOOT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException, Depends
 from app.utils.auth_utils import admin_required
 from fastapi.middleware.cors import CORSMiddleware
@@ -9,14 +14,15 @@ from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 
-# Import S3 helper for initialization
-from app.utils.s3.s3_utils import s3_helper
+# S3 helper is created lazily on first use (boto3 import + bucket check)
+from app.utils.s3.s3_utils import s3_helper, is_s3_configured
 
 # Import database helpers for initialization
 from app.db import connection_pool, close_all_connections, get_connection_stats  # Using the ultra-simplified DB module
 
 # Import enhanced CORS middleware
 from app.middleware.cors_middleware import setup_cors_middleware
+from app.utils.logging_config import configure_logging
 
 # Import regular routers
 from app.routers import (
@@ -38,7 +44,6 @@ from app.routers import kroger_store
 from app.routers import walmart_store
 from app.routers import instacart_store
 from app.routers import instacart_cart 
-from app.routers import instacart_debug  
 from app.routers import instacart_status 
 from app.routers import saved_recipes 
 from app.routers import organizations
@@ -50,6 +55,7 @@ from app.routers import onboarding_forms, client_notes
 from app.routers import invitations
 from app.routers import recipe_admin  # Add recipe admin router
 from app.routers import scraped_recipes  # Add scraped recipes router
+from app.routers import recipe_search  # Unified recipe search
 from app.routers import ai_status  # Add AI status router
 from app.routers import custom_menu  # Add custom menu router
 
@@ -57,9 +63,7 @@ from app.routers import custom_menu  # Add custom menu router
 from app.routers import organization_clients_alt
 from app.routers import invitations_alt
 from app.routers import saved_recipes_alt
-from app.routers import saved_recipes_debug
 from app.routers import client_resources  # Add client resources router
-from app.routers import test_invitation # Test invitation router for debugging
 from app.routers import organization_branding  # Add organization branding router
 from app.routers import recipe_ratings  # Add recipe ratings router
 from app.routers import rating_analytics  # Add rating analytics router
@@ -69,15 +73,19 @@ from app.routers import rating_analytics  # Add rating analytics router
 # Load environment variables
 load_dotenv()
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Set up logging (LOG_FORMAT, LOG_LEVEL and LOG_LEVELS; see app.utils.logging_config)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 
-# Explicit environment variable logging at startup
+# Debug/test routers (instacart_debug, saved_recipes_debug, test_invitation) are only
+# imported and mounted in development, or when ENABLE_DEBUG_ROUTES=true
+def debug_routes_enabled() -> bool:
+    if os.getenv("ENABLE_DEBUG_ROUTES", "").lower() in ("true", "1", "yes"):
+        return True
+    return os.getenv("ENVIRONMENT", "development").lower() in ("development", "dev", "local")
+
+# Explicit environment variable logging at startup (opt-in: values can include credentials)
 def log_environment_variables():
     print("ENVIRONMENT VARIABLE INVESTIGATION:")
     for key, value in os.environ.items():
@@ -88,7 +96,8 @@ def log_environment_variables():
             print(f"{key}: {value[:50] + '...' if len(value) > 50 else value}")
 
 # Call this at startup
-log_environment_variables()
+if os.getenv("LOG_ENVIRONMENT_VARIABLES", "").lower() in ("true", "1", "yes"):
+    log_environment_variables()
 
 def create_app() -> FastAPI:
     logger.info("Creating FastAPI application...")
@@ -138,8 +147,13 @@ def create_app() -> FastAPI:
     # Mount static files directory
     app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
-    # Only include debug router in development environment
-    app.include_router(instacart_debug.router)
+    # Only include debug routers in development environment
+    if debug_routes_enabled():
+        from app.routers import instacart_debug, saved_recipes_debug, test_invitation
+        app.include_router(instacart_debug.router)
+        app.include_router(saved_recipes_debug.router)
+        app.include_router(test_invitation.router)
+        logger.info("Debug routers enabled")
     app.include_router(kroger_auth.router)
     app.include_router(grocery_list.router)
     app.include_router(meal_grocery_list.router)
@@ -159,12 +173,11 @@ def create_app() -> FastAPI:
     app.include_router(organization_clients_alt.router)
     app.include_router(invitations_alt.router)
     app.include_router(saved_recipes_alt.router)
-    app.include_router(saved_recipes_debug.router)
     app.include_router(client_resources.router)
-    app.include_router(test_invitation.router)
     
     app.include_router(recipe_admin.router)
     app.include_router(scraped_recipes.router)
+    app.include_router(recipe_search.router)
     app.include_router(ai_status.router)
     app.include_router(custom_menu.router)
     app.include_router(organization_branding.router)  # Add branding endpoints
@@ -269,7 +282,10 @@ def create_app() -> FastAPI:
     async def get_db_stats(admin=Depends(admin_required)):
         """Get current database connection statistics"""
         try:
-            from app.db import get_connection_stats, connection_pool
+            from app.db import (
+                get_connection_stats, get_pool_stats, get_route_db_stats,
+                find_leaked_checkouts, db_leak_detector, connection_pool
+            )
 
             # Get connection stats
             stats = get_connection_stats()
@@ -292,9 +308,42 @@ def create_app() -> FastAPI:
                     # These attributes might not be accessible
                     pass
 
+            from app.utils.interaction_events import interaction_events
+            from app.ai.recipe_neighbors import recipe_neighbor_builder
+            from app.ai.rating_rollups import rating_rollup_refresher
+            from app.utils.ingredient_usage import ingredient_usage_sweeper, recent_ingredients_cache
+            from app.utils.entitlements import entitlement_cache
+            from app.utils.stripe_events import stripe_event_worker
+            from app.utils.preference_profiles import preference_profiles
+            from app.utils.branding_cache import branding_cache
+            from app.utils.cart_store import cart_cache
+            from app.integration.instacart_retailers import retailer_directory, retailer_directory_refresher
+            from app.integration.kroger_upc import upc_resolver
+            from app.utils.recipe_search import recipe_search_repairer
+
             return {
                 "connection_tracking": stats,
-                "pool_info": pool_info
+                "pool_info": pool_info,
+                "pools": get_pool_stats(),
+                "routes": get_route_db_stats(),
+                "suspected_leaks": [
+                    {key: value for key, value in leak.items() if key != "checkout"}
+                    for leak in find_leaked_checkouts()
+                ],
+                "interaction_events": interaction_events.stats(),
+                "periodic_tasks": {
+                    task.name: task.stats()
+                    for task in (recipe_neighbor_builder, rating_rollup_refresher,
+                                 ingredient_usage_sweeper, stripe_event_worker,
+                                 retailer_directory_refresher, recipe_search_repairer, db_leak_detector)
+                },
+                "ingredient_cooldown_cache": recent_ingredients_cache.stats(),
+                "entitlement_cache": entitlement_cache.stats(),
+                "preference_profile_cache": preference_profiles.stats(),
+                "branding_cache": branding_cache.stats(),
+                "instacart_retailer_directory": retailer_directory.stats(),
+                "cart_cache": cart_cache.stats(),
+                "kroger_upc_resolver": upc_resolver.stats()
             }
         except Exception as e:
             logger.error(f"Error getting DB stats: {str(e)}")
@@ -493,28 +542,19 @@ async def extend_timeout_for_menu_routes(request, call_next):
     return response
 
 @app.middleware("http")
-async def clear_thread_local_storage(request, call_next):
-    """Clear thread-local storage at the end of each request to prevent connection leaks"""
-    # Process the request
-    response = await call_next(request)
-
-    # Clean up thread-local storage
+async def db_request_scope(request, call_next):
+    """
+    Per-request DB scope: attributes checkouts, queries and hold time to the
+    matched route, and returns the request's shared session connection (if a
+    helper took one) to the pool once the response is done (see app.db).
+    """
+    from app.db import start_request_tracking, finish_request_tracking
+
+    usage, token = start_request_tracking(request.scope)
     try:
-        import threading
-        thread_local = threading.local()
-        if hasattr(thread_local, 'connection') and thread_local.connection is not None:
-            try:
-                from app.db import logger as db_logger
-                if not thread_local.connection.closed:
-                    thread_local.connection.close()
-                    db_logger.info("Auto-closed thread-local connection at request end")
-                thread_local.connection = None
-            except Exception as e:
-                logger.warning(f"Error clearing thread-local connection: {str(e)}")
-    except Exception as e:
-        logger.warning(f"Error in thread-local cleanup middleware: {str(e)}")
-
-    return response
+        return await call_next(request)
+    finally:
+        finish_request_tracking(usage, token)
 
 # Now we can use @app.on_event
 @app.on_event("startup")
@@ -535,38 +575,64 @@ async def startup_event():
         routes = [route.path for route in app.router.routes]
         logger.info("✅ LOADED ROUTES: %s", routes)
         
-        # Create recipe tables if they don't exist
-        logger.info("Checking and creating recipe tables...")
-        from app.create_recipe_tables import create_tables
-        create_tables()
-        logger.info("Recipe tables check completed")
-        
-        # Create client-related tables if they don't exist
-        logger.info("Checking and creating client-related tables...")
-        from app.create_client_tables import create_tables as create_client_tables
-        create_client_tables()
-        logger.info("Client tables check completed")
-        
-        # Run database migrations to update schema if needed
-        logger.info("Running database migrations...")
+        # Legacy table bootstrap + versioned migrations. Only one worker does the
+        # work (advisory lock); the rest hit the schema_version fast path or wait for it.
+        migrations_started = time.perf_counter()
         from app.migrations.migration_runner import run_startup_migrations
         migration_success = run_startup_migrations()
         if migration_success:
-            logger.info("Database migrations completed successfully")
+            logger.info("Database migrations check completed in %.0fms",
+                        (time.perf_counter() - migrations_started) * 1000)
         else:
             logger.warning("Some migrations failed - check logs for details")
         
         # Check S3 configuration
         logger.info("Checking S3 configuration...")
         try:
-            # The import and initialization happens at module level
-            # This just logs whether S3 is properly configured
-            if hasattr(s3_helper, 'bucket_name') and s3_helper.bucket_name:
-                logger.info(f"S3 configuration found: bucket={s3_helper.bucket_name}, region={s3_helper.region}")
+            # The client itself is created on first upload; this only checks
+            # the environment so boot doesn't wait on an S3 round trip
+            if is_s3_configured():
+                logger.info(f"S3 configuration found: bucket={os.getenv('S3_BUCKET_NAME')}")
             else:
                 logger.warning("S3 configuration is incomplete. Image upload functionality will not work properly.")
         except Exception as s3_error:
             logger.warning(f"S3 initialization error: {str(s3_error)}")
+
+        # Report connections held past DB_LEAK_THRESHOLD_S
+        from app.db import db_leak_detector
+        db_leak_detector.start()
+
+        # Background writer for recipe_interactions events
+        from app.utils.interaction_events import interaction_events
+        interaction_events.start()
+
+        # Item-item recommendation table: rebuilt by scripts/build_recipe_neighbors.py
+        # from cron; in-process only with RECOMMENDATION_BUILD_IN_APP=true
+        from app.ai.recipe_neighbors import recipe_neighbor_builder
+        recipe_neighbor_builder.start()
+
+        # Incremental refresh of the daily rating trend rollups
+        from app.ai.rating_rollups import rating_rollup_refresher
+        rating_rollup_refresher.start()
+
+        # Retention sweep for the ingredient cooldown log
+        from app.utils.ingredient_usage import ingredient_usage_sweeper
+        ingredient_usage_sweeper.start()
+
+        # Applies queued Stripe webhook events
+        from app.utils.stripe_events import stripe_event_worker
+        stripe_event_worker.start()
+
+        # Keeps the busiest ZIPs' Instacart retailer lists fresh
+        from app.integration.instacart_retailers import retailer_directory_refresher
+        retailer_directory_refresher.start()
+
+        # Re-indexes recipes whose search index trigger refresh failed
+        from app.utils.recipe_search import recipe_search_repairer
+        recipe_search_repairer.start()
+
+        logger.info("✅ Worker boot completed in %.0fms (pid %s)",
+                    (time.perf_counter() - _BOOT_STARTED) * 1000, os.getpid())
     except Exception as e:
         logger.error(f"Error during application startup: {str(e)}")
         # Don't re-raise, just log the error
@@ -581,6 +647,55 @@ async def shutdown_event():
     """Run shutdown tasks."""
     logger.info("🛑 Application shutting down")
 
+    try:
+        from app.db import db_leak_detector
+        db_leak_detector.stop()
+    except Exception as e:
+        logger.error(f"❌ Error stopping DB leak detector: {str(e)}")
+
+    try:
+        from app.ai.recipe_neighbors import recipe_neighbor_builder
+        recipe_neighbor_builder.stop()
+    except Exception as e:
+        logger.error(f"❌ Error stopping recipe neighbor builder: {str(e)}")
+
+    try:
+        from app.ai.rating_rollups import rating_rollup_refresher
+        rating_rollup_refresher.stop()
+    except Exception as e:
+        logger.error(f"❌ Error stopping rating rollup refresher: {str(e)}")
+
+    try:
+        from app.utils.ingredient_usage import ingredient_usage_sweeper
+        ingredient_usage_sweeper.stop()
+    except Exception as e:
+        logger.error(f"❌ Error stopping ingredient usage sweeper: {str(e)}")
+
+    try:
+        from app.utils.stripe_events import stripe_event_worker
+        stripe_event_worker.stop()
+    except Exception as e:
+        logger.error(f"❌ Error stopping Stripe event worker: {str(e)}")
+
+    try:
+        from app.integration.instacart_retailers import retailer_directory_refresher
+        retailer_directory_refresher.stop()
+    except Exception as e:
+        logger.error(f"❌ Error stopping Instacart retailer refresher: {str(e)}")
+
+    try:
+        from app.utils.recipe_search import recipe_search_repairer
+        recipe_search_repairer.stop()
+    except Exception as e:
+        logger.error(f"❌ Error stopping recipe search repairer: {str(e)}")
+
+    # Flush queued interaction events while the pool is still open
+    try:
+        from app.utils.interaction_events import interaction_events
+        interaction_events.stop()
+    except Exception as e:
+        logger.error(f"❌ Error draining interaction events: {str(e)}")
+
     # Close all database connections
     try:
         close_all_connections()
@@ -5,123 +5,163 @@ Migration runner for Smart Meal Planner backend.
 This module handles running database migrations on server startup,
 tracking which migrations have been applied, and ensuring they only
 run once per deployment.
+
+Every gunicorn worker calls run_startup_migrations() on boot, so the work is
+guarded twice:
+  - a fast path reads the single schema_version row and returns immediately
+    when it matches the newest migration on disk, and
+  - otherwise a Postgres advisory lock lets exactly one worker run the legacy
+    table bootstrap and pending migrations; the others wait for it to finish
+    rather than serve a half-migrated schema, then skip.
+
+Deploys can run migrations out-of-band (e.g. a release step) with:
+
+    python -m app.migrations.migration_runner            # run, waiting for the lock
+    python -m app.migrations.migration_runner --status   # show current/pending
 """
 
 import os
 import sys
+import time
 import logging
+import argparse
 import importlib
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from psycopg2.errors import LockNotAvailable
 from psycopg2.extras import RealDictCursor
 
 # Add the parent directory to the path so we can import from app
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.db import get_db_connection
+from app.db import get_db_cursor
 
 logger = logging.getLogger(__name__)
 
+# Arbitrary application-wide key for pg_advisory_lock ("SMPMIGR" in ASCII)
+MIGRATION_LOCK_KEY = 0x534D504D49475200
+
+# Bump when the legacy create_*_tables bootstrap changes so workers re-run it
+BOOTSTRAP_REVISION = "1"
+
+# How long a worker that lost the lock waits for the holder before giving up
+MIGRATION_LOCK_WAIT_S = float(os.getenv("MIGRATION_LOCK_WAIT_S", "600"))
+
+
 class MigrationRunner:
     def __init__(self):
         self.migrations_table = "applied_migrations"
+        self.version_table = "schema_version"
         self.migrations_dir = os.path.dirname(__file__)
-        
-    def ensure_migrations_table(self):
-        """Create the migrations tracking table if it doesn't exist."""
-        conn = get_db_connection()
+
+    def available_migrations(self) -> List[str]:
+        """Migration module names on disk, in the order they should run."""
+        migrations_path = os.path.join(self.migrations_dir, 'versions')
+        if not os.path.exists(migrations_path):
+            return []
+        return [
+            filename[:-3]
+            for filename in sorted(os.listdir(migrations_path))
+            if filename.endswith('.py') and not filename.startswith('__')
+        ]
+
+    def target_version(self) -> str:
+        """Schema version string this build expects once everything has run."""
+        available = self.available_migrations()
+        latest = available[-1] if available else "none"
+        return f"{latest}+bootstrap{BOOTSTRAP_REVISION}"
+
+    def get_schema_version(self, cur) -> Optional[str]:
+        """Read the recorded schema version; None if the table doesn't exist yet."""
+        cur.execute("SELECT to_regclass(%s)", (self.version_table,))
+        if cur.fetchone()[0] is None:
+            return None
+        cur.execute(f"SELECT version FROM {self.version_table} WHERE id = 1")
+        row = cur.fetchone()
+        return row[0] if row else None
+
+    def set_schema_version(self, cur, version: str):
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.version_table} (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version VARCHAR(255) NOT NULL,
+                updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        cur.execute(f"""
+            INSERT INTO {self.version_table} (id, version) VALUES (1, %s)
+            ON CONFLICT (id) DO UPDATE SET version = EXCLUDED.version, updated_at = CURRENT_TIMESTAMP;
+        """, (version,))
+
+    def is_schema_current(self) -> bool:
+        """Fast path: one query against schema_version, no locks taken."""
         try:
-            with conn.cursor() as cur:
-                cur.execute(f"""
-                    CREATE TABLE IF NOT EXISTS {self.migrations_table} (
-                        id SERIAL PRIMARY KEY,
-                        migration_name VARCHAR(255) UNIQUE NOT NULL,
-                        applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-                        status VARCHAR(50) DEFAULT 'success',
-                        error_message TEXT,
-                        execution_time_seconds FLOAT
-                    );
-                """)
-                
-                # Create index for faster lookups
-                cur.execute(f"""
-                    CREATE INDEX IF NOT EXISTS idx_applied_migrations_name 
-                    ON {self.migrations_table}(migration_name);
-                """)
-                
-                conn.commit()
-                logger.info("Migrations tracking table is ready")
+            with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
+                return self.get_schema_version(cur) == self.target_version()
         except Exception as e:
-            logger.error(f"Failed to create migrations table: {e}")
-            conn.rollback()
-            raise
-        finally:
-            conn.close()
-    
-    def get_applied_migrations(self) -> List[str]:
+            logger.warning(f"Could not read schema version: {e}")
+            return False
+
+    def ensure_migrations_table(self, cur):
+        """Create the migrations tracking table if it doesn't exist."""
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.migrations_table} (
+                id SERIAL PRIMARY KEY,
+                migration_name VARCHAR(255) UNIQUE NOT NULL,
+                applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                status VARCHAR(50) DEFAULT 'success',
+                error_message TEXT,
+                execution_time_seconds FLOAT
+            );
+        """)
+
+        # Create index for faster lookups
+        cur.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_applied_migrations_name 
+            ON {self.migrations_table}(migration_name);
+        """)
+        logger.info("Migrations tracking table is ready")
+
+    def get_applied_migrations(self, cur) -> List[str]:
         """Get list of already applied migrations."""
-        conn = get_db_connection()
         try:
-            with conn.cursor() as cur:
-                cur.execute(f"""
-                    SELECT migration_name 
-                    FROM {self.migrations_table} 
-                    WHERE status = 'success'
-                    ORDER BY applied_at;
-                """)
-                return [row[0] for row in cur.fetchall()]
+            cur.execute(f"""
+                SELECT migration_name 
+                FROM {self.migrations_table} 
+                WHERE status = 'success'
+                ORDER BY applied_at;
+            """)
+            return [row[0] for row in cur.fetchall()]
         except Exception as e:
             logger.error(f"Failed to get applied migrations: {e}")
             return []
-        finally:
-            conn.close()
-    
-    def record_migration(self, migration_name: str, status: str = 'success', 
+
+    def record_migration(self, cur, migration_name: str, status: str = 'success',
                         error_message: str = None, execution_time: float = None):
         """Record a migration as applied."""
-        conn = get_db_connection()
         try:
-            with conn.cursor() as cur:
-                cur.execute(f"""
-                    INSERT INTO {self.migrations_table} 
-                    (migration_name, status, error_message, execution_time_seconds)
-                    VALUES (%s, %s, %s, %s)
-                    ON CONFLICT (migration_name) 
-                    DO UPDATE SET 
-                        status = EXCLUDED.status,
-                        error_message = EXCLUDED.error_message,
-                        execution_time_seconds = EXCLUDED.execution_time_seconds,
-                        applied_at = CURRENT_TIMESTAMP;
-                """, (migration_name, status, error_message, execution_time))
-                conn.commit()
+            cur.execute(f"""
+                INSERT INTO {self.migrations_table} 
+                (migration_name, status, error_message, execution_time_seconds)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (migration_name) 
+                DO UPDATE SET 
+                    status = EXCLUDED.status,
+                    error_message = EXCLUDED.error_message,
+                    execution_time_seconds = EXCLUDED.execution_time_seconds,
+                    applied_at = CURRENT_TIMESTAMP;
+            """, (migration_name, status, error_message, execution_time))
         except Exception as e:
             logger.error(f"Failed to record migration {migration_name}: {e}")
-            conn.rollback()
-        finally:
-            conn.close()
-    
-    def get_pending_migrations(self) -> List[str]:
+
+    def get_pending_migrations(self, cur) -> List[str]:
         """Get list of migrations that need to be applied."""
-        # Get all migration files
-        migration_files = []
-        migrations_path = os.path.join(os.path.dirname(__file__), 'versions')
-        
-        if os.path.exists(migrations_path):
-            for filename in sorted(os.listdir(migrations_path)):
-                if filename.endswith('.py') and not filename.startswith('__'):
-                    migration_name = filename[:-3]  # Remove .py extension
-                    migration_files.append(migration_name)
-        
-        # Get already applied migrations
-        applied_migrations = self.get_applied_migrations()
-        
-        # Return pending migrations
-        pending = [m for m in migration_files if m not in applied_migrations]
+        applied_migrations = set(self.get_applied_migrations(cur))
+        pending = [m for m in self.available_migrations() if m not in applied_migrations]
         logger.info(f"Found {len(pending)} pending migrations: {pending}")
-        
         return pending
-    
-    def run_migration(self, migration_name: str) -> bool:
+
+    def run_migration(self, cur, migration_name: str) -> bool:
         """Run a single migration."""
         start_time = datetime.now()
         
@@ -143,7 +183,7 @@ class MigrationRunner:
             execution_time = (datetime.now() - start_time).total_seconds()
             
             # Record successful migration
-            self.record_migration(migration_name, 'success', None, execution_time)
+            self.record_migration(cur, migration_name, 'success', None, execution_time)
             
             logger.info(f"Migration {migration_name} completed successfully in {execution_time:.2f}s")
             return True
@@ -155,19 +195,29 @@ class MigrationRunner:
             logger.error(f"Migration {migration_name} failed: {error_msg}")
             
             # Record failed migration
-            self.record_migration(migration_name, 'failed', error_msg, execution_time)
+            self.record_migration(cur, migration_name, 'failed', error_msg, execution_time)
             
             return False
-    
-    def run_all_pending_migrations(self, stop_on_error: bool = True) -> Dict[str, Any]:
+
+    def run_legacy_bootstrap(self):
+        """Run the pre-migration-framework table creation scripts."""
+        logger.info("Checking and creating recipe tables...")
+        from app.create_recipe_tables import create_tables
+        create_tables()
+
+        logger.info("Checking and creating client-related tables...")
+        from app.create_client_tables import create_tables as create_client_tables
+        create_client_tables()
+
+    def run_all_pending_migrations(self, cur, stop_on_error: bool = True) -> Dict[str, Any]:
         """Run all pending migrations."""
         logger.info("Starting migration process...")
         
         # Ensure migrations table exists
-        self.ensure_migrations_table()
+        self.ensure_migrations_table(cur)
         
         # Get pending migrations
-        pending_migrations = self.get_pending_migrations()
+        pending_migrations = self.get_pending_migrations(cur)
         
         if not pending_migrations:
             logger.info("No pending migrations to run")
@@ -183,7 +233,7 @@ class MigrationRunner:
         failed_migrations = []
         
         for migration_name in pending_migrations:
-            success = self.run_migration(migration_name)
+            success = self.run_migration(cur, migration_name)
             
             if success:
                 successful_migrations.append(migration_name)
@@ -210,25 +260,102 @@ class MigrationRunner:
         
         return result
 
+    def run_locked(self, run_versioned: bool = True, wait: bool = False) -> Dict[str, Any]:
+        """Bootstrap + migrate while holding the migration advisory lock.
+
+        With wait=False (worker startup) a worker that loses the race waits up
+        to MIGRATION_LOCK_WAIT_S for the holder to finish, then returns with
+        status "skipped" without migrating; wait=True (CLI) blocks until the
+        lock is free and migrates.  The schema_version row is only written
+        once nothing is pending, so a partial run is retried on the next boot.
+        """
+        with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
+            if wait:
+                cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+            else:
+                cur.execute("SELECT pg_try_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+                if not cur.fetchone()[0]:
+                    return self.wait_for_lock_holder(cur)
+
+            try:
+                # Re-check under the lock: the previous holder may have just finished
+                target = self.target_version()
+                if self.get_schema_version(cur) == target:
+                    return {"status": "success", "message": "Schema already current", "migrations_run": []}
+
+                self.run_legacy_bootstrap()
+
+                if not run_versioned:
+                    return {"status": "success", "message": "Versioned migrations disabled", "migrations_run": []}
+
+                result = self.run_all_pending_migrations(cur)
+                if result["status"] == "success" and not self.get_pending_migrations(cur):
+                    self.set_schema_version(cur, target)
+                    logger.info(f"Schema version set to {target}")
+                return result
+            finally:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+
+    def wait_for_lock_holder(self, cur) -> Dict[str, Any]:
+        """Block until the worker holding the migration lock releases it."""
+        logger.info("Another worker holds the migration lock - waiting for it to finish")
+        started = time.perf_counter()
+        cur.execute("SET lock_timeout = %s", (f"{int(MIGRATION_LOCK_WAIT_S * 1000)}ms",))
+        try:
+            cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+        except LockNotAvailable:
+            logger.error(f"Migration lock still held after {MIGRATION_LOCK_WAIT_S:.0f}s")
+            return {"status": "failed", "message": "Timed out waiting for the migration lock",
+                    "failed_migrations": []}
+        finally:
+            cur.execute("RESET lock_timeout")
+        try:
+            current = self.get_schema_version(cur) == self.target_version()
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+        waited_ms = (time.perf_counter() - started) * 1000
+        if not current:
+            # The holder's failures are in its own log; retried on the next boot
+            logger.warning(f"Lock holder finished after {waited_ms:.0f}ms without bringing the schema current")
+        return {"status": "skipped", "message": f"Waited {waited_ms:.0f}ms for another process to migrate",
+                "migrations_run": []}
+
+    def status(self) -> Dict[str, Any]:
+        """Current vs target schema version and the pending migration list."""
+        with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
+            self.ensure_migrations_table(cur)
+            return {
+                "schema_version": self.get_schema_version(cur),
+                "target_version": self.target_version(),
+                "pending": self.get_pending_migrations(cur),
+            }
+
 # Singleton instance
 migration_runner = MigrationRunner()
 
 def run_startup_migrations():
     """Entry point for running migrations on server startup."""
     try:
+        started = time.perf_counter()
+        if migration_runner.is_schema_current():
+            logger.info(f"Schema is current ({migration_runner.target_version()}) - "
+                        f"skipped migrations in {(time.perf_counter() - started) * 1000:.0f}ms")
+            return True
+
         # Import configuration here to avoid circular imports
         from app.migrations_config import get_migration_config
         
         config = get_migration_config()
         config.log_configuration()
         
-        # Check if migrations should run
-        if not config.should_run_migrations():
+        # The legacy table bootstrap always ran on startup; versioned
+        # migrations stay behind the environment configuration
+        run_versioned = config.should_run_migrations()
+        if not run_versioned:
             logger.info("Migrations skipped based on environment configuration")
-            return True
         
         logger.info("Running startup migrations...")
-        result = migration_runner.run_all_pending_migrations()
+        result = migration_runner.run_locked(run_versioned=run_versioned, wait=False)
         
         if result["status"] == "failed":
             logger.error("Critical: Migration failures detected on startup!")
@@ -246,9 +373,35 @@ def run_startup_migrations():
             logger.info(f"Successful migrations: {result.get('migrations_run', [])}")
             return True
         else:
-            logger.info(f"All migrations completed successfully: {result.get('migrations_run', [])}")
+            logger.info(f"Migrations finished ({result['status']}): {result.get('migrations_run', [])} "
+                        f"in {(time.perf_counter() - started) * 1000:.0f}ms")
             return True
         
     except Exception as e:
         logger.error(f"Critical error during startup migrations: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+def main(argv=None) -> int:
+    """CLI entry point so deploys can migrate before workers boot."""
+    parser = argparse.ArgumentParser(description="Run Smart Meal Planner database migrations")
+    parser.add_argument("--status", action="store_true", help="show schema version and pending migrations")
+    parser.add_argument("--no-wait", action="store_true", help="exit instead of waiting if another process holds the lock")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.status:
+        status = migration_runner.status()
+        print(f"schema_version: {status['schema_version']}")
+        print(f"target_version: {status['target_version']}")
+        print(f"pending: {', '.join(status['pending']) or 'none'}")
+        return 0
+
+    result = migration_runner.run_locked(run_versioned=True, wait=not args.no_wait)
+    print(result.get("message", result["status"]))
+    return 0 if result["status"] in ("success", "skipped") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
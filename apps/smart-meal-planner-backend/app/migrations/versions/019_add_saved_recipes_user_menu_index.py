@@ -0,0 +1,53 @@
+"""
+Migration: Index saved_recipes by (user_id, menu_id)
+ID: 019_add_saved_recipes_user_menu_index
+Description: Supports the bulk saved-status lookup (db.get_saved_status_map),
+             which fetches every saved entry for a user's menu in one query.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_saved_recipes_user_menu
+                ON saved_recipes(user_id, menu_id)
+                WHERE menu_id IS NOT NULL
+            """)
+        conn.commit()
+        logger.info("Created index idx_saved_recipes_user_menu")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration 019 failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def downgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DROP INDEX IF EXISTS idx_saved_recipes_user_menu")
+        conn.commit()
+        logger.info("Dropped index idx_saved_recipes_user_menu")
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    upgrade()
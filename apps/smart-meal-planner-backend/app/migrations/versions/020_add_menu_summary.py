@@ -0,0 +1,76 @@
+"""
+Migration: Add denormalized menu summaries
+ID: 020_add_menu_summary
+Description: Adds menus.summary (JSONB) holding day/meal counts, first titles,
+             calorie range and thumbnail for list views, and backfills it for
+             existing menus in batches.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.db import get_db_connection
+from app.utils.menu_summary import menu_summary_json
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 200
+
+
+def upgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("ALTER TABLE menus ADD COLUMN IF NOT EXISTS summary JSONB")
+        conn.commit()
+        logger.info("Added menus.summary column")
+
+        backfilled = 0
+        last_id = 0
+        while True:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT id, meal_plan_json FROM menus
+                    WHERE id > %s AND summary IS NULL
+                    ORDER BY id
+                    LIMIT %s
+                """, (last_id, BATCH_SIZE))
+                rows = cur.fetchall()
+                if not rows:
+                    break
+                for menu_id, meal_plan_json in rows:
+                    cur.execute(
+                        "UPDATE menus SET summary = %s WHERE id = %s",
+                        (menu_summary_json(meal_plan_json), menu_id)
+                    )
+                last_id = rows[-1][0]
+                backfilled += len(rows)
+            conn.commit()
+        logger.info(f"Backfilled summaries for {backfilled} menus")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration 020 failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def downgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("ALTER TABLE menus DROP COLUMN IF EXISTS summary")
+        conn.commit()
+        logger.info("Dropped menus.summary column")
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    upgrade()
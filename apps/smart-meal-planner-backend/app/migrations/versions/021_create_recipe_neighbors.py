@@ -0,0 +1,60 @@
+"""
+Migration: Create recipe_neighbors for item-item recommendations
+ID: 021_create_recipe_neighbors
+Description: Stores the top-K most similar recipes for each rated recipe,
+             rebuilt periodically by app.ai.recipe_neighbors and read by
+             /ratings/recipes/recommended.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            # The primary key doubles as the lookup index (recipe_id = ANY(...))
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS recipe_neighbors (
+                    recipe_id INTEGER NOT NULL,
+                    neighbor_id INTEGER NOT NULL,
+                    similarity REAL NOT NULL,
+                    support INTEGER NOT NULL,
+                    built_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (recipe_id, neighbor_id)
+                )
+            """)
+        conn.commit()
+        logger.info("Created table recipe_neighbors")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration 021 failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def downgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS recipe_neighbors")
+        conn.commit()
+        logger.info("Dropped table recipe_neighbors")
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    upgrade()
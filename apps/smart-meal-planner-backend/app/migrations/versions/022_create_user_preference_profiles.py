@@ -0,0 +1,57 @@
+"""
+Migration: Create user_preference_profiles
+ID: 022_create_user_preference_profiles
+Description: One row per user holding the running rating aggregates behind
+             /analytics/users/{id}/preferences (see app.ai.preference_profile).
+             Rows are updated with every rating write; existing users are
+             filled in lazily on first read or by scripts/backfill_preference_profiles.py.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS user_preference_profiles (
+                    user_id INTEGER PRIMARY KEY REFERENCES user_profiles(id) ON DELETE CASCADE,
+                    stats JSONB NOT NULL,
+                    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+        conn.commit()
+        logger.info("Created table user_preference_profiles")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration 022 failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def downgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS user_preference_profiles")
+        conn.commit()
+        logger.info("Dropped table user_preference_profiles")
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    upgrade()
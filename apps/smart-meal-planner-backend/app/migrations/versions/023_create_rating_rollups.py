@@ -0,0 +1,93 @@
+"""
+Migration: Create daily rating rollups
+ID: 023_create_rating_rollups
+Description: Per-day rating aggregates per recipe and per cuisine, read by the
+             /analytics/trends endpoints (see app.ai.rating_rollups), plus the
+             refresh watermark table and the recipe_interactions indexes the
+             incremental refresh scans. Buckets are filled by the first
+             scheduled refresh or scripts/refresh_rating_rollups.py --full.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS recipe_rating_daily (
+                    day DATE NOT NULL,
+                    recipe_id INTEGER NOT NULL,
+                    rating_count INTEGER NOT NULL,
+                    rating_sum INTEGER NOT NULL,
+                    high_ratings INTEGER NOT NULL,
+                    times_made INTEGER NOT NULL,
+                    would_remake INTEGER NOT NULL,
+                    PRIMARY KEY (day, recipe_id)
+                )
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS cuisine_rating_daily (
+                    day DATE NOT NULL,
+                    cuisine TEXT NOT NULL,
+                    rating_count INTEGER NOT NULL,
+                    rating_sum INTEGER NOT NULL,
+                    high_ratings INTEGER NOT NULL,
+                    PRIMARY KEY (day, cuisine)
+                )
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS rating_rollup_state (
+                    name TEXT PRIMARY KEY,
+                    refreshed_through TIMESTAMP NOT NULL
+                )
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_recipe_interactions_rating_updated
+                ON recipe_interactions(updated_at)
+                WHERE rating_score IS NOT NULL
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_recipe_interactions_rating_timestamp
+                ON recipe_interactions(timestamp)
+                WHERE rating_score IS NOT NULL
+            """)
+        conn.commit()
+        logger.info("Created rating rollup tables and indexes")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration 023 failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def downgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DROP INDEX IF EXISTS idx_recipe_interactions_rating_timestamp")
+            cur.execute("DROP INDEX IF EXISTS idx_recipe_interactions_rating_updated")
+            cur.execute("DROP TABLE IF EXISTS rating_rollup_state")
+            cur.execute("DROP TABLE IF EXISTS cuisine_rating_daily")
+            cur.execute("DROP TABLE IF EXISTS recipe_rating_daily")
+        conn.commit()
+        logger.info("Dropped rating rollup tables and indexes")
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    upgrade()
@@ -0,0 +1,71 @@
+"""
+Migration: ingredient_usage_log table and indexes
+ID: 024_ingredient_usage_log_indexes
+Description: Creates ingredient_usage_log if it is missing (it predates the
+             migration runner) and adds the indexes behind the skeleton agent's
+             cooldown read (user_id, used_on_date) and the periodic retention
+             sweep (used_on_date) in app.utils.ingredient_usage.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS ingredient_usage_log (
+                    id SERIAL PRIMARY KEY,
+                    user_id INTEGER NOT NULL REFERENCES user_profiles(id) ON DELETE CASCADE,
+                    menu_id INTEGER,
+                    ingredient_name TEXT NOT NULL,
+                    used_on_date DATE NOT NULL DEFAULT CURRENT_DATE,
+                    meal_time TEXT,
+                    UNIQUE (user_id, ingredient_name, used_on_date, meal_time)
+                )
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_ingredient_usage_log_user_date
+                ON ingredient_usage_log(user_id, used_on_date, ingredient_name)
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_ingredient_usage_log_used_on
+                ON ingredient_usage_log(used_on_date)
+            """)
+        conn.commit()
+        logger.info("Ensured ingredient_usage_log and its indexes")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration 024 failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def downgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            # The table itself predates this migration and is left in place
+            cur.execute("DROP INDEX IF EXISTS idx_ingredient_usage_log_used_on")
+            cur.execute("DROP INDEX IF EXISTS idx_ingredient_usage_log_user_date")
+        conn.commit()
+        logger.info("Dropped ingredient_usage_log indexes")
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    upgrade()
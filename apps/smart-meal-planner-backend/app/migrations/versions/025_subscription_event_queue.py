@@ -0,0 +1,93 @@
+"""
+Migration: queue columns for Stripe webhook events
+ID: 025_subscription_event_queue
+Description: Stripe webhooks are now acknowledged once recorded in
+             subscription_events and applied by the background worker in
+             app.utils.stripe_events. Adds the ordering/retry columns it uses,
+             a unique index that drops redeliveries of a queued event id, and
+             a partial index over the events still to process.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS subscription_events (
+                    id SERIAL PRIMARY KEY,
+                    subscription_id INTEGER,
+                    event_type VARCHAR(100) NOT NULL,
+                    event_data TEXT NOT NULL,
+                    payment_provider VARCHAR(50) NOT NULL,
+                    provider_event_id VARCHAR(255),
+                    processed BOOLEAN DEFAULT FALSE,
+                    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                    processed_at TIMESTAMP WITH TIME ZONE
+                )
+            """)
+            cur.execute("""
+                ALTER TABLE subscription_events
+                    ADD COLUMN IF NOT EXISTS processed_at TIMESTAMP WITH TIME ZONE,
+                    ADD COLUMN IF NOT EXISTS ordering_key VARCHAR(255),
+                    ADD COLUMN IF NOT EXISTS event_created TIMESTAMP WITH TIME ZONE,
+                    ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0,
+                    ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP WITH TIME ZONE,
+                    ADD COLUMN IF NOT EXISTS last_error TEXT
+            """)
+            # Only queued rows carry an ordering_key, so older audit rows never conflict
+            cur.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_subscription_events_provider_event
+                ON subscription_events(payment_provider, provider_event_id)
+                WHERE ordering_key IS NOT NULL
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_subscription_events_pending
+                ON subscription_events(event_created, id)
+                WHERE ordering_key IS NOT NULL AND NOT processed
+            """)
+        conn.commit()
+        logger.info("Added Stripe event queue columns and indexes to subscription_events")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration 025 failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def downgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DROP INDEX IF EXISTS idx_subscription_events_pending")
+            cur.execute("DROP INDEX IF EXISTS idx_subscription_events_provider_event")
+            cur.execute("""
+                ALTER TABLE subscription_events
+                    DROP COLUMN IF EXISTS last_error,
+                    DROP COLUMN IF EXISTS next_attempt_at,
+                    DROP COLUMN IF EXISTS attempts,
+                    DROP COLUMN IF EXISTS event_created,
+                    DROP COLUMN IF EXISTS ordering_key
+            """)
+        conn.commit()
+        logger.info("Removed Stripe event queue columns from subscription_events")
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    upgrade()
@@ -0,0 +1,65 @@
+"""
+Migration: Instacart retailer directory cache
+ID: 026_instacart_retailer_directory
+Description: Persists the Instacart retailer list per (postal_code,
+             country_code) for app.integration.instacart_retailers, with the
+             request counters its background refresher uses to keep hot ZIPs
+             current.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS instacart_retailer_directory (
+                    postal_code VARCHAR(20) NOT NULL,
+                    country_code VARCHAR(2) NOT NULL DEFAULT 'US',
+                    retailers JSONB NOT NULL DEFAULT '[]'::jsonb,
+                    fetched_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    last_requested_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    request_count BIGINT NOT NULL DEFAULT 0,
+                    PRIMARY KEY (postal_code, country_code)
+                )
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_instacart_retailer_directory_requested
+                ON instacart_retailer_directory(last_requested_at)
+            """)
+        conn.commit()
+        logger.info("Created instacart_retailer_directory")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration 026 failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def downgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS instacart_retailer_directory")
+        conn.commit()
+        logger.info("Dropped instacart_retailer_directory")
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    upgrade()
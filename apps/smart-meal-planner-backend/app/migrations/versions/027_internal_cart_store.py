@@ -0,0 +1,75 @@
+"""
+Migration: Postgres-backed internal carts
+ID: 027_internal_cart_store
+Description: Creates internal_carts (one versioned row per user) and
+             internal_cart_items for app.utils.cart_store, replacing the
+             per-process dict in routers/cart.py. The unique
+             (user_id, store, name) index backs item upserts and name lookups.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS internal_carts (
+                    user_id INTEGER PRIMARY KEY REFERENCES user_profiles(id) ON DELETE CASCADE,
+                    version BIGINT NOT NULL DEFAULT 1,
+                    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS internal_cart_items (
+                    id BIGSERIAL PRIMARY KEY,
+                    user_id INTEGER NOT NULL REFERENCES internal_carts(user_id) ON DELETE CASCADE,
+                    store VARCHAR(50) NOT NULL,
+                    name TEXT NOT NULL,
+                    quantity INTEGER NOT NULL DEFAULT 1,
+                    store_preference VARCHAR(50),
+                    details JSONB,
+                    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cur.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_internal_cart_items_user_store_name
+                ON internal_cart_items(user_id, store, name)
+            """)
+        conn.commit()
+        logger.info("Created internal_carts and internal_cart_items")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration 027 failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def downgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS internal_cart_items")
+            cur.execute("DROP TABLE IF EXISTS internal_carts")
+        conn.commit()
+        logger.info("Dropped internal_carts and internal_cart_items")
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    upgrade()
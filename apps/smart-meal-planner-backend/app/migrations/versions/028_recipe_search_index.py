@@ -0,0 +1,223 @@
+"""
+Migration: unified recipe search index
+ID: 028_recipe_search_index
+Description: Creates recipe_search_index, one row per scraped or active user
+             recipe with a weighted tsvector (title, cuisine and tags,
+             ingredient names), a trigram-indexed title and the facet columns
+             used by app.utils.recipe_search. Triggers on the recipe, tag and
+             ingredient tables keep it current; existing recipes are
+             backfilled here.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Tables whose changes re-index a recipe: (table, source, recipe id column, columns an UPDATE must touch)
+INDEXED_TABLES = (
+    ("scraped_recipes", "scraped", "id",
+     "title, cuisine, complexity, diet_tags, image_url, total_time, is_verified"),
+    ("recipe_tags", "scraped", "recipe_id", None),
+    ("recipe_ingredients", "scraped", "recipe_id", None),
+    ("user_recipes", "user", "id",
+     "title, cuisine, complexity, diet_tags, custom_tags, image_url, total_time, is_verified, "
+     "is_public, is_active, created_by_user_id, created_by_organization_id"),
+    ("user_recipe_ingredients", "user", "recipe_id", None),
+)
+
+
+def create_search_index(cur):
+    """Table, functions, indexes and triggers; shared with scripts/benchmark_recipe_search.py"""
+    cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS recipe_search_index (
+            source VARCHAR(10) NOT NULL,
+            recipe_id INTEGER NOT NULL,
+            title VARCHAR(255) NOT NULL,
+            cuisine VARCHAR(100),
+            complexity VARCHAR(50),
+            diet_tags TEXT[] NOT NULL DEFAULT '{}',
+            tags TEXT[] NOT NULL DEFAULT '{}',
+            ingredients TEXT NOT NULL DEFAULT '',
+            image_url TEXT,
+            total_time INTEGER,
+            is_verified BOOLEAN NOT NULL DEFAULT FALSE,
+            is_public BOOLEAN NOT NULL DEFAULT TRUE,
+            created_by_user_id INTEGER,
+            created_by_organization_id INTEGER,
+            document TSVECTOR NOT NULL,
+            indexed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, recipe_id)
+        )
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_recipe_search_document
+        ON recipe_search_index USING GIN (document)
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_recipe_search_title_trgm
+        ON recipe_search_index USING GIN (title gin_trgm_ops)
+    """)
+    # Keyset order when browsing without a query
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_recipe_search_title_order
+        ON recipe_search_index(title, source, recipe_id)
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_recipe_search_diet_tags
+        ON recipe_search_index USING GIN (diet_tags)
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_recipe_search_cuisine
+        ON recipe_search_index(cuisine, complexity)
+    """)
+
+    # diet_tags / custom_tags are JSON arrays (JSONB or JSON text depending on the table's age)
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION recipe_search_tags(value TEXT)
+        RETURNS TEXT[] AS $$
+        BEGIN
+            IF value IS NULL OR value = '' OR jsonb_typeof(value::jsonb) <> 'array' THEN
+                RETURN '{}';
+            END IF;
+            RETURN ARRAY(SELECT jsonb_array_elements_text(value::jsonb));
+        EXCEPTION WHEN others THEN
+            RETURN '{}';
+        END;
+        $$ LANGUAGE plpgsql IMMUTABLE
+    """)
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION recipe_search_document(title TEXT, cuisine TEXT, tags TEXT[], ingredients TEXT)
+        RETURNS TSVECTOR AS $$
+            SELECT setweight(to_tsvector('english', COALESCE(title, '')), 'A')
+                || setweight(to_tsvector('english', COALESCE(cuisine, '') || ' ' || array_to_string(tags, ' ')), 'B')
+                || setweight(to_tsvector('english', COALESCE(ingredients, '')), 'C')
+        $$ LANGUAGE sql STABLE
+    """)
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION refresh_scraped_recipe_search(ids INTEGER[])
+        RETURNS VOID AS $$
+            DELETE FROM recipe_search_index WHERE source = 'scraped' AND recipe_id = ANY(ids);
+            INSERT INTO recipe_search_index (source, recipe_id, title, cuisine, complexity, diet_tags, tags,
+                                             ingredients, image_url, total_time, is_verified, document)
+            SELECT 'scraped', r.id, r.title, r.cuisine, r.complexity, d.diet_tags, t.tags,
+                   i.ingredients, r.image_url, r.total_time, COALESCE(r.is_verified, FALSE),
+                   recipe_search_document(r.title, r.cuisine, t.tags || d.diet_tags, i.ingredients)
+            FROM scraped_recipes r
+            CROSS JOIN LATERAL (SELECT recipe_search_tags(r.diet_tags::text) AS diet_tags) d
+            CROSS JOIN LATERAL (
+                SELECT ARRAY(SELECT tag::text FROM recipe_tags WHERE recipe_id = r.id ORDER BY tag) AS tags
+            ) t
+            CROSS JOIN LATERAL (
+                SELECT COALESCE(string_agg(name, ' '), '') AS ingredients
+                FROM recipe_ingredients WHERE recipe_id = r.id
+            ) i
+            WHERE r.id = ANY(ids);
+        $$ LANGUAGE sql
+    """)
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION refresh_user_recipe_search(ids INTEGER[])
+        RETURNS VOID AS $$
+            DELETE FROM recipe_search_index WHERE source = 'user' AND recipe_id = ANY(ids);
+            INSERT INTO recipe_search_index (source, recipe_id, title, cuisine, complexity, diet_tags, tags,
+                                             ingredients, image_url, total_time, is_verified, is_public,
+                                             created_by_user_id, created_by_organization_id, document)
+            SELECT 'user', r.id, r.title, r.cuisine, r.complexity, d.diet_tags, t.tags,
+                   i.ingredients, r.image_url, r.total_time, COALESCE(r.is_verified, FALSE),
+                   COALESCE(r.is_public, FALSE), r.created_by_user_id, r.created_by_organization_id,
+                   recipe_search_document(r.title, r.cuisine, t.tags || d.diet_tags, i.ingredients)
+            FROM user_recipes r
+            CROSS JOIN LATERAL (SELECT recipe_search_tags(r.diet_tags::text) AS diet_tags) d
+            CROSS JOIN LATERAL (SELECT recipe_search_tags(r.custom_tags::text) AS tags) t
+            CROSS JOIN LATERAL (
+                SELECT COALESCE(string_agg(name, ' '), '') AS ingredients
+                FROM user_recipe_ingredients WHERE recipe_id = r.id
+            ) i
+            WHERE r.id = ANY(ids) AND r.is_active;
+        $$ LANGUAGE sql
+    """)
+    # TG_ARGV: the index source and the column holding the recipe id
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION recipe_search_index_trigger()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            changed JSONB;
+            rid INTEGER;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                changed := to_jsonb(OLD);
+            ELSE
+                changed := to_jsonb(NEW);
+            END IF;
+            rid := (changed ->> TG_ARGV[1])::INTEGER;
+            IF rid IS NULL THEN
+                RETURN NULL;
+            END IF;
+            IF TG_ARGV[0] = 'scraped' THEN
+                PERFORM refresh_scraped_recipe_search(ARRAY[rid]);
+            ELSE
+                PERFORM refresh_user_recipe_search(ARRAY[rid]);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table, source, id_column, update_columns in INDEXED_TABLES:
+        trigger = f"{table}_search_index"
+        events = "INSERT OR DELETE OR UPDATE" + (f" OF {update_columns}" if update_columns else "")
+        cur.execute(f"DROP TRIGGER IF EXISTS {trigger} ON {table}")
+        cur.execute(f"""
+            CREATE TRIGGER {trigger}
+                AFTER {events} ON {table}
+                FOR EACH ROW
+                EXECUTE FUNCTION recipe_search_index_trigger('{source}', '{id_column}')
+        """)
+
+
+def upgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            create_search_index(cur)
+            cur.execute("SELECT refresh_scraped_recipe_search(ARRAY(SELECT id FROM scraped_recipes))")
+            cur.execute("SELECT refresh_user_recipe_search(ARRAY(SELECT id FROM user_recipes))")
+            cur.execute("ANALYZE recipe_search_index")
+        conn.commit()
+        logger.info("Created and backfilled recipe_search_index")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration 028 failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def downgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            for table, _, _, _ in INDEXED_TABLES:
+                cur.execute(f"DROP TRIGGER IF EXISTS {table}_search_index ON {table}")
+            cur.execute("DROP FUNCTION IF EXISTS recipe_search_index_trigger()")
+            cur.execute("DROP FUNCTION IF EXISTS refresh_user_recipe_search(INTEGER[])")
+            cur.execute("DROP FUNCTION IF EXISTS refresh_scraped_recipe_search(INTEGER[])")
+            cur.execute("DROP FUNCTION IF EXISTS recipe_search_document(TEXT, TEXT, TEXT[], TEXT)")
+            cur.execute("DROP FUNCTION IF EXISTS recipe_search_tags(TEXT)")
+            cur.execute("DROP TABLE IF EXISTS recipe_search_index")
+        conn.commit()
+        logger.info("Dropped recipe_search_index")
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    upgrade()
@@ -0,0 +1,54 @@
+"""
+Migration: Index for saved-recipe lists
+ID: 029_add_saved_recipes_list_index
+Description: Serves db.get_saved_recipes_page, which keyset-pages a user's
+             saved recipes newest first on (created_at, id): each page is read
+             from the index in that order and stops after LIMIT rows instead
+             of sorting the user's whole list.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_saved_recipes_user_created
+                ON saved_recipes(user_id, created_at DESC, id DESC)
+            """)
+        conn.commit()
+        logger.info("Created index idx_saved_recipes_user_created")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration 029 failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def downgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DROP INDEX IF EXISTS idx_saved_recipes_user_created")
+        conn.commit()
+        logger.info("Dropped index idx_saved_recipes_user_created")
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    upgrade()
@@ -0,0 +1,67 @@
+"""
+Migration: Kroger UPC resolutions
+ID: 030_kroger_upc_resolutions
+Description: Persists the Kroger product chosen for a normalized item name at a
+             store location, for app.integration.kroger_upc. user_id 0 holds
+             the shared top-ranked search result; any other user_id is that
+             user's own pick from a cart add, which takes precedence.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS kroger_upc_resolutions (
+                    user_id INTEGER NOT NULL,
+                    location_id VARCHAR(50) NOT NULL,
+                    ingredient_key VARCHAR(255) NOT NULL,
+                    upc VARCHAR(50) NOT NULL,
+                    product JSONB,
+                    use_count INTEGER NOT NULL DEFAULT 1,
+                    resolved_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (user_id, location_id, ingredient_key)
+                )
+            """)
+            # Lookups ask for many names at one location for (user, 0)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_kroger_upc_resolutions_lookup
+                ON kroger_upc_resolutions(location_id, ingredient_key, user_id)
+            """)
+        conn.commit()
+        logger.info("Created kroger_upc_resolutions")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration 030 failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def downgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS kroger_upc_resolutions")
+        conn.commit()
+        logger.info("Dropped kroger_upc_resolutions")
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    upgrade()
@@ -0,0 +1,59 @@
+"""
+Migration: Image variant records
+ID: 031_image_variants
+Description: Records the resized WebP variants actually written for each
+             uploaded image, keyed by the original's S3 object key. Responses
+             only list variants found here, so images that could not be
+             resized (SVG, undecodable files) or were never backfilled don't
+             get srcset entries that 404.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            # variants maps variant name -> S3 key of the WebP object
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS image_variants (
+                    image_key TEXT PRIMARY KEY,
+                    variants JSONB NOT NULL,
+                    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+        conn.commit()
+        logger.info("Created image_variants")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration 031 failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def downgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS image_variants")
+        conn.commit()
+        logger.info("Dropped image_variants")
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    upgrade()
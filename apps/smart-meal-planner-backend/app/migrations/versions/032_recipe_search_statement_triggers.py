@@ -0,0 +1,161 @@
+"""
+Migration: statement-level recipe search triggers
+ID: 032_recipe_search_statement_triggers
+Description: Replaces 028's FOR EACH ROW search index triggers, which re-indexed
+             a recipe once per tag or ingredient row written (a 30-ingredient
+             insert rebuilt the same recipe 30 times). Each table now has one
+             INSERT, UPDATE and DELETE trigger per statement; the transition
+             tables give the distinct recipe ids touched, each refreshed once.
+             Updates that leave the indexed columns alone refresh nothing.
+
+             A failed refresh no longer aborts the recipe write: it is logged
+             as a WARNING and the ids are queued in recipe_search_pending for
+             app.utils.recipe_search.refresh_pending_recipe_search.
+"""
+
+import importlib
+import os
+import sys
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+search_index = importlib.import_module("app.migrations.versions.028_recipe_search_index")
+
+# (table, source, recipe id column, columns whose change re-indexes the recipe)
+INDEXED_TABLES = (
+    ("scraped_recipes", "scraped", "id",
+     "title, cuisine, complexity, diet_tags, image_url, total_time, is_verified"),
+    ("recipe_tags", "scraped", "recipe_id", "recipe_id, tag"),
+    ("recipe_ingredients", "scraped", "recipe_id", "recipe_id, name"),
+    ("user_recipes", "user", "id",
+     "title, cuisine, complexity, diet_tags, custom_tags, image_url, total_time, is_verified, "
+     "is_public, is_active, created_by_user_id, created_by_organization_id"),
+    ("user_recipe_ingredients", "user", "recipe_id", "recipe_id, name"),
+)
+
+EVENTS = (
+    ("insert", "INSERT", "NEW TABLE AS new_rows"),
+    ("update", "UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+    ("delete", "DELETE", "OLD TABLE AS old_rows"),
+)
+
+
+def create_search_triggers(cur):
+    """Pending queue, trigger function and statement triggers; shared with scripts/benchmark_recipe_search.py"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS recipe_search_pending (
+            source VARCHAR(10) NOT NULL,
+            recipe_id INTEGER NOT NULL,
+            queued_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, recipe_id)
+        )
+    """)
+    # TG_ARGV: the index source, the column holding the recipe id and the
+    # columns compared on UPDATE. Every indexed table has an id primary key,
+    # which pairs old and new rows. Values are compared as text because older
+    # tables hold tags as JSON, which has no equality operator.
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION recipe_search_index_refresh()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            id_column TEXT := TG_ARGV[1];
+            old_values TEXT;
+            new_values TEXT;
+            ids INTEGER[];
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                EXECUTE format('SELECT array_agg(DISTINCT %I) FROM new_rows', id_column) INTO ids;
+            ELSIF TG_OP = 'DELETE' THEN
+                EXECUTE format('SELECT array_agg(DISTINCT %I) FROM old_rows', id_column) INTO ids;
+            ELSE
+                SELECT string_agg(format('o.%I::text', trim(c)), ', '),
+                       string_agg(format('n.%I::text', trim(c)), ', ')
+                INTO old_values, new_values
+                FROM unnest(string_to_array(TG_ARGV[2], ',')) AS c;
+                EXECUTE format(
+                    'SELECT array_agg(DISTINCT changed.rid) '
+                    'FROM old_rows o JOIN new_rows n ON n.id = o.id, '
+                    'LATERAL (VALUES (o.%1$I), (n.%1$I)) AS changed(rid) '
+                    'WHERE ROW(%2$s) IS DISTINCT FROM ROW(%3$s)',
+                    id_column, old_values, new_values
+                ) INTO ids;
+            END IF;
+
+            ids := array_remove(ids, NULL);
+            IF ids IS NULL OR cardinality(ids) = 0 THEN
+                RETURN NULL;
+            END IF;
+
+            BEGIN
+                IF TG_ARGV[0] = 'scraped' THEN
+                    PERFORM refresh_scraped_recipe_search(ids);
+                ELSE
+                    PERFORM refresh_user_recipe_search(ids);
+                END IF;
+            EXCEPTION WHEN others THEN
+                RAISE WARNING 'recipe_search_index: refreshing % % recipes failed, queued for retry: %',
+                    cardinality(ids), TG_ARGV[0], SQLERRM;
+                INSERT INTO recipe_search_pending (source, recipe_id)
+                SELECT TG_ARGV[0], unnest(ids)
+                ON CONFLICT DO NOTHING;
+            END;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table, source, id_column, compared in INDEXED_TABLES:
+        cur.execute(f"DROP TRIGGER IF EXISTS {table}_search_index ON {table}")
+        for suffix, event, referencing in EVENTS:
+            trigger = f"{table}_search_index_{suffix}"
+            cur.execute(f"DROP TRIGGER IF EXISTS {trigger} ON {table}")
+            cur.execute(f"""
+                CREATE TRIGGER {trigger}
+                    AFTER {event} ON {table}
+                    REFERENCING {referencing}
+                    FOR EACH STATEMENT
+                    EXECUTE FUNCTION recipe_search_index_refresh('{source}', '{id_column}', '{compared}')
+            """)
+
+
+def upgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            create_search_triggers(cur)
+        conn.commit()
+        logger.info("Replaced recipe search row triggers with statement triggers")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration 032 failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def downgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            for table, _, _, _ in INDEXED_TABLES:
+                for suffix, _, _ in EVENTS:
+                    cur.execute(f"DROP TRIGGER IF EXISTS {table}_search_index_{suffix} ON {table}")
+            cur.execute("DROP FUNCTION IF EXISTS recipe_search_index_refresh()")
+            cur.execute("DROP TABLE IF EXISTS recipe_search_pending")
+            # Back to 028's row triggers
+            search_index.create_search_index(cur)
+        conn.commit()
+        logger.info("Restored recipe search row triggers")
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    upgrade()
@@ -0,0 +1,55 @@
+"""
+Migration: Index for Stripe event keys waiting on a retry
+ID: 033_subscription_events_waiting_index
+Description: The Stripe event worker skips ordering keys whose oldest pending
+             event has a next_attempt_at in the future. This partial index
+             holds just those pending, retry-scheduled rows, so the check
+             doesn't scan the whole subscription_events audit table.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_subscription_events_waiting
+                ON subscription_events(ordering_key, next_attempt_at)
+                WHERE ordering_key IS NOT NULL AND NOT processed AND next_attempt_at IS NOT NULL
+            """)
+        conn.commit()
+        logger.info("Created index idx_subscription_events_waiting")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration 033 failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def downgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DROP INDEX IF EXISTS idx_subscription_events_waiting")
+        conn.commit()
+        logger.info("Dropped index idx_subscription_events_waiting")
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    upgrade()
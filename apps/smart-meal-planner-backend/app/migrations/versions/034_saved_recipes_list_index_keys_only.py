@@ -0,0 +1,55 @@
+"""
+Migration: Drop the included columns from the saved-recipe list index
+ID: 034_saved_recipes_list_index_keys_only
+Description: 029 first shipped idx_saved_recipes_user_created with a few card
+             columns INCLUDEd. get_saved_recipes_page projects more columns
+             than that and joins menus, so the index could never answer it
+             alone and the extra columns only made it bigger. Databases that
+             built that version get the key-only index 029 now creates.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            # indnatts counts included columns too; equal to indnkeyatts when there are none
+            cur.execute("""
+                SELECT i.indnatts > i.indnkeyatts
+                FROM pg_index i
+                WHERE i.indexrelid = to_regclass('idx_saved_recipes_user_created')
+            """)
+            row = cur.fetchone()
+            if row and row[0]:
+                cur.execute("DROP INDEX idx_saved_recipes_user_created")
+                cur.execute("""
+                    CREATE INDEX idx_saved_recipes_user_created
+                    ON saved_recipes(user_id, created_at DESC, id DESC)
+                """)
+                logger.info("Rebuilt idx_saved_recipes_user_created without included columns")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration 034 failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def downgrade():
+    # The key-only index serves 029's query as well; nothing to restore
+    logger.info("Nothing to downgrade for 034_saved_recipes_list_index_keys_only")
+
+
+if __name__ == "__main__":
+    upgrade()
@@ -0,0 +1,59 @@
+"""
+Migration: Record recipe neighbour builds
+ID: 035_recipe_neighbor_builds
+Description: The in-app builder judged a build due by MAX(built_at) in
+             recipe_neighbors, which is NULL while the table is empty (no
+             ratings with enough support yet), so every check rebuilt. Each
+             build now stamps this single row in the same transaction as the
+             neighbour lists it stores.
+"""
+
+import os
+import sys
+import logging
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS recipe_neighbor_builds (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    built_at TIMESTAMP NOT NULL,
+                    recipes INTEGER NOT NULL,
+                    pairs INTEGER NOT NULL
+                )
+            """)
+        conn.commit()
+        logger.info("Created table recipe_neighbor_builds")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration 035 failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def downgrade():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS recipe_neighbor_builds")
+        conn.commit()
+        logger.info("Dropped table recipe_neighbor_builds")
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    upgrade()
@@ -10,6 +10,8 @@ class OrganizationBrandingVisual(BaseModel):
     secondaryColor: Optional[str] = Field(default="#ff9800", pattern=r"^#[0-9A-Fa-f]{6}$")
     accentColor: Optional[str] = Field(default="#2196f3", pattern=r"^#[0-9A-Fa-f]{6}$")
     logoUrl: Optional[str] = None
+    # Resized WebP versions of an uploaded logo, keyed by variant name (read-only)
+    logoVariants: Optional[Dict[str, str]] = None
     faviconUrl: Optional[str] = None
     backgroundImageUrl: Optional[str] = None
     fontFamily: Optional[str] = "Roboto"
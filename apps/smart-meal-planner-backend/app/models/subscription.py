@@ -73,6 +73,7 @@ from psycopg2.extras import RealDictCursor
 import logging
 import json
 from app.db import get_db_connection
+from app.utils.entitlements import entitlement_cache, get_entitlement, get_client_organization
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -307,6 +308,7 @@ def update_subscription(subscription_id, status=None, current_period_start=None,
             
             result = cur.fetchone()
             conn.commit()
+            entitlement_cache.invalidate_subscription(subscription_id)
             
             success = result is not None
             logger.info(f"Subscription update success: {success}")
@@ -350,6 +352,7 @@ def cancel_subscription(subscription_id, cancel_at_period_end=True):
                 
             result = cur.fetchone()
             conn.commit()
+            entitlement_cache.invalidate_subscription(subscription_id)
             
             success = result is not None
             logger.info(f"Subscription cancellation success: {success}")
@@ -564,8 +567,15 @@ def delete_payment_method(payment_method_id):
         if conn:
             conn.close()
 
-def log_subscription_event(subscription_id, event_type, event_data, payment_provider, provider_event_id=None, processed=False, processed_at=None):
-    """Log a subscription event"""
+def log_subscription_event(subscription_id, event_type, event_data, payment_provider, provider_event_id=None, processed=False, processed_at=None,
+                           ordering_key=None, event_created=None):
+    """
+    Log a subscription event
+
+    Passing an ordering_key queues the event for app.utils.stripe_events. Queued
+    events are recorded once per provider_event_id: a redelivery returns the id
+    of the row already stored.
+    """
     conn = None
     try:
         logger.info(f"Logging subscription event: subscription={subscription_id}, type={event_type}")
@@ -576,6 +586,30 @@ def log_subscription_event(subscription_id, event_type, event_data, payment_prov
 
         conn = get_db_connection()
         with conn.cursor() as cur:
+            if ordering_key is not None:
+                cur.execute("""
+                    INSERT INTO subscription_events (
+                        subscription_id, event_type, event_data, payment_provider, provider_event_id,
+                        processed, processed_at, ordering_key, event_created
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (payment_provider, provider_event_id) WHERE ordering_key IS NOT NULL
+                    DO NOTHING
+                    RETURNING id
+                """, (
+                    subscription_id, event_type, event_data_json, payment_provider, provider_event_id,
+                    processed, processed_at, ordering_key, event_created
+                ))
+                row = cur.fetchone()
+                if row is None:
+                    cur.execute("""
+                        SELECT id FROM subscription_events
+                        WHERE payment_provider = %s AND provider_event_id = %s AND ordering_key IS NOT NULL
+                    """, (payment_provider, provider_event_id))
+                    row = cur.fetchone()
+                    logger.info(f"Event {provider_event_id} already recorded as {row[0]}")
+                conn.commit()
+                return row[0]
+
             # Try to insert with processed_at column
             try:
                 cur.execute("""
@@ -866,6 +900,7 @@ def migrate_to_free_tier(user_id=None, organization_id=None, set_beta_expiration
                 """, (subscription_id, json.dumps(event_data)))
 
             conn.commit()
+            entitlement_cache.invalidate(user_id=user_id, organization_id=organization_id)
             return subscription_id
 
     except Exception as e:
@@ -960,36 +995,20 @@ def check_user_subscription_access(user_id, account_type=None, organization_id=N
         logger.info(f"Subscription enforcement disabled (SUBSCRIPTION_ENFORCE=false) - granting access to user {user_id}")
         return True
 
-    conn = None
     try:
-        logger.info(f"Checking user subscription access: user_id={user_id}, account_type={account_type}, org_id={organization_id}")
-
         # For client accounts, check their organization's subscription
         if account_type == 'client':
             if organization_id:
                 # Use the provided organization_id
-                logger.info(f"Client {user_id} using JWT organization_id: {organization_id}")
                 return check_subscription_status(organization_id=organization_id, include_free_tier=include_free_tier)
             else:
-                # Look up the client's organization
-                logger.info(f"Client {user_id} missing organization_id, looking up in database")
-                conn = get_db_connection()
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        SELECT oc.organization_id
-                        FROM organization_clients oc
-                        WHERE oc.client_id = %s AND oc.status = 'active'
-                        LIMIT 1
-                    """, (user_id,))
-                    result = cur.fetchone()
-
-                    if result:
-                        client_org_id = result[0]
-                        logger.info(f"Found organization {client_org_id} for client {user_id}")
-                        return check_subscription_status(organization_id=client_org_id, include_free_tier=include_free_tier)
-                    else:
-                        logger.error(f"No active organization found for client {user_id}")
-                        return False
+                # Look up the client's organization (cached by the entitlement service)
+                client_org_id = get_client_organization(user_id)
+                if client_org_id:
+                    return check_subscription_status(organization_id=client_org_id, include_free_tier=include_free_tier)
+                else:
+                    logger.error(f"No active organization found for client {user_id}")
+                    return False
 
         # For organization and individual accounts, check their own subscription
         else:
@@ -998,9 +1017,6 @@ def check_user_subscription_access(user_id, account_type=None, organization_id=N
     except Exception as e:
         logger.error(f"Error checking user subscription access: {str(e)}", exc_info=True)
         return False
-    finally:
-        if conn:
-            conn.close()
 
 def check_subscription_status(user_id=None, organization_id=None, include_free_tier=True):
     """
@@ -1023,84 +1039,19 @@ def check_subscription_status(user_id=None, organization_id=None, include_free_t
         logger.info(f"Subscription enforcement disabled (SUBSCRIPTION_ENFORCE=false) - all subscriptions considered active")
         return True
 
-    conn = None
     try:
-        logger.info(f"Checking subscription status: user_id={user_id}, org_id={organization_id}")
-
         # Validate that either user_id or organization_id is provided, but not both
         if (user_id is None and organization_id is None) or (user_id is not None and organization_id is not None):
             logger.error(f"Either user_id or organization_id must be provided, but not both")
             return False
 
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            if user_id:
-                cur.execute("""
-                    SELECT s.status, s.current_period_end, s.trial_end, s.subscription_type
-                    FROM subscriptions s
-                    JOIN user_profiles u ON s.id = u.subscription_id
-                    WHERE u.id = %s
-                """, (user_id,))
-            else:
-                cur.execute("""
-                    SELECT s.status, s.current_period_end, s.trial_end, s.subscription_type
-                    FROM subscriptions s
-                    JOIN organizations o ON s.id = o.subscription_id
-                    WHERE o.id = %s
-                """, (organization_id,))
-
-            result = cur.fetchone()
-
-            if not result:
-                logger.warning("No subscription found")
-                return False
-
-            status, current_period_end, trial_end, subscription_type = result
-
-            # Special handling for free tier and organization subscriptions
-            if subscription_type in ('free', 'organization'):
-                if include_free_tier:
-                    # For free tier and organization subscriptions, check if it's still active
-                    if status == 'active':
-                        if trial_end is None:
-                            # Indefinite free tier or organization subscription
-                            logger.info(f"{subscription_type} subscription with no expiration - active")
-                            return True
-                        else:
-                            # Free tier/organization with expiration
-                            import datetime
-                            now = datetime.datetime.now(datetime.timezone.utc)
-                            is_valid = now < trial_end
-                            logger.info(f"{subscription_type} subscription with expiration - active: {is_valid}")
-                            return is_valid
-                else:
-                    # If we're not including free tier, it doesn't count as an active subscription
-                    logger.info(f"{subscription_type} subscription not included in check - inactive")
-                    return False
-
-            # Regular subscription checks for paid tiers
-            # Check if status is active or trialing
-            is_active = status in ('active', 'trialing')
-
-            # Check if within trial period
-            import datetime
-            now = datetime.datetime.now(datetime.timezone.utc)
-            is_in_trial = trial_end is not None and now < trial_end
-
-            # Check if within current period
-            is_in_period = current_period_end is not None and now < current_period_end
-
-            # Overall status
-            has_active_subscription = is_active and (is_in_trial or is_in_period)
-            logger.info(f"Active subscription status: {has_active_subscription}")
-
-            return has_active_subscription
+        # Served from the entitlement cache; see app.utils.entitlements for expiry rules
+        entitlement = get_entitlement(user_id=user_id, organization_id=organization_id,
+                                      include_free_tier=include_free_tier)
+        return entitlement.has_access
     except Exception as e:
         logger.error(f"Error checking subscription status: {str(e)}", exc_info=True)
         return False
-    finally:
-        if conn:
-            conn.close()
 
 def get_subscription_details(user_id=None, organization_id=None):
     """Get detailed subscription information for a user or organization"""
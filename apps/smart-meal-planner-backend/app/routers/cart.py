@@ -4,7 +4,9 @@ from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import logging
+from starlette.concurrency import run_in_threadpool
 from app.utils.auth_utils import get_user_from_token
+from app.utils import cart_store
 
 logger = logging.getLogger(__name__)
 
@@ -23,9 +25,6 @@ class StoreSearchRequest(BaseModel):
     items: List[str]
     store: str
 
-# Internal cart storage (in production this would be a database)
-internal_carts = {}
-
 router = APIRouter(prefix="/cart", tags=["Cart"])
 
 @router.get("/internal/{user_id}/contents")
@@ -43,18 +42,10 @@ async def get_internal_cart(
             raise HTTPException(403, "Not authorized to access this cart")
         
         logger.debug(f"Accessing cart for user {user_id} from token user {token_user_id}")
-        
-        # Initialize cart if needed
-        if user_id not in internal_carts:
-            internal_carts[user_id] = {
-                'instacart': [],
-                'kroger': [],
-                'unassigned': []
-            }
 
         return {
             "status": "success",
-            "cart": internal_carts[user_id]
+            "cart": await run_in_threadpool(cart_store.get_cart, user_id)
         }
     except Exception as e:
         logger.error(f"Error getting internal cart: {str(e)}")
@@ -70,29 +61,17 @@ async def add_to_internal_cart(
         user_id = str(user.get('user_id'))
         logger.debug(f"Adding items to cart for user {user_id}")
         logger.debug(f"Request items: {req.items}")
-        
-        # Initialize cart if needed
-        if user_id not in internal_carts:
-            internal_carts[user_id] = {
-                'instacart': [],
-                'kroger': [],
-                'unassigned': []
-            }
-
-        # Add items to appropriate store list
-        for item in req.items:
-            store = req.store or item.store_preference or 'unassigned'
 
-            # Ensure the store key exists in the cart
-            if store not in internal_carts[user_id]:
-                logger.info(f"Creating new store section in cart: {store}")
-                internal_carts[user_id][store] = []
-
-            internal_carts[user_id][store].append(item)
+        # Add items to appropriate store list, all in one batch
+        cart = await run_in_threadpool(cart_store.add_items, user_id, [
+            (req.store or item.store_preference or 'unassigned', item.name, item.quantity,
+             item.store_preference, item.details)
+            for item in req.items
+        ])
 
         return {
             "status": "success",
-            "cart": internal_carts[user_id]
+            "cart": cart
         }
     except Exception as e:
         logger.error(f"Error adding to internal cart: {str(e)}")
@@ -115,24 +94,13 @@ async def assign_store_to_items(
         
         logger.debug(f"Assigning items to store for user {user_id}")
         logger.debug(f"Items: {items}, Store: {store}")
-        
-        if user_id not in internal_carts:
-            raise HTTPException(404, "Cart not found")
-            
+
         # Move items from unassigned to specified store
-        updated_unassigned = []
-        for item in internal_carts[user_id]['unassigned']:
-            if item.name in [i.name for i in items]:
-                item.store_preference = store
-                internal_carts[user_id][store].append(item)
-            else:
-                updated_unassigned.append(item)
-                
-        internal_carts[user_id]['unassigned'] = updated_unassigned
-        
+        cart = await run_in_threadpool(cart_store.assign_store, user_id, {item.name for item in items}, store)
+
         return {
             "status": "success",
-            "cart": internal_carts[user_id]
+            "cart": cart
         }
     except Exception as e:
         logger.error(f"Error assigning store: {str(e)}")
@@ -147,13 +115,8 @@ async def clear_internal_cart(
     try:
         if str(user.get('user_id')) != str(user_id):
             raise HTTPException(403, "Not authorized to access this cart")
-            
-        if user_id in internal_carts:
-            internal_carts[user_id] = {
-                'instacart': [],
-                'kroger': [],
-                'unassigned': []
-            }
+
+        await run_in_threadpool(cart_store.clear_cart, user_id)
         return {"status": "success"}
     except Exception as e:
         logger.error(f"Error clearing internal cart: {str(e)}")
@@ -169,13 +132,12 @@ async def clear_store_items(
     try:
         if str(user.get('user_id')) != str(user_id):
             raise HTTPException(403, "Not authorized to access this cart")
-            
-        if user_id in internal_carts:
-            if store not in internal_carts[user_id]:
-                raise HTTPException(400, f"Invalid store: {store}")
-                
-            internal_carts[user_id][store] = []
-            
+
+        if store not in await run_in_threadpool(cart_store.get_cart, user_id):
+            raise HTTPException(400, f"Invalid store: {store}")
+
+        await run_in_threadpool(cart_store.clear_store, user_id, store)
+
         return {"status": "success"}
     except Exception as e:
         logger.error(f"Error clearing store items: {str(e)}")
@@ -192,19 +154,13 @@ async def get_store_items(
         if str(user.get('user_id')) != str(user_id):
             raise HTTPException(403, "Not authorized to access this cart")
 
-        if user_id not in internal_carts:
-            internal_carts[user_id] = {
-                'instacart': [],
-                'kroger': [],
-                'unassigned': []
-            }
-
-        if store not in internal_carts[user_id]:
+        cart = await run_in_threadpool(cart_store.get_cart, user_id)
+        if store not in cart:
             raise HTTPException(400, f"Invalid store: {store}")
 
         return {
             "status": "success",
-            "items": internal_carts[user_id][store]
+            "items": cart[store]
         }
     except Exception as e:
         logger.error(f"Error getting store items: {str(e)}")
@@ -248,41 +204,13 @@ async def remove_cart_item(
             raise HTTPException(400, "item_name and store are required")
 
         logger.info(f"Removing item '{item_name}' from '{store}' for user {user_id}")
-        logger.info(f"Current internal_carts keys: {list(internal_carts.keys())}")
-
-        if user_id in internal_carts:
-            if store not in internal_carts[user_id]:
-                raise HTTPException(400, f"Invalid store: {store}")
-
-            # Debug: Log current cart contents before removal
-            logger.info(f"Current cart for user {user_id}, store {store}: {internal_carts[user_id][store]}")
-
-            # Find and remove the item with better error handling
-            original_count = len(internal_carts[user_id][store])
-            try:
-                # Filter items, handling both dictionary and object formats
-                filtered_items = []
-                for item in internal_carts[user_id][store]:
-                    # Get item name - handle both dict and object formats
-                    if isinstance(item, dict):
-                        current_item_name = item.get('name')
-                    else:
-                        current_item_name = getattr(item, 'name', None)
-
-                    # Keep item if name doesn't match
-                    if current_item_name != item_name:
-                        filtered_items.append(item)
-
-                internal_carts[user_id][store] = filtered_items
-                new_count = len(internal_carts[user_id][store])
-                logger.info(f"Items removed: {original_count - new_count}")
-            except Exception as filter_error:
-                logger.error(f"Error during item filtering: {str(filter_error)}")
-                logger.error(f"Cart item types: {[type(item) for item in internal_carts[user_id][store]]}")
-                raise
-        else:
-            logger.warning(f"User {user_id} not found in internal_carts")
-            
+
+        if store not in await run_in_threadpool(cart_store.get_cart, user_id):
+            raise HTTPException(400, f"Invalid store: {store}")
+
+        _, removed = await run_in_threadpool(cart_store.remove_item, user_id, store, item_name)
+        logger.info(f"Items removed: {removed}")
+
         return {"status": "success"}
     except HTTPException:
         # Re-raise HTTP exceptions as-is
@@ -320,30 +248,14 @@ async def update_cart_item_quantity(
             raise HTTPException(400, "Invalid quantity value")
             
         logger.info(f"Updating quantity for '{item_name}' in '{store}' to {quantity}")
-            
-        if user_id in internal_carts:
-            if store not in internal_carts[user_id]:
-                raise HTTPException(400, f"Invalid store: {store}")
-                
-            # Find and update the item
-            item_found = False
-            for item in internal_carts[user_id][store]:
-                # Handle both dictionary and object formats
-                if isinstance(item, dict):
-                    current_item_name = item.get('name')
-                    if current_item_name == item_name:
-                        item['quantity'] = quantity
-                        item_found = True
-                        break
-                else:
-                    if getattr(item, 'name', None) == item_name:
-                        item.quantity = quantity
-                        item_found = True
-                        break
-                    
-            if not item_found:
-                raise HTTPException(404, f"Item '{item_name}' not found in '{store}'")
-            
+
+        if store not in await run_in_threadpool(cart_store.get_cart, user_id):
+            raise HTTPException(400, f"Invalid store: {store}")
+
+        _, updated = await run_in_threadpool(cart_store.set_quantity, user_id, store, item_name, quantity)
+        if not updated:
+            raise HTTPException(404, f"Item '{item_name}' not found in '{store}'")
+
         return {"status": "success"}
     except Exception as e:
         logger.error(f"Error updating cart item quantity: {str(e)}")
@@ -1,21 +1,31 @@
 # app/routers/client_resources.py
 
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response
 from pydantic import BaseModel
 from psycopg2.extras import RealDictCursor
-from ..db import get_db_connection, get_db_cursor
+from ..db import get_db_connection, get_db_cursor, get_saved_status_map, saved_id_for, annotate_saved_meals
 from ..utils.auth_middleware import require_organization_owner, get_user_from_token
+from ..utils.menu_summary import menu_summary_json, include_plan, apply_summary, plan_column_sql
+from ..utils.http_cache import etag_matches, not_modified
+from ..utils.preference_profiles import PREFERENCE_CACHE_CONTROL, get_preference_profile
 from typing import List, Dict, Any, Optional
 import logging
 import traceback
 import json
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Client Resources"])
 
+# Preference columns an organization owner sees for a client
+CLIENT_PREFERENCE_COLUMNS = (
+    "diet_type", "dietary_restrictions", "disliked_ingredients", "recipe_type",
+    "macro_protein", "macro_carbs", "macro_fat", "calorie_goal", "meal_times", "appliances",
+    "prep_complexity", "servings_per_meal", "snacks_per_day", "flavor_preferences", "spice_level",
+    "recipe_type_preferences", "meal_time_preferences", "time_constraints", "prep_preferences",
+)
+
 # Helper function removed - using direct queries with known schema
 
 class MenuShare(BaseModel):
@@ -25,8 +35,12 @@ class MenuShare(BaseModel):
     message: Optional[str] = None
 
 @router.get("/client/dashboard")
-async def get_client_dashboard(user=Depends(get_user_from_token)):
+async def get_client_dashboard(
+    include: Optional[str] = Query(None, description="Pass 'plan' to include each full meal plan"),
+    user=Depends(get_user_from_token)
+):
     """Get client dashboard data including shared menus"""
+    want_plan = include_plan(include)
     if not user:
         raise HTTPException(status_code=401, detail="Authentication required")
 
@@ -71,7 +85,7 @@ async def get_client_dashboard(user=Depends(get_user_from_token)):
                     logger.info(f"Total shared menus in database: {total_count}")
                     
                     # Get shared menus using the actual schema
-                    cursor.execute("""
+                    cursor.execute(f"""
                         SELECT 
                             sm.id as share_id, 
                             sm.menu_id, 
@@ -89,30 +103,25 @@ async def get_client_dashboard(user=Depends(get_user_from_token)):
                             m.created_at,
                             o.name as organization_name,
                             m.duration_days,
-                            m.meal_plan_json
+                            {plan_column_sql("m")}
                         FROM shared_menus sm
                         JOIN menus m ON sm.menu_id = m.id
                         LEFT JOIN organizations o ON sm.organization_id = o.id
                         WHERE sm.client_id = %s AND sm.is_active = TRUE
                         ORDER BY sm.shared_at DESC
-                    """, (client_id,))
+                    """, (want_plan, client_id))
                     
                     shared_menus = cursor.fetchall()
                     logger.info(f"Found {len(shared_menus)} shared menus for user {user_id}")
                     
                     # Process menus to ensure proper data types
                     for menu in shared_menus:
-                        # Parse meal_plan_json if it's a string
-                        if menu.get('meal_plan_json') and isinstance(menu['meal_plan_json'], str):
-                            try:
-                                menu['meal_plan_json'] = json.loads(menu['meal_plan_json'])
-                            except:
-                                menu['meal_plan_json'] = {}
+                        # Attach the card summary; the plan itself only ships with ?include=plan
+                        apply_summary(menu, want_plan)
                         
-                        # Extract meal count from meal_plan_json if available
-                        if isinstance(menu.get('meal_plan_json'), dict):
-                            days = menu['meal_plan_json'].get('days', [])
-                            menu['meal_count'] = len(days)
+                        # meal_count has always been the number of days on dashboard cards
+                        if menu.get('summary'):
+                            menu['meal_count'] = menu['summary']['day_count']
                         
                         # Ensure description is a string
                         if not menu.get('description') or menu['description'] == menu.get('nickname'):
@@ -142,32 +151,20 @@ async def get_client_dashboard(user=Depends(get_user_from_token)):
             # Use all_menus instead of shared_menus
             shared_menus = all_menus
 
-            # Get saved recipes
-            saved_recipes = []
+            # Count saved recipes (the dashboard only shows the total)
+            saved_recipes_count = 0
             try:
                 cursor.execute("""
-                    SELECT 
-                        id,
-                        recipe_name,
-                        recipe_id,
-                        created_at,
-                        scraped_recipe_id,
-                        user_id,
-                        ingredients,
-                        instructions,
-                        servings,
-                        macros,
-                        prep_time
+                    SELECT COUNT(*) AS count
                     FROM saved_recipes
                     WHERE user_id = %s
-                    ORDER BY created_at DESC
                 """, (user_id,))
 
-                saved_recipes = cursor.fetchall()
+                saved_recipes_count = cursor.fetchone()['count']
             except Exception as e:
-                logger.error(f"Error fetching saved recipes: {e}")
+                logger.error(f"Error counting saved recipes: {e}")
                 # No need for rollback with context manager
-                saved_recipes = []
+                saved_recipes_count = 0
 
             # Get user preferences data (summary)
             preferences_summary = None
@@ -233,7 +230,7 @@ async def get_client_dashboard(user=Depends(get_user_from_token)):
                 "is_client": is_client,
                 "organization": organization,
                 "shared_menus": shared_menus,
-                "saved_recipes_count": len(saved_recipes),
+                "saved_recipes_count": saved_recipes_count,
                 "preferences": preferences_summary
             }
 
@@ -335,6 +332,11 @@ async def get_client_menu(
             menu['published'] = True
             menu['image_url'] = None
 
+            # Saved status for the viewer, in one query on this cursor
+            saved = get_saved_status_map(user_id, menu_id, cur=cursor)
+            menu['is_saved'] = saved_id_for(saved, menu_id) is not None
+            annotate_saved_meals(menu['meal_plan'], menu_id, saved)
+
             # Get share information if client is accessing
             if user.get('account_type') != 'organization':
                 # Check if shared_menus table exists
@@ -565,9 +567,11 @@ async def get_client_menu_grocery_list(
 @router.post("/organizations/clients/{client_id}/menus")
 async def org_get_client_menus(
     client_id: int = Path(..., description="The ID of the client"),
+    include: Optional[str] = Query(None, description="Pass 'plan' to include each full meal plan"),
     user=Depends(get_user_from_token)
 ):
     """Get menus for a specific client (organization owner only)"""
+    want_plan = include_plan(include)
     logger.info(f"\n=== ORG GET CLIENT MENUS DEBUG ===")
     logger.info(f"Received client_id: {client_id}")
     logger.info(f"User token data: {user}")
@@ -652,7 +656,7 @@ async def org_get_client_menus(
                 try:
                     # Get all menus shared with this client using known schema
                     logger.info(f"Querying shared menus for client_id={client_id}, organization_id={organization_id}")
-                    cursor.execute("""
+                    cursor.execute(f"""
                         SELECT 
                             m.id,
                             m.nickname as title,
@@ -667,29 +671,24 @@ async def org_get_client_menus(
                             ms.id as share_id,
                             ms.message,
                             m.duration_days,
-                            m.meal_plan_json
+                            {plan_column_sql("m")}
                         FROM menus m
                         JOIN shared_menus ms ON m.id = ms.menu_id
                         WHERE ms.client_id = %s AND ms.organization_id = %s AND ms.is_active = TRUE
                         ORDER BY ms.shared_at DESC
-                    """, (client_id, organization_id))
+                    """, (want_plan, client_id, organization_id))
                     
                     shared_menus = cursor.fetchall()
                     logger.info(f"Found {len(shared_menus)} shared menus for client {client_id}")
                     
                     # Process menus to ensure proper data types
                     for menu in shared_menus:
-                        # Parse meal_plan_json if it's a string
-                        if menu.get('meal_plan_json') and isinstance(menu['meal_plan_json'], str):
-                            try:
-                                menu['meal_plan_json'] = json.loads(menu['meal_plan_json'])
-                            except:
-                                menu['meal_plan_json'] = {}
+                        # Attach the card summary; the plan itself only ships with ?include=plan
+                        apply_summary(menu, want_plan)
                         
-                        # Extract meal count from meal_plan_json if available
-                        if isinstance(menu.get('meal_plan_json'), dict):
-                            days = menu['meal_plan_json'].get('days', [])
-                            menu['meal_count'] = len(days)
+                        # meal_count has always been the number of days on dashboard cards
+                        if menu.get('summary'):
+                            menu['meal_count'] = menu['summary']['day_count']
                         
                         # Ensure description is a string
                         if not menu.get('description') or menu['description'] == menu.get('nickname'):
@@ -733,6 +732,8 @@ async def org_get_client_menus(
 @router.get("/organizations/clients/{client_id}/preferences")
 @router.post("/organizations/clients/{client_id}/preferences")
 async def org_get_client_preferences(
+    request: Request,
+    response: Response,
     client_id: int = Path(..., description="The ID of the client"),
     user=Depends(get_user_from_token)
 ):
@@ -786,36 +787,18 @@ async def org_get_client_preferences(
                 raise HTTPException(status_code=404, detail="Client not found in your organization")
 
             # Fetch client's preferences
-            cursor.execute("""
-                SELECT 
-                    diet_type,
-                    dietary_restrictions,
-                    disliked_ingredients,
-                    recipe_type,
-                    macro_protein,
-                    macro_carbs,
-                    macro_fat,
-                    calorie_goal,
-                    meal_times,
-                    appliances,
-                    prep_complexity,
-                    servings_per_meal,
-                    snacks_per_day,
-                    flavor_preferences,
-                    spice_level,
-                    recipe_type_preferences,
-                    meal_time_preferences,
-                    time_constraints,
-                    prep_preferences
-                FROM user_profiles
-                WHERE id = %s
-            """, (client_id,))
+            profile = get_preference_profile(client_id)
 
-            preferences = cursor.fetchone()
-
-            if not preferences:
+            if not profile:
                 raise HTTPException(status_code=404, detail="Client preferences not found")
 
+            if etag_matches(request, profile.etag):
+                return not_modified(profile.etag, PREFERENCE_CACHE_CONTROL)
+            response.headers["ETag"] = profile.etag
+            response.headers["Cache-Control"] = PREFERENCE_CACHE_CONTROL
+
+            preferences = profile.to_dict(CLIENT_PREFERENCE_COLUMNS)
+
             # Handle JSONB fields
             if preferences['meal_times'] is None:
                 preferences['meal_times'] = {
@@ -994,14 +977,16 @@ async def org_create_client_menu(
                     user_id, 
                     nickname,
                     meal_plan_json,
+                    summary,
                     for_client_id
                 )
-                VALUES (%s, %s, %s, %s)
+                VALUES (%s, %s, %s, %s, %s)
                 RETURNING id
             """, (
                 user_id,
                 nickname or title,
                 meal_plan_json,
+                menu_summary_json(meal_plan_json),
                 client_id
             ))
             
@@ -1064,11 +1049,12 @@ async def org_create_client_menu(
 @router.post("/clients/{client_id}/menus")
 async def client_get_menus(
     client_id: int = Path(..., description="The ID of the client"),
+    include: Optional[str] = Query(None, description="Pass 'plan' to include each full meal plan"),
     user=Depends(get_user_from_token)
 ):
     """Alternative endpoint to get menus for a client - compatible with mobile app"""
     # This is just a proxy to the organization client menus endpoint
-    return await org_get_client_menus(client_id, user)
+    return await org_get_client_menus(client_id=client_id, include=include, user=user)
 
 @router.get("/clients/{client_id}/preferences")
 @router.post("/clients/{client_id}/preferences")
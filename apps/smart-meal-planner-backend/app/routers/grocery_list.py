@@ -4,10 +4,11 @@ from psycopg2.extras import RealDictCursor
 from ..db import get_db_cursor, get_db_connection
 from ..utils.grocery_aggregator import aggregate_grocery_list
 from ..config import OPENAI_API_KEY
+from ..utils.lazy_import import lazy_import
+from ..utils.logging_config import LogSampler
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import json
-import openai
 import logging
 import re
 import time
@@ -16,11 +17,14 @@ import threading
 from datetime import datetime, timedelta
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# Per-item lines while preparing the AI prompt; a few are enough to debug a list's format
+item_log = LogSampler(logger, burst=10)
+# Malformed list items; still reported as warnings, capped per window
+bad_item_log = LogSampler(logger, logging.WARNING, burst=10)
 
-# Configure OpenAI API
-openai.api_key = OPENAI_API_KEY
+# Configure OpenAI API (SDK imported on first use)
+openai = lazy_import("openai", on_load=lambda module: setattr(module, "api_key", OPENAI_API_KEY))
 
 # Shopping list cache implementation
 AI_SHOPPING_LIST_CACHE = {}
@@ -160,10 +164,9 @@ def get_grocery_list(
         grocery_list = aggregate_grocery_list(menu_data)
 
         # Log the format of the basic grocery list
-        logger.info(f"Basic grocery list has {len(grocery_list)} items")
-        if grocery_list and len(grocery_list) > 0:
-            logger.info(f"First item format: {type(grocery_list[0])}")
-            logger.info(f"Sample item: {grocery_list[0]}")
+        logger.info("Basic grocery list has %d items", len(grocery_list))
+        if grocery_list:
+            logger.debug("Sample item (%s): %s", type(grocery_list[0]).__name__, grocery_list[0])
 
         # If AI is requested, enhance the list
         if use_ai:
@@ -802,17 +805,17 @@ async def get_ai_shopping_list_status(menu_id: int, preferences: Optional[str] =
                         result['remaining_seconds'] = round(remaining)
                         result['timeout_in'] = f"{round(remaining)} seconds"
 
-                # Log the structure being returned
-                if status == 'completed':
-                    logger.info(f"Returning completed AI shopping list with structure: {type(result)}")
+                # Log the structure being returned (the client polls this endpoint)
+                if status == 'completed' and logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Returning completed AI shopping list with structure: %s", type(result).__name__)
                     if 'groceryList' in result:
-                        logger.info(f"groceryList has {len(result['groceryList'])} categories")
+                        logger.debug("groceryList has %d categories", len(result['groceryList']))
                         # Check first category format
                         if result['groceryList'] and isinstance(result['groceryList'][0], dict):
                             first_cat = result['groceryList'][0]
-                            logger.info(f"First category: {first_cat.get('category', 'unknown')}")
+                            logger.debug("First category: %s", first_cat.get('category', 'unknown'))
                             if 'items' in first_cat and first_cat['items']:
-                                logger.info(f"Sample items: {first_cat['items'][:2]}")
+                                logger.debug("Sample items: %s", first_cat['items'][:2])
 
             logger.info(f"Returning AI shopping list status: {status}")
             return result
@@ -921,31 +924,23 @@ def generate_ai_shopping_list(menu_data, basic_grocery_list, additional_preferen
         
         # Extract items from the basic grocery list
         grocery_items = []
-        logger.info(f"Processing grocery list with {len(basic_grocery_list)} items")
-        
-        # Debug log the structure of the first few items
-        if len(basic_grocery_list) > 0:
-            sample_items = basic_grocery_list[:3]
-            for i, item in enumerate(sample_items):
-                logger.info(f"Sample item {i}: Type={type(item)}, Value={item}")
+        logger.info("Processing grocery list with %d items", len(basic_grocery_list))
         
         for item in basic_grocery_list:
             if isinstance(item, dict) and "name" in item:
                 grocery_items.append(item["name"])
-                logger.info(f"Added dict item: {item['name']}")
+                item_log.log("Added dict item: %s", item["name"])
             elif isinstance(item, str):
                 grocery_items.append(item)
-                logger.info(f"Added string item: {item}")
+                item_log.log("Added string item: %s", item)
             else:
-                # More detailed logging of unexpected formats
-                logger.warning(f"Unexpected item format in grocery list: {type(item)}")
+                # Unexpected formats are worth seeing, but not once per item on a bad list
+                bad_item_log.log("Unexpected item format in grocery list: %s %r", type(item).__name__, item)
                 try:
-                    logger.warning(f"Item content: {repr(item)}")
                     # Try to extract name from any object with string representation
                     item_str = str(item).strip()
                     if item_str and len(item_str) > 1:
                         grocery_items.append(item_str)
-                        logger.info(f"Added string representation of item: {item_str}")
                 except Exception as ex:
                     logger.error(f"Failed to process item: {ex}")
                 
@@ -964,18 +959,18 @@ def generate_ai_shopping_list(menu_data, basic_grocery_list, additional_preferen
                             value = item[first_key]
                             if isinstance(value, str) and value.strip():
                                 grocery_items.append(value.strip())
-                                logger.info(f"Extracted from dict using first key: {value}")
+                                item_log.log("Extracted from dict using first key: %s", value)
                             else:
                                 # Use the key itself if it's a meaningful string
                                 if isinstance(first_key, str) and len(first_key) > 1:
                                     grocery_items.append(first_key)
-                                    logger.info(f"Using dict key as item: {first_key}")
+                                    item_log.log("Using dict key as item: %s", first_key)
                         # If it's something with a string representation, use that
                         elif item is not None:
                             item_str = str(item).strip()
                             if item_str and len(item_str) > 1 and item_str.lower() != "none":
                                 grocery_items.append(item_str)
-                                logger.info(f"Using string representation: {item_str}")
+                                item_log.log("Using string representation: %s", item_str)
                     except Exception as ex:
                         logger.error(f"Error in aggressive extraction: {ex}")
             except Exception as ex:
@@ -993,7 +988,7 @@ def generate_ai_shopping_list(menu_data, basic_grocery_list, additional_preferen
                 logger.info(f"Aggressive extraction found {len(grocery_items)} items")
         
         grocery_text = "\n".join(grocery_items)
-        logger.info(f"Prepared {len(grocery_items)} items for AI processing")
+        logger.info("Prepared %d items for AI processing", len(grocery_items))
         
         # Convert menu_data to string if it's not already
         if not isinstance(menu_data, str):
@@ -1209,9 +1204,10 @@ def generate_ai_shopping_list(menu_data, basic_grocery_list, additional_preferen
 
         # Parse the JSON response with enhanced error handling
         try:
-            logger.info(f"Attempting to parse AI response, content type: {type(ai_content)}, length: {len(ai_content)}")
+            logger.info("Attempting to parse AI response, content type: %s, length: %d",
+                        type(ai_content).__name__, len(ai_content))
             # Log a sample of the content for debugging
-            logger.info(f"First 200 chars of AI response: {ai_content[:200]}")
+            logger.debug("First 200 chars of AI response: %s", ai_content[:200])
 
             # Simplified, more robust extraction approach to handle typical GPT responses
 
@@ -2124,9 +2120,10 @@ def create_categorized_fallback(grocery_list):
     result = [cat for cat in result if len(cat["items"]) > 0]
 
     # Log the results
-    logger.info(f"Created fallback categorized list with {len(result)} non-empty categories")
-    for cat in result:
-        logger.info(f"  Category: {cat['category']} - {len(cat['items'])} items")
+    logger.info("Created fallback categorized list with %d non-empty categories", len(result))
+    if logger.isEnabledFor(logging.DEBUG):
+        for cat in result:
+            logger.debug("  Category: %s - %d items", cat['category'], len(cat['items']))
 
     return result
 
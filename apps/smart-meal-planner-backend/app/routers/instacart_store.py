@@ -9,9 +9,11 @@ import os
 from typing import List, Dict, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 
 from app.utils.auth_utils import get_user_from_token as get_current_user
 from app.integration import instacart
+from app.integration.instacart_retailers import get_retailers
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -79,10 +81,9 @@ async def get_instacart_retailers(
 
         # Get client and make the request with detailed logging
         try:
-            client = instacart.get_instacart_client()
-            logger.info("Client created successfully, getting retailers...")
-            retailers = client.get_retailers(postal_code=zip_code, country_code="US")
-            logger.info(f"Retrieved {len(retailers)} retailers from Instacart API")
+            # Served from the retailer directory cache; off the event loop so lookups can coalesce
+            retailers = await run_in_threadpool(get_retailers, zip_code, "US")
+            logger.info(f"Retrieved {len(retailers)} retailers for ZIP code {zip_code}")
 
             # Transform to response model
             formatted_retailers = []
@@ -237,9 +238,8 @@ async def get_nearby_instacart_retailers(
 
         # Use the new method for getting nearby retailers
         try:
-            client = instacart.get_instacart_client()
-            nearby_retailers = client.get_nearby_retailers(postal_code=zip_code, country_code="US")
-            logger.info(f"Retrieved {len(nearby_retailers) if nearby_retailers else 0} nearby retailers from Instacart API")
+            nearby_retailers = await run_in_threadpool(get_retailers, zip_code, "US")
+            logger.info(f"Retrieved {len(nearby_retailers) if nearby_retailers else 0} nearby retailers for ZIP code {zip_code}")
 
             if not nearby_retailers:
                 logger.warning(f"No nearby retailers found for ZIP code {zip_code}")
@@ -2,10 +2,12 @@
 
 from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional, Dict, Any
 import logging
 from app.integration.kroger import KrogerIntegration  # Changed to absolute
 from app.integration.kroger_db import get_user_kroger_credentials  # Changed to absolute
+from app.integration.kroger_upc import upc_resolver
 from app.utils.auth_utils import get_user_from_token  # Changed to absolute
 import os
 
@@ -13,9 +15,11 @@ logger = logging.getLogger(__name__)
 
 class KrogerSearchRequest(BaseModel):
     items: List[str]
+    refresh: bool = False  # search again even for items resolved before
 
 class KrogerCartRequest(BaseModel):
     items: List[dict]
+    location_id: Optional[str] = None
 
 router = APIRouter(prefix="/kroger", tags=["Kroger"])
 
@@ -150,7 +154,13 @@ async def search_and_suggest_kroger_items(
     req: KrogerSearchRequest,
     user = Depends(get_user_from_token)
 ):
-    """Search for items and return suggestions with UPC codes for cart operations"""
+    """
+    Search for items and return suggestions with UPC codes for cart operations.
+
+    An item resolved before at this store (the user's last pick, or a recent
+    top search result) comes back with that one product and no search; the
+    rest are searched concurrently. Each entry's source says which it was.
+    """
     try:
         user_id = user.get('user_id')
         logger.info(f"Searching and suggesting Kroger items for user {user_id}")
@@ -166,35 +176,15 @@ async def search_and_suggest_kroger_items(
                 "needs_setup": True
             }
         
-        # Search for each item and return suggestions
+        resolved = await upc_resolver.resolve(user_id, location_id, req.items, refresh=req.refresh)
+
         suggestions = []
         for item_name in req.items:
-            try:
-                # Use the existing search function
-                search_result = kroger_search_item(item_name, location_id)
-                
-                if search_result.get("success") and search_result.get("results"):
-                    # Take the top 3 results for user selection
-                    item_suggestions = search_result["results"][:3]
-                    suggestions.append({
-                        "original_item": item_name,
-                        "suggestions": item_suggestions
-                    })
-                else:
-                    # No results found
-                    suggestions.append({
-                        "original_item": item_name,
-                        "suggestions": [],
-                        "message": f"No results found for '{item_name}'"
-                    })
-                    
-            except Exception as search_error:
-                logger.error(f"Error searching for item '{item_name}': {search_error}")
-                suggestions.append({
-                    "original_item": item_name,
-                    "suggestions": [],
-                    "error": str(search_error)
-                })
+            resolution = resolved.get(item_name) or {
+                "source": "search", "suggestions": [], "message": f"No results found for '{item_name}'"
+            }
+            entry = {"original_item": item_name, **resolution}
+            suggestions.append(entry)
         
         return {
             "success": True,
@@ -247,7 +237,7 @@ async def add_to_kroger_cart(
         
         # Get user's Kroger credentials from database
         credentials = get_user_kroger_credentials(user_id)
-        logger.info(f"Credentials from DB: {credentials}")
+        logger.info(f"Kroger credentials found for user {user_id}: {bool(credentials)}")
         
         # Try to get location_id from request first, then credentials, then default
         location_id = None
@@ -315,8 +305,6 @@ async def add_to_kroger_cart(
             # Ensure UPC is properly formatted
             upc = item.get("upc", "")
             if not upc:
-                logger.warning(f"Item missing UPC: {item}")
-                # Store items without UPC for search-first workflow
                 items_without_upc.append({
                     "name": item.get("name", ""),
                     "quantity": item.get("quantity", 1)
@@ -328,13 +316,26 @@ async def add_to_kroger_cart(
                 "quantity": item.get("quantity", 1)
             })
         
-        # If no items have UPC codes, return a needs_search response instead of error
+        # Resolve items that came by name here rather than sending the client back to search
+        unresolved_items = []
+        if items_without_upc:
+            resolved = await upc_resolver.resolve(
+                user_id, location_id, [item["name"] for item in items_without_upc]
+            )
+            for item in items_without_upc:
+                suggestions = (resolved.get(item["name"]) or {}).get("suggestions") or []
+                if suggestions and suggestions[0].get("upc"):
+                    kroger_items.append({"upc": suggestions[0]["upc"], "quantity": item["quantity"]})
+                else:
+                    unresolved_items.append(item)
+        
+        # If nothing could be resolved, return a needs_search response instead of error
         if not kroger_items:
-            if items_without_upc:
+            if unresolved_items:
                 return {
                     "success": False,
                     "needs_search": True,
-                    "items_to_search": items_without_upc,
+                    "items_to_search": unresolved_items,
                     "message": "Items need to be searched for and selected before adding to cart"
                 }
             else:
@@ -430,6 +431,14 @@ async def add_to_kroger_cart(
                     "message": f"Failed to add items to cart: {result.get('message', 'Unknown error')}"
                 })
         
+        if result.get('success'):
+            # Products picked on the client become this user's answer for those names
+            chosen = [item for item in req.items if item.get("upc") and item.get("name")]
+            if chosen:
+                await run_in_threadpool(upc_resolver.record_choices, user_id, location_id, chosen)
+            if unresolved_items:
+                result["unresolved_items"] = unresolved_items
+        
         return result
         
     except ImportError as imp_err:
@@ -18,7 +18,6 @@ import time
 from datetime import datetime
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Cache for meal shopping lists
@@ -6,7 +6,6 @@ import uuid
 from typing import List, Optional, Dict, Any, Set
 from datetime import datetime
 from fastapi import APIRouter, HTTPException, Query, Body, Depends, status, BackgroundTasks
-import openai
 from psycopg2.extras import RealDictCursor
 from ..db import get_db_connection, get_db_cursor
 from ..config import OPENAI_API_KEY
@@ -16,13 +15,17 @@ from pydantic import BaseModel
 import threading
 import logging
 from ..utils.grocery_aggregator import aggregate_grocery_list
+from ..utils.lazy_import import lazy_import
+from ..utils.menu_summary import menu_summary_json, include_plan, apply_summary, plan_column_sql
+
+# OpenAI SDK is imported on first use to keep worker boot fast
+openai = lazy_import("openai")
 
 # Setup enhanced logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 from ..integration.kroger import add_to_kroger_cart
 from ..integration.walmart import add_to_cart as add_to_walmart_cart
-from ..db import track_recipe_interaction, is_recipe_saved
+from ..db import track_recipe_interaction, get_saved_status_map, saved_id_for, annotate_saved_meals
 from ..utils.auth_utils import get_user_from_token, admin_required
 from datetime import datetime
 
@@ -51,7 +54,6 @@ class MenuSharingResponse(BaseModel):
     shared_with: List[MenuSharingDetail]
 
 # Enhanced logging setup
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def determine_model(model_to_use: str) -> str:
@@ -810,27 +812,20 @@ def get_prep_complexity_level(complexity_value):
 async def _run_agent_pipeline(req: GenerateMealPlanRequest, job_id: str = None) -> dict:
     """Fetch prefs and run the 3-stage agent pipeline. Returns result dict."""
     from ..ai.pipeline_orchestrator import run_pipeline
+    from ..utils.preference_profiles import PREFERENCE_COLUMNS, get_preference_profile
 
     preference_user_id = req.for_client_id if req.for_client_id else req.user_id
 
-    with get_db_cursor(dict_cursor=True) as (cursor, conn):
-        cursor.execute("""
-            SELECT recipe_type, macro_protein, macro_carbs, macro_fat, calorie_goal,
-                   appliances, prep_complexity, servings_per_meal, meal_times,
-                   dietary_restrictions, disliked_ingredients, snacks_per_day,
-                   flavor_preferences, spice_level, recipe_type_preferences,
-                   meal_time_preferences, time_constraints, prep_preferences,
-                   preferred_proteins, other_proteins,
-                   carb_cycling_enabled, carb_cycling_config, diet_type
-            FROM user_profiles WHERE id = %s
-        """, (preference_user_id,))
-        prefs = cursor.fetchone()
-        if not prefs:
-            raise HTTPException(404, f"User {preference_user_id} not found")
+    profile = get_preference_profile(preference_user_id)
+    if not profile:
+        raise HTTPException(404, f"User {preference_user_id} not found")
+    # Everything but zip_code, which the pipeline never read
+    prefs = profile.to_dict(tuple(name for name in PREFERENCE_COLUMNS if name != "zip_code"))
 
+    with get_db_cursor(dict_cursor=True) as (cursor, conn):
         result = await run_pipeline(
             req=req,
-            prefs=dict(prefs),
+            prefs=prefs,
             cursor=cursor,
             conn=conn,
             user_id=preference_user_id,
@@ -850,14 +845,15 @@ async def _run_agent_pipeline(req: GenerateMealPlanRequest, job_id: str = None)
         )
         cursor.execute("""
             INSERT INTO menus (
-                user_id, meal_plan_json, duration_days, meal_times,
+                user_id, meal_plan_json, summary, duration_days, meal_times,
                 snacks_per_day, for_client_id, ai_model_used, nickname
             )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
             RETURNING id
         """, (
             req.user_id,
             meal_plan_json,
+            menu_summary_json(meal_plan_for_db),
             req.duration_days,
             json.dumps(req.meal_times),
             req.snacks_per_day,
@@ -1190,40 +1186,49 @@ def get_latest_menu(user_id: int, current_user: dict = Depends(get_user_from_tok
         raise HTTPException(status_code=500, detail="Error fetching latest menu")
 
 @router.get("/history/{user_id}")
-def get_menu_history(user_id: int, current_user: dict = Depends(get_user_from_token)):
-    """Get menu history for a user."""
+def get_menu_history(
+    user_id: int,
+    include: Optional[str] = Query(None, description="Pass 'plan' to include each full meal plan"),
+    current_user: dict = Depends(get_user_from_token)
+):
+    """Get menu history for a user (card summaries; full plans with ?include=plan)."""
     if current_user["user_id"] != user_id:
         raise HTTPException(status_code=403, detail="Access denied")
+    want_plan = include_plan(include)
     # Use autocommit for menu history retrieval
     with get_db_cursor(dict_cursor=True, autocommit=True) as (cursor, conn):
         # Autocommit is enabled at connection creation time
         try:
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT
-                    id as menu_id,
-                    meal_plan_json,
-                    created_at::TEXT AS created_at,
-                    COALESCE(nickname, '') AS nickname
-                FROM menus
-                WHERE user_id = %s
-                ORDER BY created_at DESC
+                    m.id as menu_id,
+                    {plan_column_sql("m")},
+                    m.created_at::TEXT AS created_at,
+                    COALESCE(m.nickname, '') AS nickname
+                FROM menus m
+                WHERE m.user_id = %s
+                ORDER BY m.created_at DESC
                 LIMIT 10;
-            """, (user_id,))
+            """, (want_plan, user_id))
 
             menus = cursor.fetchall()
 
             if not menus:
                 raise HTTPException(status_code=404, detail="No menu history found.")
 
-            return [
-                {
+            history = []
+            for m in menus:
+                apply_summary(m, want_plan)
+                entry = {
                     "menu_id": m["menu_id"],
-                    "meal_plan": m["meal_plan_json"],
+                    "summary": m["summary"],
                     "created_at": m["created_at"],
                     "nickname": m["nickname"]
                 }
-                for m in menus
-            ]
+                if want_plan:
+                    entry["meal_plan"] = m["meal_plan_json"]
+                history.append(entry)
+            return history
 
         except Exception as e:
             logger.error(f"Error fetching menu history: {str(e)}")
@@ -1583,33 +1588,13 @@ def get_menu_details(
             if user_id:
                 track_recipe_interaction(user_id, menu_id, "viewed")
 
-                # Check if menu is saved by this user
-                menu['is_saved'] = is_recipe_saved(user_id, menu_id)
-
-                # If the menu has recipe-level data, check each recipe
             # Parse the meal plan JSON
             menu['meal_plan'] = json.loads(menu['meal_plan_json']) if isinstance(menu['meal_plan_json'], str) else menu['meal_plan_json']
 
-            # Check saved status for each recipe in the meal plan
-            if 'days' in menu['meal_plan']:
-                for day in menu['meal_plan']['days']:
-                    day_number = day.get('dayNumber')
-
-                    if 'meals' in day:
-                        for meal in day['meals']:
-                            meal_time = meal.get('meal_time')
-                            recipe_id = meal.get('id')  # If your recipes have IDs
-
-                            if recipe_id:
-                                meal['is_saved'] = is_recipe_saved(
-                                    user_id,
-                                    menu_id,
-                                    recipe_id=recipe_id,
-                                    meal_time=meal_time
-                                )
-            else:
-                # Ensure meal_plan_json is parsed if user_id was not provided
-                menu['meal_plan'] = json.loads(menu['meal_plan_json']) if isinstance(menu['meal_plan_json'], str) else menu['meal_plan_json']
+            # Saved status for the menu and every recipe in it, from one query on this cursor
+            saved = get_saved_status_map(user_id, menu_id, cur=cur)
+            menu['is_saved'] = saved_id_for(saved, menu_id) is not None
+            annotate_saved_meals(menu['meal_plan'], menu_id, saved)
 
             return menu
 
@@ -1619,10 +1604,15 @@ def get_menu_details(
 
 
 @router.get("/shared/{user_id}")
-async def get_shared_menus(user_id: int, current_user: dict = Depends(get_user_from_token)):
-    """Get menus shared with the current user."""
+async def get_shared_menus(
+    user_id: int,
+    include: Optional[str] = Query(None, description="Pass 'plan' to include each full meal plan"),
+    current_user: dict = Depends(get_user_from_token)
+):
+    """Get menus shared with the current user (card summaries; full plans with ?include=plan)."""
     if current_user["user_id"] != user_id:
         raise HTTPException(status_code=403, detail="Access denied")
+    want_plan = include_plan(include)
     # Use the context manager for safer database operations
     with get_db_cursor(dict_cursor=True) as (cursor, conn):
         try:
@@ -1654,10 +1644,10 @@ async def get_shared_menus(user_id: int, current_user: dict = Depends(get_user_f
                 return []
 
             # If the table exists, proceed with fetching shared menus
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT
                     m.id as menu_id,
-                    m.meal_plan_json,
+                    {plan_column_sql("m")},
                     m.user_id,
                     m.created_at::TEXT as created_at,
                     m.nickname,
@@ -1668,13 +1658,14 @@ async def get_shared_menus(user_id: int, current_user: dict = Depends(get_user_f
                 JOIN user_profiles up ON m.user_id = up.id
                 WHERE sm.shared_with = %s
                 ORDER BY m.created_at DESC
-            """, (user_id,))
+            """, (want_plan, user_id))
 
             shared_menus = cursor.fetchall()
             logger.info(f"Found {len(shared_menus)} shared menus for user {user_id}")
 
             # Convert datetime objects to strings for JSON serialization
             for menu in shared_menus:
+                apply_summary(menu, want_plan)
                 if 'created_at' in menu and not isinstance(menu['created_at'], str):
                     menu['created_at'] = menu['created_at'].isoformat()
 
@@ -2629,7 +2620,10 @@ async def delete_menu(
             """, (menu_id,))
             shared_deleted = cursor.rowcount
             
-            # 2. Delete saved_recipes records
+            # 2. Delete saved_recipes records (after flagging the preference
+            #    profiles their quick ratings were counted in for a rebuild)
+            from ..ai.rating_analytics import rating_analytics
+            rating_analytics.mark_profiles_for_rebuild(cursor, "sv.menu_id = %s", (menu_id,))
             cursor.execute("""
                 DELETE FROM saved_recipes
                 WHERE menu_id = %s
@@ -1,12 +1,19 @@
 # app/routers/organization_branding.py
 
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
 from app.db import get_db_cursor
 from app.models.branding import (
     OrganizationBranding, OrganizationBrandingUpdate, OrganizationBrandingResponse,
     BrandingPreviewRequest, BrandingPreviewResponse
 )
 from app.utils.auth_utils import get_user_from_token
+from app.utils.branding_cache import (
+    BRANDING_CACHE_CONTROL, DEFAULT_COMPILED_BRANDING, branding_cache,
+    get_compiled_branding, get_compiled_brandings
+)
+from app.utils.http_cache import etag_matches, not_modified, strong_etag
+from app.utils.s3.s3_utils import image_variant_urls, force_initialize_s3_helper
 import json
 import logging
 from typing import Optional
@@ -16,6 +23,9 @@ import uuid
 router = APIRouter(prefix="/api/organization-branding", tags=["organization-branding"])
 logger = logging.getLogger(__name__)
 
+# Most organizations the bulk public-branding endpoint returns at once
+BRANDING_BULK_LIMIT = 100
+
 def get_user_organization_id(user_id: int) -> int:
     """Get the organization ID for a user, ensuring they are an organization owner"""
     try:
@@ -156,6 +166,9 @@ async def get_organization_branding(
                         if key not in branding_settings[section]:
                             branding_settings[section][key] = default_value
 
+            # Only the variants recorded when the logo was uploaded (none for SVGs or external URLs)
+            branding_settings['visual']['logoVariants'] = image_variant_urls(branding_settings['visual'].get('logoUrl'))
+
             logger.info(f"Returning branding with defaults merged: {type(branding_settings)}")
 
             return {
@@ -250,7 +263,7 @@ async def update_organization_branding(
                 logger.info("Updating visual settings")
                 current_branding['visual'] = {
                     **current_branding.get('visual', {}),
-                    **branding_data.visual.dict(exclude_unset=True)
+                    **branding_data.visual.dict(exclude_unset=True, exclude={'logoVariants'})
                 }
             
             if branding_data.layout:
@@ -290,6 +303,7 @@ async def update_organization_branding(
             
             result = cur.fetchone()
             conn.commit()
+            branding_cache.invalidate(organization_id)
             
             # Handle returned result, could be string or dict
             updated_branding = result[0]
@@ -298,6 +312,9 @@ async def update_organization_branding(
                     updated_branding = json.loads(updated_branding)
                 except:
                     updated_branding = current_branding
+
+            if updated_branding.get('visual'):
+                updated_branding['visual']['logoVariants'] = image_variant_urls(updated_branding['visual'].get('logoUrl'))
             
             return {
                 "organization_id": organization_id,
@@ -315,85 +332,128 @@ async def update_organization_branding(
         )
 
 @router.get("/{organization_id}/branding/public")
-async def get_public_branding(organization_id: int):
+async def get_public_branding(organization_id: int, request: Request):
     """Get public branding settings (no authentication required for client-facing pages)"""
     try:
-        with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
+        # A cache miss reads organization_settings through psycopg2
+        compiled = await run_in_threadpool(get_compiled_branding, organization_id)
+    except Exception as e:
+        logger.error(f"Error getting public branding: {str(e)}")
+        # Return default branding on error
+        return _fallback_branding_response(DEFAULT_COMPILED_BRANDING.body)
+
+    return _branding_response(request, compiled.body, compiled.etag)
+
+@router.get("/branding/public")
+async def get_public_branding_bulk(
+    request: Request,
+    ids: str = Query(..., description="Comma-separated organization IDs")
+):
+    """Public branding for several organizations at once, keyed by organization ID"""
+    try:
+        organization_ids = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids must be comma-separated integers")
+    if not organization_ids or len(organization_ids) > BRANDING_BULK_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Provide between 1 and {BRANDING_BULK_LIMIT} organization IDs"
+        )
+
+    failed = False
+    try:
+        compiled = await run_in_threadpool(get_compiled_brandings, organization_ids)
+    except Exception as e:
+        logger.error(f"Error getting public branding: {str(e)}")
+        compiled = {organization_id: DEFAULT_COMPILED_BRANDING for organization_id in organization_ids}
+        failed = True
+
+    # Splice the compiled bodies together instead of re-serializing them
+    body = b"{" + b",".join(
+        b'"%d":%s' % (organization_id, compiled[organization_id].body) for organization_id in organization_ids
+    ) + b"}"
+    if failed:
+        return _fallback_branding_response(body)
+    return _branding_response(request, body, strong_etag(body))
+
+def _branding_response(request: Request, body: bytes, etag: str):
+    if etag_matches(request, etag):
+        return not_modified(etag, BRANDING_CACHE_CONTROL)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": BRANDING_CACHE_CONTROL}
+    )
+
+def _fallback_branding_response(body: bytes):
+    # Default branding stood in for a failed read: no ETag and no caching, so
+    # neither browsers nor a CDN keep it once the organization's branding loads
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"Cache-Control": "no-store"}
+    )
+
+@router.post("/{organization_id}/branding/logo")
+async def upload_organization_logo(
+    organization_id: int,
+    file: UploadFile = File(...),
+    current_user = Depends(get_user_from_token)
+):
+    """Upload a logo to S3 (with resized WebP variants) and set it as the organization's logoUrl"""
+    # Verify user owns this organization
+    user_org_id = get_user_organization_id(current_user['user_id'])
+    if user_org_id != organization_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied to this organization"
+        )
+
+    if file.content_type and not file.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Logo must be an image"
+        )
+
+    s3 = force_initialize_s3_helper()
+    uploaded = await s3.upload_image_with_variants(file, folder="branding-logos")
+
+    try:
+        with get_db_cursor(dict_cursor=False) as (cur, conn):
             cur.execute("""
-                SELECT branding_settings
-                FROM organization_settings
+                UPDATE organization_settings
+                SET branding_settings = jsonb_set(
+                    COALESCE(branding_settings, '{}'::jsonb),
+                    '{visual}',
+                    COALESCE(branding_settings->'visual', '{}'::jsonb) || jsonb_build_object('logoUrl', %s::text)
+                )
                 WHERE organization_id = %s
-            """, (organization_id,))
-            
+                RETURNING branding_settings->'visual'->>'logoUrl'
+            """, (uploaded["url"], organization_id))
+
             result = cur.fetchone()
             if not result:
-                # Return default branding if organization not found
-                return {
-                    "visual": {
-                        "primaryColor": "#4caf50",
-                        "secondaryColor": "#ff9800",
-                        "logoUrl": None,
-                        "fontFamily": "Roboto"
-                    },
-                    "messaging": {
-                        "platformName": "Smart Meal Planner"
-                    }
-                }
-            
-            branding_settings = result[0] or {}
-            
-            # If branding_settings is a string, try to parse it
-            if isinstance(branding_settings, str):
-                try:
-                    branding_settings = json.loads(branding_settings)
-                except json.JSONDecodeError:
-                    logger.error(f"Invalid JSON in public branding_settings: {branding_settings}")
-                    branding_settings = {}
-                except Exception as json_error:
-                    logger.error(f"Error parsing public branding settings JSON: {str(json_error)}")
-                    branding_settings = {}
-            
-            # Return only public-safe branding information
-            public_branding = {
-                "visual": {
-                    "primaryColor": branding_settings.get('visual', {}).get('primaryColor', '#4caf50'),
-                    "secondaryColor": branding_settings.get('visual', {}).get('secondaryColor', '#ff9800'),
-                    "accentColor": branding_settings.get('visual', {}).get('accentColor', '#2196f3'),
-                    "logoUrl": branding_settings.get('visual', {}).get('logoUrl'),
-                    "fontFamily": branding_settings.get('visual', {}).get('fontFamily', 'Roboto'),
-                    "customCSS": branding_settings.get('visual', {}).get('customCSS', '')
-                },
-                "layout": branding_settings.get('layout', {}),
-                "messaging": {
-                    "platformName": branding_settings.get('messaging', {}).get('platformName'),
-                    "tagline": branding_settings.get('messaging', {}).get('tagline'),
-                    "footerText": branding_settings.get('messaging', {}).get('footerText'),
-                    "supportEmail": branding_settings.get('messaging', {}).get('supportEmail'),
-                    "supportPhone": branding_settings.get('messaging', {}).get('supportPhone')
-                },
-                "features": {
-                    "showPoweredBy": branding_settings.get('features', {}).get('showPoweredBy', True),
-                    "hideDefaultLogo": branding_settings.get('features', {}).get('hideDefaultLogo', False)
-                }
-            }
-            
-            return public_branding
-            
-    except Exception as e:
-        logger.error(f"Error getting public branding: {str(e)}")
-        # Return default branding on error
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Organization settings not found"
+                )
+            conn.commit()
+        branding_cache.invalidate(organization_id)
+
         return {
-            "visual": {
-                "primaryColor": "#4caf50",
-                "secondaryColor": "#ff9800",
-                "logoUrl": None,
-                "fontFamily": "Roboto"
-            },
-            "messaging": {
-                "platformName": "Smart Meal Planner"
-            }
+            "logoUrl": uploaded["url"],
+            "logoVariants": uploaded["variants"]
         }
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error saving organization logo: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to save organization logo: {str(e)}"
+        )
+
 @router.post("/{organization_id}/branding/preview", response_model=BrandingPreviewResponse)
 async def create_branding_preview(
     organization_id: int,
@@ -485,6 +545,7 @@ async def reset_organization_branding(
             """, (json.dumps(default_branding), organization_id))
             
             conn.commit()
+            branding_cache.invalidate(organization_id)
             
             return {"message": "Branding settings reset to defaults successfully"}
             
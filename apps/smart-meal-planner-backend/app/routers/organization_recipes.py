@@ -1,7 +1,7 @@
 # app/routers/organization_recipes.py
 
 from fastapi import APIRouter, HTTPException, Depends, status, Query
-from app.db import get_db_cursor
+from app.db import get_db_connection, get_db_cursor, session_cursor
 from app.models.user import (
     OrganizationRecipe, OrganizationRecipeCreate, OrganizationRecipeUpdate,
     OrganizationRecipeCategory, OrganizationRecipeCategoryCreate, OrganizationRecipeCategoryUpdate,
@@ -10,6 +10,7 @@ from app.models.user import (
     RecipeApprovalRequest, RecipeApprovalResponse
 )
 from app.utils.auth_utils import get_user_from_token
+from app.utils.recipe_search import search_filter
 import json
 import logging
 from typing import List, Optional
@@ -21,7 +22,7 @@ logger = logging.getLogger(__name__)
 def get_user_organization_id(user_id: int) -> int:
     """Get the organization ID for a user, ensuring they are an organization owner"""
     try:
-        with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
+        with session_cursor(dict_cursor=False) as (cur, conn):
             # Check if user owns an organization
             cur.execute("""
                 SELECT id FROM organizations
@@ -874,13 +875,14 @@ async def get_available_recipes(
     try:
         with conn.cursor() as cur:
             # Get recipes that are not already in this organization's library
-            where_clauses = ["sr.id NOT IN (SELECT recipe_id FROM organization_recipes WHERE organization_id = %s)"]
+            where_clauses = ["NOT EXISTS (SELECT 1 FROM organization_recipes o WHERE o.organization_id = %s AND o.recipe_id = sr.id)"]
             params = [organization_id]
             
             # Add search filter
             if search:
-                where_clauses.append("sr.title ILIKE %s")
-                params.append(f"%{search}%")
+                search_sql, search_params = search_filter("sr.id", "scraped", search)
+                where_clauses.append(search_sql)
+                params.extend(search_params)
             
             # Add cuisine filter
             if cuisine:
@@ -962,13 +964,14 @@ async def get_all_available_recipes(
             # Get scraped recipes (if requested)
             if source in [None, 'all', 'scraped']:
                 # Get scraped recipes that are not already in this organization's library
-                where_clauses = ["sr.id NOT IN (SELECT recipe_id FROM organization_recipes WHERE organization_id = %s AND recipe_id IS NOT NULL)"]
+                where_clauses = ["NOT EXISTS (SELECT 1 FROM organization_recipes o WHERE o.organization_id = %s AND o.recipe_id = sr.id)"]
                 params = [organization_id]
                 
                 # Add search filter
                 if search:
-                    where_clauses.append("sr.title ILIKE %s")
-                    params.append(f"%{search}%")
+                    search_sql, search_params = search_filter("sr.id", "scraped", search)
+                    where_clauses.append(search_sql)
+                    params.extend(search_params)
                 
                 # Add cuisine filter
                 if cuisine:
@@ -1017,7 +1020,7 @@ async def get_all_available_recipes(
                 # Get user recipes that are not already in this organization's library
                 # Include organization's own recipes and public recipes from other users
                 where_clauses = [
-                    "ur.id NOT IN (SELECT user_recipe_id FROM organization_recipes WHERE organization_id = %s AND user_recipe_id IS NOT NULL)",
+                    "NOT EXISTS (SELECT 1 FROM organization_recipes o WHERE o.organization_id = %s AND o.user_recipe_id = ur.id)",
                     "ur.is_active = TRUE",
                     "(ur.created_by_organization_id = %s OR ur.is_public = TRUE)"
                 ]
@@ -1025,8 +1028,9 @@ async def get_all_available_recipes(
                 
                 # Add search filter
                 if search:
-                    where_clauses.append("ur.title ILIKE %s")
-                    params.append(f"%{search}%")
+                    search_sql, search_params = search_filter("ur.id", "user", search)
+                    where_clauses.append(search_sql)
+                    params.extend(search_params)
                 
                 # Add cuisine filter
                 if cuisine:
@@ -1,244 +1,56 @@
 import json
 import traceback
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from psycopg2.extras import RealDictCursor
 from ..db import get_db_connection, get_db_cursor
 from ..models.user import PreferencesUpdate
 from ..utils.auth_utils import get_user_from_token
+from ..utils.http_cache import etag_matches, not_modified
+from ..utils.preference_profiles import (
+    PREFERENCE_CACHE_CONTROL, get_preference_profile, invalidate_preference_profile
+)
 import logging
 
 # Set up logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
 router = APIRouter(prefix="/preferences", tags=["Preferences"])
 
 @router.get("/{id}")
-def get_user_preferences(id: int, current_user: dict = Depends(get_user_from_token)):
+def get_user_preferences(id: int, request: Request, response: Response, current_user: dict = Depends(get_user_from_token)):
     requesting_id = current_user.get("user_id")
     is_org = current_user.get("account_type") in ("organization", "admin") or current_user.get("is_admin")
     if requesting_id != id and not is_org:
         raise HTTPException(status_code=403, detail="Access denied")
     try:
-        with get_db_cursor(dict_cursor=True) as (cursor, conn):
-            cursor.execute("""
-                SELECT
-                    diet_type,
-                    dietary_restrictions,
-                    disliked_ingredients,
-                    recipe_type,
-                    macro_protein,
-                    macro_carbs,
-                    macro_fat,
-                    calorie_goal,
-                    meal_times,
-                    appliances,
-                    prep_complexity,
-                    servings_per_meal,
-                    snacks_per_day,
-                    flavor_preferences,
-                    spice_level,
-                    recipe_type_preferences,
-                    meal_time_preferences,
-                    time_constraints,
-                    prep_preferences,
-                    preferred_proteins,
-                    other_proteins,
-                    carb_cycling_enabled,
-                    carb_cycling_config,
-                    zip_code
-                FROM user_profiles
-                WHERE id = %s
-            """, (id,))
-
-            preferences = cursor.fetchone()
-
-            if not preferences:
-                return {
-                    "diet_type": "",
-                    "dietary_restrictions": "",
-                    "disliked_ingredients": "",
-                    "recipe_type": "",
-                    "macro_protein": None,
-                    "macro_carbs": None,
-                    "macro_fat": None,
-                    "calorie_goal": None,
-                    "meal_times": {
-                        "breakfast": False,
-                        "lunch": False,
-                        "dinner": False,
-                        "snacks": False
-                    },
-                    "appliances": {
-                        "airFryer": False,
-                        "instapot": False,
-                        "crockpot": False
-                    },
-                    "prep_complexity": 50,
-                    "servings_per_meal": 1,
-                    "snacks_per_day": 0,
-                    "flavor_preferences": {
-                        "creamy": False,
-                        "cheesy": False,
-                        "herbs": False,
-                        "umami": False,
-                        "sweet": False,
-                        "spiced": False,
-                        "smoky": False,
-                        "garlicky": False,
-                        "tangy": False,
-                        "peppery": False,
-                        "hearty": False,
-                        "spicy": False
-                    },
-                    "spice_level": "medium",
-                    "recipe_type_preferences": {
-                        "stir-fry": False,
-                        "grain-bowl": False,
-                        "salad": False,
-                        "pasta": False,
-                        "main-sides": False,
-                        "pizza": False,
-                        "burger": False,
-                        "sandwich": False,
-                        "tacos": False,
-                        "wrap": False,
-                        "soup-stew": False,
-                        "bake": False,
-                        "family-meals": False
-                    },
-                    "meal_time_preferences": {
-                        "breakfast": False,
-                        "morning-snack": False,
-                        "lunch": False,
-                        "afternoon-snack": False,
-                        "dinner": False,
-                        "evening-snack": False
-                    },
-                    "time_constraints": {
-                        "weekday-breakfast": 10,
-                        "weekday-lunch": 15,
-                        "weekday-dinner": 30,
-                        "weekend-breakfast": 20,
-                        "weekend-lunch": 30,
-                        "weekend-dinner": 45
-                    },
-                    "prep_preferences": {
-                        "batch-cooking": False,
-                        "meal-prep": False,
-                        "quick-assembly": False,
-                        "one-pot": False,
-                        "minimal-dishes": False
-                    },
-                    "preferred_proteins": {
-                        "meat": {
-                            "chicken": False,
-                            "beef": False,
-                            "pork": False,
-                            "turkey": False,
-                            "lamb": False,
-                            "bison": False,
-                            "other": False
-                        },
-                        "seafood": {
-                            "salmon": False,
-                            "tuna": False,
-                            "cod": False,
-                            "shrimp": False,
-                            "crab": False,
-                            "mussels": False,
-                            "other": False
-                        },
-                        "vegetarian_vegan": {
-                            "tofu": False,
-                            "tempeh": False,
-                            "seitan": False,
-                            "lentils": False,
-                            "chickpeas": False,
-                            "black_beans": False,
-                            "other": False
-                        },
-                        "other": {
-                            "eggs": False,
-                            "dairy_milk": False,
-                            "dairy_yogurt": False,
-                            "protein_powder_whey": False,
-                            "protein_powder_pea": False,
-                            "quinoa": False,
-                            "other": False
-                        }
-                    },
-                    "other_proteins": {
-                        "meat": "",
-                        "seafood": "",
-                        "vegetarian_vegan": "",
-                        "other": ""
-                    },
-                    "carb_cycling_enabled": False,
-                    "carb_cycling_config": {
-                        "pattern": "3-1-3",
-                        "high_carb_grams": 200,
-                        "moderate_carb_grams": 100,
-                        "low_carb_grams": 50,
-                        "no_carb_grams": 20,
-                        "weekly_schedule": {
-                            "monday": "high",
-                            "tuesday": "low", 
-                            "wednesday": "high",
-                            "thursday": "moderate",
-                            "friday": "high",
-                            "saturday": "low",
-                            "sunday": "low"
-                        },
-                        "sync_with_workouts": False,
-                        "workout_days": [],
-                        "custom_pattern": False,
-                        "pattern_options": [
-                            {"name": "3-1-3", "description": "3 High, 1 Moderate, 3 Low carb days"},
-                            {"name": "2-2-3", "description": "2 High, 2 Moderate, 3 Low carb days"},
-                            {"name": "4-0-3", "description": "4 High, 0 Moderate, 3 Low carb days"},
-                            {"name": "5-0-2", "description": "5 High, 0 Moderate, 2 Low carb days"},
-                            {"name": "custom", "description": "Create your own custom pattern"}
-                        ],
-                        "carb_ranges": {
-                            "high": {"min": 150, "max": 300, "description": "High carb days (workout/active days)"},
-                            "moderate": {"min": 75, "max": 150, "description": "Moderate carb days (light activity)"},
-                            "low": {"min": 25, "max": 75, "description": "Low carb days (rest days)"},
-                            "no_carb": {"min": 0, "max": 25, "description": "Very low carb days (advanced)"}
-                        },
-                        "goals": {
-                            "primary": "fat_loss",
-                            "secondary": "maintain_muscle"
-                        },
-                        "notes": ""
-                    },
-                    "zip_code": ""
-                }
-
-            # Handle JSONB fields
-            if preferences['meal_times'] is None:
-                preferences['meal_times'] = {
+        profile = get_preference_profile(id)
+
+        if not profile:
+            return {
+                "diet_type": "",
+                "dietary_restrictions": "",
+                "disliked_ingredients": "",
+                "recipe_type": "",
+                "macro_protein": None,
+                "macro_carbs": None,
+                "macro_fat": None,
+                "calorie_goal": None,
+                "meal_times": {
                     "breakfast": False,
                     "lunch": False,
                     "dinner": False,
                     "snacks": False
-                }
-
-            if preferences['appliances'] is None:
-                preferences['appliances'] = {
+                },
+                "appliances": {
                     "airFryer": False,
                     "instapot": False,
                     "crockpot": False
-                }
-
-            # Ensure snacks_per_day has a default value if null
-            if preferences['snacks_per_day'] is None:
-                preferences['snacks_per_day'] = 0
-
-            # Handle new JSONB fields
-            if preferences['flavor_preferences'] is None:
-                preferences['flavor_preferences'] = {
+                },
+                "prep_complexity": 50,
+                "servings_per_meal": 1,
+                "snacks_per_day": 0,
+                "flavor_preferences": {
                     "creamy": False,
                     "cheesy": False,
                     "herbs": False,
@@ -251,13 +63,9 @@ def get_user_preferences(id: int, current_user: dict = Depends(get_user_from_tok
                     "peppery": False,
                     "hearty": False,
                     "spicy": False
-                }
-
-            if preferences['spice_level'] is None:
-                preferences['spice_level'] = "medium"
-
-            if preferences['recipe_type_preferences'] is None:
-                preferences['recipe_type_preferences'] = {
+                },
+                "spice_level": "medium",
+                "recipe_type_preferences": {
                     "stir-fry": False,
                     "grain-bowl": False,
                     "salad": False,
@@ -271,47 +79,39 @@ def get_user_preferences(id: int, current_user: dict = Depends(get_user_from_tok
                     "soup-stew": False,
                     "bake": False,
                     "family-meals": False
-                }
-
-            if preferences['meal_time_preferences'] is None:
-                preferences['meal_time_preferences'] = {
+                },
+                "meal_time_preferences": {
                     "breakfast": False,
                     "morning-snack": False,
                     "lunch": False,
                     "afternoon-snack": False,
                     "dinner": False,
                     "evening-snack": False
-                }
-
-            if preferences['time_constraints'] is None:
-                preferences['time_constraints'] = {
+                },
+                "time_constraints": {
                     "weekday-breakfast": 10,
                     "weekday-lunch": 15,
                     "weekday-dinner": 30,
                     "weekend-breakfast": 20,
                     "weekend-lunch": 30,
                     "weekend-dinner": 45
-                }
-
-            if preferences['prep_preferences'] is None:
-                preferences['prep_preferences'] = {
+                },
+                "prep_preferences": {
                     "batch-cooking": False,
                     "meal-prep": False,
                     "quick-assembly": False,
                     "one-pot": False,
                     "minimal-dishes": False
-                }
-
-            # Handle preferred proteins - check for None, empty dict, or missing keys
-            if preferences['preferred_proteins'] is None or preferences['preferred_proteins'] == {} or not isinstance(preferences['preferred_proteins'], dict):
-                preferences['preferred_proteins'] = {
+                },
+                "preferred_proteins": {
                     "meat": {
                         "chicken": False,
                         "beef": False,
                         "pork": False,
                         "turkey": False,
                         "lamb": False,
-                        "bison": False
+                        "bison": False,
+                        "other": False
                     },
                     "seafood": {
                         "salmon": False,
@@ -319,7 +119,8 @@ def get_user_preferences(id: int, current_user: dict = Depends(get_user_from_tok
                         "cod": False,
                         "shrimp": False,
                         "crab": False,
-                        "mussels": False
+                        "mussels": False,
+                        "other": False
                     },
                     "vegetarian_vegan": {
                         "tofu": False,
@@ -327,7 +128,8 @@ def get_user_preferences(id: int, current_user: dict = Depends(get_user_from_tok
                         "seitan": False,
                         "lentils": False,
                         "chickpeas": False,
-                        "black_beans": False
+                        "black_beans": False,
+                        "other": False
                     },
                     "other": {
                         "eggs": False,
@@ -335,54 +137,18 @@ def get_user_preferences(id: int, current_user: dict = Depends(get_user_from_tok
                         "dairy_yogurt": False,
                         "protein_powder_whey": False,
                         "protein_powder_pea": False,
-                        "quinoa": False
-                    }
-                }
-            else:
-                # Ensure all categories exist in the preferred_proteins object
-                default_categories = {
-                    "meat": {
-                        "chicken": False, "beef": False, "pork": False, "turkey": False, "lamb": False, "bison": False
-                    },
-                    "seafood": {
-                        "salmon": False, "tuna": False, "cod": False, "shrimp": False, "crab": False, "mussels": False
-                    },
-                    "vegetarian_vegan": {
-                        "tofu": False, "tempeh": False, "seitan": False, "lentils": False, "chickpeas": False, "black_beans": False
-                    },
-                    "other": {
-                        "eggs": False, "dairy_milk": False, "dairy_yogurt": False, "protein_powder_whey": False, "protein_powder_pea": False, "quinoa": False
+                        "quinoa": False,
+                        "other": False
                     }
-                }
-                
-                for category, default_proteins in default_categories.items():
-                    if category not in preferences['preferred_proteins'] or not isinstance(preferences['preferred_proteins'][category], dict):
-                        preferences['preferred_proteins'][category] = default_proteins
-                    else:
-                        # Ensure all proteins in category exist
-                        for protein, default_value in default_proteins.items():
-                            if protein not in preferences['preferred_proteins'][category]:
-                                preferences['preferred_proteins'][category][protein] = default_value
-
-            if preferences['other_proteins'] is None or preferences['other_proteins'] == {} or not isinstance(preferences['other_proteins'], dict):
-                preferences['other_proteins'] = {
+                },
+                "other_proteins": {
                     "meat": "",
                     "seafood": "",
                     "vegetarian_vegan": "",
                     "other": ""
-                }
-            else:
-                # Ensure all categories exist in other_proteins
-                for category in ["meat", "seafood", "vegetarian_vegan", "other"]:
-                    if category not in preferences['other_proteins']:
-                        preferences['other_proteins'][category] = ""
-
-            # Handle carb cycling preferences defaults - robust null checking
-            if preferences['carb_cycling_enabled'] is None:
-                preferences['carb_cycling_enabled'] = False
-
-            if preferences['carb_cycling_config'] is None or preferences['carb_cycling_config'] == {} or not isinstance(preferences['carb_cycling_config'], dict):
-                preferences['carb_cycling_config'] = {
+                },
+                "carb_cycling_enabled": False,
+                "carb_cycling_config": {
                     "pattern": "3-1-3",
                     "high_carb_grams": 200,
                     "moderate_carb_grams": 100,
@@ -390,7 +156,7 @@ def get_user_preferences(id: int, current_user: dict = Depends(get_user_from_tok
                     "no_carb_grams": 20,
                     "weekly_schedule": {
                         "monday": "high",
-                        "tuesday": "low",
+                        "tuesday": "low", 
                         "wednesday": "high",
                         "thursday": "moderate",
                         "friday": "high",
@@ -418,9 +184,222 @@ def get_user_preferences(id: int, current_user: dict = Depends(get_user_from_tok
                         "secondary": "maintain_muscle"
                     },
                     "notes": ""
+                },
+                "zip_code": ""
+            }
+
+        if etag_matches(request, profile.etag):
+            return not_modified(profile.etag, PREFERENCE_CACHE_CONTROL)
+        response.headers["ETag"] = profile.etag
+        response.headers["Cache-Control"] = PREFERENCE_CACHE_CONTROL
+
+        preferences = profile.to_dict()
+
+        # Handle JSONB fields
+        if preferences['meal_times'] is None:
+            preferences['meal_times'] = {
+                "breakfast": False,
+                "lunch": False,
+                "dinner": False,
+                "snacks": False
+            }
+
+        if preferences['appliances'] is None:
+            preferences['appliances'] = {
+                "airFryer": False,
+                "instapot": False,
+                "crockpot": False
+            }
+
+        # Ensure snacks_per_day has a default value if null
+        if preferences['snacks_per_day'] is None:
+            preferences['snacks_per_day'] = 0
+
+        # Handle new JSONB fields
+        if preferences['flavor_preferences'] is None:
+            preferences['flavor_preferences'] = {
+                "creamy": False,
+                "cheesy": False,
+                "herbs": False,
+                "umami": False,
+                "sweet": False,
+                "spiced": False,
+                "smoky": False,
+                "garlicky": False,
+                "tangy": False,
+                "peppery": False,
+                "hearty": False,
+                "spicy": False
+            }
+
+        if preferences['spice_level'] is None:
+            preferences['spice_level'] = "medium"
+
+        if preferences['recipe_type_preferences'] is None:
+            preferences['recipe_type_preferences'] = {
+                "stir-fry": False,
+                "grain-bowl": False,
+                "salad": False,
+                "pasta": False,
+                "main-sides": False,
+                "pizza": False,
+                "burger": False,
+                "sandwich": False,
+                "tacos": False,
+                "wrap": False,
+                "soup-stew": False,
+                "bake": False,
+                "family-meals": False
+            }
+
+        if preferences['meal_time_preferences'] is None:
+            preferences['meal_time_preferences'] = {
+                "breakfast": False,
+                "morning-snack": False,
+                "lunch": False,
+                "afternoon-snack": False,
+                "dinner": False,
+                "evening-snack": False
+            }
+
+        if preferences['time_constraints'] is None:
+            preferences['time_constraints'] = {
+                "weekday-breakfast": 10,
+                "weekday-lunch": 15,
+                "weekday-dinner": 30,
+                "weekend-breakfast": 20,
+                "weekend-lunch": 30,
+                "weekend-dinner": 45
+            }
+
+        if preferences['prep_preferences'] is None:
+            preferences['prep_preferences'] = {
+                "batch-cooking": False,
+                "meal-prep": False,
+                "quick-assembly": False,
+                "one-pot": False,
+                "minimal-dishes": False
+            }
+
+        # Handle preferred proteins - check for None, empty dict, or missing keys
+        if preferences['preferred_proteins'] is None or preferences['preferred_proteins'] == {} or not isinstance(preferences['preferred_proteins'], dict):
+            preferences['preferred_proteins'] = {
+                "meat": {
+                    "chicken": False,
+                    "beef": False,
+                    "pork": False,
+                    "turkey": False,
+                    "lamb": False,
+                    "bison": False
+                },
+                "seafood": {
+                    "salmon": False,
+                    "tuna": False,
+                    "cod": False,
+                    "shrimp": False,
+                    "crab": False,
+                    "mussels": False
+                },
+                "vegetarian_vegan": {
+                    "tofu": False,
+                    "tempeh": False,
+                    "seitan": False,
+                    "lentils": False,
+                    "chickpeas": False,
+                    "black_beans": False
+                },
+                "other": {
+                    "eggs": False,
+                    "dairy_milk": False,
+                    "dairy_yogurt": False,
+                    "protein_powder_whey": False,
+                    "protein_powder_pea": False,
+                    "quinoa": False
                 }
-
-            return preferences
+            }
+        else:
+            # Ensure all categories exist in the preferred_proteins object
+            default_categories = {
+                "meat": {
+                    "chicken": False, "beef": False, "pork": False, "turkey": False, "lamb": False, "bison": False
+                },
+                "seafood": {
+                    "salmon": False, "tuna": False, "cod": False, "shrimp": False, "crab": False, "mussels": False
+                },
+                "vegetarian_vegan": {
+                    "tofu": False, "tempeh": False, "seitan": False, "lentils": False, "chickpeas": False, "black_beans": False
+                },
+                "other": {
+                    "eggs": False, "dairy_milk": False, "dairy_yogurt": False, "protein_powder_whey": False, "protein_powder_pea": False, "quinoa": False
+                }
+            }
+            
+            for category, default_proteins in default_categories.items():
+                if category not in preferences['preferred_proteins'] or not isinstance(preferences['preferred_proteins'][category], dict):
+                    preferences['preferred_proteins'][category] = default_proteins
+                else:
+                    # Ensure all proteins in category exist
+                    for protein, default_value in default_proteins.items():
+                        if protein not in preferences['preferred_proteins'][category]:
+                            preferences['preferred_proteins'][category][protein] = default_value
+
+        if preferences['other_proteins'] is None or preferences['other_proteins'] == {} or not isinstance(preferences['other_proteins'], dict):
+            preferences['other_proteins'] = {
+                "meat": "",
+                "seafood": "",
+                "vegetarian_vegan": "",
+                "other": ""
+            }
+        else:
+            # Ensure all categories exist in other_proteins
+            for category in ["meat", "seafood", "vegetarian_vegan", "other"]:
+                if category not in preferences['other_proteins']:
+                    preferences['other_proteins'][category] = ""
+
+        # Handle carb cycling preferences defaults - robust null checking
+        if preferences['carb_cycling_enabled'] is None:
+            preferences['carb_cycling_enabled'] = False
+
+        if preferences['carb_cycling_config'] is None or preferences['carb_cycling_config'] == {} or not isinstance(preferences['carb_cycling_config'], dict):
+            preferences['carb_cycling_config'] = {
+                "pattern": "3-1-3",
+                "high_carb_grams": 200,
+                "moderate_carb_grams": 100,
+                "low_carb_grams": 50,
+                "no_carb_grams": 20,
+                "weekly_schedule": {
+                    "monday": "high",
+                    "tuesday": "low",
+                    "wednesday": "high",
+                    "thursday": "moderate",
+                    "friday": "high",
+                    "saturday": "low",
+                    "sunday": "low"
+                },
+                "sync_with_workouts": False,
+                "workout_days": [],
+                "custom_pattern": False,
+                "pattern_options": [
+                    {"name": "3-1-3", "description": "3 High, 1 Moderate, 3 Low carb days"},
+                    {"name": "2-2-3", "description": "2 High, 2 Moderate, 3 Low carb days"},
+                    {"name": "4-0-3", "description": "4 High, 0 Moderate, 3 Low carb days"},
+                    {"name": "5-0-2", "description": "5 High, 0 Moderate, 2 Low carb days"},
+                    {"name": "custom", "description": "Create your own custom pattern"}
+                ],
+                "carb_ranges": {
+                    "high": {"min": 150, "max": 300, "description": "High carb days (workout/active days)"},
+                    "moderate": {"min": 75, "max": 150, "description": "Moderate carb days (light activity)"},
+                    "low": {"min": 25, "max": 75, "description": "Low carb days (rest days)"},
+                    "no_carb": {"min": 0, "max": 25, "description": "Very low carb days (advanced)"}
+                },
+                "goals": {
+                    "primary": "fat_loss",
+                    "secondary": "maintain_muscle"
+                },
+                "notes": ""
+            }
+
+        return preferences
 
     except Exception as e:
         logger.error(f"Error fetching preferences: {str(e)}", exc_info=True)
@@ -598,6 +577,7 @@ async def update_preferences(id: int, preferences: PreferencesUpdate, current_us
 
                 cursor.execute(query, params)
                 conn.commit()
+                invalidate_preference_profile(id)
 
                 if cursor.rowcount == 0:
                     raise HTTPException(status_code=404, detail="User not found")
@@ -1,9 +1,10 @@
 # app/routers/rating_analytics.py - Rating Analytics API Endpoints
 
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
 from typing import Dict, List, Optional
 import logging
 from ..ai.rating_analytics import rating_analytics
+from ..ai.rating_rollups import get_cuisine_trends, get_recipe_performance
 from ..routers.recipe_ratings import get_rating_user_from_token
 
 logger = logging.getLogger(__name__)
@@ -172,11 +173,13 @@ async def get_ai_prompt_data(
 @router.get("/trends/cuisine-popularity")
 async def get_cuisine_popularity_trends(
     request: Request,
-    limit: int = 10
+    limit: int = 10,
+    days: int = Query(90, ge=1, le=365)
 ):
     """
     Get trending cuisine preferences across all users.
     Useful for understanding platform-wide food trends.
+    Reads the daily rollups, so any window of ``days`` is a sum of day buckets.
     """
     logger.info("=== GET CUISINE TRENDS ===")
     
@@ -185,25 +188,8 @@ async def get_cuisine_popularity_trends(
         if not user:
             raise HTTPException(status_code=401, detail="Authentication required")
         
-        # Get cuisine popularity from rating data
-        cuisine_trends = rating_analytics.execute_analytics_query("""
-            SELECT 
-                sr.cuisine,
-                COUNT(*) as rating_count,
-                AVG(ri.rating_score) as average_rating,
-                COUNT(CASE WHEN ri.rating_score >= 4 THEN 1 END) as high_ratings
-            FROM recipe_interactions ri
-            JOIN scraped_recipes sr ON ri.recipe_id = sr.id
-            WHERE ri.rating_score IS NOT NULL 
-            AND sr.cuisine IS NOT NULL
-            AND ri.updated_at >= NOW() - INTERVAL '90 days'
-            GROUP BY sr.cuisine
-            HAVING COUNT(*) >= 3
-            ORDER BY 
-                (AVG(ri.rating_score) * COUNT(*)) DESC,
-                COUNT(*) DESC
-            LIMIT %s
-        """, (limit,), fetch_all=True)
+        # Get cuisine popularity from the daily rating rollups
+        cuisine_trends = get_cuisine_trends(days=days, limit=limit)
         
         trends = []
         for trend in cuisine_trends or []:
@@ -217,7 +203,7 @@ async def get_cuisine_popularity_trends(
         
         return {
             "cuisine_trends": trends,
-            "period": "last_90_days",
+            "period": f"last_{days}_days",
             "status": "success"
         }
         
@@ -233,11 +219,13 @@ async def get_cuisine_popularity_trends(
 @router.get("/trends/recipe-performance")
 async def get_recipe_performance_trends(
     request: Request,
-    limit: int = 20
+    limit: int = 20,
+    days: Optional[int] = Query(None, ge=1, le=365)
 ):
     """
     Get top performing recipes based on rating data.
     Identifies recipes that should be recommended more often.
+    All-time by default; pass ``days`` for a trailing window.
     """
     logger.info("=== GET RECIPE PERFORMANCE TRENDS ===")
     
@@ -246,28 +234,8 @@ async def get_recipe_performance_trends(
         if not user:
             raise HTTPException(status_code=401, detail="Authentication required")
         
-        # Get top performing recipes
-        top_recipes = rating_analytics.execute_analytics_query("""
-            SELECT 
-                ri.recipe_id,
-                sr.title,
-                sr.cuisine,
-                sr.complexity,
-                sr.total_time,
-                COUNT(*) as rating_count,
-                AVG(ri.rating_score) as average_rating,
-                COUNT(CASE WHEN ri.made_recipe = true THEN 1 END) as times_made,
-                COUNT(CASE WHEN ri.would_make_again = true THEN 1 END) as would_remake
-            FROM recipe_interactions ri
-            JOIN scraped_recipes sr ON ri.recipe_id = sr.id
-            WHERE ri.rating_score IS NOT NULL
-            GROUP BY ri.recipe_id, sr.title, sr.cuisine, sr.complexity, sr.total_time
-            HAVING COUNT(*) >= 2
-            ORDER BY 
-                AVG(ri.rating_score) DESC,
-                COUNT(*) DESC
-            LIMIT %s
-        """, (limit,), fetch_all=True)
+        # Get top performing recipes from the daily rating rollups
+        top_recipes = get_recipe_performance(days=days, limit=limit)
         
         performance_data = []
         for recipe in top_recipes or []:
@@ -288,6 +256,7 @@ async def get_recipe_performance_trends(
         
         return {
             "top_recipes": performance_data,
+            "period": f"last_{days}_days" if days else "all_time",
             "status": "success"
         }
         
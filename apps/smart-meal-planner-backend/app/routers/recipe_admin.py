@@ -4,7 +4,6 @@ Admin endpoints for managing scraped recipes
 import os
 import uuid
 import logging
-import boto3
 from botocore.exceptions import ClientError
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
 from fastapi.responses import JSONResponse
@@ -13,7 +12,7 @@ from typing import List, Optional, Dict, Any
 import json
 from ..db import get_db_connection
 from ..utils.auth_utils import admin_required, get_user_from_token
-from ..utils.s3.s3_utils import s3_helper
+from ..utils.s3.s3_utils import s3_helper, boto3
 
 logger = logging.getLogger(__name__)
 
@@ -42,14 +41,16 @@ async def upload_recipe_image(
         # Check if s3_helper is properly configured
         logger.debug(f"S3 helper bucket name: {s3.bucket_name if hasattr(s3, 'bucket_name') else 'None'}")
         
-        # Upload image to S3
+        # Upload image (plus resized WebP variants) to S3
         logger.info("Initiating upload to S3...")
-        image_url = await s3.upload_image(file)
+        uploaded = await s3.upload_image_with_variants(file)
+        image_url = uploaded["url"]
         logger.info(f"Image successfully uploaded to {image_url}")
         
         return {
             "success": True,
             "image_url": image_url,
+            "image_variants": uploaded["variants"],
             "message": "Image uploaded successfully"
         }
     except ValueError as e:
@@ -102,7 +103,8 @@ async def update_recipe_image(
         
         # Upload new image
         logger.info("Uploading new image...")
-        new_image_url = await s3.upload_image(file)
+        uploaded = await s3.upload_image_with_variants(file)
+        new_image_url = uploaded["url"]
         logger.info(f"New image uploaded to: {new_image_url}")
         
         # Update recipe with new image URL
@@ -115,6 +117,7 @@ async def update_recipe_image(
         
         updated_recipe = cursor.fetchone()
         conn.commit()
+        updated_recipe['image_variants'] = uploaded["variants"]
         
         return {
             "success": True, 
@@ -4,8 +4,11 @@ from pydantic import BaseModel, Field, validator
 from typing import Optional, Dict, List
 from datetime import datetime
 import logging
-from psycopg2.extras import RealDictCursor
 from ..utils.auth_utils import get_user_from_token
+from ..db import get_db_cursor, RATING_POOL
+from ..ai.recipe_neighbors import recommend_recipes
+from ..ai.rating_analytics import rating_analytics
+from ..utils.logging_config import redact_headers
 import jwt
 from ..config import JWT_SECRET, JWT_ALGORITHM
 
@@ -16,43 +19,31 @@ router = APIRouter(prefix="/ratings", tags=["Ratings"])
 # Simplified auth function for ratings that doesn't hit the problematic database pool
 async def get_rating_user_from_token(request):
     """Simplified authentication for rating endpoints that bypasses DB organization lookup"""
-    logger.info(f"=== RATING AUTH DEBUG ===")
-    logger.info(f"Request path: {request.url.path}")
-    logger.info(f"Request method: {request.method}")
-    
-    # Log all headers for debugging
-    logger.info("Request headers:")
-    for header_name, header_value in request.headers.items():
-        if header_name.lower() == 'authorization':
-            logger.info(f"  {header_name}: Bearer ***")
-        else:
-            logger.info(f"  {header_name}: {header_value}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Rating auth: %s %s, headers: %s", request.method, request.url.path,
+                     redact_headers(request.headers))
     
     auth_header = request.headers.get('Authorization')
     if not auth_header:
         logger.error("No Authorization header found for rating request")
         return None
     
-    logger.info(f"Auth header present, length: {len(auth_header)}")
-    
     try:
         if auth_header.startswith('Bearer '):
             token = auth_header.split(' ')[1]
-            logger.info(f"Extracted token, length: {len(token)}")
         else:
             token = auth_header
-            logger.info("Using auth header as token directly")
+            logger.debug("Using auth header as token directly")
             
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        logger.info(f"JWT decoded successfully. Payload keys: {list(payload.keys())}")
         
         user_id = payload.get('user_id')
         if not user_id:
-            logger.error(f"Token payload missing user_id. Full payload: {payload}")
+            logger.error("Token payload missing user_id. Payload keys: %s", list(payload.keys()))
             return None
         
         # Return just the basic payload without organization data to avoid DB calls
-        logger.info(f"Rating auth successful for user {user_id}")
+        logger.debug("Rating auth successful for user %s", user_id)
         return payload
         
     except jwt.ExpiredSignatureError:
@@ -156,35 +147,11 @@ class SavedRecipeQuickRating(BaseModel):
     quick_rating: int = Field(..., ge=1, le=5)
     notes: Optional[str] = None
 
-# Create isolated database connection for ratings to avoid pool conflicts
-def get_rating_db_connection():
-    """Get a direct database connection for rating operations only"""
-    try:
-        from ..config import DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT
-        import psycopg2
-        
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-            connect_timeout=10
-        )
-        return conn
-    except Exception as e:
-        logger.error(f"Failed to create rating database connection: {str(e)}")
-        raise HTTPException(status_code=500, detail="Database connection failed")
-
 # Simplified database execution for ratings only
 def execute_rating_query(query, params=None, fetch_one=False, fetch_all=False):
-    """Execute a database query specifically for rating operations"""
-    conn = None
+    """Execute a database query on the rating pool, isolated from core traffic"""
     try:
-        conn = get_rating_db_connection()
-        conn.autocommit = True
-        
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        with get_db_cursor(dict_cursor=True, autocommit=True, pool_type=RATING_POOL) as (cur, conn):
             cur.execute("SET statement_timeout = 15000")  # 15 second timeout
             cur.execute(query, params)
             
@@ -198,12 +165,6 @@ def execute_rating_query(query, params=None, fetch_one=False, fetch_all=False):
     except Exception as e:
         logger.error(f"Rating database operation failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Rating operation failed: {str(e)}")
-    finally:
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 # Recipe Rating Endpoints
 @router.post("/recipes/{recipe_id}/rate")
@@ -261,35 +222,39 @@ async def rate_recipe(
         # Single atomic upsert — relies on the partial unique index
         # idx_recipe_interactions_user_recipe_rating (user_id, recipe_id)
         # WHERE interaction_type = 'rating' added in migration 016.
-        updated_rating = execute_rating_query("""
-            INSERT INTO recipe_interactions
-                (user_id, recipe_id, interaction_type, rating_score, rating_aspects,
-                 feedback_text, made_recipe, would_make_again, difficulty_rating,
-                 time_accuracy, timestamp, updated_at)
-            VALUES (%s, %s, 'rating', %s, %s::jsonb, %s, %s, %s, %s, %s,
-                    CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-            ON CONFLICT (user_id, recipe_id) WHERE interaction_type = 'rating'
-            DO UPDATE SET
-                rating_score      = EXCLUDED.rating_score,
-                rating_aspects    = EXCLUDED.rating_aspects,
-                feedback_text     = EXCLUDED.feedback_text,
-                made_recipe       = EXCLUDED.made_recipe,
-                would_make_again  = EXCLUDED.would_make_again,
-                difficulty_rating = EXCLUDED.difficulty_rating,
-                time_accuracy     = EXCLUDED.time_accuracy,
-                updated_at        = CURRENT_TIMESTAMP
-            RETURNING *
-        """, (
-            user_id,
-            recipe_id,
-            rating.rating_score,
-            rating_aspects_json,
-            rating.feedback_text,
-            rating.made_recipe,
-            rating.would_make_again,
-            rating.difficulty_rating,
-            rating.time_accuracy,
-        ), fetch_one=True)
+        # The user's preference profile is updated in the same transaction.
+        with rating_analytics.profile_update(user_id) as profile:
+            profile.track_interaction(recipe_id, 'rating')
+            profile.cur.execute("""
+                INSERT INTO recipe_interactions
+                    (user_id, recipe_id, interaction_type, rating_score, rating_aspects,
+                     feedback_text, made_recipe, would_make_again, difficulty_rating,
+                     time_accuracy, timestamp, updated_at)
+                VALUES (%s, %s, 'rating', %s, %s::jsonb, %s, %s, %s, %s, %s,
+                        CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                ON CONFLICT (user_id, recipe_id) WHERE interaction_type = 'rating'
+                DO UPDATE SET
+                    rating_score      = EXCLUDED.rating_score,
+                    rating_aspects    = EXCLUDED.rating_aspects,
+                    feedback_text     = EXCLUDED.feedback_text,
+                    made_recipe       = EXCLUDED.made_recipe,
+                    would_make_again  = EXCLUDED.would_make_again,
+                    difficulty_rating = EXCLUDED.difficulty_rating,
+                    time_accuracy     = EXCLUDED.time_accuracy,
+                    updated_at        = CURRENT_TIMESTAMP
+                RETURNING *
+            """, (
+                user_id,
+                recipe_id,
+                rating.rating_score,
+                rating_aspects_json,
+                rating.feedback_text,
+                rating.made_recipe,
+                rating.would_make_again,
+                rating.difficulty_rating,
+                rating.time_accuracy,
+            ))
+            updated_rating = profile.cur.fetchone()
         
         result = {
             "success": True,
@@ -486,25 +451,28 @@ async def rate_menu(
             "practicality": rating.practicality
         })
         
-        menu_rating = execute_rating_query("""
-            INSERT INTO recipe_interactions 
-            (user_id, recipe_id, interaction_type, rating_score, 
-             rating_aspects, feedback_text, timestamp, updated_at)
-            VALUES (%s, %s, 'menu_rating', %s, %s::jsonb, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-            ON CONFLICT (user_id, recipe_id) 
-            DO UPDATE SET 
-                rating_score = EXCLUDED.rating_score,
-                rating_aspects = EXCLUDED.rating_aspects,
-                feedback_text = EXCLUDED.feedback_text,
-                updated_at = CURRENT_TIMESTAMP
-            RETURNING *
-        """, (
-            user_id,
-            -menu_id,  # Negative ID to distinguish from recipe ratings
-            rating.overall_rating,
-            menu_aspects_json,
-            rating.feedback_text
-        ), fetch_one=True)
+        with rating_analytics.profile_update(user_id) as profile:
+            profile.track_interaction(-menu_id, 'menu_rating')
+            profile.cur.execute("""
+                INSERT INTO recipe_interactions 
+                (user_id, recipe_id, interaction_type, rating_score, 
+                 rating_aspects, feedback_text, timestamp, updated_at)
+                VALUES (%s, %s, 'menu_rating', %s, %s::jsonb, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                ON CONFLICT (user_id, recipe_id) 
+                DO UPDATE SET 
+                    rating_score = EXCLUDED.rating_score,
+                    rating_aspects = EXCLUDED.rating_aspects,
+                    feedback_text = EXCLUDED.feedback_text,
+                    updated_at = CURRENT_TIMESTAMP
+                RETURNING *
+            """, (
+                user_id,
+                -menu_id,  # Negative ID to distinguish from recipe ratings
+                rating.overall_rating,
+                menu_aspects_json,
+                rating.feedback_text
+            ))
+            menu_rating = profile.cur.fetchone()
         
         return {
             "success": True,
@@ -579,30 +547,13 @@ async def get_recommended_recipes(
     try:
         user_id = user.get('user_id')
         
-        # Simple recommendation based on highly rated recipes by similar users
-        recommendations = execute_rating_query("""
-            SELECT DISTINCT
-                ri2.recipe_id,
-                AVG(ri2.rating_score) as avg_rating,
-                COUNT(*) as rating_count
-            FROM recipe_interactions ri1
-            JOIN recipe_interactions ri2 ON ri1.user_id != ri2.user_id
-            WHERE ri1.user_id = %s 
-            AND ri1.rating_score >= 4
-            AND ri2.rating_score >= 4
-            AND ri2.recipe_id NOT IN (
-                SELECT recipe_id FROM recipe_interactions 
-                WHERE user_id = %s AND rating_score IS NOT NULL
-            )
-            GROUP BY ri2.recipe_id
-            HAVING COUNT(*) >= 2
-            ORDER BY avg_rating DESC, rating_count DESC
-            LIMIT %s
-        """, (user_id, user_id, limit), fetch_all=True)
+        # Merge the precomputed neighbour lists of the user's highly rated recipes
+        # (recipe_neighbors is rebuilt in the background by app.ai.recipe_neighbors)
+        recommendations = recommend_recipes(user_id, limit=limit)
         
         return {
             "user_id": user_id,
-            "recommendations": [dict(rec) for rec in (recommendations or [])]
+            "recommendations": recommendations
         }
         
     except Exception as e:
@@ -649,42 +600,51 @@ async def quick_rate_saved_recipe(
         
         logger.info(f"Found saved recipe: scraped_recipe_id={saved_recipe['scraped_recipe_id']}, recipe_id={saved_recipe['recipe_id']}")
         
-        # Update quick rating
-        updated = execute_rating_query("""
-            UPDATE saved_recipes
-            SET quick_rating = %s,
-                notes = COALESCE(%s, notes)
-            WHERE id = %s
-            RETURNING *
-        """, (rating.quick_rating, rating.notes, saved_recipe_id), fetch_one=True)
-        
-        logger.info(f"Updated saved recipe quick rating to {rating.quick_rating}")
-        
-        # Also create/update a full rating if there's a linked recipe
         recipe_id = saved_recipe['scraped_recipe_id'] or saved_recipe['recipe_id']
-        if recipe_id:
-            logger.info(f"Creating/updating full rating for recipe {recipe_id}")
-
-            result_row = execute_rating_query("""
-                INSERT INTO recipe_interactions
-                    (user_id, recipe_id, interaction_type, rating_score, timestamp, updated_at)
-                VALUES (%s, %s, 'rating', %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                ON CONFLICT (user_id, recipe_id) WHERE interaction_type = 'rating'
-                DO UPDATE SET
-                    rating_score = EXCLUDED.rating_score,
-                    updated_at   = CURRENT_TIMESTAMP
-                RETURNING id
-            """, (user_id, recipe_id, rating.quick_rating), fetch_one=True)
-            interaction_id = result_row['id']
+        
+        # Both writes and the preference profile update commit together
+        with rating_analytics.profile_update(user_id) as profile:
+            cur = profile.cur
+            profile.track_saved(saved_recipe_id)
+            if recipe_id:
+                profile.track_interaction(recipe_id, 'rating')
             
-            # Link the rating to the saved recipe
-            execute_rating_query("""
+            # Update quick rating
+            cur.execute("""
                 UPDATE saved_recipes
-                SET rating_id = %s
+                SET quick_rating = %s,
+                    notes = COALESCE(%s, notes)
                 WHERE id = %s
-            """, (interaction_id, saved_recipe_id))
+                RETURNING *
+            """, (rating.quick_rating, rating.notes, saved_recipe_id))
+            updated = cur.fetchone()
+            
+            logger.info(f"Updated saved recipe quick rating to {rating.quick_rating}")
             
-            logger.info(f"Linked rating {interaction_id} to saved recipe {saved_recipe_id}")
+            # Also create/update a full rating if there's a linked recipe
+            if recipe_id:
+                logger.info(f"Creating/updating full rating for recipe {recipe_id}")
+
+                cur.execute("""
+                    INSERT INTO recipe_interactions
+                        (user_id, recipe_id, interaction_type, rating_score, timestamp, updated_at)
+                    VALUES (%s, %s, 'rating', %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                    ON CONFLICT (user_id, recipe_id) WHERE interaction_type = 'rating'
+                    DO UPDATE SET
+                        rating_score = EXCLUDED.rating_score,
+                        updated_at   = CURRENT_TIMESTAMP
+                    RETURNING id
+                """, (user_id, recipe_id, rating.quick_rating))
+                interaction_id = cur.fetchone()['id']
+                
+                # Link the rating to the saved recipe
+                cur.execute("""
+                    UPDATE saved_recipes
+                    SET rating_id = %s
+                    WHERE id = %s
+                """, (interaction_id, saved_recipe_id))
+                
+                logger.info(f"Linked rating {interaction_id} to saved recipe {saved_recipe_id}")
         
         result = {
             "success": True,
@@ -0,0 +1,70 @@
+# app/routers/recipe_search.py
+"""
+Ranked, faceted search across scraped and user-created recipes.
+"""
+
+import logging
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from starlette.concurrency import run_in_threadpool
+
+from app.utils.auth_utils import get_user_from_token
+from app.utils.recipe_search import SEARCH_SOURCES, search_recipes
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/recipe-search", tags=["RecipeSearch"])
+
+
+@router.get("/")
+async def search(
+    q: Optional[str] = Query(None, description="Words to find in titles, cuisines, tags and ingredients"),
+    source: Optional[List[str]] = Query(None, description="'scraped' and/or 'user'; both by default"),
+    cuisine: Optional[List[str]] = Query(None),
+    complexity: Optional[List[str]] = Query(None),
+    diet_tag: Optional[List[str]] = Query(None, description="Recipes must have every tag given"),
+    exclude_organization_id: Optional[int] = Query(
+        None, description="Leave out recipes already in this organization's library (owner only)"
+    ),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    facets: bool = Query(True, description="Include facet counts and the total on the first page"),
+    user = Depends(get_user_from_token)
+):
+    """
+    Relevance-ranked results when q is given, alphabetical otherwise. Pass
+    next_cursor back as cursor for the following page.
+    """
+    if source and any(s not in SEARCH_SOURCES for s in source):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"source must be one of {', '.join(SEARCH_SOURCES)}")
+
+    organization_id = user.get("organization_id")
+    if exclude_organization_id is not None and not (
+        user.get("role") == "owner" and organization_id == exclude_organization_id
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="Access denied: User does not own this organization")
+
+    try:
+        # The ranked query and the facet counts are blocking psycopg2 calls
+        return await run_in_threadpool(
+            search_recipes,
+            query=q,
+            sources=source,
+            cuisine=cuisine,
+            complexity=complexity,
+            diet_tags=diet_tag,
+            user_id=user.get("user_id"),
+            organization_id=organization_id,
+            exclude_organization_id=exclude_organization_id,
+            cursor=cursor,
+            limit=limit,
+            include_facets=facets,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error searching recipes: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to search recipes")
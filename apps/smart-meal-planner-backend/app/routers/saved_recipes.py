@@ -6,11 +6,15 @@ import logging
 from ..db import (
     save_recipe, 
     unsave_recipe, 
-    get_user_saved_recipes, 
-    is_recipe_saved, 
+    get_saved_recipes_page,
+    get_user_saved_recipes,
     get_saved_recipe_by_id,
-    get_saved_recipe_id,
-    get_db_connection
+    SAVED_RECIPES_PAGE_SIZE,
+    SAVED_RECIPES_MAX_PAGE_SIZE,
+    get_saved_status_map,
+    saved_id_for,
+    get_db_connection,
+    session_cursor
 )
 from ..utils.auth_utils import get_user_from_token
 from ..models.user import SaveRecipeRequest
@@ -26,6 +30,52 @@ def parse_optional_int(value: str = None) -> Optional[int]:
     except (ValueError, TypeError):
         return None
 
+def include_details(include: Optional[str]) -> bool:
+    """True when an ``include`` query parameter (comma-separated) asks for full recipe details"""
+    return "details" in {part.strip().lower() for part in (include or "").split(",")}
+
+def saved_recipes_page(user_id, limit, cursor, include):
+    # Without limit or cursor, the whole list as full rows: the shape the
+    # mobile app's saved recipes screens were built against
+    if limit is None and not cursor:
+        return {"saved_recipes": get_user_saved_recipes(user_id), "next_cursor": None}
+    try:
+        return get_saved_recipes_page(user_id, limit=limit or SAVED_RECIPES_PAGE_SIZE, cursor=cursor,
+                                      include_details=include_details(include))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def check_client_access(trainer_id, client_id):
+    """Raise 403 unless trainer_id owns the organization client_id belongs to"""
+    with session_cursor(dict_cursor=False) as (cur, conn):
+        # Check if user is an organization owner
+        cur.execute("""
+            SELECT id FROM organizations WHERE owner_id = %s
+        """, (trainer_id,))
+        
+        org_result = cur.fetchone()
+        if not org_result:
+            logger.warning(f"User {trainer_id} attempted to access client {client_id} saved recipes but is not an organization owner")
+            raise HTTPException(
+                status_code=403,
+                detail="Only organization owners can access client saved recipes"
+            )
+            
+        org_id = org_result[0]
+        
+        # Check if client belongs to this organization
+        cur.execute("""
+            SELECT 1 FROM organization_clients
+            WHERE organization_id = %s AND client_id = %s
+        """, (org_id, client_id))
+        
+        if not cur.fetchone():
+            logger.warning(f"User {trainer_id} attempted to access client {client_id} saved recipes but client is not in their organization")
+            raise HTTPException(
+                status_code=403,
+                detail="This client does not belong to your organization"
+            )
+
 router = APIRouter(prefix="/saved-recipes", tags=["SavedRecipes"])
 
 @router.get("/test")
@@ -316,9 +366,17 @@ async def remove_saved_recipe(
 
 @router.get("/")
 async def list_saved_recipes(
+    limit: Optional[int] = Query(None, ge=1, le=SAVED_RECIPES_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include: Optional[str] = Query(None, description="Pass 'details' to include macros, ingredients and instructions"),
     user = Depends(get_user_from_token)
 ):
-    """Get all saved recipes for current user"""
+    """
+    Get the current user's saved recipes, newest first, one page at a time.
+    Card fields only unless ?include=details; GET /saved-recipes/{saved_id}
+    has the full recipe. Without limit or cursor, every recipe as full rows
+    (older app versions expect that); new callers should pass limit.
+    """
     # Check if user is authenticated
     if not user:
         logger.error("Authentication required for saved recipes access")
@@ -330,13 +388,16 @@ async def list_saved_recipes(
     user_id = user.get('user_id')
 
     try:
-        saved_recipes = get_user_saved_recipes(user_id)
+        page = saved_recipes_page(user_id, limit, cursor, include)
 
         return {
             "status": "success",
-            "saved_recipes": saved_recipes
+            "saved_recipes": page["saved_recipes"],
+            "next_cursor": page["next_cursor"]
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching saved recipes: {str(e)}")
         raise HTTPException(
@@ -347,10 +408,13 @@ async def list_saved_recipes(
 @router.get("/client/{client_id}")
 async def get_client_saved_recipes(
     client_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=SAVED_RECIPES_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include: Optional[str] = Query(None, description="Pass 'details' to include macros, ingredients and instructions"),
     user = Depends(get_user_from_token)
 ):
     """
-    Get all saved recipes for a specific client.
+    Get a specific client's saved recipes, paged like GET /saved-recipes/.
     Only accessible by organization owners for their clients.
     """
     # Check if user is authenticated
@@ -365,47 +429,16 @@ async def get_client_saved_recipes(
 
     try:
         # Verify the trainer has access to this client
-        conn = get_db_connection()
-        
-        try:
-            with conn.cursor() as cur:
-                # Check if user is an organization owner
-                cur.execute("""
-                    SELECT id FROM organizations WHERE owner_id = %s
-                """, (trainer_id,))
-                
-                org_result = cur.fetchone()
-                if not org_result:
-                    logger.warning(f"User {trainer_id} attempted to access client {client_id} saved recipes but is not an organization owner")
-                    raise HTTPException(
-                        status_code=403,
-                        detail="Only organization owners can access client saved recipes"
-                    )
-                    
-                org_id = org_result[0]
-                
-                # Check if client belongs to this organization
-                cur.execute("""
-                    SELECT 1 FROM organization_clients
-                    WHERE organization_id = %s AND client_id = %s
-                """, (org_id, client_id))
-                
-                if not cur.fetchone():
-                    logger.warning(f"User {trainer_id} attempted to access client {client_id} saved recipes but client is not in their organization")
-                    raise HTTPException(
-                        status_code=403,
-                        detail="This client does not belong to your organization"
-                    )
-        finally:
-            conn.close()
+        check_client_access(trainer_id, client_id)
         
         # Now get the client's saved recipes
-        saved_recipes = get_user_saved_recipes(client_id)
+        page = saved_recipes_page(client_id, limit, cursor, include)
         
         return {
             "status": "success",
             "client_id": client_id,
-            "saved_recipes": saved_recipes
+            "saved_recipes": page["saved_recipes"],
+            "next_cursor": page["next_cursor"]
         }
     
     except HTTPException:
@@ -418,6 +451,48 @@ async def get_client_saved_recipes(
             detail=f"Error fetching client saved recipes: {str(e)}"
         )
 
+@router.get("/client/{client_id}/{saved_id}")
+async def get_client_saved_recipe_details(
+    client_id: int,
+    saved_id: int,
+    user = Depends(get_user_from_token)
+):
+    """
+    Get one of a client's saved recipes in full, like GET /saved-recipes/{saved_id}.
+    Only accessible by organization owners for their clients.
+    """
+    if not user:
+        logger.error("Authentication required to access client saved recipes")
+        raise HTTPException(
+            status_code=401,
+            detail="Authentication required"
+        )
+
+    try:
+        check_client_access(user.get('user_id'), client_id)
+
+        recipe = get_saved_recipe_by_id(client_id, saved_id)
+        if not recipe:
+            raise HTTPException(
+                status_code=404,
+                detail="Saved recipe not found"
+            )
+
+        return {
+            "status": "success",
+            "client_id": client_id,
+            "recipe": recipe
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching client saved recipe details: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error fetching client saved recipe details: {str(e)}"
+        )
+
 @router.get("/check")
 async def check_recipe_saved(
     menu_id: Optional[str] = Query(None),
@@ -442,6 +517,10 @@ async def check_recipe_saved(
 
     user_id = user.get('user_id')
 
+    if recipe_id == "":
+        # Omit recipe_id to check the whole menu
+        raise HTTPException(status_code=400, detail="recipe_id must not be blank")
+
     # Parse string parameters to proper types
     parsed_menu_id = parse_optional_int(menu_id)
     parsed_scraped_recipe_id = parse_optional_int(scraped_recipe_id)
@@ -470,23 +549,11 @@ async def check_recipe_saved(
                 cursor.close()
                 conn.close()
         elif parsed_menu_id:
-            # Regular menu recipe check
-            is_saved = is_recipe_saved(
-                user_id=user_id,
-                menu_id=parsed_menu_id,
-                recipe_id=recipe_id,
-                meal_time=meal_time
-            )
-            
-            # If saved, also return the saved ID for easier deletion
-            saved_id = None
-            if is_saved:
-                saved_id = get_saved_recipe_id(
-                    user_id=user_id,
-                    menu_id=parsed_menu_id,
-                    recipe_id=recipe_id,
-                    meal_time=meal_time
-                )
+            # Regular menu recipe check - one query returns the saved ID too,
+            # for easier deletion
+            saved = get_saved_status_map(user_id, parsed_menu_id)
+            saved_id = saved_id_for(saved, parsed_menu_id, recipe_id, meal_time)
+            is_saved = saved_id is not None
                 
             recipe_source = 'menu'
         else:
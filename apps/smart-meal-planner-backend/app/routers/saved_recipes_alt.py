@@ -4,6 +4,7 @@ from typing import Optional, Dict, Any, Union, List
 import logging
 from pydantic import BaseModel, validator
 from ..db import get_db_connection
+from ..ai.rating_analytics import rating_analytics
 from ..utils.auth_utils import get_user_from_token
 
 logger = logging.getLogger(__name__)
@@ -172,35 +173,21 @@ async def delete_saved_recipe(
     user_id = user.get('user_id')
     
     try:
-        conn = get_db_connection()
-        try:
-            with conn.cursor() as cur:
-                # Check if the recipe belongs to the user
-                cur.execute("""
-                    SELECT id FROM saved_recipes
-                    WHERE id = %s AND user_id = %s
-                """, (saved_id, user_id))
-                
-                if not cur.fetchone():
-                    raise HTTPException(
-                        status_code=404,
-                        detail="Saved recipe not found or doesn't belong to you"
-                    )
-                
-                # Delete the recipe
-                cur.execute("""
-                    DELETE FROM saved_recipes
-                    WHERE id = %s
-                """, (saved_id,))
-                
-                conn.commit()
-                
-                return {
-                    "status": "success",
-                    "message": "Recipe deleted successfully"
-                }
-        finally:
-            conn.close()
+        # Only the user's own row is deleted; its quick rating leaves the
+        # preference profile in the same transaction
+        with rating_analytics.profile_update(user_id) as profile:
+            deleted = profile.delete_saved("sv.id = %s", (saved_id,))
+
+        if not deleted:
+            raise HTTPException(
+                status_code=404,
+                detail="Saved recipe not found or doesn't belong to you"
+            )
+
+        return {
+            "status": "success",
+            "message": "Recipe deleted successfully"
+        }
     except HTTPException:
         raise
     except Exception as e:
@@ -8,6 +8,8 @@ from typing import List, Optional, Dict, Any
 import json
 from ..db import get_db_connection
 from ..utils.auth_utils import get_user_from_token
+from ..utils.s3.s3_utils import image_variant_urls, stored_variant_urls
+from ..utils.recipe_search import search_filter
 
 logger = logging.getLogger(__name__)
 
@@ -47,8 +49,9 @@ async def get_scraped_recipes(
         
         # Add filters
         if search:
-            where_clauses.append("r.title ILIKE %s")
-            params.append(f"%{search}%")
+            search_sql, search_params = search_filter("r.id", "scraped", search)
+            where_clauses.append(search_sql)
+            params.extend(search_params)
             
         if cuisine:
             where_clauses.append("r.cuisine ILIKE %s")
@@ -109,7 +112,12 @@ async def get_scraped_recipes(
         if user:
             user_id = user.get('user_id')
         
+        # Resized WebP URLs for images we host (empty for external images)
+        variants = stored_variant_urls(recipe.get('image_url') for recipe in recipes)
+
         for recipe in recipes:
+            recipe['image_variants'] = variants.get(recipe.get('image_url'), {})
+
             # Only query saved status if we have a user_id
             if user_id:
                 cursor.execute("""
@@ -198,6 +206,8 @@ async def get_scraped_recipe_by_id(
         recipe = cursor.fetchone()
         if not recipe:
             raise HTTPException(status_code=404, detail="Recipe not found")
+
+        recipe['image_variants'] = image_variant_urls(recipe.get('image_url'))
             
         # Check if recipe is saved by the user (if user is authenticated)
         user_id = None
@@ -4,15 +4,20 @@ from typing import Optional, List, Dict, Any
 import logging
 import json
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
-# Import Stripe conditionally
-try:
-    import stripe
-    STRIPE_AVAILABLE = True
-except ImportError:
+from app.utils.lazy_import import is_module_available, lazy_import
+
+# Import Stripe conditionally. The SDK is large, so it is only imported (and
+# given its API key) the first time a request actually touches it.
+STRIPE_AVAILABLE = is_module_available("stripe")
+if STRIPE_AVAILABLE:
+    stripe = lazy_import(
+        "stripe",
+        on_load=lambda module: setattr(module, "api_key", os.getenv("STRIPE_SECRET_KEY", "")),
+    )
+else:
     stripe = None
-    STRIPE_AVAILABLE = False
     logging.warning("Stripe module not installed. Stripe integration will be disabled.")
 
 # Import your models and utilities
@@ -28,6 +33,9 @@ from app.models.subscription import (
 )
 from pydantic import BaseModel
 from app.utils.auth_middleware import get_user_from_token
+from app.utils.entitlements import entitlement_cache
+from app.utils.logging_config import redact_headers
+from app.utils.stripe_events import stripe_event_worker, ordering_key as stripe_event_ordering_key
 from app.db import get_db_connection, get_db_cursor
 from psycopg2.extras import RealDictCursor
 
@@ -312,79 +320,86 @@ async def subscription_status(user = Depends(get_user_from_token)):
 
         subscription_enforce = os.getenv("SUBSCRIPTION_ENFORCE", "true").lower() == "true"
 
-        # Check if the user has a subscription record
-        conn = None
-        try:
-            conn = get_db_connection()
-            with conn.cursor() as cur:
-                # First, check if user has a subscription record in their profile
-                if account_type != 'client':  # For non-client accounts
-                    cur.execute("""
-                        SELECT subscription_id FROM user_profiles
-                        WHERE id = %s
-                    """, (user_id,))
-                    result = cur.fetchone()
-
-                    # If no subscription found, create a free tier subscription for this user
-                    if not result or not result[0]:
-                        logger.info(f"No subscription found for user {user_id} - creating free tier subscription")
-                        # Create a free tier subscription
-                        cur.execute("""
-                            INSERT INTO subscriptions (
-                                user_id, subscription_type, payment_provider,
-                                monthly_amount, currency, status
-                            ) VALUES (%s, 'free', 'none', 0.00, 'USD', 'active')
-                            RETURNING id
-                        """, (user_id,))
-                        new_subscription_id = cur.fetchone()[0]
-
-                        # Update the user's profile with the new subscription
-                        cur.execute("""
-                            UPDATE user_profiles
-                            SET subscription_id = %s
-                            WHERE id = %s
-                        """, (new_subscription_id, user_id))
-
-                        conn.commit()
-                        logger.info(f"Created free tier subscription {new_subscription_id} for user {user_id}")
-                else:
-                    # For client accounts, make sure their organization has a subscription
-                    if organization_id:
+        # Ensure a subscription record exists. Skipped when a cached entitlement
+        # already points at one, so repeat status calls don't re-query the profile.
+        cached = entitlement_cache.get(
+            ('organization', organization_id) if is_client else ('user', user_id)
+        )
+        if cached is None or cached.subscription_id is None:
+            conn = None
+            try:
+                conn = get_db_connection()
+                with conn.cursor() as cur:
+                    # First, check if user has a subscription record in their profile
+                    if account_type != 'client':  # For non-client accounts
                         cur.execute("""
-                            SELECT subscription_id FROM organizations
+                            SELECT subscription_id FROM user_profiles
                             WHERE id = %s
-                        """, (organization_id,))
+                        """, (user_id,))
                         result = cur.fetchone()
 
-                        # If no subscription found, create a free tier subscription for this organization
+                        # If no subscription found, create a free tier subscription for this user
                         if not result or not result[0]:
-                            logger.info(f"No subscription found for organization {organization_id} - creating free tier subscription")
+                            logger.info(f"No subscription found for user {user_id} - creating free tier subscription")
                             # Create a free tier subscription
                             cur.execute("""
                                 INSERT INTO subscriptions (
-                                    organization_id, subscription_type, payment_provider,
+                                    user_id, subscription_type, payment_provider,
                                     monthly_amount, currency, status
                                 ) VALUES (%s, 'free', 'none', 0.00, 'USD', 'active')
                                 RETURNING id
-                            """, (organization_id,))
+                            """, (user_id,))
                             new_subscription_id = cur.fetchone()[0]
 
-                            # Update the organization with the new subscription
+                            # Update the user's profile with the new subscription
                             cur.execute("""
-                                UPDATE organizations
+                                UPDATE user_profiles
                                 SET subscription_id = %s
                                 WHERE id = %s
-                            """, (new_subscription_id, organization_id))
+                            """, (new_subscription_id, user_id))
 
                             conn.commit()
-                            logger.info(f"Created free tier subscription {new_subscription_id} for organization {organization_id}")
-        except Exception as e:
-            logger.error(f"Error ensuring free tier subscription: {str(e)}", exc_info=True)
-            if conn:
-                conn.rollback()
-        finally:
-            if conn:
-                conn.close()
+                            entitlement_cache.invalidate(user_id=user_id)
+                            logger.info(f"Created free tier subscription {new_subscription_id} for user {user_id}")
+                    else:
+                        # For client accounts, make sure their organization has a subscription
+                        if organization_id:
+                            cur.execute("""
+                                SELECT subscription_id FROM organizations
+                                WHERE id = %s
+                            """, (organization_id,))
+                            result = cur.fetchone()
+
+                            # If no subscription found, create a free tier subscription for this organization
+                            if not result or not result[0]:
+                                logger.info(f"No subscription found for organization {organization_id} - creating free tier subscription")
+                                # Create a free tier subscription
+                                cur.execute("""
+                                    INSERT INTO subscriptions (
+                                        organization_id, subscription_type, payment_provider,
+                                        monthly_amount, currency, status
+                                    ) VALUES (%s, 'free', 'none', 0.00, 'USD', 'active')
+                                    RETURNING id
+                                """, (organization_id,))
+                                new_subscription_id = cur.fetchone()[0]
+
+                                # Update the organization with the new subscription
+                                cur.execute("""
+                                    UPDATE organizations
+                                    SET subscription_id = %s
+                                    WHERE id = %s
+                                """, (new_subscription_id, organization_id))
+
+                                conn.commit()
+                                entitlement_cache.invalidate(organization_id=organization_id)
+                                logger.info(f"Created free tier subscription {new_subscription_id} for organization {organization_id}")
+            except Exception as e:
+                logger.error(f"Error ensuring free tier subscription: {str(e)}", exc_info=True)
+                if conn:
+                    conn.rollback()
+            finally:
+                if conn:
+                    conn.close()
 
         # Now check subscription access normally - users should all have access now
         has_subscription_access = check_user_subscription_access(
@@ -617,20 +632,18 @@ STRIPE_WEBHOOK_SECRET = ""
 if ENABLE_SUBSCRIPTION_FEATURES and STRIPE_AVAILABLE:
     # Configure Stripe
     if stripe is not None:
-        stripe.api_key = os.getenv("STRIPE_SECRET_KEY", "")
+        # stripe.api_key is set from STRIPE_SECRET_KEY when the SDK is first used
         STRIPE_INDIVIDUAL_PRICE_ID = os.getenv("STRIPE_INDIVIDUAL_PRICE_ID", "")
         STRIPE_ORGANIZATION_PRICE_ID = os.getenv("STRIPE_ORGANIZATION_PRICE_ID", "")
         STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
 
         # Log configuration
-        logger.info(f"Stripe configured: API Key present: {bool(stripe.api_key)}")
+        logger.info(f"Stripe configured: API Key present: {bool(os.getenv('STRIPE_SECRET_KEY'))}")
         logger.info(f"Stripe Individual Price ID: {STRIPE_INDIVIDUAL_PRICE_ID}")
         logger.info(f"Stripe Organization Price ID: {STRIPE_ORGANIZATION_PRICE_ID}")
     
-    # Configure PayPal
-    try:
-        import paypalrestsdk
-        
+    # Configure PayPal (SDK imported lazily on first use)
+    if is_module_available("paypalrestsdk"):
         PAYPAL_CLIENT_ID = os.getenv("PAYPAL_CLIENT_ID", "")
         PAYPAL_CLIENT_SECRET = os.getenv("PAYPAL_CLIENT_SECRET", "")
         PAYPAL_MODE = os.getenv("PAYPAL_MODE", "sandbox")  # sandbox or live
@@ -639,27 +652,30 @@ if ENABLE_SUBSCRIPTION_FEATURES and STRIPE_AVAILABLE:
         
         # Only configure if credentials are present
         if PAYPAL_CLIENT_ID and PAYPAL_CLIENT_SECRET:
-            try:
-                # Configure PayPal SDK
-                paypalrestsdk.configure({
-                    "mode": PAYPAL_MODE,
-                    "client_id": PAYPAL_CLIENT_ID,
-                    "client_secret": PAYPAL_CLIENT_SECRET
-                })
-                
-                # Log configuration (with debug info)
-                logger.info(f"PayPal configured: Client ID present: {bool(PAYPAL_CLIENT_ID)}")
-                logger.info(f"PayPal Mode: '{PAYPAL_MODE}' (length: {len(PAYPAL_MODE)})")
-                logger.info(f"PayPal Client ID starts with: {PAYPAL_CLIENT_ID[:10]}...")
-                logger.info(f"PayPal Client Secret present: {bool(PAYPAL_CLIENT_SECRET)} (length: {len(PAYPAL_CLIENT_SECRET)})")
-                logger.info(f"PayPal Webhook ID present: {bool(PAYPAL_WEBHOOK_ID)}")
-            except Exception as config_error:
-                logger.error(f"Error configuring PayPal SDK: {str(config_error)}")
-                paypalrestsdk = None
+            def _configure_paypal(module):
+                try:
+                    # Configure PayPal SDK
+                    module.configure({
+                        "mode": PAYPAL_MODE,
+                        "client_id": PAYPAL_CLIENT_ID,
+                        "client_secret": PAYPAL_CLIENT_SECRET
+                    })
+                except Exception as config_error:
+                    logger.error(f"Error configuring PayPal SDK: {str(config_error)}")
+
+            paypalrestsdk = lazy_import("paypalrestsdk", on_load=_configure_paypal)
+            
+            # Log configuration (with debug info)
+            logger.info(f"PayPal configured: Client ID present: {bool(PAYPAL_CLIENT_ID)}")
+            logger.info(f"PayPal Mode: '{PAYPAL_MODE}' (length: {len(PAYPAL_MODE)})")
+            logger.info(f"PayPal Client ID starts with: {PAYPAL_CLIENT_ID[:10]}...")
+            logger.info(f"PayPal Client Secret present: {bool(PAYPAL_CLIENT_SECRET)} (length: {len(PAYPAL_CLIENT_SECRET)})")
+            logger.info(f"PayPal Webhook ID present: {bool(PAYPAL_WEBHOOK_ID)}")
         else:
+            paypalrestsdk = lazy_import("paypalrestsdk")
             logger.warning("PayPal credentials not found. PayPal integration will be limited.")
         
-    except ImportError:
+    else:
         logger.warning("PayPal SDK not installed. PayPal integration will be disabled.")
         paypalrestsdk = None
         # Define PayPal variables as None when SDK is not available
@@ -1476,10 +1492,12 @@ async def create_checkout_session(
 @router.post("/webhooks/stripe")
 async def stripe_webhook_handler(request: Request):
     """
-    Handle Stripe webhook events for subscription lifecycle
+    Acknowledge Stripe webhook events for subscription lifecycle
+
+    The verified event is recorded and handed to the background worker in
+    app.utils.stripe_events, which applies it via dispatch_stripe_event.
     """
-    logger.info("🔔 Received Stripe webhook - processing...")
-    logger.info(f"Request headers: {dict(request.headers)}")
+    logger.info("🔔 Received Stripe webhook")
 
     if not ENABLE_SUBSCRIPTION_FEATURES or not stripe:
         logger.error("❌ Stripe integration is not available - check ENABLE_SUBSCRIPTION_FEATURES and stripe module")
@@ -1499,7 +1517,6 @@ async def stripe_webhook_handler(request: Request):
 
     # Get the webhook secret
     webhook_secret = STRIPE_WEBHOOK_SECRET
-    logger.info(f"🔑 Webhook secret exists: {bool(webhook_secret)}")
     if not webhook_secret:
         logger.error("❌ Stripe webhook secret not configured - check STRIPE_WEBHOOK_SECRET env variable")
         return JSONResponse(
@@ -1510,20 +1527,15 @@ async def stripe_webhook_handler(request: Request):
     # Get the request body
     try:
         payload = await request.body()
-        logger.info(f"📦 Webhook payload received (first 100 chars): {payload[:100]}")
 
         # Verify the event using the signature and secret
         try:
-            logger.info(f"🔒 Attempting to verify webhook signature...")
             event = stripe.Webhook.construct_event(
                 payload, signature, webhook_secret
             )
-            logger.info(f"✅ Webhook signature verified successfully!")
         except ValueError as e:
             # Invalid payload
             logger.error(f"❌ Invalid webhook payload: {str(e)}")
-            # Log the full payload for debugging
-            logger.error(f"Full payload: {payload}")
             return JSONResponse(
                 status_code=400,
                 content={"detail": "Invalid payload"}
@@ -1531,148 +1543,38 @@ async def stripe_webhook_handler(request: Request):
         except stripe.error.SignatureVerificationError as e:
             # Invalid signature
             logger.error(f"❌ Invalid webhook signature: {str(e)}")
-            logger.error(f"Provided signature: {signature}")
-            logger.error(f"Used webhook secret (first 4 chars): {webhook_secret[:4]}***")
             return JSONResponse(
                 status_code=400,
                 content={"detail": "Invalid signature"}
             )
 
-        # Extract event data
         event_id = event.id
         event_type = event.type
-        event_data = event.data.object
-
         logger.info(f"🎯 Received Stripe webhook event: {event_type} ({event_id})")
-        logger.info(f"📅 Event timestamp: {datetime.now().isoformat()}")
-
-        # First log event to database regardless of type
-        try:
-            # Record the event in our database for audit/debugging
-            with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
-                # Try to find associated subscription
-                sub_id = None
-                if hasattr(event_data, 'subscription'):
-                    # Try to look up by stripe_subscription_id
-                    cur.execute("""
-                        SELECT id FROM subscriptions
-                        WHERE stripe_subscription_id = %s
-                    """, (event_data.subscription,))
-                    result = cur.fetchone()
-                    if result:
-                        sub_id = result[0]
 
-                # If no subscription found but customer exists, try by customer
-                if not sub_id and hasattr(event_data, 'customer'):
-                    cur.execute("""
-                        SELECT id FROM subscriptions
-                        WHERE stripe_customer_id = %s
-                    """, (event_data.customer,))
-                    result = cur.fetchone()
-                    if result:
-                        sub_id = result[0]
-
-                # Log the event regardless of whether we have a subscription ID
-                # Use a placeholder ID of -1 if we don't have a real one yet
-                cur.execute("""
-                    INSERT INTO subscription_events (
-                        subscription_id, event_type, event_data, payment_provider,
-                        provider_event_id, processed, processed_at
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                """, (
-                    sub_id or -1,  # Use -1 as placeholder if no subscription yet
-                    event_type,
-                    str(event_data),
-                    'stripe',
-                    event_id,
-                    False,  # Mark as unprocessed initially
-                    None    # Initially no processed time
-                ))
-                webhook_event_id = cur.fetchone()[0]
-                logger.info(f"📝 Recorded webhook event in database with ID: {webhook_event_id}")
-        except Exception as e:
-            logger.error(f"❌ Failed to log webhook event to database: {str(e)}", exc_info=True)
-            # Continue processing even if logging fails
-
-        # Handle different event types
-        if event_type == "checkout.session.completed":
-            # A checkout session has completed successfully
-            await handle_checkout_completed(event_data)
-        elif event_type == "customer.subscription.created":
-            # A subscription has been created
-            await handle_subscription_created(event_data)
-        elif event_type == "customer.subscription.updated":
-            # A subscription has been updated
-            await handle_subscription_updated(event_data)
-        elif event_type == "customer.subscription.deleted":
-            # A subscription has been cancelled
-            await handle_subscription_deleted(event_data)
-        elif event_type == "invoice.paid":
-            # An invoice has been paid
-            await handle_invoice_paid(event_data)
-        elif event_type == "invoice.payment_failed":
-            # An invoice payment has failed
-            await handle_invoice_payment_failed(event_data)
-        else:
-            # Other events - just log them
-            logger.info(f"Unhandled Stripe event type: {event_type}")
-
-        # Always mark the webhook as processed and return success, even if we didn't handle it
-        # This prevents Stripe from retrying and potentially creating duplicate records
-        try:
-            with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
-                # Check if processed_at column exists
-                try:
-                    cur.execute("""
-                        SELECT EXISTS (
-                            SELECT FROM information_schema.columns
-                            WHERE table_name = 'subscription_events'
-                            AND column_name = 'processed_at'
-                        )
-                    """)
-                    has_processed_at = cur.fetchone()[0]
-                except Exception:
-                    has_processed_at = False
-
-                # Update the event as processed if we recorded it earlier
-                if 'webhook_event_id' in locals():
-                    try:
-                        if has_processed_at:
-                            cur.execute("""
-                                UPDATE subscription_events
-                                SET processed = TRUE, processed_at = CURRENT_TIMESTAMP
-                                WHERE id = %s
-                            """, (webhook_event_id,))
-                        else:
-                            # Fallback if processed_at column doesn't exist
-                            cur.execute("""
-                                UPDATE subscription_events
-                                SET processed = TRUE
-                                WHERE id = %s
-                            """, (webhook_event_id,))
-                        logger.info(f"✅ Marked webhook event {webhook_event_id} as processed")
-                    except Exception as update_error:
-                        # Don't let update errors prevent processing
-                        logger.error(f"❌ Error marking webhook as processed: {str(update_error)}")
-                        # Try simpler update as last resort
-                        try:
-                            cur.execute("""
-                                UPDATE subscription_events
-                                SET processed = TRUE
-                                WHERE id = %s
-                            """, (webhook_event_id,))
-                            logger.info(f"✅ Marked webhook event {webhook_event_id} as processed (simple update)")
-                        except Exception as final_error:
-                            logger.error(f"❌ Final error marking webhook as processed: {str(final_error)}")
-        except Exception as e:
-            logger.error(f"❌ Failed to mark webhook as processed: {str(e)}")
+        # Record the event (redeliveries map to the row already stored) and queue it.
+        # The subscription id is filled in once the worker has applied the event.
+        webhook_event_id = log_subscription_event(
+            -1,
+            event_type,
+            payload.decode("utf-8"),
+            'stripe',
+            provider_event_id=event_id,
+            ordering_key=stripe_event_ordering_key(event.data.object),
+            event_created=datetime.fromtimestamp(event.created, timezone.utc)
+        )
+        if webhook_event_id is None:
+            # Not acknowledged, so Stripe retries the delivery
+            return JSONResponse(
+                status_code=500,
+                content={"detail": "Could not record webhook event"}
+            )
 
-        # Return a success response
-        logger.info("🎉 Webhook processing completed successfully")
+        stripe_event_worker.wake()
+        logger.info(f"📝 Queued webhook event {event_id} as {webhook_event_id}")
         return JSONResponse(
             status_code=200,
-            content={"detail": "Webhook processed successfully"}
+            content={"detail": "Webhook received"}
         )
     except Exception as e:
         logger.error(f"❌ Error processing Stripe webhook: {str(e)}", exc_info=True)
@@ -1701,6 +1603,78 @@ async def stripe_webhook_handler(request: Request):
             content={"detail": f"Error processing webhook: {str(e)}"}
         )
 
+def _local_subscription_id(event_data):
+    """Our subscriptions.id for a Stripe event object, by Stripe subscription and then customer"""
+    with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
+        stripe_subscription_id = (
+            event_data.get("id") if event_data.get("object") == "subscription" else event_data.get("subscription")
+        )
+        if stripe_subscription_id:
+            cur.execute("""
+                SELECT id FROM subscriptions
+                WHERE stripe_subscription_id = %s
+            """, (stripe_subscription_id,))
+            result = cur.fetchone()
+            if result:
+                return result[0]
+
+        if event_data.get("customer"):
+            cur.execute("""
+                SELECT id FROM subscriptions
+                WHERE stripe_customer_id = %s
+            """, (event_data.get("customer"),))
+            result = cur.fetchone()
+            if result:
+                return result[0]
+    return None
+
+async def dispatch_stripe_event(payload):
+    """
+    Apply one recorded Stripe event (called by app.utils.stripe_events)
+
+    Handler errors propagate so the worker can retry. Returns our subscription
+    id for the event, if it maps to one.
+    """
+    event = stripe.Event.construct_from(
+        payload if isinstance(payload, dict) else json.loads(payload), stripe.api_key
+    )
+    event_type = event.type
+    event_data = event.data.object
+    logger.info(f"Processing Stripe event: {event_type} ({event.id})")
+
+    # Handle different event types
+    if event_type == "checkout.session.completed":
+        # A checkout session has completed successfully
+        await handle_checkout_completed(event_data)
+    elif event_type == "customer.subscription.created":
+        # A subscription has been created
+        await handle_subscription_created(event_data)
+    elif event_type == "customer.subscription.updated":
+        # A subscription has been updated
+        await handle_subscription_updated(event_data)
+    elif event_type == "customer.subscription.deleted":
+        # A subscription has been cancelled
+        await handle_subscription_deleted(event_data)
+    elif event_type == "invoice.paid":
+        # An invoice has been paid
+        await handle_invoice_paid(event_data)
+    elif event_type == "invoice.payment_failed":
+        # An invoice payment has failed
+        await handle_invoice_payment_failed(event_data)
+    else:
+        # Other events - just log them
+        logger.info(f"Unhandled Stripe event type: {event_type}")
+
+    sub_id = _local_subscription_id(event_data)
+
+    # Cached access decisions for this subscription are stale now. Events that can
+    # attach a new subscription to an account (or that we couldn't map) drop the lot.
+    if sub_id and event_type not in ("checkout.session.completed", "customer.subscription.created"):
+        entitlement_cache.invalidate_subscription(sub_id)
+    else:
+        entitlement_cache.clear()
+    return sub_id
+
 # Helper functions for handling Stripe webhook events
 async def handle_checkout_completed(event_data):
     """Handle checkout.session.completed event"""
@@ -1936,6 +1910,7 @@ async def handle_checkout_completed(event_data):
 
     except Exception as e:
         logger.error(f"Error handling checkout completed: {str(e)}", exc_info=True)
+        raise
 
 async def handle_subscription_created(event_data):
     """Handle customer.subscription.created event"""
@@ -2149,6 +2124,7 @@ async def handle_subscription_created(event_data):
 
     except Exception as e:
         logger.error(f"Error handling subscription created: {str(e)}", exc_info=True)
+        raise
 
 async def handle_subscription_updated(event_data):
     """Handle customer.subscription.updated event"""
@@ -2279,6 +2255,7 @@ async def handle_subscription_updated(event_data):
 
     except Exception as e:
         logger.error(f"Error handling subscription updated: {str(e)}", exc_info=True)
+        raise
 
 async def handle_subscription_deleted(event_data):
     """Handle customer.subscription.deleted event"""
@@ -2324,6 +2301,7 @@ async def handle_subscription_deleted(event_data):
 
     except Exception as e:
         logger.error(f"Error handling subscription deleted: {str(e)}", exc_info=True)
+        raise
 
 async def handle_invoice_paid(event_data):
     """Handle invoice.paid event"""
@@ -2393,6 +2371,7 @@ async def handle_invoice_paid(event_data):
 
     except Exception as e:
         logger.error(f"Error handling invoice paid: {str(e)}", exc_info=True)
+        raise
 
 async def handle_invoice_payment_failed(event_data):
     """Handle invoice.payment_failed event"""
@@ -2470,6 +2449,7 @@ async def handle_invoice_payment_failed(event_data):
 
     except Exception as e:
         logger.error(f"Error handling invoice payment failed: {str(e)}", exc_info=True)
+        raise
 
 @router.post("/webhooks/paypal")
 async def paypal_webhook_handler(request: Request):
@@ -2488,10 +2468,10 @@ async def paypal_webhook_handler(request: Request):
     try:
         # Get the webhook data
         payload = await request.body()
-        headers = dict(request.headers)
         
         logger.info(f"📦 PayPal webhook payload received")
-        logger.info(f"📋 Headers: {headers}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📋 Headers: %s", redact_headers(request.headers))
         
         # Parse the JSON payload
         import json
@@ -2515,6 +2495,9 @@ async def paypal_webhook_handler(request: Request):
             await handle_paypal_payment_failed(resource)
         else:
             logger.info(f"Unhandled PayPal event type: {event_type}")
+
+        # PayPal events aren't mapped to a local subscription id, so drop every cached decision
+        entitlement_cache.clear()
         
         # Log the event to database
         try:
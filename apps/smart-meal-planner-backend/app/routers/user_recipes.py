@@ -1,12 +1,13 @@
 # app/routers/user_recipes.py
 
 from fastapi import APIRouter, HTTPException, Depends, status, Query
-from app.db import get_db_connection
+from app.db import get_db_connection, session_cursor
 from app.models.user import (
     UserRecipe, UserRecipeCreate, UserRecipeUpdate, UserRecipeListItem,
     UserRecipeIngredient, UserRecipeStep
 )
 from app.utils.auth_utils import get_user_from_token
+from app.utils.recipe_search import search_filter
 import json
 import logging
 from typing import List, Optional
@@ -17,18 +18,14 @@ logger = logging.getLogger(__name__)
 
 def get_user_organization_id(user_id: int) -> Optional[int]:
     """Get the organization ID for a user if they own an organization"""
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT id FROM organizations 
-                WHERE owner_id = %s
-            """, (user_id,))
-            
-            result = cur.fetchone()
-            return result[0] if result else None
-    finally:
-        conn.close()
+    with session_cursor(dict_cursor=False) as (cur, conn):
+        cur.execute("""
+            SELECT id FROM organizations 
+            WHERE owner_id = %s
+        """, (user_id,))
+        
+        result = cur.fetchone()
+        return result[0] if result else None
 
 # Get User Recipes
 
@@ -75,8 +72,9 @@ async def get_user_recipes(
             
             # Add search filter
             if search:
-                where_conditions.append("ur.title ILIKE %s")
-                params.append(f"%{search}%")
+                search_sql, search_params = search_filter("ur.id", "user", search)
+                where_conditions.append(search_sql)
+                params.extend(search_params)
             
             # Add cuisine filter
             if cuisine:
@@ -701,8 +699,9 @@ async def get_user_recipes_by_organization(
             
             # Add search filter
             if search:
-                where_conditions.append("ur.title ILIKE %s")
-                params.append(f"%{search}%")
+                search_sql, search_params = search_filter("ur.id", "user", search)
+                where_conditions.append(search_sql)
+                params.extend(search_params)
             
             # Add cuisine filter
             if cuisine:
@@ -0,0 +1,184 @@
+# app/utils/branding_cache.py
+"""
+Compiled public branding for client-facing pages.
+
+GET /api/organization-branding/{id}/branding/public is unauthenticated and
+requested on every client page load. Each organization's public branding is
+now compiled once into the exact response bytes plus a strong ETag, and served
+from this cache until the owner changes it (update, logo upload and reset
+invalidate the entry) or BRANDING_CACHE_TTL_S passes, which bounds how long
+another worker can serve a copy compiled before that change.
+
+Responses carry Cache-Control with stale-while-revalidate so browsers and a
+CDN can keep serving the previous branding while they revalidate it.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from .http_cache import strong_etag
+from .s3.s3_utils import stored_variant_urls
+
+logger = logging.getLogger(__name__)
+
+BRANDING_CACHE_TTL_S = float(os.getenv("BRANDING_CACHE_TTL_S", "300"))
+BRANDING_MAX_AGE_S = int(os.getenv("BRANDING_MAX_AGE_S", "60"))
+BRANDING_STALE_WHILE_REVALIDATE_S = int(os.getenv("BRANDING_STALE_WHILE_REVALIDATE_S", "600"))
+BRANDING_CACHE_SIZE = int(os.getenv("BRANDING_CACHE_SIZE", "10000"))
+
+BRANDING_CACHE_CONTROL = (
+    f"public, max-age={BRANDING_MAX_AGE_S}, stale-while-revalidate={BRANDING_STALE_WHILE_REVALIDATE_S}"
+)
+
+# Returned when an organization has no settings row (or its branding can't be read)
+DEFAULT_PUBLIC_BRANDING = {
+    "visual": {
+        "primaryColor": "#4caf50",
+        "secondaryColor": "#ff9800",
+        "logoUrl": None,
+        "fontFamily": "Roboto"
+    },
+    "messaging": {
+        "platformName": "Smart Meal Planner"
+    }
+}
+
+CompiledBranding = namedtuple("CompiledBranding", ["body", "etag", "expires_at"])
+
+PUBLIC_BRANDING_SQL = """
+    SELECT organization_id, branding_settings
+    FROM organization_settings
+    WHERE organization_id = ANY(%s)
+"""
+
+
+def parse_branding_settings(branding_settings):
+    """branding_settings as a dict; older rows hold it as a JSON string"""
+    branding_settings = branding_settings or {}
+
+    # If branding_settings is a string, try to parse it
+    if isinstance(branding_settings, str):
+        try:
+            branding_settings = json.loads(branding_settings)
+        except json.JSONDecodeError:
+            logger.error(f"Invalid JSON in public branding_settings: {branding_settings}")
+            branding_settings = {}
+    return branding_settings
+
+
+def public_branding(branding_settings, logo_variants):
+    """
+    The public-safe subset of parsed branding_settings. logo_variants maps
+    logo URLs to their recorded variants (see stored_variant_urls).
+    """
+    visual = branding_settings.get('visual', {})
+    messaging = branding_settings.get('messaging', {})
+    features = branding_settings.get('features', {})
+    return {
+        "visual": {
+            "primaryColor": visual.get('primaryColor', '#4caf50'),
+            "secondaryColor": visual.get('secondaryColor', '#ff9800'),
+            "accentColor": visual.get('accentColor', '#2196f3'),
+            "logoUrl": visual.get('logoUrl'),
+            "logoVariants": logo_variants.get(visual.get('logoUrl'), {}),
+            "fontFamily": visual.get('fontFamily', 'Roboto'),
+            "customCSS": visual.get('customCSS', '')
+        },
+        "layout": branding_settings.get('layout', {}),
+        "messaging": {
+            "platformName": messaging.get('platformName'),
+            "tagline": messaging.get('tagline'),
+            "footerText": messaging.get('footerText'),
+            "supportEmail": messaging.get('supportEmail'),
+            "supportPhone": messaging.get('supportPhone')
+        },
+        "features": {
+            "showPoweredBy": features.get('showPoweredBy', True),
+            "hideDefaultLogo": features.get('hideDefaultLogo', False)
+        }
+    }
+
+
+def compile_branding(branding, ttl_s=BRANDING_CACHE_TTL_S):
+    body = json.dumps(branding, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return CompiledBranding(body, strong_etag(body), time.monotonic() + ttl_s)
+
+
+# Compiled once and shared by every organization without a settings row
+DEFAULT_COMPILED_BRANDING = compile_branding(DEFAULT_PUBLIC_BRANDING, ttl_s=0)
+
+
+class BrandingCache:
+    """CompiledBranding by organization id"""
+
+    def __init__(self, max_entries=BRANDING_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, organization_id):
+        with self._lock:
+            compiled = self._entries.get(organization_id)
+            if compiled is not None and compiled.expires_at > time.monotonic():
+                self.hits += 1
+                return compiled
+            self.misses += 1
+            return None
+
+    def put(self, organization_id, compiled):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[organization_id] = compiled
+
+    def invalidate(self, organization_id):
+        with self._lock:
+            self._entries.pop(organization_id, None)
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+branding_cache = BrandingCache()
+
+
+def get_compiled_brandings(organization_ids):
+    """CompiledBranding for each id (the default one where there is none), reading only the misses"""
+    compiled = {}
+    missing = []
+    for organization_id in organization_ids:
+        cached = branding_cache.get(organization_id)
+        if cached is not None:
+            compiled[organization_id] = cached
+        else:
+            missing.append(organization_id)
+
+    if missing:
+        from app.db import session_cursor
+
+        with session_cursor(dict_cursor=False) as (cur, conn):
+            cur.execute(PUBLIC_BRANDING_SQL, (missing,))
+            rows = cur.fetchall()
+        settings = {organization_id: parse_branding_settings(branding_settings)
+                    for organization_id, branding_settings in rows}
+        # One variant lookup for every logo in the batch
+        logo_urls = [branding.get('visual', {}).get('logoUrl') for branding in settings.values()]
+        logo_variants = stored_variant_urls([url for url in logo_urls if url])
+        for organization_id, branding_settings in settings.items():
+            compiled[organization_id] = compile_branding(public_branding(branding_settings, logo_variants))
+        default = DEFAULT_COMPILED_BRANDING._replace(expires_at=time.monotonic() + BRANDING_CACHE_TTL_S)
+        for organization_id in missing:
+            compiled.setdefault(organization_id, default)
+            branding_cache.put(organization_id, compiled[organization_id])
+
+    return compiled
+
+
+def get_compiled_branding(organization_id):
+    return get_compiled_brandings([organization_id])[organization_id]
@@ -0,0 +1,246 @@
+# app/utils/cart_store.py
+"""
+Postgres-backed internal carts.
+
+routers/cart.py kept every user's cart in a module-level dict, so carts were
+lost on restart and differed between gunicorn workers. Carts now live in
+internal_cart_items, one row per (user, store, item name), next to a per-user
+internal_carts row whose version every write bumps.
+
+A write runs in one transaction that bumps the version first. That also locks
+the cart row, so concurrent updates to one cart, from any worker, apply one
+after another. The cart is re-read inside the same transaction and written
+through to an in-process cache. Reads compare the cached version with
+internal_carts (a primary-key lookup) and only reload the items when another
+worker changed the cart.
+
+Adding an item that is already in that store section adds to its quantity.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+CART_CACHE_SIZE = int(os.getenv("CART_CACHE_SIZE", "5000"))
+
+# Sections every cart has, even when empty
+DEFAULT_STORES = ("instacart", "kroger", "unassigned")
+
+VERSION_SQL = "SELECT version FROM internal_carts WHERE user_id = %s"
+
+# One statement, so the version and items come from the same snapshot
+CART_SQL = """
+    SELECT c.version, i.store, i.name, i.quantity, i.store_preference, i.details
+    FROM internal_carts c
+    LEFT JOIN internal_cart_items i ON i.user_id = c.user_id
+    WHERE c.user_id = %s
+    ORDER BY i.id
+"""
+
+BUMP_VERSION_SQL = """
+    INSERT INTO internal_carts (user_id) VALUES (%s)
+    ON CONFLICT (user_id) DO UPDATE
+    SET version = internal_carts.version + 1, updated_at = CURRENT_TIMESTAMP
+    RETURNING version
+"""
+
+UPSERT_ITEMS_SQL = """
+    INSERT INTO internal_cart_items (user_id, store, name, quantity, store_preference, details)
+    VALUES %s
+    ON CONFLICT (user_id, store, name) DO UPDATE
+    SET quantity = internal_cart_items.quantity + EXCLUDED.quantity,
+        store_preference = COALESCE(EXCLUDED.store_preference, internal_cart_items.store_preference),
+        details = COALESCE(EXCLUDED.details, internal_cart_items.details),
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+UPSERT_ITEMS_TEMPLATE = "(%s, %s, %s, %s, %s, %s::jsonb)"
+
+TAKE_ITEMS_SQL = """
+    DELETE FROM internal_cart_items
+    WHERE user_id = %s AND store = %s AND name = ANY(%s)
+    RETURNING name, quantity, details
+"""
+
+REMOVE_ITEM_SQL = "DELETE FROM internal_cart_items WHERE user_id = %s AND store = %s AND name = %s"
+
+CLEAR_STORE_SQL = "DELETE FROM internal_cart_items WHERE user_id = %s AND store = %s"
+
+CLEAR_CART_SQL = "DELETE FROM internal_cart_items WHERE user_id = %s"
+
+SET_QUANTITY_SQL = """
+    UPDATE internal_cart_items
+    SET quantity = %s, updated_at = CURRENT_TIMESTAMP
+    WHERE user_id = %s AND store = %s AND name = %s
+"""
+
+
+class CartCache:
+    """(version, cart) by user id, least recently used evicted first"""
+
+    def __init__(self, max_users=CART_CACHE_SIZE):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+            return entry
+
+    def put(self, user_id, version, cart):
+        with self._lock:
+            # Two writers can finish out of order; never replace a newer cart
+            current = self._entries.get(user_id)
+            if current is not None and current[0] > version:
+                return
+            self._entries[user_id] = (version, cart)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+cart_cache = CartCache()
+
+
+def _build_cart(rows):
+    cart = {store: [] for store in DEFAULT_STORES}
+    for row in rows:
+        # A cart without items comes back as a single row of NULL item columns
+        if row["name"] is None:
+            continue
+        cart.setdefault(row["store"], []).append({
+            "name": row["name"],
+            "quantity": row["quantity"],
+            "store_preference": row["store_preference"],
+            "details": row["details"],
+        })
+    return cart
+
+
+def get_cart(user_id):
+    """The user's cart as {store: [item, ...]}; shared with the cache, so treat it as read-only"""
+    from app.db import session_cursor
+
+    user_id = int(user_id)
+    cached = cart_cache.get(user_id)
+    with session_cursor(dict_cursor=True) as (cur, conn):
+        if cached is not None:
+            cur.execute(VERSION_SQL, (user_id,))
+            row = cur.fetchone()
+            if (row["version"] if row else 0) == cached[0]:
+                cart_cache.hits += 1
+                return cached[1]
+        cart_cache.misses += 1
+        cur.execute(CART_SQL, (user_id,))
+        rows = cur.fetchall()
+
+    cart = _build_cart(rows)
+    cart_cache.put(user_id, rows[0]["version"] if rows else 0, cart)
+    return cart
+
+
+def _write(user_id, apply):
+    """Run apply(cur, user_id) holding the cart's row lock; returns (cart, apply's result)"""
+    from app.db import get_db_cursor
+
+    user_id = int(user_id)
+    with get_db_cursor(dict_cursor=True) as (cur, conn):
+        cur.execute(BUMP_VERSION_SQL, (user_id,))
+        version = cur.fetchone()["version"]
+        result = apply(cur, user_id)
+        cur.execute(CART_SQL, (user_id,))
+        rows = cur.fetchall()
+        conn.commit()
+
+    cart = _build_cart(rows)
+    cart_cache.put(user_id, version, cart)
+    return cart, result
+
+
+def _upsert_items(cur, user_id, items):
+    """Upsert (store, name, quantity, store_preference, details) items in one batch"""
+    from psycopg2.extras import execute_values
+
+    # ON CONFLICT can't touch a row twice in one statement, so merge repeats first
+    merged = {}
+    for store, name, quantity, store_preference, details in items:
+        key = (store, name)
+        if key in merged:
+            previous = merged[key]
+            merged[key] = (store, name, previous[2] + quantity,
+                           store_preference or previous[3], details or previous[4])
+        else:
+            merged[key] = (store, name, quantity, store_preference, details)
+
+    rows = [
+        (user_id, store, name, quantity, store_preference, json.dumps(details) if details is not None else None)
+        for store, name, quantity, store_preference, details in merged.values()
+    ]
+    if rows:
+        execute_values(cur, UPSERT_ITEMS_SQL, rows, template=UPSERT_ITEMS_TEMPLATE, page_size=500)
+    return len(rows)
+
+
+def add_items(user_id, items):
+    """Add (store, name, quantity, store_preference, details) items; returns the updated cart"""
+    items = list(items)
+    return _write(user_id, lambda cur, uid: _upsert_items(cur, uid, items))[0]
+
+
+def assign_store(user_id, names, store):
+    """Move the named unassigned items to ``store``; returns the updated cart"""
+    names = list(set(names))
+
+    def apply(cur, uid):
+        cur.execute(TAKE_ITEMS_SQL, (uid, "unassigned", names))
+        moved = [(store, row["name"], row["quantity"], store, row["details"]) for row in cur.fetchall()]
+        return _upsert_items(cur, uid, moved)
+
+    return _write(user_id, apply)[0]
+
+
+def _execute(sql, params):
+    def apply(cur, uid):
+        cur.execute(sql, (uid,) + params)
+        return cur.rowcount
+
+    return apply
+
+
+def remove_item(user_id, store, name):
+    """Remove the item from that store section; returns (cart, rows removed)"""
+    return _write(user_id, _execute(REMOVE_ITEM_SQL, (store, name)))
+
+
+def set_quantity(user_id, store, name, quantity):
+    """Returns (cart, rows updated); 0 rows means the item isn't in that section"""
+
+    def apply(cur, uid):
+        cur.execute(SET_QUANTITY_SQL, (quantity, uid, store, name))
+        return cur.rowcount
+
+    return _write(user_id, apply)
+
+
+def clear_store(user_id, store):
+    return _write(user_id, _execute(CLEAR_STORE_SQL, (store,)))[0]
+
+
+def clear_cart(user_id):
+    return _write(user_id, _execute(CLEAR_CART_SQL, ()))[0]
@@ -0,0 +1,212 @@
+# app/utils/entitlements.py
+"""
+Entitlement service: cached subscription access decisions.
+
+Premium-gated requests (require_active_subscription) used to join
+subscriptions with user_profiles/organizations on every call. The access
+decision is now cached per user or organization until whichever comes first:
+
+- the moment it would change on its own (trial_end / current_period_end),
+- ENTITLEMENT_CACHE_TTL_S (ENTITLEMENT_NEGATIVE_TTL_S for denials), or
+- an invalidation from the Stripe/PayPal webhook handlers or the
+  status/cancel endpoints.
+
+The cache is per process; the TTLs bound how long another worker can serve a
+decision made before a webhook it did not receive.
+"""
+
+import datetime
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+ENTITLEMENT_CACHE_TTL_S = float(os.getenv("ENTITLEMENT_CACHE_TTL_S", "300"))
+ENTITLEMENT_NEGATIVE_TTL_S = float(os.getenv("ENTITLEMENT_NEGATIVE_TTL_S", "60"))
+ENTITLEMENT_CACHE_SIZE = int(os.getenv("ENTITLEMENT_CACHE_SIZE", "50000"))
+
+Entitlement = namedtuple("Entitlement", ["has_access", "subscription_id", "expires_at"])
+
+USER_SUBSCRIPTION_SQL = """
+    SELECT s.id, s.status, s.current_period_end, s.trial_end, s.subscription_type
+    FROM subscriptions s
+    JOIN user_profiles u ON s.id = u.subscription_id
+    WHERE u.id = %s
+"""
+
+ORGANIZATION_SUBSCRIPTION_SQL = """
+    SELECT s.id, s.status, s.current_period_end, s.trial_end, s.subscription_type
+    FROM subscriptions s
+    JOIN organizations o ON s.id = o.subscription_id
+    WHERE o.id = %s
+"""
+
+CLIENT_ORGANIZATION_SQL = """
+    SELECT oc.organization_id
+    FROM organization_clients oc
+    WHERE oc.client_id = %s AND oc.status = 'active'
+    LIMIT 1
+"""
+
+
+def evaluate_subscription(row, include_free_tier=True, now=None):
+    """
+    Access decision for a (status, current_period_end, trial_end, subscription_type) row.
+
+    Returns (has_access, valid_until): valid_until is when a granted decision
+    lapses on its own, or None if time alone will not change it.
+    """
+    if not row:
+        return False, None
+    status, current_period_end, trial_end, subscription_type = row
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+
+    # Special handling for free tier and organization subscriptions
+    if subscription_type in ('free', 'organization'):
+        if not include_free_tier:
+            return False, None
+        if status == 'active':
+            if trial_end is None:
+                # Indefinite free tier or organization subscription
+                return True, None
+            is_valid = now < trial_end
+            return is_valid, trial_end if is_valid else None
+
+    # Regular subscription checks for paid tiers
+    if status not in ('active', 'trialing'):
+        return False, None
+    granting = [end for end in (trial_end, current_period_end) if end is not None and now < end]
+    if not granting:
+        return False, None
+    return True, max(granting)
+
+
+class EntitlementCache:
+    """Access decisions keyed by ('user', id) / ('organization', id), plus client -> organization links"""
+
+    def __init__(self, ttl_s=ENTITLEMENT_CACHE_TTL_S, negative_ttl_s=ENTITLEMENT_NEGATIVE_TTL_S,
+                 max_entries=ENTITLEMENT_CACHE_SIZE):
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self.max_entries = max_entries
+        self._entries = {}
+        self._client_orgs = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > time.monotonic():
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def put(self, key, has_access, subscription_id, valid_until=None):
+        ttl = self.ttl_s if has_access else self.negative_ttl_s
+        if valid_until is not None:
+            now = datetime.datetime.now(datetime.timezone.utc)
+            ttl = min(ttl, max((valid_until - now).total_seconds(), 0))
+        entry = Entitlement(has_access, subscription_id, time.monotonic() + ttl)
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = entry
+        return entry
+
+    def client_organization(self, client_id):
+        with self._lock:
+            cached = self._client_orgs.get(client_id)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        return None
+
+    def put_client_organization(self, client_id, organization_id):
+        with self._lock:
+            if len(self._client_orgs) >= self.max_entries:
+                self._client_orgs.clear()
+            self._client_orgs[client_id] = (organization_id, time.monotonic() + self.ttl_s)
+
+    def invalidate(self, user_id=None, organization_id=None):
+        with self._lock:
+            self.invalidations += 1
+            if user_id is not None:
+                self._entries.pop(("user", user_id), None)
+                self._client_orgs.pop(user_id, None)
+            if organization_id is not None:
+                self._entries.pop(("organization", organization_id), None)
+
+    def invalidate_subscription(self, subscription_id):
+        """Drop decisions based on this subscription, and any made without one (it may now be theirs)"""
+        with self._lock:
+            self.invalidations += 1
+            for key in [key for key, entry in self._entries.items()
+                        if entry.subscription_id in (subscription_id, None)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += 1
+            self._entries.clear()
+            self._client_orgs.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "client_links": len(self._client_orgs),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+entitlement_cache = EntitlementCache()
+
+
+def get_entitlement(user_id=None, organization_id=None, include_free_tier=True):
+    """Cached access decision for a user's or an organization's own subscription"""
+    key = ("user", user_id) if user_id is not None else ("organization", organization_id)
+    # Only the default free-tier semantics are cached; the other is a rare admin-side check
+    if include_free_tier:
+        entry = entitlement_cache.get(key)
+        if entry is not None:
+            return entry
+
+    from app.db import session_cursor
+
+    with session_cursor(dict_cursor=False) as (cur, conn):
+        if user_id is not None:
+            cur.execute(USER_SUBSCRIPTION_SQL, (user_id,))
+        else:
+            cur.execute(ORGANIZATION_SUBSCRIPTION_SQL, (organization_id,))
+        row = cur.fetchone()
+
+    subscription_id = row[0] if row else None
+    has_access, valid_until = evaluate_subscription(row[1:] if row else None, include_free_tier)
+    if not include_free_tier:
+        return Entitlement(has_access, subscription_id, 0)
+    logger.info(f"Entitlement for {key[0]} {key[1]}: access={has_access} (subscription {subscription_id})")
+    return entitlement_cache.put(key, has_access, subscription_id, valid_until)
+
+
+def get_client_organization(client_id):
+    """Active organization of a client account (cached)"""
+    organization_id = entitlement_cache.client_organization(client_id)
+    if organization_id is not None:
+        return organization_id
+
+    from app.db import session_cursor
+
+    with session_cursor(dict_cursor=False) as (cur, conn):
+        cur.execute(CLIENT_ORGANIZATION_SQL, (client_id,))
+        row = cur.fetchone()
+    if row:
+        entitlement_cache.put_client_organization(client_id, row[0])
+        return row[0]
+    return None
@@ -5,9 +5,12 @@ import logging
 from fractions import Fraction
 from typing import Any, Dict
 
+from app.utils.logging_config import LazyJson, LogSampler
+
 # Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# One line per ingredient is useful when debugging a menu, not on every request
+ingredient_log = LogSampler(logger, burst=20)
 
 # Load the ingredient_config.json
 CURRENT_DIR = os.path.dirname(__file__)
@@ -353,7 +356,7 @@ def standardize_ingredient(ing: Any):
         return "", ing_str
 
     if isinstance(ing, str):
-        logger.debug(f"Standardizing string ingredient: {ing}")
+        logger.debug("Standardizing string ingredient: %s", ing)
 
         # First check for unit without quantity pattern
         raw_unit, name_after_unit = check_unit_without_quantity(ing)
@@ -381,7 +384,7 @@ def standardize_ingredient(ing: Any):
             else:
                 amount = 1.0  # Default for other units
 
-            logger.info(f"Parsed unit without quantity: '{ing}' -> name='{clean_name}', amount={amount}, unit='{unit}'")
+            logger.debug("Parsed unit without quantity: %r -> name=%r, amount=%s, unit=%r", ing, clean_name, amount, unit)
             return (clean_name, amount, unit)
 
         # Try complex parsing for multi-unit ingredients
@@ -402,16 +405,13 @@ def standardize_ingredient(ing: Any):
 
     # Dictionary handling with better name detection
     elif isinstance(ing, dict):
-        logger.debug(f"Standardizing dict ingredient: {ing}")
+        logger.debug("Standardizing dict ingredient: %s", ing)
 
         # Look for name in various fields
         name = ing.get('name', '')
         if not name:
             name = ing.get('ingredient', '')
 
-        # Log the name we found
-        logger.debug(f"Found ingredient name: {name}")
-
         # Clean up the name first
         clean_name = sanitize_name(name)
 
@@ -420,9 +420,6 @@ def standardize_ingredient(ing: Any):
         if quantity is None:
             quantity = ing.get('amount', None)
 
-        # Log the quantity we found
-        logger.debug(f"Found ingredient quantity: {quantity}")
-
         # Look for unit in various fields - initialize earlier
         unit = ing.get('unit', '')
 
@@ -438,7 +435,7 @@ def standardize_ingredient(ing: Any):
                 if unit_str:  # We found a unit in the quantity string
                     quantity = amount_str  # Set quantity to just the numeric part
                     unit = unit_str        # Set unit to the unit part
-                    logger.info(f"Parsed quantity with unit: '{ing.get('quantity')}' -> amount={quantity}, unit='{unit}'")
+                    logger.debug("Parsed quantity with unit: %r -> amount=%s, unit=%r", ing.get('quantity'), quantity, unit)
 
             # Check for unit without quantity (e.g., "cup" with no number)
             elif quantity.lower() in ['cup', 'cups', 'tbsp', 'tablespoon', 'tablespoons',
@@ -465,7 +462,7 @@ def standardize_ingredient(ing: Any):
                 else:
                     quantity = 1.0  # Default for other units
 
-                logger.info(f"Parsed unit without quantity: '{name}' -> quantity={quantity}, unit='{unit}'")
+                logger.debug("Parsed unit without quantity: %r -> quantity=%s, unit=%r", name, quantity, unit)
 
             # Handle cases like "12 large eggs", "4 medium onions", etc.
             elif re.search(r'\d+\s+(large|medium|small|cloves|leaves|cans|slices)', quantity):
@@ -486,7 +483,7 @@ def standardize_ingredient(ing: Any):
 
                     # Update the quantity to just the number
                     quantity = number_match.group(1)
-                    logger.info(f"Extracted quantity: {quantity}, qualifier: {unit if unit else 'none'}")
+                    logger.debug("Extracted quantity: %s, qualifier: %s", quantity, unit or 'none')
 
             # Handle 'cooked' qualifier in quantities
             if isinstance(quantity, str) and 'cooked' in quantity.lower() and ('rice' in clean_name.lower() or 'quinoa' in clean_name.lower()):
@@ -880,14 +877,15 @@ def aggregate_grocery_list(menu_dict: Dict[str, Any]):
     import logging
     logger = logging.getLogger(__name__)
 
-    logger.info(f"Aggregating grocery list from input type: {type(menu_dict)}")
+    logger.info("Aggregating grocery list from input type: %s", type(menu_dict).__name__)
 
     # First, try direct extraction from menu structure if available
     ingredient_quantities, summarized_ingredients = extract_ingredient_quantities_from_menu(menu_dict)
 
     # If we have direct summarized ingredients, use those but format them correctly
     if summarized_ingredients:
-        logger.info(f"Using directly summarized ingredients: {summarized_ingredients}")
+        logger.info("Using %d directly summarized ingredients", len(summarized_ingredients))
+        logger.debug("Summarized ingredients: %s", LazyJson(summarized_ingredients))
 
         # Format the ingredients in a way the frontend expects
         # The frontend expects a list of dictionaries with name and quantity
@@ -958,35 +956,21 @@ def aggregate_grocery_list(menu_dict: Dict[str, Any]):
             return
 
         # Log the path for debugging deep structures
-        logger.debug(f"Scanning path: {path}, keys: {list(obj.keys())}")
+        logger.debug("Scanning path: %s, keys: %s", path, obj.keys())
 
         # Extract from ingredients array directly
         if 'ingredients' in obj and isinstance(obj['ingredients'], list):
-            logger.info(f"Found ingredients array at {path} with {len(obj['ingredients'])} items")
+            logger.debug("Found ingredients array at %s with %d items", path, len(obj['ingredients']))
 
             for i, ing in enumerate(obj['ingredients']):
-                logger.info(f"Processing ingredient {i} at {path}: {ing}")
-
-                # Handle different ingredient formats
-                if isinstance(ing, str):
-                    # String format like "1 cup flour"
-                    logger.info(f"Ingredient {i} is a string: {ing}")
-                    name, amount, unit = standardize_ingredient(ing)
-                else:
-                    # Dictionary format
-                    if isinstance(ing, dict):
-                        logger.info(f"Ingredient {i} is a dict with keys: {list(ing.keys())}")
-                        if 'name' in ing:
-                            logger.info(f"Ingredient has name: {ing['name']}")
-                        if 'quantity' in ing:
-                            logger.info(f"Ingredient has quantity: {ing['quantity']}")
-                    name, amount, unit = standardize_ingredient(ing)
-
-                logger.info(f"Standardized to name='{name}', amount={amount}, unit='{unit}'")
+                # Handles both strings like "1 cup flour" and dicts
+                name, amount, unit = standardize_ingredient(ing)
+                ingredient_log.log("Ingredient %d at %s: %r -> name=%r, amount=%s, unit=%r",
+                                   i, path, ing, name, amount, unit)
 
                 # Skip empty ingredients
                 if not name:
-                    logger.warning(f"Skipping ingredient {i} with empty name")
+                    logger.warning("Skipping ingredient %d at %s with empty name", i, path)
                     continue
 
                 key = (name, unit)
@@ -996,19 +980,18 @@ def aggregate_grocery_list(menu_dict: Dict[str, Any]):
                     if current is None:
                         current = 0.0
                     aggregated_dict[key] = current + amount
-                    logger.info(f"Added amount {amount} to {name}, total now: {aggregated_dict[key]}")
                 elif key not in aggregated_dict:
                     # Instead of setting to None, provide default values for common ingredients
                     if "cheese" in name.lower():
                         if "cheddar" in name.lower() or "mozzarella" in name.lower():
                             aggregated_dict[key] = 8.0  # Default 8 oz for common cheeses
-                            logger.info(f"Added default amount 8.0 for {name}")
+                            logger.debug("Added default amount 8.0 for %s", name)
                         else:
                             aggregated_dict[key] = 4.0  # Default 4 oz for other cheeses
-                            logger.info(f"Added default amount 4.0 for {name}")
+                            logger.debug("Added default amount 4.0 for %s", name)
                     else:
                         aggregated_dict[key] = None
-                        logger.info(f"Added {name} without amount")
+                        logger.debug("Added %s without amount", name)
 
         # Handle snack-specific format (title and quantity without ingredients)
         if 'title' in obj and not 'ingredients' in obj:
@@ -1016,7 +999,7 @@ def aggregate_grocery_list(menu_dict: Dict[str, Any]):
             quantity = obj.get('quantity', '') or obj.get('amount', '')
 
             if title:
-                logger.info(f"Found simple item with title at {path}: {title}")
+                ingredient_log.log("Found simple item with title at %s: %s", path, title)
                 # Format as "quantity title" and standardize
                 ingredient_str = f"{quantity} {title}".strip()
                 name, amount, unit = standardize_ingredient(ingredient_str)
@@ -1112,7 +1095,8 @@ def aggregate_grocery_list(menu_dict: Dict[str, Any]):
                             # Handle different formats of ingredients
                             if 'ingredients' in item and isinstance(item['ingredients'], list):
                                 ingredients = item['ingredients']
-                                logger.info(f"Processing {len(ingredients)} ingredients from day {day_index+1}, {section}, meal {meal_index+1}")
+                                logger.debug("Processing %d ingredients from day %d, %s, meal %d",
+                                             len(ingredients), day_index + 1, section, meal_index + 1)
 
                                 # Process each ingredient based on its format
                                 for ing_index, ing in enumerate(ingredients):
@@ -1134,25 +1118,25 @@ def aggregate_grocery_list(menu_dict: Dict[str, Any]):
                                         if current is None:
                                             current = 0.0
                                         aggregated[key] = current + amount
-                                        logger.info(f"Added ingredient: {name}, amount: {amount}")
+                                        ingredient_log.log("Added ingredient: %s, amount: %s", name, amount)
                                     elif key not in aggregated:
                                         # Apply same defaults here
                                         if "cheese" in name.lower():
                                             if "cheddar" in name.lower() or "mozzarella" in name.lower():
                                                 aggregated[key] = 8.0
-                                                logger.info(f"Added default amount 8.0 for {name}")
+                                                logger.debug("Added default amount 8.0 for %s", name)
                                             else:
                                                 aggregated[key] = 4.0
-                                                logger.info(f"Added default amount 4.0 for {name}")
+                                                logger.debug("Added default amount 4.0 for %s", name)
                                         else:
                                             aggregated[key] = None
-                                            logger.info(f"Added ingredient without amount: {name}")
+                                            logger.debug("Added ingredient without amount: %s", name)
 
                             # Check if this item is a snack in the simplified format (no ingredients array)
                             elif section == 'snacks' and item.get('title') and (item.get('quantity') or item.get('amount')):
                                 title = item.get('title', '')
                                 quantity = item.get('quantity', '') or item.get('amount', '')
-                                logger.info(f"Processing simple snack: {title} - {quantity}")
+                                ingredient_log.log("Processing simple snack: %s - %s", title, quantity)
 
                                 # Directly use the title as name and quantity as amount
                                 # For snacks, ensure we have a reasonable unit if none provided
@@ -0,0 +1,30 @@
+# app/utils/http_cache.py
+"""
+Conditional GET helpers shared by endpoints that send ETags.
+
+An endpoint computes a strong ETag for the exact bytes (or values) it would
+send, answers a matching If-None-Match with not_modified(), and otherwise sets
+the ETag and Cache-Control headers on its normal response.
+"""
+
+import hashlib
+
+from fastapi import Response
+
+
+def strong_etag(data: bytes) -> str:
+    return '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+
+
+def etag_matches(request, etag):
+    """True when the request's If-None-Match already names ``etag``"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def not_modified(etag, cache_control):
+    """Empty 304 carrying the validators a cache needs to keep using its copy"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
@@ -0,0 +1,172 @@
+# app/utils/ingredient_usage.py
+"""
+ingredient_usage_log: the per-user ingredient cooldown behind the skeleton agent.
+
+Writes are batched with execute_values (one round trip per page instead of one
+per ingredient). Rows past the retention window are removed by a periodic
+sweeper (one worker at a time, under an advisory lock) rather than a per-user
+DELETE on every generation. Reads of the cooldown list go through a small
+per-user TTL cache that is dropped once this process commits new usage for
+the user.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from .periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+INGREDIENT_USAGE_RETENTION_DAYS = int(os.getenv("INGREDIENT_USAGE_RETENTION_DAYS", "14"))
+INGREDIENT_USAGE_SWEEP_HOURS = float(os.getenv("INGREDIENT_USAGE_SWEEP_HOURS", "6"))
+INGREDIENT_USAGE_SWEEP_BATCH = int(os.getenv("INGREDIENT_USAGE_SWEEP_BATCH", "5000"))
+INGREDIENT_COOLDOWN_CACHE_TTL_S = float(os.getenv("INGREDIENT_COOLDOWN_CACHE_TTL_S", "300"))
+INGREDIENT_COOLDOWN_CACHE_SIZE = int(os.getenv("INGREDIENT_COOLDOWN_CACHE_SIZE", "2000"))
+
+# Session-scoped advisory lock so one worker sweeps at a time ("SMPINGR")
+INGREDIENT_USAGE_SWEEP_LOCK_KEY = 0x534d50494e4752
+
+INSERT_SQL = """
+    INSERT INTO ingredient_usage_log
+        (user_id, menu_id, ingredient_name, used_on_date, meal_time)
+    VALUES %s
+    ON CONFLICT DO NOTHING
+"""
+
+RECENT_SQL = """
+    SELECT DISTINCT ingredient_name
+    FROM ingredient_usage_log
+    WHERE user_id = %s
+      AND used_on_date >= CURRENT_DATE - %s
+    ORDER BY ingredient_name
+"""
+
+# Deleting by ctid in bounded batches keeps each sweep transaction (and its locks) short
+SWEEP_SQL = """
+    DELETE FROM ingredient_usage_log
+    WHERE ctid = ANY(ARRAY(
+        SELECT ctid FROM ingredient_usage_log
+        WHERE used_on_date < CURRENT_DATE - %s
+        LIMIT %s
+    ))
+"""
+
+
+class RecentIngredientsCache:
+    """Per-user cooldown lists, keyed by (user_id, days) and valid for the day they were read."""
+
+    def __init__(self, ttl_s=INGREDIENT_COOLDOWN_CACHE_TTL_S, max_users=INGREDIENT_COOLDOWN_CACHE_SIZE):
+        self.ttl_s = ttl_s
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, days):
+        key = (user_id, days)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic() and entry[1] == date.today():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry[2])
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, user_id, days, names):
+        with self._lock:
+            self._entries[(user_id, days)] = (time.monotonic() + self.ttl_s, date.today(), list(names))
+            self._entries.move_to_end((user_id, days))
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+recent_ingredients_cache = RecentIngredientsCache()
+
+
+def recent_ingredients(cur, user_id: int, days: int = 3) -> list:
+    """Distinct ingredient names the user was served in the last ``days`` days (cached).
+
+    Works with dict and tuple cursors. Errors propagate and are not cached.
+    """
+    cached = recent_ingredients_cache.get(user_id, days)
+    if cached is not None:
+        return cached
+
+    cur.execute(RECENT_SQL, (user_id, days))
+    rows = cur.fetchall() or []
+    if rows and isinstance(rows[0], dict):
+        names = [r["ingredient_name"] for r in rows]
+    else:
+        names = [r[0] for r in rows]
+    recent_ingredients_cache.put(user_id, days, names)
+    return names
+
+
+def write_ingredient_usage(cur, rows: list, page_size: int = 1000) -> int:
+    """Insert (user_id, menu_id, ingredient_name, used_on_date, meal_time) rows in batches.
+
+    Runs on the caller's cursor; the caller commits, then calls
+    forget_recent_ingredients for the users written. Dropping their cached
+    lists any earlier would let a read before the commit cache the old rows.
+    """
+    if not rows:
+        return 0
+    from psycopg2.extras import execute_values
+
+    execute_values(cur, INSERT_SQL, rows, page_size=page_size)
+    return len(rows)
+
+
+def forget_recent_ingredients(user_ids) -> None:
+    """Drop the cached cooldown lists of users whose new usage was just committed."""
+    for user_id in set(user_ids):
+        recent_ingredients_cache.invalidate(user_id)
+
+
+def prune_ingredient_usage(retention_days: int = INGREDIENT_USAGE_RETENTION_DAYS,
+                           batch_size: int = INGREDIENT_USAGE_SWEEP_BATCH) -> dict:
+    """Delete rows older than the retention window, batch by batch (autocommit, one transaction each)."""
+    from app.db import get_db_cursor
+
+    deleted = 0
+    started = time.perf_counter()
+    with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
+        cur.execute("SELECT pg_try_advisory_lock(%s)", (INGREDIENT_USAGE_SWEEP_LOCK_KEY,))
+        if not cur.fetchone()[0]:
+            return {"status": "skipped", "reason": "another worker is sweeping"}
+        try:
+            while True:
+                cur.execute(SWEEP_SQL, (retention_days, batch_size))
+                count = cur.rowcount
+                deleted += count
+                if count < batch_size:
+                    break
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (INGREDIENT_USAGE_SWEEP_LOCK_KEY,))
+
+    if deleted:
+        logger.info(f"Pruned {deleted} ingredient_usage_log rows older than {retention_days} days")
+    return {"deleted": deleted, "duration_s": round(time.perf_counter() - started, 2)}
+
+
+ingredient_usage_sweeper = PeriodicTask(
+    "ingredient-usage-sweeper",
+    prune_ingredient_usage,
+    interval_s=INGREDIENT_USAGE_SWEEP_HOURS * 3600,
+    initial_delay_s=300,
+)
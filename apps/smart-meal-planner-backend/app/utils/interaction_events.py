@@ -0,0 +1,173 @@
+# app/utils/interaction_events.py
+"""
+Background ingestion for recipe_interactions events.
+
+Hot read paths (menu views) used to INSERT and commit each interaction inline
+on their own pooled connection. Events now go onto a bounded in-process queue
+and a flusher thread batch-writes them with execute_values. When the queue is
+full, new events are dropped and counted rather than blocking the request.
+Pending events are drained on shutdown (main.shutdown_event).
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+INTERACTION_QUEUE_SIZE = int(os.getenv("INTERACTION_QUEUE_SIZE", "10000"))
+INTERACTION_BATCH_SIZE = int(os.getenv("INTERACTION_BATCH_SIZE", "500"))
+INTERACTION_FLUSH_INTERVAL_S = float(os.getenv("INTERACTION_FLUSH_INTERVAL_S", "2.0"))
+INTERACTION_WRITE_RETRIES = int(os.getenv("INTERACTION_WRITE_RETRIES", "2"))
+
+# Events are timestamped at enqueue time; the insert backdates CURRENT_TIMESTAMP by
+# the event's age so the stored time matches the original inline INSERT.
+INSERT_SQL = """
+    INSERT INTO recipe_interactions
+    (user_id, recipe_id, interaction_type, rating, timestamp)
+    VALUES %s
+"""
+INSERT_TEMPLATE = "(%s, %s, %s, %s, CURRENT_TIMESTAMP - (%s * INTERVAL '1 second'))"
+
+
+class InteractionEventQueue:
+    """Bounded queue of interaction events with a single background flusher thread."""
+
+    def __init__(self, maxsize=INTERACTION_QUEUE_SIZE, batch_size=INTERACTION_BATCH_SIZE,
+                 flush_interval=INTERACTION_FLUSH_INTERVAL_S, write_retries=INTERACTION_WRITE_RETRIES):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.write_retries = write_retries
+        self._thread = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped_overflow = 0
+        self.dropped_failed = 0
+        self.batches = 0
+        self.last_flush_at = None
+        self.last_error = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the flusher thread (idempotent)."""
+        with self._lock:
+            if self.running:
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="interaction-event-flusher", daemon=True
+            )
+            self._thread.start()
+            logger.info(f"Interaction event flusher started (queue={self._queue.maxsize}, batch={self.batch_size})")
+
+    def enqueue(self, user_id, recipe_id, interaction_type, rating=None):
+        """Queue an event without blocking. Returns False if it was dropped."""
+        try:
+            self._queue.put_nowait((user_id, recipe_id, interaction_type, rating, time.monotonic()))
+        except queue.Full:
+            with self._lock:
+                self.dropped_overflow += 1
+                dropped = self.dropped_overflow
+            # Log the first overflow and then every 1000th so a flood doesn't flood the logs too
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning(f"Interaction event queue full; {dropped} events dropped so far")
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def stop(self, timeout=10.0):
+        """Stop the flusher after draining whatever is queued (used on shutdown)."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning(f"Interaction event flusher did not drain within {timeout}s; "
+                           f"{self._queue.qsize()} events left in queue")
+        else:
+            logger.info(f"Interaction event flusher stopped ({self.written} written, "
+                        f"{self.dropped_overflow} dropped on overflow, {self.dropped_failed} failed)")
+        self._thread = None
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "capacity": self._queue.maxsize,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped_overflow": self.dropped_overflow,
+            "dropped_failed": self.dropped_failed,
+            "last_flush_at": self.last_flush_at,
+            "last_error": self.last_error,
+        }
+
+    # -- flusher ------------------------------------------------------------
+
+    def _next_batch(self):
+        """Wait up to flush_interval for the first event, then take what's ready."""
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval))
+        except queue.Empty:
+            return batch
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+            elif self._stopping.is_set():
+                # Queue is empty and shutdown was requested
+                return
+
+    def _write(self, batch):
+        from psycopg2.extras import execute_values
+        from app.db import get_db_cursor
+
+        for attempt in range(self.write_retries + 1):
+            # Ages are taken per attempt: a retry runs after the backoff sleep
+            now = time.monotonic()
+            rows = [
+                (user_id, recipe_id, interaction_type, rating, max(0.0, now - queued_at))
+                for user_id, recipe_id, interaction_type, rating, queued_at in batch
+            ]
+            try:
+                with get_db_cursor(dict_cursor=False) as (cur, conn):
+                    execute_values(cur, INSERT_SQL, rows, template=INSERT_TEMPLATE, page_size=self.batch_size)
+                    conn.commit()
+                with self._lock:
+                    self.written += len(rows)
+                    self.batches += 1
+                    self.last_flush_at = time.time()
+                return
+            except Exception as e:
+                self.last_error = str(e)
+                if attempt < self.write_retries and not self._stopping.is_set():
+                    time.sleep(min(2 ** attempt, 5))
+                    continue
+                logger.error(f"Dropping {len(batch)} interaction events after failed write: {str(e)}")
+                with self._lock:
+                    self.dropped_failed += len(batch)
+                return
+
+
+interaction_events = InteractionEventQueue()
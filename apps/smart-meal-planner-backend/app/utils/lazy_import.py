@@ -0,0 +1,63 @@
+# app/utils/lazy_import.py
+
+import importlib
+import importlib.util
+import logging
+import threading
+import types
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def is_module_available(name: str) -> bool:
+    """Check whether a module can be imported without actually importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a heavy SDK module (stripe, paypalrestsdk, ...) that defers the
+    real import until the first attribute access, so worker boot doesn't pay
+    for SDKs that most requests never touch.
+
+    Args:
+        name: The module to import on first use
+        on_load: Optional callback run once with the real module, e.g. to set
+                 api keys that used to be configured at import time
+    """
+
+    def __init__(self, name: str, on_load: Optional[Callable[[types.ModuleType], None]] = None):
+        super().__init__(name)
+        object.__setattr__(self, "_lazy_on_load", on_load)
+        object.__setattr__(self, "_lazy_module", None)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+
+    def _load(self) -> types.ModuleType:
+        module = object.__getattribute__(self, "_lazy_module")
+        if module is not None:
+            return module
+        with object.__getattribute__(self, "_lazy_lock"):
+            module = object.__getattribute__(self, "_lazy_module")
+            if module is None:
+                module = importlib.import_module(self.__name__)
+                on_load = object.__getattribute__(self, "_lazy_on_load")
+                if on_load:
+                    on_load(module)
+                object.__setattr__(self, "_lazy_module", module)
+                logger.info(f"Lazily imported {self.__name__}")
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+
+def lazy_import(name: str, on_load: Optional[Callable[[types.ModuleType], None]] = None) -> LazyModule:
+    """Return a LazyModule proxy for ``name``."""
+    return LazyModule(name, on_load)
@@ -0,0 +1,198 @@
+"""
+Process-wide logging setup plus helpers that keep hot paths cheap.
+
+configure_logging() is called once from app.main and reads:
+
+- LOG_FORMAT: "json" (default, one object per line) or "text"
+- LOG_LEVEL: root level, INFO by default
+- LOG_LEVELS: per-logger overrides, e.g.
+  "app.routers.grocery_list=WARNING,app.integration.instacart=DEBUG"
+
+Hot paths log with %-style arguments so nothing is formatted for a disabled
+level; LazyJson defers json.dumps the same way, and LogSampler caps per-item
+logging inside loops.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict, Mapping, Optional
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else on a record came from extra=
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# Loggers uvicorn/gunicorn set up with their own handlers before the app is imported
+_SERVER_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+SENSITIVE_HEADERS = frozenset({
+    "authorization", "cookie", "set-cookie", "x-api-key", "stripe-signature",
+    "paypal-transmission-sig", "paypal-auth-algo",
+})
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; fields passed with extra= become top-level keys"""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + ".%03dZ" % record.msecs,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key[0] != "_":
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def parse_level(value: Optional[str], default: int = logging.INFO) -> int:
+    """A level name or number; ValueError for anything logging doesn't know"""
+    if value is None or not value.strip():
+        return default
+    value = value.strip().upper()
+    if value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value)
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown log level: {value}")
+    return level
+
+
+def parse_module_levels(spec: Optional[str]) -> Dict[str, int]:
+    """'logger=LEVEL' pairs separated by commas"""
+    levels = {}
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        name, sep, level = part.partition("=")
+        if not sep or not name.strip():
+            raise ValueError(f"Expected logger=LEVEL, got {part.strip()!r}")
+        levels[name.strip()] = parse_level(level)
+    return levels
+
+
+def configure_logging(env: Optional[Mapping[str, str]] = None, stream=None) -> logging.Handler:
+    """
+    Replace the root handlers with a single stream handler configured from the
+    environment. Returns the handler (tests and the benchmark point it elsewhere).
+    """
+    env = os.environ if env is None else env
+    problems = []
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    if env.get("LOG_FORMAT", "json").strip().lower() == "text":
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    else:
+        handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+
+    try:
+        root.setLevel(parse_level(env.get("LOG_LEVEL")))
+    except ValueError as e:
+        root.setLevel(logging.INFO)
+        problems.append(str(e))
+
+    try:
+        module_levels = parse_module_levels(env.get("LOG_LEVELS"))
+    except ValueError as e:
+        module_levels = {}
+        problems.append(f"LOG_LEVELS ignored: {e}")
+    for name, level in module_levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    # Send the server's own lines (including access logs) through the same handler
+    for name in _SERVER_LOGGERS:
+        server_logger = logging.getLogger(name)
+        for existing in server_logger.handlers[:]:
+            server_logger.removeHandler(existing)
+        server_logger.propagate = True
+
+    for problem in problems:
+        logging.getLogger(__name__).warning("Logging configuration: %s", problem)
+    return handler
+
+
+class LazyJson:
+    """
+    json.dumps deferred until a handler formats the record, truncated to
+    `limit` characters. Pass it as a %-style argument:
+    logger.debug("Request body: %s", LazyJson(data))
+    """
+
+    __slots__ = ("value", "limit", "indent")
+
+    def __init__(self, value, limit: int = 2000, indent: Optional[int] = None):
+        self.value = value
+        self.limit = limit
+        self.indent = indent
+
+    def __str__(self):
+        try:
+            text = json.dumps(self.value, default=str, indent=self.indent)
+        except (TypeError, ValueError):
+            text = repr(self.value)
+        if self.limit and len(text) > self.limit:
+            return f"{text[:self.limit]}... ({len(text)} chars)"
+        return text
+
+
+def redact_headers(headers: Mapping[str, str]) -> Dict[str, str]:
+    """Header dict safe to log: credentials and signatures are masked"""
+    return {
+        name: "***" if name.lower() in SENSITIVE_HEADERS else value
+        for name, value in headers.items()
+    }
+
+
+class LogSampler:
+    """
+    Rate limit for logging inside per-item loops. Up to `burst` records get
+    through per `window_s` seconds (then every `every`-th one, if set); the
+    rest are counted and reported in one line when the next window opens.
+    Costs a single isEnabledFor check when the level is off.
+    """
+
+    def __init__(self, logger: logging.Logger, level: int = logging.DEBUG, burst: int = 5,
+                 window_s: float = 60.0, every: int = 0):
+        self.logger = logger
+        self.level = level
+        self.burst = burst
+        self.window_s = window_s
+        self.every = every
+        self._lock = threading.Lock()
+        self._window_started = None
+        self._seen = 0
+        self._suppressed = 0
+
+    def log(self, msg, *args, **kwargs):
+        if not self.logger.isEnabledFor(self.level):
+            return
+        now = time.monotonic()
+        with self._lock:
+            expired = 0
+            if self._window_started is None or now - self._window_started >= self.window_s:
+                expired = self._suppressed
+                self._window_started, self._seen, self._suppressed = now, 0, 0
+            self._seen += 1
+            over = self._seen - self.burst
+            allowed = over <= 0 or (self.every > 0 and over % self.every == 0)
+            if not allowed:
+                self._suppressed += 1
+        if expired:
+            self.logger.log(self.level, "%d similar messages suppressed, e.g. %r", expired, msg, stacklevel=2)
+        if allowed:
+            self.logger.log(self.level, msg, *args, stacklevel=2, **kwargs)
@@ -0,0 +1,162 @@
+# app/utils/menu_summary.py
+"""
+Denormalized menu summaries for list views.
+
+History, shared-menu and dashboard listings only render cards (title, date,
+day count...), but used to select the full meal_plan_json for every menu.
+A small summary is now stored in menus.summary whenever a menu is written,
+and list endpoints return it instead of the plan unless ?include=plan is passed.
+"""
+
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Bump when the summary shape changes; rows with an older version are rebuilt on read
+MENU_SUMMARY_VERSION = 1
+
+# Number of meal titles kept for card previews
+SUMMARY_TITLE_COUNT = 4
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _as_dict(meal_plan):
+    if isinstance(meal_plan, str):
+        try:
+            meal_plan = json.loads(meal_plan)
+        except (TypeError, ValueError):
+            return {}
+    if isinstance(meal_plan, dict) and isinstance(meal_plan.get("meal_plan"), dict):
+        # Unwrapped pipeline output: {"meal_plan": {"days": [...]}}
+        meal_plan = meal_plan["meal_plan"]
+    return meal_plan if isinstance(meal_plan, dict) else {}
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        if match:
+            return float(match.group())
+    return None
+
+
+def _meal_calories(meal):
+    macros = meal.get("macros") if isinstance(meal.get("macros"), dict) else {}
+    for source in (macros.get("perServing"), macros.get("perMeal"), macros, meal):
+        if isinstance(source, dict):
+            calories = _number(source.get("calories"))
+            if calories is not None:
+                return calories
+    return None
+
+
+def _meal_image(meal):
+    for key in ("image_url", "imageUrl", "image"):
+        value = meal.get(key)
+        if isinstance(value, str) and value.startswith(("http://", "https://")):
+            return value
+    return None
+
+
+def build_menu_summary(meal_plan):
+    """
+    Build the card summary for a meal plan (dict or JSON string):
+    day/meal counts, the first few meal titles, the per-day calorie range and
+    the first meal image as a thumbnail.
+    """
+    plan = _as_dict(meal_plan)
+    days = plan.get("days") if isinstance(plan.get("days"), list) else []
+
+    meal_count = 0
+    titles = []
+    day_calories = []
+    thumbnail_url = None
+
+    for day in days:
+        if not isinstance(day, dict):
+            continue
+        entries = [m for key in ("meals", "snacks") for m in (day.get(key) or []) if isinstance(m, dict)]
+        meal_count += len(entries)
+
+        total = None
+        for meal in entries:
+            title = meal.get("title") or meal.get("name")
+            if title and len(titles) < SUMMARY_TITLE_COUNT:
+                titles.append(title)
+            if thumbnail_url is None:
+                thumbnail_url = _meal_image(meal)
+            calories = _meal_calories(meal)
+            if calories is not None:
+                total = (total or 0) + calories
+        if total is not None:
+            day_calories.append(round(total))
+
+    return {
+        "version": MENU_SUMMARY_VERSION,
+        "day_count": len(days),
+        "meal_count": meal_count,
+        "titles": titles,
+        "calories_per_day": (
+            {"min": min(day_calories), "max": max(day_calories)} if day_calories else None
+        ),
+        "thumbnail_url": thumbnail_url,
+    }
+
+
+def menu_summary_json(meal_plan):
+    """build_menu_summary serialized for an INSERT/UPDATE parameter."""
+    return json.dumps(build_menu_summary(meal_plan))
+
+
+def include_plan(include):
+    """True when an ``include`` query parameter (comma-separated) asks for the full plan."""
+    return "plan" in {part.strip().lower() for part in (include or "").split(",")}
+
+
+def apply_summary(row, want_plan, plan_key="meal_plan_json"):
+    """
+    Attach ``summary`` to a listed menu row and drop the plan unless requested.
+
+    List queries select the plan only when it was requested or the stored summary
+    is missing/outdated, so older rows still get a summary built on the fly.
+    """
+    summary = row.get("summary")
+    if isinstance(summary, str):
+        try:
+            summary = json.loads(summary)
+        except ValueError:
+            summary = None
+
+    plan = row.get(plan_key)
+    if isinstance(plan, str):
+        try:
+            plan = json.loads(plan)
+        except ValueError:
+            plan = {}
+        row[plan_key] = plan
+
+    if not isinstance(summary, dict) or summary.get("version") != MENU_SUMMARY_VERSION:
+        summary = build_menu_summary(plan) if plan is not None else None
+    row["summary"] = summary
+
+    if not want_plan:
+        row.pop(plan_key, None)
+    return row
+
+
+# Select-list fragment for list queries: the plan is only shipped from Postgres when
+# asked for (first %s) or when the row has no current summary to return instead
+def plan_column_sql(alias="m", plan_key="meal_plan_json"):
+    return (
+        f"{alias}.summary, "
+        f"CASE WHEN %s OR {alias}.summary IS NULL "
+        f"OR ({alias}.summary->>'version')::int IS DISTINCT FROM {MENU_SUMMARY_VERSION} "
+        f"THEN {alias}.meal_plan_json END AS {plan_key}"
+    )
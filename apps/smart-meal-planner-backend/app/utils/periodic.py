@@ -0,0 +1,91 @@
+# app/utils/periodic.py
+"""
+Minimal in-process scheduler for background maintenance jobs.
+
+Each PeriodicTask runs one function on a daemon thread at a fixed interval,
+started from main.startup_event and stopped on shutdown. Every worker runs its
+own copy, so jobs that must not overlap across workers take a Postgres
+advisory lock themselves.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Call ``func`` every ``interval_s`` seconds, first after ``initial_delay_s``."""
+
+    def __init__(self, name, func, interval_s, initial_delay_s=60.0):
+        self.name = name
+        self.func = func
+        self.interval_s = interval_s
+        self.initial_delay_s = initial_delay_s
+        self._thread = None
+        self._stopping = threading.Event()
+        self._wakeup = threading.Event()
+
+        self.runs = 0
+        self.last_run_at = None
+        self.last_result = None
+        self.last_error = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the thread (no-op when the interval is 0 or it is already running)."""
+        if self.interval_s <= 0 or self.running:
+            return
+        self._stopping.clear()
+        self._wakeup.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        logger.info(f"Periodic task {self.name} started (every {self.interval_s:g}s)")
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def run_once(self):
+        """Run the job now, recording its result or error."""
+        try:
+            self.last_result = self.func()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Periodic task {self.name} failed: {str(e)}")
+        self.runs += 1
+        self.last_run_at = time.time()
+        return self.last_result
+
+    def wake(self):
+        """Run the job as soon as possible instead of waiting out the interval."""
+        self._wakeup.set()
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "interval_s": self.interval_s,
+            "runs": self.runs,
+            "last_run_at": self.last_run_at,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+        }
+
+    def _run(self):
+        wait = self.initial_delay_s
+        while True:
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                return
+            self.run_once()
+            wait = self.interval_s
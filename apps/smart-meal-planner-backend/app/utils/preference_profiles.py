@@ -0,0 +1,155 @@
+# app/utils/preference_profiles.py
+"""
+Read-through cache of users' preference columns.
+
+GET /preferences/{id}, the org client-preferences endpoint and the meal-plan
+agent pipeline all read the same ~25 JSONB-heavy user_profiles columns, and
+the frontend refetches them on most screens. A profile is now loaded and
+parsed once into a PreferenceProfile and reused until the row changes.
+
+Each read still checks the row's xmin (a one-column primary-key lookup), so a
+profile updated through another worker is never served stale. The full
+columns are only fetched again when it differs. update_preferences also drops
+the entry directly.
+
+PreferenceProfile.etag hashes the preference values, so the endpoints answer
+If-None-Match with 304 when nothing a client can see has changed.
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from .http_cache import strong_etag
+
+logger = logging.getLogger(__name__)
+
+PREFERENCE_CACHE_SIZE = int(os.getenv("PREFERENCE_CACHE_SIZE", "5000"))
+
+# Browsers may keep the response but must revalidate it (If-None-Match) before use
+PREFERENCE_CACHE_CONTROL = "private, no-cache"
+
+PREFERENCE_COLUMNS = (
+    "diet_type",
+    "dietary_restrictions",
+    "disliked_ingredients",
+    "recipe_type",
+    "macro_protein",
+    "macro_carbs",
+    "macro_fat",
+    "calorie_goal",
+    "meal_times",
+    "appliances",
+    "prep_complexity",
+    "servings_per_meal",
+    "snacks_per_day",
+    "flavor_preferences",
+    "spice_level",
+    "recipe_type_preferences",
+    "meal_time_preferences",
+    "time_constraints",
+    "prep_preferences",
+    "preferred_proteins",
+    "other_proteins",
+    "carb_cycling_enabled",
+    "carb_cycling_config",
+    "zip_code",
+)
+
+VERSION_SQL = "SELECT xmin::text AS version FROM user_profiles WHERE id = %s"
+
+PROFILE_SQL = f"""
+    SELECT xmin::text AS version, {', '.join(PREFERENCE_COLUMNS)}
+    FROM user_profiles
+    WHERE id = %s
+"""
+
+
+class PreferenceProfile:
+    """One user's preference columns as stored, parsed once"""
+
+    __slots__ = ("user_id", "version", "etag", "_values")
+
+    def __init__(self, user_id, version, values):
+        self.user_id = user_id
+        self.version = version
+        self._values = tuple(values.get(name) for name in PREFERENCE_COLUMNS)
+        self.etag = strong_etag(json.dumps(self._values, sort_keys=True, default=str).encode("utf-8"))
+
+    def to_dict(self, columns=PREFERENCE_COLUMNS):
+        """A fresh copy of the requested columns; callers may fill in defaults in place"""
+        values = dict(zip(PREFERENCE_COLUMNS, self._values))
+        return {name: copy.deepcopy(values[name]) for name in columns}
+
+
+class PreferenceProfileCache:
+    """PreferenceProfiles by user id, least recently used evicted first"""
+
+    def __init__(self, max_users=PREFERENCE_CACHE_SIZE):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def get(self, user_id):
+        with self._lock:
+            profile = self._entries.get(user_id)
+            if profile is not None:
+                self._entries.move_to_end(user_id)
+            return profile
+
+    def put(self, profile):
+        with self._lock:
+            self._entries[profile.user_id] = profile
+            self._entries.move_to_end(profile.user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "reloads": self.reloads}
+
+
+preference_profiles = PreferenceProfileCache()
+
+
+def get_preference_profile(user_id):
+    """The user's PreferenceProfile, or None if there is no such user"""
+    from app.db import session_cursor
+
+    cached = preference_profiles.get(user_id)
+    with session_cursor(dict_cursor=True) as (cur, conn):
+        if cached is not None:
+            cur.execute(VERSION_SQL, (user_id,))
+            row = cur.fetchone()
+            if row is None:
+                preference_profiles.invalidate(user_id)
+                return None
+            if row["version"] == cached.version:
+                preference_profiles.hits += 1
+                return cached
+            preference_profiles.reloads += 1
+        else:
+            preference_profiles.misses += 1
+
+        cur.execute(PROFILE_SQL, (user_id,))
+        row = cur.fetchone()
+
+    if not row:
+        return None
+    profile = PreferenceProfile(user_id, row["version"], row)
+    preference_profiles.put(profile)
+    return profile
+
+
+def invalidate_preference_profile(user_id):
+    preference_profiles.invalidate(user_id)
+
@@ -0,0 +1,289 @@
+# app/utils/recipe_search.py
+"""
+Full-text search over scraped and user-created recipes.
+
+The scraped, organization and user recipe endpoints each searched with
+``title ILIKE '%...%'``, which can't use an index, only looks at titles and
+pages with OFFSET. recipe_search_index (migration 028) holds one row per
+scraped or user recipe, kept current by statement triggers on the recipe,
+tag and ingredient tables (migration 032), which re-index each recipe a
+statement touched once. Each row has:
+
+- a weighted tsvector: title (A), cuisine and tags (B), ingredient names (C);
+- the title, under a trigram index for substring and misspelled matches;
+- cuisine, complexity and diet tags for filters and facet counts.
+
+Organization libraries only link to those two sources (organization_recipes),
+so they are a filter here rather than a third document set.
+
+search_recipes ranks matches by text rank plus title similarity, counts facets
+over the whole match set, and pages with an opaque keyset cursor. The legacy
+endpoints keep their response shapes and use search_filter to find matching
+ids through the same index.
+
+A trigger whose refresh fails lets the recipe write commit anyway and queues
+the recipe in recipe_search_pending; recipe_search_repairer re-indexes the
+queue in the background.
+"""
+
+import base64
+import json
+import logging
+import os
+import re
+
+from .periodic import PeriodicTask
+from .s3.s3_utils import stored_variant_urls
+
+logger = logging.getLogger(__name__)
+
+RECIPE_SEARCH_REPAIR_MINUTES = float(os.getenv("RECIPE_SEARCH_REPAIR_MINUTES", "5"))
+
+SEARCH_SOURCES = ("scraped", "user")
+FACET_VALUE_LIMIT = 20
+
+RESULT_COLUMNS = """
+    r.source, r.recipe_id AS id, r.title, r.cuisine, r.complexity, r.diet_tags, r.tags,
+    r.image_url, r.total_time, r.is_verified, r.is_public, r.created_by_organization_id
+"""
+
+FACETS_SQL = """
+    WITH matched AS (
+        SELECT r.cuisine, r.complexity, r.diet_tags
+        FROM recipe_search_index r
+        WHERE {where}
+    )
+    SELECT 'total' AS facet, NULL AS value, COUNT(*) AS count FROM matched
+    UNION ALL
+    SELECT 'cuisine', cuisine, COUNT(*) FROM matched WHERE cuisine IS NOT NULL GROUP BY cuisine
+    UNION ALL
+    SELECT 'complexity', complexity, COUNT(*) FROM matched WHERE complexity IS NOT NULL GROUP BY complexity
+    UNION ALL
+    SELECT 'diet_tags', tag, COUNT(*) FROM matched, unnest(diet_tags) AS tag GROUP BY tag
+"""
+
+
+def build_tsquery(text):
+    """A prefix-matching tsquery ('chick:* & curri:*') for the words in ``text``, or None"""
+    words = re.findall(r"\w+", (text or "").lower())
+    if not words:
+        return None
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def like_pattern(text):
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _text_match(text, alias="r"):
+    """(condition, params, rank expression, rank params) for a search term"""
+    tsquery = build_tsquery(text)
+    condition = f"{alias}.title ILIKE %s OR {alias}.title %% %s"
+    params = [like_pattern(text), text]
+    rank = f"similarity({alias}.title, %s)"
+    rank_params = [text]
+    if tsquery:
+        condition = f"{alias}.document @@ to_tsquery('english', %s) OR " + condition
+        params.insert(0, tsquery)
+        rank = f"ts_rank({alias}.document, to_tsquery('english', %s)) + " + rank
+        rank_params.insert(0, tsquery)
+    return f"({condition})", params, rank, rank_params
+
+
+def search_filter(id_column, source, search):
+    """SQL condition (and params) limiting ``id_column`` to ``source`` recipes that match ``search``"""
+    condition, params, _, _ = _text_match(search, alias="s")
+    sql = (f"{id_column} IN (SELECT s.recipe_id FROM recipe_search_index s "
+           f"WHERE s.source = %s AND {condition})")
+    return sql, [source] + params
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor, mode):
+    """The (sort value, source, recipe id) a cursor points after; ValueError if it's not one of ours"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        cursor_mode, sort_value, source, recipe_id = values
+        if cursor_mode != mode or source not in SEARCH_SOURCES:
+            raise ValueError
+        return str(sort_value), source, int(recipe_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _filters(query, sources, cuisine, complexity, diet_tags, user_id, organization_id, exclude_organization_id):
+    clauses = []
+    params = []
+    if sources:
+        clauses.append("r.source = ANY(%s)")
+        params.append(list(sources))
+
+    # User recipes are visible to their creator, the creating organization and, when public, everyone
+    clauses.append("(r.source = 'scraped' OR r.is_public OR r.created_by_user_id = %s "
+                   "OR r.created_by_organization_id = %s)")
+    params.extend([user_id, organization_id])
+
+    if query:
+        condition, text_params, _, _ = _text_match(query)
+        clauses.append(condition)
+        params.extend(text_params)
+    if cuisine:
+        clauses.append("r.cuisine = ANY(%s)")
+        params.append(list(cuisine))
+    if complexity:
+        clauses.append("r.complexity = ANY(%s)")
+        params.append(list(complexity))
+    if diet_tags:
+        clauses.append("r.diet_tags @> %s::text[]")
+        params.append(list(diet_tags))
+    if exclude_organization_id is not None:
+        # Recipes the organization has not added to its library yet
+        clauses.append("""NOT EXISTS (
+            SELECT 1 FROM organization_recipes o
+            WHERE o.organization_id = %s
+            AND ((r.source = 'scraped' AND o.recipe_id = r.recipe_id)
+                 OR (r.source = 'user' AND o.user_recipe_id = r.recipe_id))
+        )""")
+        params.append(exclude_organization_id)
+    return " AND ".join(clauses), params
+
+
+def _facets(rows):
+    facets = {"cuisine": [], "complexity": [], "diet_tags": []}
+    total = 0
+    for row in rows:
+        if row["facet"] == "total":
+            total = row["count"]
+        else:
+            facets[row["facet"]].append({"value": row["value"], "count": row["count"]})
+    for name, values in facets.items():
+        values.sort(key=lambda v: (-v["count"], v["value"]))
+        facets[name] = values[:FACET_VALUE_LIMIT]
+    return total, facets
+
+
+def search_recipes(query=None, sources=None, cuisine=None, complexity=None, diet_tags=None,
+                   user_id=None, organization_id=None, exclude_organization_id=None,
+                   cursor=None, limit=20, include_facets=True):
+    """
+    One page of matching recipes, ranked by relevance when there is a query
+    and by title otherwise.
+
+    Returns {"recipes", "next_cursor", "total", "facets"}; total and facets
+    are only computed for the first page (no cursor) and are None after it.
+    Raises ValueError for a cursor from another query mode or not from here.
+    """
+    from app.db import session_cursor
+
+    query = (query or "").strip() or None
+    where, params = _filters(query, sources, cuisine, complexity, diet_tags,
+                             user_id, organization_id, exclude_organization_id)
+
+    if query:
+        mode = "rank"
+        _, _, rank, rank_params = _text_match(query)
+        sql = f"""
+            SELECT * FROM (
+                SELECT {RESULT_COLUMNS}, ROUND(({rank})::numeric, 6) AS rank
+                FROM recipe_search_index r
+                WHERE {where}
+            ) ranked
+        """
+        page_params = rank_params + params
+        if cursor:
+            rank_after, source_after, id_after = decode_cursor(cursor, mode)
+            sql += " WHERE rank < %s::numeric OR (rank = %s::numeric AND (source, id) > (%s, %s))"
+            page_params += [rank_after, rank_after, source_after, id_after]
+        sql += " ORDER BY rank DESC, source, id LIMIT %s"
+    else:
+        mode = "title"
+        sql = f"""
+            SELECT {RESULT_COLUMNS}, NULL AS rank
+            FROM recipe_search_index r
+            WHERE {where}
+        """
+        page_params = list(params)
+        if cursor:
+            title_after, source_after, id_after = decode_cursor(cursor, mode)
+            sql += " AND (r.title, r.source, r.recipe_id) > (%s, %s, %s)"
+            page_params += [title_after, source_after, id_after]
+        sql += " ORDER BY r.title, r.source, r.recipe_id LIMIT %s"
+    page_params.append(limit + 1)
+
+    total = facets = None
+    with session_cursor(dict_cursor=True) as (cur, conn):
+        cur.execute(sql, page_params)
+        rows = cur.fetchall()
+        if include_facets and not cursor:
+            cur.execute(FACETS_SQL.format(where=where), params)
+            total, facets = _facets(cur.fetchall())
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        sort_value = last["rank"] if mode == "rank" else last["title"]
+        next_cursor = encode_cursor([mode, str(sort_value), last["source"], last["id"]])
+
+    variants = stored_variant_urls(row.get("image_url") for row in rows)
+    recipes = []
+    for row in rows:
+        recipe = dict(row)
+        recipe["recipe_type"] = recipe["source"]
+        recipe["rank"] = float(recipe["rank"]) if recipe["rank"] is not None else None
+        recipe["image_variants"] = variants.get(recipe.get("image_url"), {})
+        recipes.append(recipe)
+
+    return {"recipes": recipes, "next_cursor": next_cursor, "total": total, "facets": facets}
+
+
+REFRESH_FUNCTIONS = {"scraped": "refresh_scraped_recipe_search", "user": "refresh_user_recipe_search"}
+
+
+def refresh_pending_recipe_search(batch_size=500):
+    """
+    Re-index recipes whose trigger refresh failed. Each batch is claimed with
+    SKIP LOCKED, so workers running this at once never share recipes, and
+    stays queued if the refresh fails again.
+
+    Returns {source: recipes re-indexed}.
+    """
+    from app.db import get_db_cursor
+
+    refreshed = {}
+    for source, function in REFRESH_FUNCTIONS.items():
+        refreshed[source] = 0
+        while True:
+            with get_db_cursor(dict_cursor=False) as (cur, conn):
+                cur.execute("""
+                    DELETE FROM recipe_search_pending
+                    WHERE (source, recipe_id) IN (
+                        SELECT source, recipe_id FROM recipe_search_pending
+                        WHERE source = %s
+                        ORDER BY queued_at
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING recipe_id
+                """, (source, batch_size))
+                ids = [row[0] for row in cur.fetchall()]
+                if ids:
+                    cur.execute(f"SELECT {function}(%s::integer[])", (ids,))
+                conn.commit()
+            refreshed[source] += len(ids)
+            if len(ids) < batch_size:
+                break
+    if any(refreshed.values()):
+        logger.info(f"Re-indexed queued recipes for search: {refreshed}")
+    return refreshed
+
+
+recipe_search_repairer = PeriodicTask(
+    "recipe-search-repairer",
+    refresh_pending_recipe_search,
+    interval_s=RECIPE_SEARCH_REPAIR_MINUTES * 60,
+)
@@ -1,17 +1,231 @@
 """
 AWS S3 utilities for handling image uploads and downloads
 """
+import io
+import json
 import os
 import uuid
 import logging
-import boto3
 from botocore.exceptions import ClientError
 from fastapi import UploadFile, HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from app.utils.lazy_import import is_module_available, lazy_import
+
+# boto3 is imported on first use; it's one of the slowest imports at worker boot
+boto3 = lazy_import("boto3")
+
+# Pillow is optional (and imported on first resize): without it originals are
+# still uploaded, just without variants
+PIL_AVAILABLE = is_module_available("PIL")
 
 # Configure more detailed logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Optional S3-compatible endpoint (MinIO, LocalStack, moto server) for local testing.
+# S3_PUBLIC_URL overrides the base used when building object URLs for that endpoint.
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")
+S3_PUBLIC_URL = os.getenv("S3_PUBLIC_URL", "")
+
+# Uploads above the threshold are streamed to S3 as multipart uploads
+S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "8")) * 1024 * 1024
+S3_MULTIPART_CHUNKSIZE = int(os.getenv("S3_MULTIPART_CHUNKSIZE_MB", "8")) * 1024 * 1024
+
+# Resized WebP variants generated for every uploaded image, as "name:max_width" pairs.
+# Variants are stored next to the original as <key>_<name>.webp, and the ones
+# actually written are recorded in the image_variants table.
+IMAGE_VARIANTS = os.getenv("IMAGE_VARIANTS", "thumb:320,medium:800")
+IMAGE_VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", "80"))
+
+# Object keys are unique per upload, so browsers and CDNs can cache them indefinitely
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class _UncloseableFile:
+    """s3transfer closes the file it uploads; keep the caller's UploadFile usable."""
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+
+    def __getattr__(self, name):
+        return getattr(self._fileobj, name)
+
+    def close(self):
+        pass
+
+
+def _parse_variant_sizes(spec):
+    """Parse IMAGE_VARIANTS ("thumb:320,medium:800") into [(name, width), ...]."""
+    sizes = []
+    for part in (spec or "").split(","):
+        name, _, width = part.strip().partition(":")
+        if name and width.isdigit() and int(width) > 0:
+            sizes.append((name, int(width)))
+    return sizes
+
+
+VARIANT_SIZES = _parse_variant_sizes(IMAGE_VARIANTS)
+
+
+def _parse_region(aws_region_or_url):
+    """AWS_REGION is sometimes set to an endpoint URL; pull the region out of it."""
+    if "amazonaws.com" not in aws_region_or_url:
+        return aws_region_or_url
+    for part in aws_region_or_url.split('.'):
+        if part.startswith('us-') or part.startswith('eu-') or part.startswith('ap-') or part.startswith('sa-'):
+            return part
+    # Fallback if no region found in the URL
+    return "us-east-2"
+
+
+def public_url_for_key(key, bucket_name=None, region=None):
+    """Public URL of an object in the configured bucket."""
+    bucket_name = bucket_name or os.getenv("S3_BUCKET_NAME")
+    region = region or _parse_region(os.getenv("AWS_REGION", "us-east-2") or "us-east-2")
+    if S3_ENDPOINT_URL:
+        base = (S3_PUBLIC_URL or S3_ENDPOINT_URL).rstrip("/")
+        return f"{base}/{bucket_name}/{key}"
+    if region == "us-east-1":
+        # Special case for us-east-1 which doesn't need region in the URL
+        return f"https://{bucket_name}.s3.amazonaws.com/{key}"
+    # Region-specific URL format
+    return f"https://{bucket_name}.s3.{region}.amazonaws.com/{key}"
+
+
+def key_from_url(image_url, bucket_name=None, region=None):
+    """Object key for a URL in the configured bucket, or None if the URL isn't ours."""
+    bucket_name = bucket_name or os.getenv("S3_BUCKET_NAME")
+    if not image_url or not bucket_name or bucket_name not in image_url:
+        return None
+    region = region or _parse_region(os.getenv("AWS_REGION", "us-east-2") or "us-east-2")
+
+    prefixes = [
+        f"{bucket_name}.s3.amazonaws.com/",
+        f"{bucket_name}.s3.{region}.amazonaws.com/",
+    ]
+    if S3_ENDPOINT_URL:
+        prefixes.insert(0, f"{(S3_PUBLIC_URL or S3_ENDPOINT_URL).rstrip('/')}/{bucket_name}/")
+    for prefix in prefixes:
+        if prefix in image_url:
+            return image_url.split(prefix, 1)[1]
+
+    # Try to extract by looking for common patterns
+    parts = image_url.split('/')
+    for i, part in enumerate(parts):
+        if bucket_name in part and 's3' in part and i + 1 < len(parts):
+            return '/'.join(parts[i + 1:])
+    return None
+
+
+def variant_key(key, name):
+    """Key of the ``name`` WebP variant stored alongside ``key``."""
+    base, _ = os.path.splitext(key)
+    return f"{base}_{name}.webp"
+
+
+def record_image_variants(key, variant_keys):
+    """Record the variants written for ``key`` ({name: variant key}); blocking."""
+    from app.db import get_db_cursor
+
+    try:
+        with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
+            cur.execute("""
+                INSERT INTO image_variants (image_key, variants)
+                VALUES (%s, %s)
+                ON CONFLICT (image_key) DO UPDATE
+                SET variants = EXCLUDED.variants, created_at = CURRENT_TIMESTAMP
+            """, (key, json.dumps(variant_keys)))
+    except Exception as e:
+        # The variants just aren't advertised; the original is unaffected
+        logger.error(f"Error recording image variants for {key}: {str(e)}")
+
+
+def forget_image_variants(key):
+    from app.db import get_db_cursor
+
+    try:
+        with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
+            cur.execute("DELETE FROM image_variants WHERE image_key = %s", (key,))
+    except Exception as e:
+        logger.error(f"Error removing image variant record for {key}: {str(e)}")
+
+
+def stored_variant_urls(image_urls):
+    """
+    {image_url: {variant name: URL}} for the images that have recorded variants.
+
+    One query for the whole batch. External URLs (scraped source images),
+    images that couldn't be resized and images that were never backfilled
+    are left out, so callers never advertise a variant that doesn't exist.
+    """
+    from app.db import session_cursor
+
+    urls_by_key = {}
+    for url in image_urls:
+        key = key_from_url(url)
+        if key:
+            urls_by_key.setdefault(key, []).append(url)
+    if not urls_by_key:
+        return {}
+
+    try:
+        with session_cursor(dict_cursor=False) as (cur, conn):
+            cur.execute(
+                "SELECT image_key, variants FROM image_variants WHERE image_key = ANY(%s)",
+                (list(urls_by_key),)
+            )
+            rows = cur.fetchall()
+    except Exception as e:
+        logger.error(f"Error reading image variants: {str(e)}")
+        return {}
+
+    result = {}
+    for key, variants in rows:
+        if isinstance(variants, str):
+            variants = json.loads(variants)
+        urls = {name: public_url_for_key(path) for name, path in (variants or {}).items()}
+        for url in urls_by_key[key]:
+            result[url] = urls
+    return result
+
+
+def image_variant_urls(image_url):
+    """URLs of the recorded WebP variants of one image, keyed by variant name ({} if none)."""
+    if not image_url:
+        return {}
+    return stored_variant_urls([image_url]).get(image_url, {})
+
+
+def generate_image_variants(fileobj, sizes=None):
+    """
+    Resize an image into WebP variants no wider than each configured width.
+
+    Returns [(name, webp_bytes), ...]; empty when Pillow isn't installed.
+    Raises whatever Pillow raises for unreadable images.
+    """
+    sizes = VARIANT_SIZES if sizes is None else sizes
+    if not PIL_AVAILABLE or not sizes:
+        return []
+
+    from PIL import Image, ImageOps
+
+    fileobj.seek(0)
+    with Image.open(fileobj) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        variants = []
+        for name, width in sizes:
+            resized = image
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, "WEBP", quality=IMAGE_VARIANT_QUALITY, method=4)
+            variants.append((name, buffer.getvalue()))
+    return variants
+
 class S3Helper:
     def __init__(self):
         """Initialize S3 client connection using environment variables"""
@@ -39,20 +253,15 @@ class S3Helper:
         aws_region_or_url = region_direct or region_getenv or "us-east-2"
         logger.info(f"AWS_REGION raw value: {aws_region_or_url}")
         
-        # Parse the region
-        if "amazonaws.com" in aws_region_or_url:
-            # Extract region from URL like https://sts.us-east-2.amazonaws.com
-            parts = aws_region_or_url.split('.')
-            for part in parts:
-                if part.startswith('us-') or part.startswith('eu-') or part.startswith('ap-') or part.startswith('sa-'):
-                    self.region = part
-                    break
-            else:
-                # Fallback if no region found in the URL
-                self.region = "us-east-2"
+        # Parse the region (extracts it from URLs like https://sts.us-east-2.amazonaws.com)
+        self.region = _parse_region(aws_region_or_url)
+        if self.region != aws_region_or_url:
             logger.info(f"Extracted region '{self.region}' from URL: {aws_region_or_url}")
-        else:
-            self.region = aws_region_or_url
+
+        # Whether the bucket accepts ACLs; flipped off after the first AccessDenied
+        # so later uploads don't pay for a failed request every time
+        self._acl_supported = True
+        self._transfer_config = None
         
         # Get bucket name
         self.bucket_name = bucket_direct or bucket_getenv
@@ -78,11 +287,16 @@ class S3Helper:
         # Initialize S3 client
         try:
             logger.info(f"Creating boto3 S3 client with access_key={self.aws_access_key[:4]}*** and region={self.region}")
+            client_kwargs = {}
+            if S3_ENDPOINT_URL:
+                client_kwargs["endpoint_url"] = S3_ENDPOINT_URL
+                logger.info(f"Using S3-compatible endpoint: {S3_ENDPOINT_URL}")
             self.s3_client = boto3.client(
                 's3',
                 aws_access_key_id=self.aws_access_key,
                 aws_secret_access_key=self.aws_secret_key,
-                region_name=self.region
+                region_name=self.region,
+                **client_kwargs
             )
             
             # Test connection with a simple operation that only requires bucket-specific permissions
@@ -110,70 +324,111 @@ class S3Helper:
             logger.error(f"Failed to initialize S3 client: {str(e)}")
             raise ValueError(f"S3 client initialization failed: {str(e)}")
     
-    async def upload_image(self, file: UploadFile, folder: str = "recipe-images"):
+    def object_url(self, key):
+        """Public URL for an object in this helper's bucket."""
+        return public_url_for_key(key, self.bucket_name, self.region)
+
+    def _get_transfer_config(self):
+        if self._transfer_config is None:
+            from boto3.s3.transfer import TransferConfig
+            self._transfer_config = TransferConfig(
+                multipart_threshold=S3_MULTIPART_THRESHOLD,
+                multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+            )
+        return self._transfer_config
+
+    def _upload_fileobj(self, fileobj, key, content_type):
         """
-        Upload an image file to S3 bucket
-        
+        Stream a file object to S3 (blocking; call from a worker thread).
+
+        upload_fileobj switches to a multipart upload above S3_MULTIPART_THRESHOLD,
+        so large files are never held in memory in full.
+        """
+        extra_args = {"ContentType": content_type, "CacheControl": IMAGE_CACHE_CONTROL}
+
+        # Try to upload with public-read ACL first, but if that fails due to ACL issues,
+        # we'll try again without the ACL parameter
+        fileobj = _UncloseableFile(fileobj)
+        if self._acl_supported:
+            try:
+                fileobj.seek(0)
+                self.s3_client.upload_fileobj(
+                    fileobj, self.bucket_name, key,
+                    ExtraArgs={**extra_args, "ACL": "public-read"},
+                    Config=self._get_transfer_config()
+                )
+                return
+            except ClientError as acl_error:
+                if 'AccessDenied' in str(acl_error) and 'ACL' in str(acl_error):
+                    logger.warning("Could not set public-read ACL. Uploading without ACL from now on.")
+                    logger.warning("You need to manually set bucket policy for public access.")
+                    self._acl_supported = False
+                else:
+                    # Re-raise if it's not an ACL-related error
+                    raise
+
+        fileobj.seek(0)
+        self.s3_client.upload_fileobj(
+            fileobj, self.bucket_name, key,
+            ExtraArgs=extra_args,
+            Config=self._get_transfer_config()
+        )
+
+    def _upload_variants(self, fileobj, key):
+        """Generate and upload the WebP variants for ``key`` (blocking)."""
+        try:
+            variants = generate_image_variants(fileobj)
+        except Exception as e:
+            # Not a decodable image (or Pillow can't read it); keep the original only
+            logger.warning(f"Could not generate image variants for {key}: {str(e)}")
+            return {}
+
+        paths = {}
+        for name, data in variants:
+            path = variant_key(key, name)
+            self._upload_fileobj(io.BytesIO(data), path, "image/webp")
+            paths[name] = path
+        if paths:
+            record_image_variants(key, paths)
+            logger.info(f"Uploaded {len(variants)} variants for {key}")
+        return {name: self.object_url(path) for name, path in paths.items()}
+
+    async def upload_image_with_variants(self, file: UploadFile, folder: str = "recipe-images"):
+        """
+        Upload an image file to S3 bucket along with resized WebP variants
+
+        The S3 calls run in the threadpool so the event loop isn't blocked, and
+        the upload streams from the spooled temp file instead of reading it
+        into memory.
+
         Args:
             file (UploadFile): The image file to upload
             folder (str): The folder within the bucket to store the image
-            
+
         Returns:
-            str: The URL of the uploaded image
+            dict: {"url": original URL, "variants": {variant name: URL}}
         """
         try:
             # Log file information
             logger.debug(f"Upload request received for file: {file.filename}, content-type: {file.content_type}")
             logger.debug(f"Using bucket: {self.bucket_name}, region: {self.region}")
-            
+
             # Generate a unique filename to avoid collisions
             file_extension = os.path.splitext(file.filename)[1] if file.filename else ".jpg"
             unique_filename = f"{uuid.uuid4()}{file_extension}"
             s3_path = f"{folder}/{unique_filename}"
             logger.debug(f"Generated S3 path: {s3_path}")
-            
-            # Read file content
-            file_content = await file.read()
-            logger.debug(f"Read file content: {len(file_content)} bytes")
-            
-            # Try to upload with public-read ACL first, but if that fails due to ACL issues,
-            # we'll try again without the ACL parameter
+
             logger.debug(f"Attempting to upload to S3 bucket: {self.bucket_name}")
-            try:
-                response = self.s3_client.put_object(
-                    Bucket=self.bucket_name,
-                    Key=s3_path,
-                    Body=file_content,
-                    ContentType=file.content_type or "image/jpeg",
-                    ACL='public-read'  # Attempting to make the object publicly readable
-                )
-                logger.info("Successfully uploaded with public-read ACL")
-            except ClientError as acl_error:
-                if 'AccessDenied' in str(acl_error) and 'ACL' in str(acl_error):
-                    logger.warning("Could not set public-read ACL. Trying without ACL parameter.")
-                    # Try again without ACL parameter
-                    response = self.s3_client.put_object(
-                        Bucket=self.bucket_name,
-                        Key=s3_path,
-                        Body=file_content,
-                        ContentType=file.content_type or "image/jpeg"
-                    )
-                    logger.warning("Image uploaded without ACL. You need to manually set bucket policy for public access.")
-                else:
-                    # Re-raise if it's not an ACL-related error
-                    raise
-            logger.debug(f"S3 put_object response: {response}")
-            
-            # Generate URL with region-specific endpoint format
-            if self.region == "us-east-1":
-                # Special case for us-east-1 which doesn't need region in the URL
-                url = f"https://{self.bucket_name}.s3.amazonaws.com/{s3_path}"
-            else:
-                # Region-specific URL format
-                url = f"https://{self.bucket_name}.s3.{self.region}.amazonaws.com/{s3_path}"
+            await run_in_threadpool(
+                self._upload_fileobj, file.file, s3_path, file.content_type or "image/jpeg"
+            )
+            variants = await run_in_threadpool(self._upload_variants, file.file, s3_path)
+
+            url = self.object_url(s3_path)
             logger.info(f"Image uploaded successfully to {url}")
-            return url
-            
+            return {"url": url, "variants": variants}
+
         except ClientError as e:
             error_code = e.response['Error']['Code'] if 'Error' in e.response else 'Unknown'
             error_message = e.response['Error']['Message'] if 'Error' in e.response else str(e)
@@ -200,10 +455,24 @@ class S3Helper:
         finally:
             # Reset file position for potential future reads
             await file.seek(0)
+
+    async def upload_image(self, file: UploadFile, folder: str = "recipe-images"):
+        """
+        Upload an image file to S3 bucket
+        
+        Args:
+            file (UploadFile): The image file to upload
+            folder (str): The folder within the bucket to store the image
+            
+        Returns:
+            str: The URL of the uploaded image
+        """
+        result = await self.upload_image_with_variants(file, folder)
+        return result["url"]
     
     def delete_image(self, image_url: str):
         """
-        Delete an image from S3 bucket using its URL
+        Delete an image (and its WebP variants) from S3 bucket using its URL
         
         Args:
             image_url (str): The URL of the image to delete
@@ -212,36 +481,19 @@ class S3Helper:
             bool: True if successful, False otherwise
         """
         try:
-            # Extract the key from the URL
-            if not image_url or not self.bucket_name in image_url:
+            # Extract the key from the URL - handles regional, non-regional and custom endpoint URLs
+            key = key_from_url(image_url, self.bucket_name, self.region)
+            if not key:
                 logger.warning(f"Cannot delete image: Invalid S3 URL: {image_url}")
                 return False
-                
-            # Parse URL to get S3 key - handle both regional and non-regional URL formats
-            if f"{self.bucket_name}.s3.amazonaws.com/" in image_url:
-                key = image_url.split(f"{self.bucket_name}.s3.amazonaws.com/")[1]
-            elif f"{self.bucket_name}.s3.{self.region}.amazonaws.com/" in image_url:
-                key = image_url.split(f"{self.bucket_name}.s3.{self.region}.amazonaws.com/")[1]
-            else:
-                # Try to extract by looking for common patterns
-                parts = image_url.split('/')
-                bucket_index = -1
-                for i, part in enumerate(parts):
-                    if self.bucket_name in part and 's3' in part:
-                        bucket_index = i
-                        break
-                
-                if bucket_index >= 0 and bucket_index + 1 < len(parts):
-                    key = '/'.join(parts[bucket_index+1:])
-                else:
-                    logger.warning(f"Cannot parse S3 key from URL: {image_url}")
-                    return False
             
-            # Delete from S3
-            self.s3_client.delete_object(
+            # Delete the original and any variants in one request
+            keys = [key] + [variant_key(key, name) for name, _ in VARIANT_SIZES]
+            self.s3_client.delete_objects(
                 Bucket=self.bucket_name,
-                Key=key
+                Delete={"Objects": [{"Key": k} for k in keys], "Quiet": True}
             )
+            forget_image_variants(key)
             
             logger.info(f"Image deleted successfully: {key}")
             return True
@@ -256,7 +508,11 @@ class S3Helper:
 # Function to force initialize S3 helper at runtime
 def force_initialize_s3_helper():
     """Attempt to initialize S3 helper at runtime after environment variables might be loaded"""
-    global s3_helper
+    global _s3_helper_instance
+    # Already connected: don't rebuild the client and re-check the bucket on every upload
+    if isinstance(_s3_helper_instance, S3Helper):
+        return _s3_helper_instance
+
     logger.info("Attempting to force initialize S3 helper")
     
     # Try reading from environment - Railway specific handling
@@ -294,7 +550,8 @@ def force_initialize_s3_helper():
                     's3',
                     aws_access_key_id=aws_access_key,
                     aws_secret_access_key=aws_secret_key,
-                    region_name=aws_region
+                    region_name=aws_region,
+                    **({"endpoint_url": S3_ENDPOINT_URL} if S3_ENDPOINT_URL else {})
                 )
                 
                 # Try a bucket-specific operation instead of listing all buckets
@@ -322,7 +579,7 @@ def force_initialize_s3_helper():
                 logger.info("Creating S3Helper with verified credentials")
                 real_s3_helper = S3Helper()
                 logger.info(f"Successfully created S3Helper with bucket: {real_s3_helper.bucket_name}")
-                s3_helper = real_s3_helper
+                _s3_helper_instance = real_s3_helper
                 return real_s3_helper
             except Exception as e:
                 logger.error(f"Failed to initialize S3Helper at runtime: {str(e)}", exc_info=True)
@@ -343,63 +600,75 @@ def force_initialize_s3_helper():
     logger.error("Failed to initialize S3 helper with environment variables")
     logger.error("Please set the AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, S3_BUCKET_NAME, and AWS_REGION environment variables in your Railway deployment")
     
-    return s3_helper
-
-# Try to create the singleton instance
-try:
-    s3_helper = S3Helper()
-    logger.info(f"S3Helper initialized successfully with bucket: {s3_helper.bucket_name}")
-except ValueError as e:
-    logger.warning(f"S3Helper initialization failed: {str(e)}")
-    # Create a placeholder that will attempt runtime initialization when called
-    class DummyS3Helper:
-        def __init__(self):
-            self.bucket_name = None
-            
-        async def upload_image(self, file, folder="recipe-images"):
-            logger.error("S3 helper initialization failed. Attempting on-demand initialization.")
-            # Try to initialize on demand if called after environment variables are set
-            s3 = force_initialize_s3_helper()
-            if not hasattr(s3, 'bucket_name') or s3.bucket_name is None:
-                raise HTTPException(
-                    status_code=500, 
-                    detail="S3 configuration is missing or incomplete. Check AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, S3_BUCKET_NAME, and AWS_REGION environment variables."
-                )
-            return await s3.upload_image(file, folder)
-            
-        def delete_image(self, image_url):
-            logger.error("S3 helper initialization failed. Attempting on-demand initialization.")
-            # Try to initialize on demand
-            s3 = force_initialize_s3_helper()
-            if not hasattr(s3, 'bucket_name') or s3.bucket_name is None:
-                return False
-            return s3.delete_image(image_url)
-    
-    s3_helper = DummyS3Helper()
-except Exception as e:
-    logger.error(f"Unexpected error initializing S3Helper: {str(e)}")
-    # Create a placeholder with the same interface that attempts runtime initialization
-    class DummyS3Helper:
-        def __init__(self):
-            self.bucket_name = None
-            
-        async def upload_image(self, file, folder="recipe-images"):
-            logger.error("S3 helper failed to initialize. Attempting on-demand initialization.")
-            # Try to initialize on demand if called after environment variables are set
-            s3 = force_initialize_s3_helper()
-            if not hasattr(s3, 'bucket_name') or s3.bucket_name is None:
-                raise HTTPException(
-                    status_code=500, 
-                    detail="S3 configuration is missing or incomplete. Check AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, S3_BUCKET_NAME, and AWS_REGION environment variables."
-                )
-            return await s3.upload_image(file, folder)
-            
-        def delete_image(self, image_url):
-            logger.error("S3 helper failed to initialize. Attempting on-demand initialization.")
-            # Try to initialize on demand
-            s3 = force_initialize_s3_helper()
-            if not hasattr(s3, 'bucket_name') or s3.bucket_name is None:
-                return False
-            return s3.delete_image(image_url)
-    
-    s3_helper = DummyS3Helper()
\ No newline at end of file
+    return _s3_helper_instance if _s3_helper_instance is not None else DummyS3Helper()
+
+class DummyS3Helper:
+    """Placeholder used when S3 isn't configured; retries initialization on each call."""
+    def __init__(self):
+        self.bucket_name = None
+        
+    async def upload_image(self, file, folder="recipe-images"):
+        logger.error("S3 helper initialization failed. Attempting on-demand initialization.")
+        # Try to initialize on demand if called after environment variables are set
+        s3 = force_initialize_s3_helper()
+        if not hasattr(s3, 'bucket_name') or s3.bucket_name is None:
+            raise HTTPException(
+                status_code=500, 
+                detail="S3 configuration is missing or incomplete. Check AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, S3_BUCKET_NAME, and AWS_REGION environment variables."
+            )
+        return await s3.upload_image(file, folder)
+
+    async def upload_image_with_variants(self, file, folder="recipe-images"):
+        logger.error("S3 helper initialization failed. Attempting on-demand initialization.")
+        s3 = force_initialize_s3_helper()
+        if not hasattr(s3, 'bucket_name') or s3.bucket_name is None:
+            raise HTTPException(
+                status_code=500, 
+                detail="S3 configuration is missing or incomplete. Check AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, S3_BUCKET_NAME, and AWS_REGION environment variables."
+            )
+        return await s3.upload_image_with_variants(file, folder)
+        
+    def delete_image(self, image_url):
+        logger.error("S3 helper initialization failed. Attempting on-demand initialization.")
+        # Try to initialize on demand
+        s3 = force_initialize_s3_helper()
+        if not hasattr(s3, 'bucket_name') or s3.bucket_name is None:
+            return False
+        return s3.delete_image(image_url)
+
+
+_s3_helper_instance = None
+
+def get_s3_helper():
+    """Return the S3 helper, creating it (boto3 client + bucket check) on first use."""
+    global _s3_helper_instance
+    if _s3_helper_instance is None:
+        try:
+            _s3_helper_instance = S3Helper()
+            logger.info(f"S3Helper initialized successfully with bucket: {_s3_helper_instance.bucket_name}")
+        except ValueError as e:
+            logger.warning(f"S3Helper initialization failed: {str(e)}")
+            # Create a placeholder that will attempt runtime initialization when called
+            _s3_helper_instance = DummyS3Helper()
+        except Exception as e:
+            logger.error(f"Unexpected error initializing S3Helper: {str(e)}")
+            _s3_helper_instance = DummyS3Helper()
+    return _s3_helper_instance
+
+
+class _LazyS3Helper:
+    """
+    Module-level ``s3_helper`` stand-in. Creating the real helper imports boto3
+    and makes a network call to the bucket, so it is deferred until an upload
+    or delete actually needs it instead of running at import time.
+    """
+    def __getattr__(self, name):
+        return getattr(get_s3_helper(), name)
+
+
+def is_s3_configured():
+    """Cheap check of the S3 environment variables without initializing the client."""
+    return all(os.getenv(var) for var in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "S3_BUCKET_NAME"))
+
+
+s3_helper = _LazyS3Helper()
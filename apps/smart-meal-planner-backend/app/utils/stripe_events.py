@@ -0,0 +1,173 @@
+# app/utils/stripe_events.py
+"""
+Background processing of Stripe webhook events.
+
+stripe_webhook_handler only verifies the signature and records the event in
+subscription_events (log_subscription_event drops redeliveries of a Stripe
+event id), so Stripe gets its 200 well inside its timeout even during renewal
+bursts. This worker applies the recorded events:
+
+- oldest first (by the event's Stripe ``created`` time),
+- in order per Stripe subscription (or customer): a later event for the same
+  key waits until the earlier one has been applied or given up on,
+- retrying failures with exponential backoff, up to STRIPE_EVENT_MAX_ATTEMPTS.
+
+Keys whose oldest event is waiting out a retry are left out of the pending
+query itself, so however many of them pile up at the front of the queue,
+events for every other key still get through.
+
+Every worker process runs a copy; a session advisory lock lets only one of
+them drain the queue at a time.
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+from .periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+STRIPE_EVENT_POLL_S = float(os.getenv("STRIPE_EVENT_POLL_S", "15"))
+STRIPE_EVENT_BATCH = int(os.getenv("STRIPE_EVENT_BATCH", "100"))
+STRIPE_EVENT_MAX_ATTEMPTS = int(os.getenv("STRIPE_EVENT_MAX_ATTEMPTS", "8"))
+STRIPE_EVENT_RETRY_BASE_S = float(os.getenv("STRIPE_EVENT_RETRY_BASE_S", "30"))
+STRIPE_EVENT_RETRY_MAX_S = 3600
+
+# Session-scoped advisory lock so only one process drains the queue ("SMPSTRP")
+STRIPE_EVENT_LOCK_KEY = 0x534d5053545250
+
+# Only a key's oldest pending event is ever attempted, so a pending row with a
+# future next_attempt_at marks its whole key as waiting
+PENDING_SQL = """
+    SELECT e.id, e.event_type, e.event_data, e.provider_event_id, e.ordering_key, e.attempts
+    FROM subscription_events e
+    WHERE e.ordering_key IS NOT NULL
+    AND NOT e.processed
+    AND NOT EXISTS (
+        SELECT 1 FROM subscription_events waiting
+        WHERE waiting.ordering_key = e.ordering_key
+        AND NOT waiting.processed
+        AND waiting.next_attempt_at > CURRENT_TIMESTAMP
+    )
+    ORDER BY e.event_created, e.id
+    LIMIT %s
+"""
+
+MARK_PROCESSED_SQL = """
+    UPDATE subscription_events
+    SET processed = TRUE,
+        processed_at = CURRENT_TIMESTAMP,
+        subscription_id = COALESCE(%s, subscription_id),
+        attempts = attempts + 1,
+        last_error = NULL
+    WHERE id = %s
+"""
+
+RETRY_SQL = """
+    UPDATE subscription_events
+    SET attempts = %s,
+        last_error = %s,
+        next_attempt_at = CURRENT_TIMESTAMP + %s * INTERVAL '1 second'
+    WHERE id = %s
+"""
+
+# Given-up events are closed so later events for the same key can proceed;
+# they stay findable as processed rows with a last_error
+GIVE_UP_SQL = """
+    UPDATE subscription_events
+    SET attempts = %s,
+        last_error = %s,
+        processed = TRUE,
+        processed_at = CURRENT_TIMESTAMP
+    WHERE id = %s
+"""
+
+
+def ordering_key(event_object) -> str:
+    """Key that orders a Stripe event's processing: its subscription, else customer, else the object itself"""
+    if event_object.get("object") == "subscription":
+        return event_object.get("id")
+    return event_object.get("subscription") or event_object.get("customer") or event_object.get("id")
+
+
+def retry_delay(attempts: int) -> float:
+    return min(STRIPE_EVENT_RETRY_BASE_S * 2 ** (attempts - 1), STRIPE_EVENT_RETRY_MAX_S)
+
+
+def apply_event(row):
+    """Run the subscription router's handler for one recorded event; returns the local subscription id"""
+    from app.routers.subscriptions import dispatch_stripe_event
+
+    return asyncio.run(dispatch_stripe_event(row["event_data"]))
+
+
+def _record_failure(cur, row, error) -> bool:
+    attempts = row["attempts"] + 1
+    message = str(error)[:2000]
+    if attempts >= STRIPE_EVENT_MAX_ATTEMPTS:
+        logger.error(f"Giving up on Stripe event {row['provider_event_id']} after {attempts} attempts: {message}")
+        cur.execute(GIVE_UP_SQL, (attempts, message, row["id"]))
+        return False
+    delay = retry_delay(attempts)
+    logger.warning(f"Stripe event {row['provider_event_id']} failed (attempt {attempts}), retrying in {delay:g}s: {message}")
+    cur.execute(RETRY_SQL, (attempts, message, delay, row["id"]))
+    return True
+
+
+def _process_batch(cur, batch_size: int) -> dict:
+    cur.execute(PENDING_SQL, (batch_size,))
+    rows = cur.fetchall()
+    counts = {"fetched": len(rows), "processed": 0, "retrying": 0, "failed": 0, "deferred": 0}
+    blocked = set()
+    for row in rows:
+        key = row["ordering_key"]
+        if key in blocked:
+            counts["deferred"] += 1
+            continue
+        try:
+            subscription_id = apply_event(row)
+        except Exception as e:
+            blocked.add(key)
+            counts["retrying" if _record_failure(cur, row, e) else "failed"] += 1
+            continue
+        cur.execute(MARK_PROCESSED_SQL, (subscription_id, row["id"]))
+        counts["processed"] += 1
+    return counts
+
+
+def process_stripe_events(batch_size: int = STRIPE_EVENT_BATCH) -> dict:
+    """Apply due Stripe events until the queue holds nothing more to do right now."""
+    from app.db import get_db_cursor
+
+    started = time.perf_counter()
+    totals = {"processed": 0, "retrying": 0, "failed": 0, "deferred": 0}
+    with get_db_cursor(dict_cursor=True, autocommit=True) as (cur, conn):
+        cur.execute("SELECT pg_try_advisory_lock(%s) AS locked", (STRIPE_EVENT_LOCK_KEY,))
+        if not cur.fetchone()["locked"]:
+            return {"status": "skipped", "reason": "another worker is processing"}
+        try:
+            while True:
+                counts = _process_batch(cur, batch_size)
+                for name in totals:
+                    totals[name] += counts[name]
+                # A short batch means nothing else is due yet. Failures in a full
+                # batch leave their keys waiting, so the next one moves past them.
+                if counts["fetched"] < batch_size:
+                    break
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (STRIPE_EVENT_LOCK_KEY,))
+
+    if totals["processed"] or totals["retrying"] or totals["failed"]:
+        logger.info(f"Stripe events: {totals}")
+    totals["duration_s"] = round(time.perf_counter() - started, 2)
+    return totals
+
+
+stripe_event_worker = PeriodicTask(
+    "stripe-event-worker",
+    process_stripe_events,
+    interval_s=STRIPE_EVENT_POLL_S,
+    initial_delay_s=5,
+)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Script to generate resized WebP variants for images uploaded before the
+variant pipeline existed (recipe images and organization logos in our bucket).
+
+Variants are stored next to each original as <key>_<name>.webp and recorded
+in the image_variants table, which is what recipe and branding responses read.
+Images whose variants are already in the bucket but not recorded (uploaded
+before the table existed) are recorded without regenerating them.
+
+Usage: python scripts/backfill_image_variants.py [--dry-run] [--limit N]
+"""
+
+import argparse
+import io
+import logging
+import os
+import sys
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db import get_db_cursor
+from app.utils.s3.s3_utils import (
+    S3Helper, VARIANT_SIZES, key_from_url, record_image_variants, stored_variant_urls, variant_key
+)
+
+
+def hosted_image_urls(limit=None):
+    """Image URLs in the database that point at our bucket."""
+    with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
+        cur.execute("""
+            SELECT image_url FROM scraped_recipes
+            WHERE image_url IS NOT NULL AND image_url <> ''
+            UNION
+            SELECT branding_settings->'visual'->>'logoUrl' FROM organization_settings
+            WHERE branding_settings->'visual'->>'logoUrl' IS NOT NULL
+        """)
+        urls = [row[0] for row in cur.fetchall()]
+
+    bucket_name = os.getenv("S3_BUCKET_NAME")
+    hosted = [url for url in urls if key_from_url(url, bucket_name)]
+    return hosted[:limit] if limit else hosted
+
+
+def existing_variants(s3, key):
+    """{name: variant key} when every configured variant is already in the bucket, else None."""
+    paths = {}
+    for name, _ in VARIANT_SIZES:
+        try:
+            s3.s3_client.head_object(Bucket=s3.bucket_name, Key=variant_key(key, name))
+        except Exception:
+            return None
+        paths[name] = variant_key(key, name)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="List images that need variants without uploading")
+    parser.add_argument("--limit", type=int, default=None, help="Process at most N images")
+    args = parser.parse_args()
+
+    if not VARIANT_SIZES:
+        logger.error("IMAGE_VARIANTS is empty; nothing to generate")
+        sys.exit(1)
+
+    s3 = S3Helper()
+    created = recorded = skipped = failed = 0
+
+    urls = hosted_image_urls(args.limit)
+    already_recorded = stored_variant_urls(urls)
+    for url in urls:
+        if url in already_recorded:
+            skipped += 1
+            continue
+        key = key_from_url(url, s3.bucket_name, s3.region)
+        paths = existing_variants(s3, key)
+        if paths:
+            if not args.dry_run:
+                record_image_variants(key, paths)
+            recorded += 1
+            continue
+        if args.dry_run:
+            logger.info(f"Would create variants for {key}")
+            created += 1
+            continue
+        try:
+            body = s3.s3_client.get_object(Bucket=s3.bucket_name, Key=key)["Body"].read()
+            if s3._upload_variants(io.BytesIO(body), key):
+                created += 1
+            else:
+                failed += 1
+        except Exception as e:
+            logger.error(f"Failed to create variants for {key}: {str(e)}")
+            failed += 1
+
+    logger.info(
+        f"Variants created: {created}, recorded from bucket: {recorded}, "
+        f"already recorded: {skipped}, failed: {failed}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Script to build user_preference_profiles rows for users who rated recipes
+before profiles were maintained incrementally.
+
+Missing profiles are also built lazily on the first preferences read; this
+fills them in ahead of time. With --all every profile is recomputed from the
+ratings, which also repairs any drift.
+
+Usage: python scripts/backfill_preference_profiles.py [--all] [--limit N]
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ai.preference_profile import PROFILE_VERSION
+from app.ai.rating_analytics import rating_analytics
+
+
+def users_to_backfill(rebuild_all=False, limit=None):
+    """Users with at least one rating and (unless rebuild_all) no current profile."""
+    rows = rating_analytics.execute_analytics_query("""
+        SELECT rated.user_id
+        FROM (
+            SELECT DISTINCT user_id FROM recipe_interactions WHERE rating_score IS NOT NULL
+            UNION
+            SELECT DISTINCT user_id FROM saved_recipes
+            WHERE quick_rating IS NOT NULL AND scraped_recipe_id IS NULL AND recipe_id IS NULL
+        ) rated
+        LEFT JOIN user_preference_profiles p ON p.user_id = rated.user_id
+        WHERE %s OR p.user_id IS NULL OR (p.stats->>'version')::int IS DISTINCT FROM %s
+        ORDER BY rated.user_id
+        LIMIT %s
+    """, (rebuild_all, PROFILE_VERSION, limit), fetch_all=True)
+    return [row['user_id'] for row in rows or []]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill user preference profiles")
+    parser.add_argument("--all", action="store_true", help="Recompute every profile, not only missing ones")
+    parser.add_argument("--limit", type=int, default=None, help="Maximum number of users to process")
+    args = parser.parse_args()
+
+    user_ids = users_to_backfill(args.all, args.limit)
+    logger.info(f"Backfilling preference profiles for {len(user_ids)} users")
+
+    failed = 0
+    for index, user_id in enumerate(user_ids, 1):
+        try:
+            stats, _ = rating_analytics.rebuild_user_profile(user_id)
+        except Exception as e:
+            failed += 1
+            logger.error(f"User {user_id}: {str(e)}")
+            continue
+        if index % 100 == 0 or index == len(user_ids):
+            logger.info(f"{index}/{len(user_ids)} done (last: user {user_id}, {stats['count']} ratings)")
+
+    logger.info(f"Backfill complete: {len(user_ids) - failed} profiles built, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark the logging cost of a grocery-list request.
+
+Runs the CPU part of GET /menu/{id}/grocery-list (aggregate_grocery_list and
+create_categorized_fallback, without the database fetch) over a synthetic
+seven-day menu, once per logging setup, with the handler writing to an
+in-memory sink. Two menu shapes are timed: structured ingredients
+({"name", "quantity"} dicts, summarized directly) and legacy string
+ingredients, which go through the per-ingredient aggregation loops.
+
+Setups are applied through configure_logging, as app.main does:
+
+- off:        LOG_LEVEL=CRITICAL, the floor with no log output at all
+- production: LOG_FORMAT=json, LOG_LEVEL=INFO
+- text:       LOG_FORMAT=text, LOG_LEVEL=INFO
+- debug:      LOG_FORMAT=json, LOG_LEVEL=DEBUG (per-item lines are sampled)
+
+Usage: python scripts/benchmark_logging.py [--rounds N] [--days N]
+"""
+
+import argparse
+import io
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.routers.grocery_list import create_categorized_fallback
+from app.utils.grocery_aggregator import aggregate_grocery_list
+from app.utils.logging_config import configure_logging
+
+SETUPS = {
+    "off": {"LOG_LEVEL": "CRITICAL"},
+    "production": {"LOG_FORMAT": "json", "LOG_LEVEL": "INFO"},
+    "text": {"LOG_FORMAT": "text", "LOG_LEVEL": "INFO"},
+    "debug": {"LOG_FORMAT": "json", "LOG_LEVEL": "DEBUG"},
+}
+
+INGREDIENTS = [
+    ("chicken breast", "oz"), ("ground beef", "lb"), ("salmon fillet", "oz"), ("eggs", "large"),
+    ("brown rice", "cups"), ("quinoa", "cup"), ("spinach", "cups"), ("broccoli", "cups"),
+    ("bell pepper", "medium"), ("onion", "medium"), ("garlic", "cloves"), ("olive oil", "tbsp"),
+    ("cheddar cheese", "cup"), ("greek yogurt", "cup"), ("black beans", "cans"), ("tomato", "medium"),
+    ("avocado", "medium"), ("lime", "medium"), ("cumin", "tsp"), ("soy sauce", "tbsp"),
+    ("sweet potato", "medium"), ("almond milk", "cups"), ("oats", "cup"), ("banana", "medium"),
+]
+MEAL_TIMES = ["breakfast", "lunch", "dinner"]
+
+
+def build_menu(days, structured, seed=11):
+    rng = random.Random(seed)
+
+    def ingredient():
+        name, unit = rng.choice(INGREDIENTS)
+        quantity = f"{rng.choice(['1', '2', '1/2', '3', '8', '12'])} {unit}"
+        return {"name": name, "quantity": quantity} if structured else f"{quantity} {name}"
+
+    return {
+        "days": [
+            {
+                "dayNumber": day + 1,
+                "meals": [
+                    {"meal_time": meal_time, "title": f"Day {day + 1} {meal_time}",
+                     "ingredients": [ingredient() for _ in range(rng.randint(6, 10))]}
+                    for meal_time in MEAL_TIMES
+                ],
+                "snacks": [
+                    {"title": f"Day {day + 1} snack", "ingredients": [ingredient() for _ in range(3)]}
+                ],
+            }
+            for day in range(days)
+        ]
+    }
+
+
+def grocery_list_request(menu):
+    return create_categorized_fallback(aggregate_grocery_list(menu))
+
+
+def run(setup, menu, rounds):
+    sink = io.StringIO()
+    configure_logging(env=SETUPS[setup], stream=sink)
+    grocery_list_request(menu)  # warm-up, and opens the sampler windows
+    sink.seek(0)
+    sink.truncate()
+
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        grocery_list_request(menu)
+        samples.append((time.perf_counter() - started) * 1000)
+    output = sink.getvalue()
+    return statistics.median(samples), output.count("\n") / rounds, len(output) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--days", type=int, default=7)
+    args = parser.parse_args()
+
+    try:
+        for label, structured in (("structured", True), ("legacy string", False)):
+            menu = build_menu(args.days, structured)
+            print(f"\n{label} ingredients, {args.days}-day menu")
+            print(f"{'setup':<12} {'ms/request':>11} {'lines/request':>14} {'bytes/request':>14}")
+            for setup in SETUPS:
+                ms, lines, size = run(setup, menu, args.rounds)
+                print(f"{setup:<12} {ms:>11.2f} {lines:>14.1f} {size:>14,.0f}")
+    finally:
+        configure_logging(env={"LOG_FORMAT": "text"})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark the payload size of menu list responses with and without full plans.
+
+Builds synthetic 7-day menus shaped like the agent pipeline output and compares
+the JSON a list endpoint (history, shared menus, client dashboard) returns by
+default (summaries only) against ?include=plan.
+
+Usage: python scripts/benchmark_menu_summaries.py [--menus N] [--days N] [--rounds N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.menu_summary import apply_summary, build_menu_summary
+
+MEAL_TIMES = ("breakfast", "lunch", "dinner")
+
+
+def synthetic_meal(day, meal_time):
+    return {
+        "id": f"{day}-{meal_time}",
+        "meal_time": meal_time,
+        "title": f"Herb Roasted Chicken Bowl {day} {meal_time}",
+        "servings": 4,
+        "image_url": f"https://example.com/recipes/{day}-{meal_time}.jpg",
+        "ingredients": [
+            {"name": f"ingredient {n}", "quantity": f"{n} cups", "calories": 40 + n}
+            for n in range(1, 11)
+        ],
+        "instructions": [f"Step {n}: prepare, season and cook for {n * 3} minutes." for n in range(1, 8)],
+        "macros": {
+            "perServing": {"calories": 520, "protein": "38g", "carbs": "45g", "fat": "18g"},
+            "perMeal": {"calories": 2080, "protein": "152g", "carbs": "180g", "fat": "72g"},
+        },
+    }
+
+
+def synthetic_plan(days):
+    return {
+        "days": [
+            {
+                "dayNumber": day,
+                "meals": [synthetic_meal(day, meal_time) for meal_time in MEAL_TIMES],
+                "snacks": [dict(synthetic_meal(day, "snack"), title=f"Trail Mix {day}")],
+                "summary": {"calorie_goal": 2000, "protein_goal": "150g"},
+            }
+            for day in range(1, days + 1)
+        ]
+    }
+
+
+def list_rows(count, days):
+    plan = synthetic_plan(days)
+    summary = build_menu_summary(plan)
+    return [
+        {"menu_id": menu_id, "nickname": f"Week {menu_id}", "created_at": "2024-01-01 00:00:00",
+         "summary": summary, "meal_plan_json": plan}
+        for menu_id in range(1, count + 1)
+    ]
+
+
+def measure(rows, want_plan, rounds):
+    best = None
+    body = b""
+    for _ in range(rounds):
+        start = time.perf_counter()
+        payload = [apply_summary(dict(row), want_plan) for row in rows]
+        body = json.dumps(payload, default=str).encode()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(body), best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--menus", type=int, default=10, help="Menus per list response (history returns 10)")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = list_rows(args.menus, args.days)
+    summary_bytes, summary_time = measure(rows, False, args.rounds)
+    plan_bytes, plan_time = measure(rows, True, args.rounds)
+
+    print(f"{args.menus} menus x {args.days} days")
+    print(f"  summaries:     {summary_bytes:>10,} bytes  {summary_time * 1000:8.2f} ms")
+    print(f"  include=plan:  {plan_bytes:>10,} bytes  {plan_time * 1000:8.2f} ms")
+    print(f"  reduction:     {100 * (1 - summary_bytes / plan_bytes):.1f}% of the payload")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark the item-item recommendation builder on a synthetic rating set.
+
+Generates N interactions with a skewed (Zipf-like) recipe popularity, times
+compute_item_neighbors, then times serving recommendations by merging neighbour
+lists in memory. For comparison it counts the rows the old per-request
+self-join (ri1 JOIN ri2 ON ri1.user_id != ri2.user_id) had to produce for the
+same users. No database is needed.
+
+Usage: python scripts/benchmark_recipe_neighbors.py [--interactions N] [--users N] [--recipes N]
+"""
+
+import argparse
+import bisect
+import heapq
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from operator import itemgetter
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ai.recipe_neighbors import (
+    RECOMMENDATION_SEED_RATING, compute_item_neighbors, merge_neighbor_lists
+)
+
+
+def synthetic_ratings(interactions, users, recipes, seed):
+    """(user_id, recipe_id, score) triples; popular recipes get most of the ratings."""
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) ** 0.8 for rank in range(recipes)]
+    cumulative = []
+    total = 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+
+    # Each recipe leans good or bad so the similarity has something to find
+    quality = [rng.choice((2, 3, 4, 4, 5)) for _ in range(recipes)]
+    ratings = []
+    for _ in range(interactions):
+        user_id = rng.randrange(users)
+        recipe_id = bisect.bisect_left(cumulative, rng.random() * total)
+        score = min(5, max(1, quality[recipe_id] + rng.choice((-1, 0, 0, 1))))
+        ratings.append((user_id, recipe_id, score))
+    return ratings
+
+
+def old_join_rows(ratings, sample_users):
+    """Rows the old self-join materialized for each sampled user before grouping."""
+    high_by_user = defaultdict(int)
+    for user_id, _, score in ratings:
+        if score >= 4:
+            high_by_user[user_id] += 1
+    total_high = sum(high_by_user.values())
+    return [high_by_user[u] * (total_high - high_by_user[u]) for u in sample_users]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark item-item recommendation building")
+    parser.add_argument("--interactions", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--recipes", type=int, default=5_000)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1_000, help="Recommendation requests to time")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    ratings = synthetic_ratings(args.interactions, args.users, args.recipes, args.seed)
+    print(f"Generated {len(ratings):,} interactions in {time.perf_counter() - started:.1f}s "
+          f"({args.users:,} users, {args.recipes:,} recipes)")
+
+    started = time.perf_counter()
+    neighbors = compute_item_neighbors(ratings, k=args.k)
+    build_s = time.perf_counter() - started
+    pairs = sum(len(items) for items in neighbors.values())
+    print(f"Built top-{args.k} neighbours: {pairs:,} rows for {len(neighbors):,} recipes in {build_s:.1f}s")
+
+    # Serve: the same in-memory merge recommend_recipes does after its two lookups
+    by_user = defaultdict(dict)
+    for user_id, recipe_id, score in ratings:
+        by_user[user_id].setdefault(recipe_id, float(score))
+    rng = random.Random(args.seed)
+    sample_users = rng.sample(sorted(by_user), min(args.requests, len(by_user)))
+
+    latencies = []
+    for user_id in sample_users:
+        rated = by_user[user_id]
+        started = time.perf_counter()
+        rows = [
+            (recipe_id, neighbor_id, similarity)
+            for recipe_id, score in rated.items() if score >= RECOMMENDATION_SEED_RATING
+            for neighbor_id, similarity, _ in neighbors.get(recipe_id, ())
+        ]
+        heapq.nlargest(10, merge_neighbor_lists(rated, rows), key=itemgetter("score"))
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"Served {len(latencies):,} requests: p50 {p50:.2f} ms, p99 {p99:.2f} ms (merge only)")
+
+    joined = sorted(old_join_rows(ratings, sample_users))
+    print(f"Old self-join rows per request: median {joined[len(joined) // 2]:,}, "
+          f"p99 {joined[int(len(joined) * 0.99) - 1]:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Benchmark recipe search: title ILIKE + OFFSET against recipe_search_index.
+
+Needs a Postgres database (the app's usual DB settings). Everything is built
+in a throwaway schema, recipe_search_bench, which is dropped afterwards:
+synthetic scraped recipes with tags and ingredients are loaded, the
+migration 028 index is built and backfilled over them, then the same searches
+are timed both ways:
+
+- old: ``title ILIKE '%term%' ORDER BY id DESC LIMIT/OFFSET`` plus COUNT(*),
+  as get_scraped_recipes ran it, at a shallow and a deep offset;
+- new: search_recipes first page (with facets) and a deep page reached by
+  following keyset cursors.
+
+Usage: python scripts/benchmark_recipe_search.py [--recipes N] [--rounds N] [--keep]
+"""
+
+import argparse
+import importlib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+BENCH_SCHEMA = "recipe_search_bench"
+
+# Every connection the app opens from here on uses the scratch schema first
+os.environ["PGOPTIONS"] = f"-c search_path={BENCH_SCHEMA},public"
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg2.extras import execute_values
+
+from app.db import get_db_cursor
+from app.utils.recipe_search import search_recipes
+
+ADJECTIVES = ["Smoky", "Creamy", "Spicy", "Crispy", "Lemon", "Garlic", "Honey", "Herb", "Roasted", "Grilled",
+              "Braised", "Sticky", "Zesty", "Hearty", "Quick", "Slow Cooker", "Sheet Pan", "One Pot"]
+PROTEINS = ["Chicken", "Beef", "Pork", "Salmon", "Shrimp", "Tofu", "Chickpea", "Turkey", "Lentil", "Cod",
+            "Lamb", "Tempeh", "Egg", "Black Bean"]
+DISHES = ["Curry", "Tacos", "Stir Fry", "Bowl", "Salad", "Soup", "Pasta", "Skewers", "Stew", "Wraps",
+          "Casserole", "Fried Rice", "Noodles", "Burgers", "Chili", "Frittata"]
+CUISINES = ["American", "Italian", "Mexican", "Thai", "Indian", "Chinese", "Japanese", "Mediterranean",
+            "French", "Korean", "Greek", "Vietnamese"]
+COMPLEXITIES = ["easy", "medium", "hard"]
+DIET_TAGS = ["vegetarian", "vegan", "gluten-free", "dairy-free", "high-protein", "low-carb", "keto", "paleo"]
+TAGS = ["weeknight", "meal-prep", "kid-friendly", "comfort-food", "summer", "winter", "party", "budget"]
+INGREDIENTS = ["garlic", "onion", "ginger", "cilantro", "lime", "basil", "tomato", "spinach", "coconut milk",
+               "soy sauce", "cumin", "paprika", "rice", "quinoa", "feta", "parmesan", "avocado", "bell pepper",
+               "mushroom", "zucchini", "sweet potato", "chili flakes", "sesame oil", "yogurt", "lemon"]
+
+SEARCH_TERMS = ["chicken", "chicken curry", "coconut", "tofu bowl", "garlic salmon", "chikcen", "stew"]
+
+OLD_PAGE_SQL = """
+    SELECT r.id, r.title, r.complexity, r.cuisine, r.total_time, r.image_url, r.is_verified
+    FROM scraped_recipes r
+    WHERE r.title ILIKE %s
+    ORDER BY r.id DESC
+    LIMIT %s OFFSET %s
+"""
+
+OLD_COUNT_SQL = "SELECT COUNT(r.id) AS total FROM scraped_recipes r WHERE r.title ILIKE %s"
+
+
+def create_source_tables(cur):
+    """Just the columns migration 028 reads, in the scratch schema"""
+    cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {BENCH_SCHEMA}")
+    cur.execute("""
+        CREATE TABLE scraped_recipes (
+            id SERIAL PRIMARY KEY, title VARCHAR(255) NOT NULL, cuisine VARCHAR(100), complexity VARCHAR(50),
+            diet_tags JSONB DEFAULT '[]', image_url TEXT, total_time INTEGER, is_verified BOOLEAN DEFAULT FALSE
+        )
+    """)
+    cur.execute("CREATE TABLE recipe_tags (id SERIAL PRIMARY KEY, recipe_id INTEGER, tag VARCHAR(100))")
+    cur.execute("CREATE TABLE recipe_ingredients (id SERIAL PRIMARY KEY, recipe_id INTEGER, name TEXT)")
+    cur.execute("""
+        CREATE TABLE user_recipes (
+            id SERIAL PRIMARY KEY, title VARCHAR(255) NOT NULL, cuisine VARCHAR(100), complexity VARCHAR(50),
+            diet_tags JSONB DEFAULT '[]', custom_tags JSONB DEFAULT '[]', image_url TEXT, total_time INTEGER,
+            is_verified BOOLEAN, is_public BOOLEAN, is_active BOOLEAN DEFAULT TRUE,
+            created_by_user_id INTEGER, created_by_organization_id INTEGER
+        )
+    """)
+    cur.execute("CREATE TABLE user_recipe_ingredients (id SERIAL PRIMARY KEY, recipe_id INTEGER, name TEXT)")
+    cur.execute("""
+        CREATE TABLE organization_recipes (
+            id SERIAL PRIMARY KEY, organization_id INTEGER, recipe_id INTEGER, user_recipe_id INTEGER
+        )
+    """)
+
+
+def load_recipes(cur, count, seed):
+    rng = random.Random(seed)
+    recipes, tags, ingredients = [], [], []
+    for recipe_id in range(1, count + 1):
+        title = f"{rng.choice(ADJECTIVES)} {rng.choice(PROTEINS)} {rng.choice(DISHES)}"
+        diet = rng.sample(DIET_TAGS, rng.randint(0, 3))
+        recipes.append((recipe_id, title, rng.choice(CUISINES), rng.choice(COMPLEXITIES), json.dumps(diet),
+                        rng.randint(10, 120)))
+        tags.extend((recipe_id, tag) for tag in rng.sample(TAGS, rng.randint(0, 2)))
+        ingredients.extend((recipe_id, name) for name in rng.sample(INGREDIENTS, rng.randint(4, 10)))
+
+    execute_values(cur, "INSERT INTO scraped_recipes (id, title, cuisine, complexity, diet_tags, total_time) VALUES %s",
+                   recipes, page_size=5000)
+    execute_values(cur, "INSERT INTO recipe_tags (recipe_id, tag) VALUES %s", tags, page_size=5000)
+    execute_values(cur, "INSERT INTO recipe_ingredients (recipe_id, name) VALUES %s", ingredients, page_size=5000)
+    cur.execute("CREATE INDEX ON recipe_tags(recipe_id)")
+    cur.execute("CREATE INDEX ON recipe_ingredients(recipe_id)")
+    cur.execute("ANALYZE")
+    return len(tags), len(ingredients)
+
+
+def timed(func, rounds):
+    samples = []
+    result = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def old_search(term, offset):
+    def run():
+        with get_db_cursor(dict_cursor=True, autocommit=True) as (cur, conn):
+            cur.execute(OLD_PAGE_SQL, (f"%{term}%", 20, offset))
+            rows = cur.fetchall()
+            cur.execute(OLD_COUNT_SQL, (f"%{term}%",))
+            return len(rows), cur.fetchone()["total"]
+    return run
+
+
+def new_first_page(term):
+    return lambda: search_recipes(query=term, sources=["scraped"], limit=20)
+
+
+def new_deep_page(term, pages):
+    def run():
+        page = search_recipes(query=term, sources=["scraped"], limit=20, include_facets=False)
+        for _ in range(pages - 1):
+            if not page["next_cursor"]:
+                break
+            page = search_recipes(query=term, sources=["scraped"], limit=20, cursor=page["next_cursor"],
+                                  include_facets=False)
+        return page
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--deep-page", type=int, default=50, help="Page number timed for deep pagination")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help=f"Leave the {BENCH_SCHEMA} schema in place")
+    args = parser.parse_args()
+
+    migration = importlib.import_module("app.migrations.versions.028_recipe_search_index")
+    triggers = importlib.import_module("app.migrations.versions.032_recipe_search_statement_triggers")
+
+    try:
+        with get_db_cursor(dict_cursor=False) as (cur, conn):
+            create_source_tables(cur)
+            started = time.perf_counter()
+            tag_count, ingredient_count = load_recipes(cur, args.recipes, args.seed)
+            conn.commit()
+        print(f"Loaded {args.recipes:,} recipes, {tag_count:,} tags, {ingredient_count:,} ingredients "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        with get_db_cursor(dict_cursor=False) as (cur, conn):
+            started = time.perf_counter()
+            migration.create_search_index(cur)
+            triggers.create_search_triggers(cur)
+            cur.execute("SELECT refresh_scraped_recipe_search(ARRAY(SELECT id FROM scraped_recipes))")
+            cur.execute("ANALYZE recipe_search_index")
+            conn.commit()
+        print(f"Built and backfilled recipe_search_index in {time.perf_counter() - started:.1f}s\n")
+
+        deep_offset = (args.deep_page - 1) * 20
+        print(f"{'term':<16} {'old p1':>9} {'old p' + str(args.deep_page):>9} {'new p1+facets':>14} "
+              f"{'new p' + str(args.deep_page):>9} {'old hits':>9} {'new hits':>9}")
+        for term in SEARCH_TERMS:
+            old_first_ms, (_, old_total) = timed(old_search(term, 0), args.rounds)
+            old_deep_ms, _ = timed(old_search(term, deep_offset), args.rounds)
+            new_first_ms, first = timed(new_first_page(term), args.rounds)
+            # Each round follows every cursor, so report the cost of the last page alone
+            new_deep_ms, _ = timed(new_deep_page(term, args.deep_page), 1)
+            print(f"{term:<16} {old_first_ms:>7.1f}ms {old_deep_ms:>7.1f}ms {new_first_ms:>12.1f}ms "
+                  f"{new_deep_ms / args.deep_page:>7.1f}ms {old_total:>9,} {first['total']:>9,}")
+        print(f"\nnew p{args.deep_page} is the mean per-page time while following {args.deep_page} cursors")
+    finally:
+        if not args.keep:
+            with get_db_cursor(dict_cursor=False, autocommit=True) as (cur, conn):
+                cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Script to rebuild the recipe_neighbors table used for recipe recommendations.
+
+The build is CPU-bound and loads every rating into memory, so it runs here,
+out of the web workers, e.g. hourly from cron:
+
+    0 * * * * python scripts/build_recipe_neighbors.py --if-due
+
+--if-due rebuilds only when the table is older than
+RECOMMENDATION_REBUILD_INTERVAL_HOURS and no other build holds the advisory
+lock; without it the table is rebuilt unconditionally. Web workers only build
+in-process when RECOMMENDATION_BUILD_IN_APP=true.
+
+Usage: python scripts/build_recipe_neighbors.py [--if-due] [--k N] [--min-support N]
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ai.recipe_neighbors import (
+    RECOMMENDATION_MIN_SUPPORT, RECOMMENDATION_NEIGHBORS_K, build_neighbors_if_due, build_recipe_neighbors
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild recipe_neighbors")
+    parser.add_argument("--k", type=int, default=RECOMMENDATION_NEIGHBORS_K, help="Neighbours kept per recipe")
+    parser.add_argument("--min-support", type=int, default=RECOMMENDATION_MIN_SUPPORT,
+                        help="Minimum co-rating users for a similarity")
+    parser.add_argument("--if-due", action="store_true",
+                        help="Skip the build if the table is fresh or another build is running")
+    args = parser.parse_args()
+
+    if args.if_due:
+        stats = build_neighbors_if_due(k=args.k, min_support=args.min_support)
+        if stats is None:
+            logger.info("recipe_neighbors is up to date (or another build is running); skipped")
+            return
+    else:
+        stats = build_recipe_neighbors(k=args.k, min_support=args.min_support)
+    logger.info(f"Done: {stats['pairs']} neighbour rows for {stats['recipes']} recipes "
+                f"from {stats['ratings']} ratings")
+
+
+if __name__ == "__main__":
+    main()
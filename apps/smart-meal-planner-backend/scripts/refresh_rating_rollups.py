@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Script to refresh the daily rating rollups behind the /analytics/trends endpoints.
+
+The API refreshes them incrementally every RATING_ROLLUP_REFRESH_MINUTES. Run
+with --full after deploying migration 023, or to pick up deleted ratings and
+recipe cuisine changes that the incremental refresh does not see.
+
+Usage: python scripts/refresh_rating_rollups.py [--full]
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ai.rating_rollups import refresh_rating_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh daily rating rollups")
+    parser.add_argument("--full", action="store_true", help="Rebuild every day bucket")
+    args = parser.parse_args()
+
+    result = refresh_rating_rollups(full=args.full)
+    logger.info(f"Rating rollup refresh: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Shared test fixtures.
+
+fake_db routes app.db's cursors to one recording FakeCursor, for unit tests of
+the SQL a module issues. pg gives tests a real Postgres: a throwaway schema
+holding the base tables (fixtures/postgres_base_schema.sql) with every
+versioned migration from FIRST_PG_MIGRATION on applied, app.db's pools pointed
+at it. pg tests are skipped when TEST_DATABASE_URL (else DATABASE_URL) can't
+be reached.
+"""
+
+import os
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extras
+import pytest
+from psycopg2 import pool
+
+import app.db as db
+
+PG_URL = os.getenv("TEST_DATABASE_URL") or os.getenv("DATABASE_URL")
+FIRST_PG_MIGRATION = "021"
+BASE_SCHEMA = os.path.join(os.path.dirname(__file__), "fixtures", "postgres_base_schema.sql")
+
+
+class FakeCursor:
+    """
+    Records every statement as (sql, params) in ``executed``.
+
+    Fetches return ``respond(sql, params)`` for the last statement when a
+    respond callable is set and gives an answer, else ``rows``; an int answer
+    is the rowcount of a write. The rows of each execute_values call land in
+    ``batches`` instead.
+    """
+
+    def __init__(self, rows=None, respond=None):
+        self.rows = rows if rows is not None else []
+        self.respond = respond
+        self.executed = []
+        self.batches = []
+        self.rowcount = 0
+        self._answer = None
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        answer = self.respond(sql, params) if self.respond else None
+        if isinstance(answer, int):
+            self._answer, self.rowcount = [], answer
+        else:
+            self._answer = answer
+            self.rowcount = len(self._result())
+
+    def _result(self):
+        return self._answer if self._answer is not None else self.rows
+
+    def fetchone(self):
+        result = self._result()
+        return result[0] if result else None
+
+    def fetchall(self):
+        return self._result()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    closed = 0
+    autocommit = False
+
+    def __init__(self, cursor=None):
+        self.cur = cursor or FakeCursor()
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, cursor_factory=None):
+        return self.cur
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeDatabase:
+    """One FakeCursor behind get_db_cursor, session_cursor and execute_values"""
+
+    def __init__(self):
+        self.cur = FakeCursor()
+        self.conn = FakeConnection(self.cur)
+        self.checkouts = 0
+
+    @contextmanager
+    def cursor(self, *args, **kwargs):
+        self.checkouts += 1
+        yield self.cur, self.conn
+
+    def execute_values(self, cur, sql, rows, template=None, page_size=100, fetch=False):
+        self.cur.batches.append(list(rows))
+
+    def install(self, monkeypatch, *modules):
+        """Also patch get_db_cursor in modules that imported it by name"""
+        for module in modules:
+            monkeypatch.setattr(module, "get_db_cursor", self.cursor)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(db, "get_db_cursor", database.cursor)
+    monkeypatch.setattr(db, "session_cursor", database.cursor)
+    monkeypatch.setattr(psycopg2.extras, "execute_values", database.execute_values)
+    return database
+
+
+class PgSchema:
+    """A throwaway schema on the test server, with a pool per app.db pool name"""
+
+    def __init__(self, url, name):
+        self.url = url
+        self.name = name
+        self.options = f"-c search_path={name},public"
+        self.pools = {}
+
+    def connect(self, **kwargs):
+        return psycopg2.connect(self.url, options=self.options, connect_timeout=5, **kwargs)
+
+    def pool(self, pool_type=db.DEFAULT_POOL, max_retries=3):
+        if pool_type not in self.pools:
+            self.pools[pool_type] = pool.ThreadedConnectionPool(
+                1, 20, self.url, options=self.options, connection_factory=db.TrackedConnection
+            )
+        return self.pools[pool_type]
+
+    def point_app_db(self, monkeypatch):
+        monkeypatch.setattr(db, "connection_pool", self.pool())
+        monkeypatch.setattr(db, "_named_pools", {})
+        monkeypatch.setattr(db, "_create_pool", self.pool)
+
+    def close(self):
+        for conn_pool in self.pools.values():
+            conn_pool.closeall()
+
+
+def apply_migrations():
+    """Run every versioned migration from FIRST_PG_MIGRATION on, in order"""
+    import importlib
+    from app.migrations.migration_runner import MigrationRunner
+
+    for name in MigrationRunner().available_migrations():
+        if name >= FIRST_PG_MIGRATION:
+            importlib.import_module(f"app.migrations.versions.{name}").upgrade()
+
+
+@pytest.fixture(scope="session")
+def pg_schema():
+    if not PG_URL:
+        pytest.skip("TEST_DATABASE_URL / DATABASE_URL not set")
+    try:
+        admin = psycopg2.connect(PG_URL, connect_timeout=3)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Postgres unreachable: {str(e).strip()}")
+    admin.autocommit = True
+    schema = PgSchema(PG_URL, f"pytest_{os.getpid()}")
+    with admin.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {schema.name} CASCADE")
+        cur.execute(f"CREATE SCHEMA {schema.name}")
+        cur.execute(f"SET search_path = {schema.name}, public")
+        with open(BASE_SCHEMA) as f:
+            cur.execute(f.read())
+    try:
+        with pytest.MonkeyPatch.context() as mp:
+            schema.point_app_db(mp)
+            apply_migrations()
+        yield schema
+    finally:
+        schema.close()
+        with admin.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {schema.name} CASCADE")
+        admin.close()
+
+
+@pytest.fixture
+def pg(pg_schema, monkeypatch):
+    """An autocommit connection to the migrated schema; app.db uses it too. Tables are emptied afterwards."""
+    pg_schema.point_app_db(monkeypatch)
+    conn = pg_schema.connect()
+    conn.autocommit = True
+    try:
+        yield conn
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("SELECT tablename FROM pg_tables WHERE schemaname = %s", (pg_schema.name,))
+            tables = ", ".join(f"{pg_schema.name}.{row[0]}" for row in cur.fetchall())
+            cur.execute(f"TRUNCATE {tables} RESTART IDENTITY CASCADE")
+        conn.close()
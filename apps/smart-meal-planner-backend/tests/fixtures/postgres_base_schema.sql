@@ -0,0 +1,113 @@
+-- Tables that predate the versioned migrations the Postgres tests apply (021
+-- onwards), cut down to the columns the code under test reads and writes.
+-- Loaded into a throwaway schema by the pg_schema fixture in conftest.py.
+
+CREATE TABLE organizations (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255)
+);
+
+CREATE TABLE user_profiles (
+    id SERIAL PRIMARY KEY,
+    email VARCHAR(255),
+    name VARCHAR(255),
+    account_type VARCHAR(50) DEFAULT 'individual'
+);
+
+CREATE TABLE scraped_recipes (
+    id SERIAL PRIMARY KEY,
+    title VARCHAR(255) NOT NULL,
+    complexity VARCHAR(50),
+    cuisine VARCHAR(100),
+    image_url TEXT,
+    prep_time INTEGER,
+    cook_time INTEGER,
+    total_time INTEGER,
+    servings INTEGER,
+    is_verified BOOLEAN DEFAULT FALSE,
+    instructions TEXT,
+    diet_tags JSONB DEFAULT '[]'
+);
+
+CREATE TABLE recipe_ingredients (
+    id SERIAL PRIMARY KEY,
+    recipe_id INTEGER REFERENCES scraped_recipes(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    amount VARCHAR(50),
+    unit VARCHAR(50),
+    UNIQUE (recipe_id, name)
+);
+
+CREATE TABLE recipe_tags (
+    id SERIAL PRIMARY KEY,
+    recipe_id INTEGER REFERENCES scraped_recipes(id) ON DELETE CASCADE,
+    tag VARCHAR(100) NOT NULL,
+    UNIQUE (recipe_id, tag)
+);
+
+CREATE TABLE user_recipes (
+    id SERIAL PRIMARY KEY,
+    created_by_user_id INTEGER REFERENCES user_profiles(id) ON DELETE CASCADE,
+    created_by_organization_id INTEGER REFERENCES organizations(id) ON DELETE CASCADE,
+    title VARCHAR(255) NOT NULL,
+    total_time INTEGER,
+    cuisine VARCHAR(100),
+    complexity VARCHAR(50),
+    diet_tags JSONB DEFAULT '[]',
+    custom_tags JSONB DEFAULT '[]',
+    image_url TEXT,
+    is_public BOOLEAN DEFAULT FALSE,
+    is_verified BOOLEAN DEFAULT FALSE,
+    is_active BOOLEAN DEFAULT TRUE
+);
+
+CREATE TABLE user_recipe_ingredients (
+    id SERIAL PRIMARY KEY,
+    recipe_id INTEGER REFERENCES user_recipes(id) ON DELETE CASCADE,
+    name VARCHAR(255) NOT NULL
+);
+
+CREATE TABLE menus (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER REFERENCES user_profiles(id),
+    meal_plan_json JSONB,
+    nickname VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE saved_recipes (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER REFERENCES user_profiles(id),
+    menu_id INTEGER REFERENCES menus(id),
+    recipe_id VARCHAR(255),
+    recipe_name VARCHAR(255),
+    day_number INTEGER,
+    meal_time VARCHAR(50),
+    notes TEXT,
+    macros JSONB,
+    ingredients JSONB,
+    instructions JSONB,
+    complexity_level VARCHAR(50),
+    appliance_used VARCHAR(100),
+    servings INTEGER,
+    prep_time INTEGER,
+    scraped_recipe_id INTEGER REFERENCES scraped_recipes(id),
+    recipe_source VARCHAR(50),
+    quick_rating INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE recipe_interactions (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    recipe_id INTEGER,
+    interaction_type VARCHAR(50) NOT NULL,
+    rating_score INTEGER,
+    rating_aspects JSONB,
+    made_recipe BOOLEAN,
+    would_make_again BOOLEAN,
+    difficulty_rating INTEGER,
+    time_accuracy INTEGER,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
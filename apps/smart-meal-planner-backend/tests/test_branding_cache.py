@@ -0,0 +1,128 @@
+"""Public branding: compiled once per organization, ETags and the bulk endpoint."""
+
+import asyncio
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import organization_branding
+from app.utils import branding_cache as branding_module
+from app.utils.branding_cache import BrandingCache, DEFAULT_PUBLIC_BRANDING
+
+SETTINGS = {
+    3: {"visual": {"primaryColor": "#112233"}, "messaging": {"platformName": "Fit Kitchen"}},
+    4: '{"features": {"showPoweredBy": false}}',
+}
+
+
+def _client(fake_db, monkeypatch):
+    def respond(sql, params):
+        return [(org_id, SETTINGS[org_id]) for org_id in params[0] if org_id in SETTINGS]
+
+    fake_db.cur.respond = respond
+    monkeypatch.setattr(branding_module, "branding_cache", BrandingCache())
+    monkeypatch.setattr(organization_branding, "branding_cache", branding_module.branding_cache)
+
+    api = FastAPI()
+    api.include_router(organization_branding.router)
+    return TestClient(api), fake_db.cur
+
+
+def _queried(cur):
+    """Organization ids of each branding read"""
+    return [list(params[0]) for _, params in cur.executed]
+
+
+def test_public_branding_is_compiled_once_and_revalidated_by_etag(fake_db, monkeypatch):
+    client, cur = _client(fake_db, monkeypatch)
+
+    first = client.get("/api/organization-branding/3/branding/public")
+    assert first.status_code == 200
+    assert first.json()["visual"]["primaryColor"] == "#112233"
+    assert first.json()["messaging"]["platformName"] == "Fit Kitchen"
+    assert "stale-while-revalidate" in first.headers["cache-control"]
+
+    again = client.get("/api/organization-branding/3/branding/public",
+                       headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+    assert _queried(cur) == [[3]]
+
+    branding_module.branding_cache.invalidate(3)
+    client.get("/api/organization-branding/3/branding/public")
+    assert _queried(cur) == [[3], [3]]
+
+
+def test_unknown_organization_gets_the_default_branding(fake_db, monkeypatch):
+    client, _ = _client(fake_db, monkeypatch)
+    assert client.get("/api/organization-branding/99/branding/public").json() == DEFAULT_PUBLIC_BRANDING
+
+
+def test_bulk_branding_reads_only_uncached_organizations(fake_db, monkeypatch):
+    client, cur = _client(fake_db, monkeypatch)
+    client.get("/api/organization-branding/3/branding/public")
+
+    response = client.get("/api/organization-branding/branding/public", params={"ids": "3,4,99,3"})
+    body = json.loads(response.content)
+
+    assert list(body) == ["3", "4", "99"]
+    assert body["4"]["features"]["showPoweredBy"] is False
+    assert body["99"] == DEFAULT_PUBLIC_BRANDING
+    assert _queried(cur) == [[3], [4, 99]]
+    assert client.get("/api/organization-branding/branding/public", params={"ids": "x"}).status_code == 400
+
+
+def test_bulk_branding_looks_up_every_logo_in_one_query(fake_db, monkeypatch):
+    client, cur = _client(fake_db, monkeypatch)
+    logos = {org_id: f"https://bucket.s3.amazonaws.com/logos/{org_id}.png" for org_id in (5, 6, 7)}
+    for org_id, url in logos.items():
+        monkeypatch.setitem(SETTINGS, org_id, {"visual": {"logoUrl": url}})
+    lookups = []
+
+    def fake_stored_variant_urls(urls):
+        lookups.append(sorted(urls))
+        return {logos[5]: {"thumb": "https://cdn/5.thumb.webp"}}
+
+    monkeypatch.setattr(branding_module, "stored_variant_urls", fake_stored_variant_urls)
+    body = json.loads(client.get("/api/organization-branding/branding/public", params={"ids": "5,6,7,3"}).content)
+
+    assert lookups == [sorted(logos.values())]
+    assert body["5"]["visual"]["logoVariants"] == {"thumb": "https://cdn/5.thumb.webp"}
+    assert body["6"]["visual"]["logoVariants"] == {} and body["3"]["visual"]["logoVariants"] == {}
+
+
+def test_branding_misses_are_read_off_the_event_loop(fake_db, monkeypatch):
+    client, cur = _client(fake_db, monkeypatch)
+    read = cur.respond
+    on_loop = []
+
+    def respond(sql, params):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(sql)
+        except RuntimeError:
+            pass
+        return read(sql, params)
+
+    cur.respond = respond
+    client.get("/api/organization-branding/3/branding/public")
+    client.get("/api/organization-branding/branding/public", params={"ids": "3,4"})
+
+    assert _queried(cur) == [[3], [4]] and on_loop == []
+
+
+def test_failed_read_falls_back_to_uncached_default_branding(fake_db, monkeypatch):
+    client, cur = _client(fake_db, monkeypatch)
+
+    def fail(sql, params):
+        raise RuntimeError("database unavailable")
+
+    cur.respond = fail
+    single = client.get("/api/organization-branding/3/branding/public")
+    bulk = client.get("/api/organization-branding/branding/public", params={"ids": "3,4"})
+
+    assert single.json() == DEFAULT_PUBLIC_BRANDING
+    assert json.loads(bulk.content) == {"3": DEFAULT_PUBLIC_BRANDING, "4": DEFAULT_PUBLIC_BRANDING}
+    for response in (single, bulk):
+        assert response.headers["cache-control"] == "no-store"
+        assert "etag" not in response.headers
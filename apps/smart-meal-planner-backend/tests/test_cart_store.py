@@ -0,0 +1,113 @@
+"""Internal cart store (Postgres tier): concurrent writers, cache revalidation and store assignment."""
+
+import threading
+
+import pytest
+
+from app.utils import cart_store
+from app.utils.cart_store import CartCache
+
+
+@pytest.fixture
+def database(pg, monkeypatch):
+    monkeypatch.setattr(cart_store, "cart_cache", CartCache())
+    with pg.cursor() as cur:
+        cur.execute("INSERT INTO user_profiles (id) VALUES (7)")
+    return pg
+
+
+def query(pg, sql, params=None):
+    with pg.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+
+def _names(cart, store):
+    return {item["name"]: item["quantity"] for item in cart[store]}
+
+
+def test_concurrent_adds_to_one_cart_all_land(database):
+    def add(i):
+        cart_store.add_items(7, [("kroger", "milk", 1, "kroger", None),
+                                 ("kroger", f"item{i}", 2, "kroger", {"upc": str(i)})])
+
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert query(database, "SELECT version FROM internal_carts WHERE user_id = 7") == [(10,)]
+    cart = cart_store.get_cart("7")
+    assert _names(cart, "kroger") == dict({"milk": 10}, **{f"item{i}": 2 for i in range(10)})
+    # Whatever order the writers finished in, the cache holds the newest cart
+    assert cart_store.cart_cache.get(7)[0] == 10
+    assert cart_store.cart_cache.hits == 1
+
+
+def test_cached_cart_is_reloaded_after_another_workers_write(database):
+    cart_store.add_items(7, [("unassigned", "eggs", 1, None, None)])
+
+    assert _names(cart_store.get_cart(7), "unassigned") == {"eggs": 1}
+    assert (cart_store.cart_cache.hits, cart_store.cart_cache.misses) == (1, 0)
+
+    # Another worker adds to the cart: same tables, a different process cache
+    query(database, "UPDATE internal_carts SET version = version + 1 WHERE user_id = 7 RETURNING version")
+    query(database, "INSERT INTO internal_cart_items (user_id, store, name, quantity) "
+                    "VALUES (7, 'unassigned', 'bread', 1) RETURNING id")
+
+    assert _names(cart_store.get_cart(7), "unassigned") == {"eggs": 1, "bread": 1}
+    assert (cart_store.cart_cache.hits, cart_store.cart_cache.misses) == (1, 1)
+
+
+def test_assign_store_merges_into_existing_items(database):
+    cart_store.add_items(7, [("unassigned", "milk", 2, None, None), ("unassigned", "eggs", 1, None, None),
+                             ("unassigned", "milk", 1, None, None), ("kroger", "milk", 1, "kroger", None)])
+
+    cart = cart_store.assign_store(7, ["milk", "milk"], "kroger")
+
+    assert _names(cart, "unassigned") == {"eggs": 1}
+    assert _names(cart, "kroger") == {"milk": 4}
+    assert cart["instacart"] == []
+
+
+def test_cache_never_replaces_a_newer_cart():
+    cache = CartCache()
+    cache.put(7, 3, {"kroger": ["newer"]})
+    # A writer that committed earlier but finished later
+    cache.put(7, 2, {"kroger": ["older"]})
+
+    assert cache.get(7) == (3, {"kroger": ["newer"]})
+
+
+def test_cart_endpoints_run_the_store_off_the_event_loop(database, monkeypatch):
+    import asyncio
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.routers import cart
+    from app.utils.auth_utils import get_user_from_token
+
+    on_loop = []
+    get_cart = cart_store.get_cart
+
+    def recording_get_cart(user_id):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(threading.current_thread().name)
+        except RuntimeError:
+            pass
+        return get_cart(user_id)
+
+    monkeypatch.setattr(cart_store, "get_cart", recording_get_cart)
+    api = FastAPI()
+    api.include_router(cart.router)
+    api.dependency_overrides[get_user_from_token] = lambda: {"user_id": 7}
+    client = TestClient(api)
+
+    client.post("/cart/internal/add_items", json={"items": [{"name": "milk", "quantity": 2}], "store": "kroger"})
+    response = client.get("/cart/internal/7/contents")
+
+    assert _names(response.json()["cart"], "kroger") == {"milk": 2}
+    assert on_loop == []
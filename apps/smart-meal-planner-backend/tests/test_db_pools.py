@@ -0,0 +1,142 @@
+"""Named connection pools and per-route checkout instrumentation."""
+
+import pytest
+
+import app.db as db
+from tests.conftest import FakeConnection, FakeCursor
+
+
+class FakePool:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+        self._used = {}
+        self._pool = []
+
+    def getconn(self, key=None):
+        conn = self._used.setdefault(key, FakeConnection(FakeCursor(rows=[(1,)])))
+        conn.pool_name = self.name
+        return conn
+
+    def putconn(self, conn, key=None, close=False):
+        self._used.pop(key, None)
+        self._pool.append(conn)
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    created = []
+
+    def fake_create_pool(pool_type, max_retries=3):
+        created.append(pool_type)
+        return FakePool(pool_type)
+
+    monkeypatch.setattr(db, "_create_pool", fake_create_pool)
+    monkeypatch.setattr(db, "connection_pool", FakePool(db.DEFAULT_POOL))
+    monkeypatch.setattr(db, "_named_pools", {})
+    monkeypatch.setattr(db, "_pool_stats", {name: {"active": 0, "total": 0, "peak": 0} for name in db.POOL_SIZES})
+    monkeypatch.setattr(db, "_route_stats", {})
+    monkeypatch.setattr(db, "_open_checkouts", {})
+    return created
+
+
+def test_rating_pool_is_created_once_and_used_for_rating_cursors(pools):
+    with db.get_db_cursor(pool_type=db.RATING_POOL) as (cur, conn):
+        assert conn.pool_name == db.RATING_POOL
+        assert db.get_pool_stats()[db.RATING_POOL]["active"] == 1
+    with db.get_db_cursor(pool_type=db.RATING_POOL) as (cur, conn):
+        pass
+    with db.get_db_cursor() as (cur, conn):
+        assert conn.pool_name == db.DEFAULT_POOL
+
+    assert pools == [db.RATING_POOL]
+    stats = db.get_pool_stats()
+    assert stats[db.RATING_POOL]["total"] == 2 and stats[db.RATING_POOL]["active"] == 0
+    assert stats[db.RATING_POOL]["free_connections"] == 2
+    assert stats[db.DEFAULT_POOL]["total"] == 1
+
+
+def test_unknown_pool_type_is_rejected(pools):
+    with pytest.raises(ValueError):
+        db.get_pool("reports")
+
+
+class FakeRoute:
+    path = "/menu/{menu_id}"
+
+
+def test_checkouts_and_queries_are_attributed_to_the_route(pools):
+    usage, token = db.start_request_tracking({"method": "GET", "route": FakeRoute()})
+    try:
+        for _ in range(2):
+            with db.get_db_cursor() as (cur, conn):
+                db._note_query(conn, 0.004)
+                db._note_query(conn, 0.006)
+    finally:
+        db.finish_request_tracking(usage, token)
+
+    [stats] = db.get_route_db_stats()
+    assert stats["route"] == "GET /menu/{menu_id}"
+    assert (stats["requests"], stats["checkouts"], stats["queries"]) == (1, 2, 4)
+    assert stats["db_ms_per_request"] == pytest.approx(20.0)
+    assert usage.queries == 4 and not db._open_checkouts
+
+
+def test_long_held_checkouts_are_flagged_with_their_stack(pools, monkeypatch):
+    monkeypatch.setattr(db, "DB_CAPTURE_CHECKOUT_STACKS", True)
+    conn = db.get_db_connection()
+    conn._checkout.started -= 120
+
+    [leak] = db.find_leaked_checkouts(threshold_s=60)
+    assert leak["route"].startswith("background:")
+    assert any("test_long_held_checkouts" in line for line in leak["stack"])
+    assert db.find_leaked_checkouts(threshold_s=300) == []
+
+    # Closing a pooled connection instead of returning it is counted against the route
+    db._end_checkout(conn, returned=False)
+    [stats] = db.get_route_db_stats()
+    assert stats["unreturned"] == 1 and stats["max_hold_s"] >= 120
+
+
+def test_checkout_stacks_are_not_captured_by_default(pools):
+    conn = db.get_db_connection()
+    conn._checkout.started -= 120
+
+    [leak] = db.find_leaked_checkouts(threshold_s=60)
+    assert leak["stack"] is None
+    db._end_checkout(conn)
+
+
+def test_nested_cursors_are_tracked_as_separate_checkouts(pools):
+    usage, token = db.start_request_tracking({"method": "GET", "route": FakeRoute()})
+    try:
+        with db.get_db_cursor() as (outer_cur, outer):
+            with db.get_db_cursor() as (inner_cur, inner):
+                assert inner is not outer and len(db._open_checkouts) == 2
+            # The inner cursor returned its own connection; the outer is still checked out
+            assert list(db._open_checkouts) == [id(outer)]
+            assert db.connection_pool._pool == [inner]
+            db._note_query(outer, 0.005)
+    finally:
+        db.finish_request_tracking(usage, token)
+
+    assert usage.checkouts == 2 and usage.queries == 1
+    assert db.connection_pool._pool == [inner, outer] and not db._open_checkouts
+
+
+def test_helpers_share_one_connection_per_request(pools):
+    usage, token = db.start_request_tracking({"method": "GET", "route": FakeRoute()})
+    try:
+        for _ in range(3):
+            with db.session_cursor() as (cur, conn):
+                assert conn.autocommit
+        session_conn = usage.session.conn
+        assert db.get_pool_stats()[db.DEFAULT_POOL]["active"] == 1
+    finally:
+        db.finish_request_tracking(usage, token)
+
+    assert usage.checkouts == 1
+    assert session_conn.pool_name == db.DEFAULT_POOL and not session_conn.autocommit
+    assert db.connection_pool._pool == [session_conn] and not db.connection_pool._used
+    assert db.get_pool_stats()[db.DEFAULT_POOL]["active"] == 0
+    assert db.get_request_session() is None
@@ -0,0 +1,43 @@
+"""Entitlements: access decisions, and caching until they would change or are invalidated."""
+
+from datetime import datetime, timedelta, timezone
+
+from app.utils import entitlements
+from app.utils.entitlements import EntitlementCache, evaluate_subscription, get_entitlement
+
+NOW = datetime.now(timezone.utc)
+
+
+def test_free_tier_without_trial_never_lapses():
+    assert evaluate_subscription(('active', None, None, 'free'), now=NOW) == (True, None)
+    assert evaluate_subscription(('active', None, None, 'free'), include_free_tier=False, now=NOW) == (False, None)
+
+
+def test_paid_access_lasts_until_the_later_period_end():
+    period_end = NOW + timedelta(days=20)
+    trial_end = NOW + timedelta(days=3)
+    assert evaluate_subscription(('trialing', period_end, trial_end, 'individual'), now=NOW) == (True, period_end)
+    assert evaluate_subscription(('active', NOW - timedelta(days=1), None, 'individual'), now=NOW) == (False, None)
+    assert evaluate_subscription(('canceled', period_end, None, 'individual'), now=NOW) == (False, None)
+    assert evaluate_subscription(None) == (False, None)
+
+
+def test_entitlement_is_cached_until_its_subscription_changes(fake_db, monkeypatch):
+    cache = EntitlementCache(ttl_s=60)
+    monkeypatch.setattr(entitlements, "entitlement_cache", cache)
+    fake_db.cur.rows = [(42, 'active', NOW + timedelta(days=10), None, 'individual')]
+    queries = fake_db.cur.executed
+
+    assert get_entitlement(user_id=7).has_access
+    assert get_entitlement(user_id=7).subscription_id == 42
+    assert len(queries) == 1
+
+    cache.invalidate_subscription(42)
+    get_entitlement(user_id=7)
+    assert len(queries) == 2
+
+
+def test_cached_grant_expires_at_period_end():
+    cache = EntitlementCache(ttl_s=300)
+    cache.put(("user", 7), True, 42, NOW - timedelta(seconds=1))
+    assert cache.get(("user", 7)) is None
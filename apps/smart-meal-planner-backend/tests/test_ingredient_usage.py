@@ -0,0 +1,78 @@
+"""Ingredient cooldown: batched writes and the per-user read-through cache."""
+
+from app.utils import ingredient_usage
+from app.utils.ingredient_usage import (
+    INGREDIENT_USAGE_SWEEP_LOCK_KEY, RecentIngredientsCache, forget_recent_ingredients, prune_ingredient_usage,
+    recent_ingredients, write_ingredient_usage,
+)
+
+
+def test_cooldown_list_is_cached_per_user(fake_db, monkeypatch):
+    monkeypatch.setattr(ingredient_usage, "recent_ingredients_cache", RecentIngredientsCache(ttl_s=60))
+    cur = fake_db.cur
+    cur.rows = [{"ingredient_name": name} for name in ("basil", "chicken breast")]
+
+    assert recent_ingredients(cur, 7) == ["basil", "chicken breast"]
+    assert recent_ingredients(cur, 7) == ["basil", "chicken breast"]
+    assert len(cur.executed) == 1
+
+    recent_ingredients(cur, 8)
+    assert len(cur.executed) == 2
+
+
+def test_writing_usage_batches_rows_and_the_cache_is_dropped_after_commit(fake_db, monkeypatch):
+    cache = RecentIngredientsCache(ttl_s=60)
+    monkeypatch.setattr(ingredient_usage, "recent_ingredients_cache", cache)
+    cache.put(7, 3, ["basil"])
+    cache.put(8, 3, ["rice"])
+
+    rows = [(7, None, name, "2026-10-18", "dinner") for name in ("basil", "lemon", "salmon")]
+    assert write_ingredient_usage(fake_db.cur, rows) == 3
+
+    assert fake_db.cur.batches == [rows]
+    # Not committed yet: a read now would still see the old rows
+    assert cache.get(7, 3) == ["basil"]
+
+    forget_recent_ingredients(row[0] for row in rows)
+    assert cache.get(7, 3) is None
+    assert cache.get(8, 3) == ["rice"]
+
+
+def _sweep(fake_db, lock_free, batch_counts):
+    counts = iter(batch_counts)
+
+    def respond(sql, params):
+        if "pg_try_advisory_lock" in sql:
+            return [(lock_free,)]
+        if sql == ingredient_usage.SWEEP_SQL:
+            return next(counts)
+        return None
+
+    fake_db.cur.respond = respond
+    return prune_ingredient_usage(retention_days=14, batch_size=100)
+
+
+def test_sweep_deletes_in_batches_under_the_lock(fake_db):
+    result = _sweep(fake_db, True, [100, 100, 7])
+
+    assert result["deleted"] == 207
+    statements = [sql for sql, params in fake_db.cur.executed]
+    assert statements.count(ingredient_usage.SWEEP_SQL) == 3
+    assert statements[-1] == "SELECT pg_advisory_unlock(%s)"
+    assert fake_db.cur.executed[-1][1] == (INGREDIENT_USAGE_SWEEP_LOCK_KEY,)
+
+
+def test_sweep_is_skipped_while_another_worker_holds_the_lock(fake_db):
+    assert _sweep(fake_db, False, [])["status"] == "skipped"
+    assert len(fake_db.cur.executed) == 1
+
+
+def test_cache_evicts_least_recently_used_users():
+    cache = RecentIngredientsCache(ttl_s=60, max_users=2)
+    cache.put(1, 3, ["a"])
+    cache.put(2, 3, ["b"])
+    cache.get(1, 3)
+    cache.put(3, 3, ["c"])
+
+    assert cache.get(2, 3) is None
+    assert cache.get(1, 3) == ["a"]
@@ -0,0 +1,99 @@
+"""Instacart retailer directory: coalescing, memory hits and stale fallback."""
+
+import threading
+import time
+
+from app.integration import instacart, instacart_retailers
+from app.integration.instacart_retailers import RetailerDirectory
+
+
+class FakeClient:
+    def __init__(self, retailers=None, error=None, delay=0):
+        self.retailers = retailers or [{"id": "costco"}]
+        self.error = error
+        self.delay = delay
+        self.calls = []
+
+    def get_retailers(self, postal_code, country_code):
+        self.calls.append((postal_code, country_code))
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.retailers
+
+
+def _patch(monkeypatch, client, stored=None):
+    saved = []
+    monkeypatch.setattr(instacart, "get_instacart_client", lambda: client)
+    monkeypatch.setattr(instacart_retailers, "_load_stored", lambda key: stored)
+    monkeypatch.setattr(instacart_retailers, "_store", lambda key, retailers: saved.append((key, retailers)))
+    return saved
+
+
+def test_concurrent_lookups_share_one_upstream_call(monkeypatch):
+    client = FakeClient(delay=0.2)
+    saved = _patch(monkeypatch, client)
+    directory = RetailerDirectory()
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(directory.get(" 80538 ", "us"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert client.calls == [("80538", "US")]
+    assert results == [client.retailers] * 8
+    assert saved == [(("80538", "US"), client.retailers)]
+
+    assert directory.get("80538") == client.retailers
+    assert len(client.calls) == 1
+    assert directory.hits == 1
+
+
+def test_fresh_stored_list_skips_the_api(monkeypatch):
+    client = FakeClient()
+    _patch(monkeypatch, client, stored=([{"id": "aldi"}], time.time() - 60))
+
+    assert RetailerDirectory().get("80538") == [{"id": "aldi"}]
+    assert client.calls == []
+
+
+def test_stale_stored_list_is_served_when_the_api_fails(monkeypatch):
+    client = FakeClient(error=RuntimeError("502 from Instacart"))
+    stored = ([{"id": "aldi"}], time.time() - 3 * 24 * 3600)
+    _patch(monkeypatch, client, stored=stored)
+    directory = RetailerDirectory(ttl_s=24 * 3600)
+
+    assert directory.get("80538") == [{"id": "aldi"}]
+    assert client.calls == [("80538", "US")]
+    assert directory.stale_served == 1
+
+
+def test_empty_lists_expire_sooner(monkeypatch):
+    client = FakeClient()
+    client.retailers = []
+    _patch(monkeypatch, client, stored=([], time.time() - 3600))
+    directory = RetailerDirectory(ttl_s=86400, empty_ttl_s=1800)
+
+    # An hour-old empty list is past its shorter TTL, so the API is asked again
+    assert directory.get("0000") == []
+    assert client.calls == [("0000", "US")]
+
+    directory._remember(("0000", "US"), [], time.time() - 1900)
+    directory.get("0000")
+    assert len(client.calls) == 2
+
+
+def test_caches_are_bounded_by_postal_code_count(monkeypatch):
+    _patch(monkeypatch, FakeClient())
+    directory = RetailerDirectory(max_entries=3)
+
+    for postal_code in range(10):
+        directory.get(str(postal_code))
+    directory.get("0")
+
+    assert directory.stats()["entries"] <= 3
+    counts = directory.take_request_counts()
+    assert counts == {("0", "US"): 2, ("1", "US"): 1, ("2", "US"): 1}
+    assert directory.stats()["uncounted_requests"] == 7
@@ -0,0 +1,92 @@
+"""Interaction event queue: overflow accounting, batching and drain on stop."""
+
+from contextlib import contextmanager
+
+import pytest
+
+import app.db as db
+from app.utils import interaction_events
+from app.utils.interaction_events import InteractionEventQueue
+
+
+@pytest.fixture
+def written(fake_db):
+    return fake_db.cur.batches
+
+
+def test_overflow_is_counted_not_blocking(written):
+    events = InteractionEventQueue(maxsize=3, batch_size=10, flush_interval=0.05)
+    results = [events.enqueue(1, recipe_id, "viewed") for recipe_id in range(5)]
+
+    assert results == [True, True, True, False, False]
+    assert events.stats()["dropped_overflow"] == 2
+    assert written == []
+
+
+def test_stop_drains_queue_in_batches(written):
+    events = InteractionEventQueue(maxsize=100, batch_size=4, flush_interval=0.05)
+    for recipe_id in range(10):
+        events.enqueue(1, recipe_id, "viewed")
+
+    events.start()
+    events.stop(timeout=5)
+
+    assert not events.running
+    assert [len(batch) for batch in written] == [4, 4, 2]
+    assert [row[1] for batch in written for row in batch] == list(range(10))
+    assert events.stats()["written"] == 10
+
+
+def test_failed_writes_are_counted(monkeypatch):
+    @contextmanager
+    def broken_cursor(dict_cursor=True, autocommit=False, pool_type=None):
+        raise RuntimeError("database unavailable")
+        yield
+
+    monkeypatch.setattr(db, "get_db_cursor", broken_cursor)
+    events = InteractionEventQueue(maxsize=10, batch_size=10, flush_interval=0.05, write_retries=0)
+    events.enqueue(1, 2, "viewed")
+    events.start()
+    events.stop(timeout=5)
+
+    assert events.stats()["dropped_failed"] == 1
+    assert "database unavailable" in events.stats()["last_error"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_retried_write_backdates_by_the_age_at_the_retry(fake_db, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(interaction_events, "time", clock)
+    cursor = fake_db.cursor
+    attempts = []
+
+    @contextmanager
+    def flaky_cursor(*args, **kwargs):
+        attempts.append(clock.now)
+        if len(attempts) == 1:
+            raise RuntimeError("connection reset")
+        with cursor(*args, **kwargs) as pair:
+            yield pair
+
+    monkeypatch.setattr(db, "get_db_cursor", flaky_cursor)
+    events = InteractionEventQueue(write_retries=1)
+
+    events._write([(1, 2, "viewed", None, clock.now - 3)])
+
+    # Written after the 1s backoff, so the event is 4s old by then
+    assert attempts == [1000.0, 1001.0]
+    assert fake_db.cur.batches == [[(1, 2, "viewed", None, 4.0)]]
+    assert events.stats()["written"] == 1
@@ -0,0 +1,101 @@
+"""Kroger UPC resolution: stored answers first, bounded concurrent searches for the rest."""
+
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from app.integration import kroger_upc
+from app.integration.kroger_upc import UpcResolver, normalize_item_name
+
+
+@pytest.fixture
+def database(fake_db):
+    return fake_db.cur
+
+
+def recorded(cur):
+    return [row for batch in cur.batches for row in batch]
+
+
+def test_normalize_item_name():
+    assert normalize_item_name("2 cups Brown Rice") == "brown rice"
+    assert normalize_item_name("Brown rice: 4 cups") == "brown rice"
+    assert normalize_item_name("Fresh cilantro, chopped") == "cilantro chopped"
+    assert normalize_item_name(None) == ""
+
+
+def test_stored_answers_skip_search_and_misses_are_searched_once(database, monkeypatch):
+    database.rows = [
+        {"ingredient_key": "brown rice", "user_id": 7, "upc": "0001", "product": None},
+        {"ingredient_key": "cilantro", "user_id": 0, "upc": "0002",
+         "product": json.dumps({"name": "Cilantro Bunch", "upc": "0002", "price": 0.99})},
+    ]
+    searched = []
+
+    def fake_search(term, location_id, limit):
+        searched.append(term)
+        return {"success": True, "results": [{"name": f"Kroger {term}", "upc": f"9{i}"} for i in range(5)]}
+
+    monkeypatch.setattr(kroger_upc, "kroger_search_item", fake_search)
+
+    resolved = asyncio.run(UpcResolver().resolve(
+        7, "62000044", ["2 cups brown rice", "Fresh cilantro", "1 lb chicken breast", "chicken breast"]
+    ))
+
+    assert resolved["2 cups brown rice"] == {"source": "chosen", "suggestions": [{"name": "2 cups brown rice", "upc": "0001"}]}
+    assert resolved["Fresh cilantro"]["source"] == "cached"
+    assert resolved["Fresh cilantro"]["suggestions"][0]["name"] == "Cilantro Bunch"
+    assert searched == ["1 lb chicken breast"]
+    assert resolved["chicken breast"]["source"] == "search"
+    assert len(resolved["chicken breast"]["suggestions"]) == 3
+
+    sql, params = database.executed[0]
+    assert params[:3] == ("62000044", ["brown rice", "chicken breast", "cilantro"], 7)
+    # Only the top search result is stored, as the shared answer
+    assert [row[:4] for row in recorded(database)] == [(0, "62000044", "chicken breast", "90")]
+
+
+def test_searches_run_concurrently_within_the_bound(database, monkeypatch):
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def fake_search(term, location_id, limit):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        if term == "saffron":
+            return {"success": True, "results": []}
+        return {"success": True, "results": [{"name": term, "upc": f"upc-{term}"}]}
+
+    monkeypatch.setattr(kroger_upc, "kroger_search_item", fake_search)
+    names = ["apples", "bananas", "carrots", "dates", "eggs", "flour", "saffron"]
+
+    started = time.perf_counter()
+    resolved = asyncio.run(UpcResolver(concurrency=3).resolve(7, "62000044", names, refresh=True))
+    elapsed = time.perf_counter() - started
+
+    assert running[1] == 3
+    assert elapsed < 0.05 * len(names) * 0.75
+    assert database.executed == []  # refresh skips the lookup
+    assert resolved["saffron"] == {"source": "search", "suggestions": [], "message": "No results found for 'saffron'"}
+    assert len(recorded(database)) == 6
+
+
+def test_record_choices_keeps_the_last_pick_per_name(database):
+    resolver = UpcResolver()
+
+    resolver.record_choices(7, "62000044", [
+        {"name": "2 cups brown rice", "upc": "0001"},
+        {"name": "Brown rice", "upc": "0003", "product": {"name": "Kroger Brown Rice"}},
+        {"name": "", "upc": "0004"},
+        {"name": "milk"},
+    ])
+
+    assert recorded(database) == [(7, "62000044", "brown rice", "0003", json.dumps({"name": "Kroger Brown Rice"}))]
+    assert resolver.stats()["choices_recorded"] == 1
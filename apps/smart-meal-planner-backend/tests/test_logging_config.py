@@ -0,0 +1,109 @@
+"""Logging setup: JSON output, per-module levels, sampling and lazy arguments."""
+
+import io
+import json
+import logging
+
+import pytest
+
+from app.utils import logging_config
+from app.utils.logging_config import LazyJson, LogSampler, configure_logging, parse_module_levels, redact_headers
+
+
+@pytest.fixture
+def restore_logging():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    touched = ["app.routers.grocery_list", "app.integration.instacart", "sampled"]
+    levels = {name: logging.getLogger(name).level for name in touched}
+    yield
+    root.handlers[:] = handlers
+    root.setLevel(level)
+    for name, saved in levels.items():
+        logging.getLogger(name).setLevel(saved)
+
+
+def test_json_lines_carry_extra_fields_and_exceptions(restore_logging):
+    stream = io.StringIO()
+    configure_logging(env={"LOG_FORMAT": "json"}, stream=stream)
+    log = logging.getLogger("app.integration.instacart")
+
+    log.info("Instacart %s %s -> %s", "POST", "products/products_link", 200, extra={"duration_ms": 41.5})
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        log.error("Request failed", exc_info=True)
+
+    first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert first["message"] == "Instacart POST products/products_link -> 200"
+    assert first["logger"] == "app.integration.instacart" and first["level"] == "INFO"
+    assert first["duration_ms"] == 41.5 and first["ts"].endswith("Z")
+    assert "RuntimeError: boom" in second["exc_info"]
+
+
+def test_module_levels_from_env(restore_logging):
+    stream = io.StringIO()
+    configure_logging(env={
+        "LOG_FORMAT": "text",
+        "LOG_LEVEL": "warning",
+        "LOG_LEVELS": "app.routers.grocery_list=ERROR, app.integration.instacart=DEBUG",
+    }, stream=stream)
+
+    assert logging.getLogger().level == logging.WARNING
+    assert not logging.getLogger("app.routers.grocery_list").isEnabledFor(logging.WARNING)
+    assert logging.getLogger("app.integration.instacart").isEnabledFor(logging.DEBUG)
+
+
+def test_bad_level_settings_fall_back_with_a_warning(restore_logging):
+    stream = io.StringIO()
+    configure_logging(env={"LOG_FORMAT": "text", "LOG_LEVEL": "LOUD", "LOG_LEVELS": "app.db"}, stream=stream)
+
+    assert logging.getLogger().level == logging.INFO
+    assert "Unknown log level: LOUD" in stream.getvalue()
+    assert "LOG_LEVELS ignored" in stream.getvalue()
+    with pytest.raises(ValueError):
+        parse_module_levels("app.db=NOISY")
+
+
+def test_sampler_lets_a_burst_through_then_reports_what_it_dropped(restore_logging, monkeypatch):
+    stream = io.StringIO()
+    configure_logging(env={"LOG_FORMAT": "text", "LOG_LEVEL": "DEBUG"}, stream=stream)
+    clock = [100.0]
+    monkeypatch.setattr(logging_config.time, "monotonic", lambda: clock[0])
+    sampler = LogSampler(logging.getLogger("sampled"), burst=2, window_s=10)
+
+    for i in range(5):
+        sampler.log("item %d", i)
+    clock[0] += 10
+    sampler.log("item %d", 5)
+
+    lines = stream.getvalue().splitlines()
+    assert [line.rsplit(" - ", 1)[1] for line in lines] == [
+        "item 0", "item 1", "3 similar messages suppressed, e.g. 'item %d'", "item 5",
+    ]
+
+
+def test_disabled_levels_never_format_their_arguments(restore_logging):
+    configure_logging(env={"LOG_LEVEL": "INFO"}, stream=io.StringIO())
+    rendered = []
+
+    class Payload:
+        def __str__(self):
+            rendered.append(True)
+            return "payload"
+
+    log = logging.getLogger("sampled")
+    log.debug("Request data: %s", LazyJson({"body": Payload()}))
+    LogSampler(log).log("Item: %s", Payload())
+    assert rendered == []
+
+    assert str(LazyJson({"body": Payload()})) == '{"body": "payload"}'
+    assert str(LazyJson(list(range(100)), limit=10)).endswith("... (390 chars)")
+
+
+def test_redact_headers():
+    headers = {"Authorization": "Bearer abc", "Stripe-Signature": "t=1,v1=x", "Content-Type": "application/json"}
+
+    assert redact_headers(headers) == {
+        "Authorization": "***", "Stripe-Signature": "***", "Content-Type": "application/json",
+    }
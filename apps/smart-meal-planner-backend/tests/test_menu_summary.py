@@ -0,0 +1,58 @@
+"""Menu summaries: built from the plan, rebuilt when outdated, plan only on request."""
+
+import json
+
+from app.utils.menu_summary import (
+    MENU_SUMMARY_VERSION, apply_summary, build_menu_summary, include_plan
+)
+
+PLAN = {
+    "days": [
+        {
+            "dayNumber": 1,
+            "meals": [
+                {"title": "Oats", "macros": {"perServing": {"calories": 400}}},
+                {"title": "Salad", "macros": {"perServing": {"calories": "550 kcal"}},
+                 "image_url": "https://example.com/salad.jpg"},
+            ],
+            "snacks": [{"title": "Apple", "macros": {"calories": 90}}],
+        },
+        {"dayNumber": 2, "meals": [{"title": "Soup", "macros": {"perServing": {"calories": 700}}}]},
+    ]
+}
+
+
+def test_build_menu_summary():
+    summary = build_menu_summary(json.dumps({"meal_plan": PLAN}))
+
+    assert summary == {
+        "version": MENU_SUMMARY_VERSION,
+        "day_count": 2,
+        "meal_count": 4,
+        "titles": ["Oats", "Salad", "Apple", "Soup"],
+        "calories_per_day": {"min": 700, "max": 1040},
+        "thumbnail_url": "https://example.com/salad.jpg",
+    }
+    assert build_menu_summary(None)["day_count"] == 0
+
+
+def test_apply_summary_drops_plan_unless_requested():
+    stored = build_menu_summary(PLAN)
+    row = apply_summary({"summary": stored, "meal_plan_json": None}, want_plan=False)
+    assert row == {"summary": stored}
+
+    row = apply_summary({"summary": json.dumps(stored), "meal_plan_json": json.dumps(PLAN)}, want_plan=True)
+    assert row["meal_plan_json"] == PLAN
+
+
+def test_apply_summary_rebuilds_missing_or_outdated():
+    row = apply_summary({"summary": {"version": 0}, "meal_plan_json": json.dumps(PLAN)}, want_plan=False)
+    assert row["summary"]["day_count"] == 2
+    assert "meal_plan_json" not in row
+
+
+def test_include_plan_flag():
+    assert include_plan("plan")
+    assert include_plan("summary, Plan")
+    assert not include_plan(None)
+    assert not include_plan("planner")
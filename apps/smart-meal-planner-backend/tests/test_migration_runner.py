@@ -0,0 +1,105 @@
+"""Startup migrations: the schema_version fast path and the advisory lock between workers."""
+
+import pytest
+from psycopg2.errors import LockNotAvailable
+
+from app.migrations import migration_runner as runner_module
+from app.migrations.migration_runner import MIGRATION_LOCK_KEY, run_startup_migrations
+
+
+class FakeServer:
+    """Answers the runner's SQL: the recorded schema version and whether the lock is free"""
+
+    def __init__(self, version=None, lock_free=True):
+        self.version = version
+        self.lock_free = lock_free
+
+    def __call__(self, sql, params):
+        if "pg_try_advisory_lock" in sql:
+            return [(self.lock_free,)]
+        if "to_regclass" in sql:
+            return [("schema_version",) if self.version else (None,)]
+        if "SELECT version FROM" in sql:
+            return [(self.version,)]
+        return None
+
+
+@pytest.fixture
+def runner(fake_db, monkeypatch):
+    fake_db.install(monkeypatch, runner_module)
+    monkeypatch.setenv("ENVIRONMENT", "development")
+    monkeypatch.delenv("AUTO_MIGRATE_ON_STARTUP", raising=False)
+    calls = []
+    migration_runner = runner_module.migration_runner
+    monkeypatch.setattr(migration_runner, "run_legacy_bootstrap", lambda: calls.append("bootstrap"))
+    monkeypatch.setattr(migration_runner, "run_all_pending_migrations",
+                        lambda cur: calls.append("migrate") or {"status": "success", "migrations_run": ["034_x"]})
+    monkeypatch.setattr(migration_runner, "get_pending_migrations", lambda cur: [])
+    return calls
+
+
+def _lock_calls(cur):
+    return [sql for sql, params in cur.executed if "advisory" in sql]
+
+
+def test_current_schema_takes_the_fast_path_without_the_lock(fake_db, runner):
+    fake_db.cur.respond = FakeServer(version=runner_module.migration_runner.target_version())
+
+    assert run_startup_migrations() is True
+    assert runner == [] and _lock_calls(fake_db.cur) == []
+
+
+def test_lock_holder_migrates_and_records_the_version(fake_db, runner):
+    fake_db.cur.respond = FakeServer(version="030_old+bootstrap1")
+
+    assert run_startup_migrations() is True
+
+    assert runner == ["bootstrap", "migrate"]
+    assert _lock_calls(fake_db.cur) == ["SELECT pg_try_advisory_lock(%s)", "SELECT pg_advisory_unlock(%s)"]
+    [version] = [params for sql, params in fake_db.cur.executed if "INSERT INTO schema_version" in sql]
+    assert version == (runner_module.migration_runner.target_version(),)
+
+
+def test_schema_brought_current_before_the_lock_is_not_migrated_again(fake_db, runner):
+    server = FakeServer(version=None)
+    target = runner_module.migration_runner.target_version()
+
+    def respond(sql, params):
+        # Another worker finishes between the fast path and taking the lock
+        if "pg_try_advisory_lock" in sql:
+            server.version = target
+        return server(sql, params)
+
+    fake_db.cur.respond = respond
+    result = runner_module.migration_runner.run_locked(wait=False)
+
+    assert result["message"] == "Schema already current" and runner == []
+    assert _lock_calls(fake_db.cur)[-1] == "SELECT pg_advisory_unlock(%s)"
+
+
+def test_worker_that_loses_the_lock_waits_for_the_holder(fake_db, runner):
+    fake_db.cur.respond = FakeServer(version=None, lock_free=False)
+
+    assert run_startup_migrations() is True
+
+    assert runner == []
+    assert _lock_calls(fake_db.cur) == ["SELECT pg_try_advisory_lock(%s)", "SELECT pg_advisory_lock(%s)",
+                                        "SELECT pg_advisory_unlock(%s)"]
+    assert all(params == (MIGRATION_LOCK_KEY,) for sql, params in fake_db.cur.executed if "advisory" in sql)
+    assert fake_db.cur.executed[-1][0] == "SELECT pg_advisory_unlock(%s)"
+    assert ("RESET lock_timeout", None) in fake_db.cur.executed
+
+
+def test_worker_gives_up_when_the_holder_never_finishes(fake_db, runner):
+    server = FakeServer(version=None, lock_free=False)
+
+    def respond(sql, params):
+        if sql == "SELECT pg_advisory_lock(%s)":
+            raise LockNotAvailable("canceling statement due to lock timeout")
+        return server(sql, params)
+
+    fake_db.cur.respond = respond
+
+    assert run_startup_migrations() is False
+    assert runner == [] and "SELECT pg_advisory_unlock(%s)" not in _lock_calls(fake_db.cur)
+    assert fake_db.cur.executed[-1] == ("RESET lock_timeout", None)
@@ -0,0 +1,216 @@
+"""Postgres tier: the versioned migrations and the upserts built on them, run against a real server."""
+
+import json
+from datetime import datetime, timedelta
+
+import app.db as db
+from app.ai import rating_rollups, recipe_neighbors
+from app.ai.rating_analytics import rating_analytics
+from app.integration import instacart_retailers
+from app.integration.kroger_upc import UpcResolver
+from app.models.subscription import log_subscription_event
+from app.utils import ingredient_usage, stripe_events
+from app.utils.ingredient_usage import RecentIngredientsCache
+from app.utils.s3 import s3_utils
+from tests.conftest import apply_migrations
+
+
+def rows(pg, sql, params=None):
+    with pg.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchall() if cur.description else None
+
+
+def add_user(pg, user_id=7):
+    rows(pg, "INSERT INTO user_profiles (id, email) VALUES (%s, %s)", (user_id, f"user{user_id}@example.com"))
+    return user_id
+
+
+def test_migrations_can_be_rerun(pg):
+    apply_migrations()
+
+    tables = {row[0] for row in rows(pg, "SELECT tablename FROM pg_tables WHERE schemaname = current_schema()")}
+    assert {"recipe_neighbors", "user_preference_profiles", "recipe_rating_daily", "ingredient_usage_log",
+            "subscription_events", "instacart_retailer_directory", "recipe_neighbor_builds", "internal_carts", "recipe_search_index",
+            "kroger_upc_resolutions", "image_variants"} <= tables
+
+
+def test_rating_rollups_full_then_incremental(pg):
+    rows(pg, "INSERT INTO scraped_recipes (id, title, cuisine) VALUES (1, 'Pad Thai', 'Thai'), (2, 'Dal', 'Indian')")
+    day = datetime(2026, 10, 1, 12, 0)
+    rows(pg, """
+        INSERT INTO recipe_interactions (user_id, recipe_id, interaction_type, rating_score, made_recipe, timestamp, updated_at)
+        VALUES (1, 1, 'rating', 5, true, %(day)s, %(day)s),
+               (2, 1, 'rating', 3, false, %(day)s, %(day)s),
+               (3, 2, 'rating', 4, true, %(day)s + INTERVAL '1 day', %(day)s)
+    """, {"day": day})
+
+    assert rating_rollups.refresh_rating_rollups()["mode"] == "full"
+    assert rows(pg, "SELECT day, recipe_id, rating_count, rating_sum, high_ratings, times_made "
+                    "FROM recipe_rating_daily ORDER BY day, recipe_id") == [
+        (day.date(), 1, 2, 8, 1, 1), (day.date() + timedelta(days=1), 2, 1, 4, 1, 1)]
+
+    # A re-rating moves updated_at only; the next refresh recomputes just that day
+    rows(pg, "UPDATE recipe_interactions SET rating_score = 1, updated_at = CURRENT_TIMESTAMP WHERE user_id = 1")
+    result = rating_rollups.refresh_rating_rollups()
+
+    assert (result["mode"], result["days_refreshed"]) == ("incremental", 1)
+    assert rows(pg, "SELECT rating_sum, high_ratings FROM recipe_rating_daily WHERE recipe_id = 1") == [(4, 0)]
+    assert rows(pg, "SELECT cuisine, rating_sum FROM cuisine_rating_daily ORDER BY cuisine") == [
+        ("Indian", 4), ("Thai", 4)]
+    assert len(rows(pg, "SELECT * FROM rating_rollup_state")) == 1
+
+
+def test_empty_neighbor_build_is_not_repeated(pg):
+    first = recipe_neighbors.build_neighbors_if_due()
+
+    assert first["pairs"] == 0
+    assert rows(pg, "SELECT recipes, pairs FROM recipe_neighbor_builds") == [(0, 0)]
+    # Nothing stored, but the build is recorded, so the next check waits out the interval
+    assert recipe_neighbors.build_neighbors_if_due() is None
+
+
+def test_ingredient_usage_ignores_repeats(pg, monkeypatch):
+    monkeypatch.setattr(ingredient_usage, "recent_ingredients_cache", RecentIngredientsCache(ttl_s=60))
+    user_id = add_user(pg)
+    today = datetime.now().date()
+    usage = [(user_id, None, "basil", today, "dinner"), (user_id, None, "salmon", today, "dinner")]
+
+    with db.get_db_cursor(dict_cursor=False) as (cur, conn):
+        ingredient_usage.write_ingredient_usage(cur, usage)
+        ingredient_usage.write_ingredient_usage(cur, usage + [(user_id, None, "rice", today - timedelta(days=9), "lunch")])
+        conn.commit()
+        assert ingredient_usage.recent_ingredients(cur, user_id) == ["basil", "salmon"]
+
+    assert rows(pg, "SELECT COUNT(*) FROM ingredient_usage_log") == [(3,)]
+
+
+def test_kroger_choices_replace_and_count_repeats(pg):
+    resolver = UpcResolver()
+    resolver._record([(0, "620", "brown rice", "0001", json.dumps({"name": "Kroger Brown Rice"}))])
+
+    resolver.record_choices(7, "620", [{"name": "2 cups brown rice", "upc": "0001"}])
+    resolver.record_choices(7, "620", [{"name": "Brown rice", "upc": "0001"}])
+    assert rows(pg, "SELECT upc, product, use_count FROM kroger_upc_resolutions WHERE user_id = 7") == [
+        ("0001", {"name": "Kroger Brown Rice"}, 2)]
+
+    resolver.record_choices(7, "620", [{"name": "brown rice", "upc": "0002"}])
+    assert rows(pg, "SELECT upc, product, use_count FROM kroger_upc_resolutions WHERE user_id = 7") == [
+        ("0002", None, 1)]
+
+    found = resolver._lookup(7, "620", ["brown rice", "saffron"])
+    assert list(found) == ["brown rice"] and found["brown rice"]["user_id"] == 7
+    assert resolver._lookup(8, "620", ["brown rice"])["brown rice"]["upc"] == "0001"
+
+
+def test_instacart_directory_upsert(pg):
+    key = instacart_retailers.normalize_key("10001")
+    instacart_retailers._store(key, [{"name": "Old"}])
+    instacart_retailers._store(key, [{"name": "New"}])
+
+    retailers, fetched_at = instacart_retailers._load_stored(key)
+    assert retailers == [{"name": "New"}] and fetched_at > 0
+    assert rows(pg, "SELECT COUNT(*) FROM instacart_retailer_directory") == [(1,)]
+
+
+def test_image_variants_upsert_and_forget(pg, monkeypatch):
+    monkeypatch.setenv("S3_BUCKET_NAME", "bucket")
+    monkeypatch.setenv("AWS_REGION", "us-east-2")
+    url = "https://bucket.s3.us-east-2.amazonaws.com/recipes/a.jpg"
+
+    s3_utils.record_image_variants("recipes/a.jpg", {"thumb": "recipes/a.thumb.webp"})
+    s3_utils.record_image_variants("recipes/a.jpg", {"thumb": "recipes/a.thumb.webp", "card": "recipes/a.card.webp"})
+    assert set(s3_utils.stored_variant_urls([url])[url]) == {"thumb", "card"}
+
+    s3_utils.forget_image_variants("recipes/a.jpg")
+    assert s3_utils.stored_variant_urls([url]) == {}
+
+
+def test_redelivered_stripe_event_is_queued_once(pg):
+    first = log_subscription_event(None, "invoice.paid", {"id": "evt_1"}, "stripe", "evt_1",
+                                   ordering_key="sub_1", event_created=datetime(2026, 10, 1))
+    again = log_subscription_event(None, "invoice.paid", {"id": "evt_1"}, "stripe", "evt_1",
+                                   ordering_key="sub_1", event_created=datetime(2026, 10, 1))
+
+    assert first == again
+    assert rows(pg, "SELECT COUNT(*) FROM subscription_events") == [(1,)]
+
+
+def test_stripe_events_waiting_on_a_retry_do_not_hold_back_other_keys(pg, monkeypatch):
+    applied = []
+    monkeypatch.setattr(stripe_events, "apply_event", lambda row: applied.append(row["provider_event_id"]))
+    for i, key in enumerate(["sub_a", "sub_a", "sub_a", "sub_b", "sub_c", "sub_b"]):
+        log_subscription_event(None, "invoice.paid", {"id": f"evt_{i}"}, "stripe", f"evt_{i}",
+                               ordering_key=key, event_created=datetime(2026, 10, 1, 12, i))
+    # sub_a's oldest event failed and waits; it and the two behind it fill the first batch
+    rows(pg, "UPDATE subscription_events SET attempts = 1, next_attempt_at = CURRENT_TIMESTAMP + INTERVAL '1 hour' "
+             "WHERE provider_event_id = 'evt_0'")
+
+    totals = stripe_events.process_stripe_events(batch_size=2)
+
+    assert applied == ["evt_3", "evt_4", "evt_5"]
+    assert totals["processed"] == 3
+    assert rows(pg, "SELECT provider_event_id FROM subscription_events WHERE NOT processed ORDER BY id") == [
+        ("evt_0",), ("evt_1",), ("evt_2",)]
+
+
+def test_deleting_saved_recipes_keeps_the_profile_in_step(pg):
+    user_id = add_user(pg)
+    rows(pg, "INSERT INTO menus (id, user_id) VALUES (12, %s)", (user_id,))
+    rows(pg, """
+        INSERT INTO saved_recipes (user_id, menu_id, recipe_name, quick_rating)
+        VALUES (%(user)s, 12, 'Soup', 4), (%(user)s, 12, 'Stew', 2), (%(user)s, NULL, 'Salad', 5)
+    """, {"user": user_id})
+    rating_analytics.rebuild_user_profile(user_id)
+
+    with rating_analytics.profile_update(user_id) as update:
+        assert update.delete_saved("sv.menu_id = %s", (12,)) == 2
+
+    stats = rows(pg, "SELECT stats FROM user_preference_profiles")[0][0]
+    assert stats["count"] == 1 and stats["version"]
+
+    with db.get_db_cursor() as (cur, conn):
+        rating_analytics.mark_profiles_for_rebuild(cur, "sv.menu_id IS NULL")
+        conn.commit()
+    assert "version" not in rows(pg, "SELECT stats FROM user_preference_profiles")[0][0]
+
+
+def test_saved_recipe_pages_walk_ties_in_order(pg):
+    user_id = add_user(pg)
+    created = datetime(2026, 10, 1, 12, 0)
+    for i in range(5):
+        rows(pg, "INSERT INTO saved_recipes (user_id, recipe_name, created_at) VALUES (%s, %s, %s)",
+             (user_id, f"Recipe {i}", created if i < 3 else created + timedelta(minutes=i)))
+    # Undated rows sort ahead of the dated ones
+    for name in ("Undated 0", "Undated 1", "Undated 2"):
+        rows(pg, "INSERT INTO saved_recipes (user_id, recipe_name, created_at) VALUES (%s, %s, NULL)",
+             (user_id, name))
+
+    seen, cursor = [], None
+    while True:
+        page = db.get_saved_recipes_page(user_id, limit=2, cursor=cursor)
+        seen.extend(row["recipe_name"] for row in page["saved_recipes"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == ["Undated 2", "Undated 1", "Undated 0", "Recipe 4", "Recipe 3", "Recipe 2", "Recipe 1", "Recipe 0"]
+    # The unpaged list for older clients comes back in the same order
+    assert [row["recipe_name"] for row in db.get_user_saved_recipes(user_id)] == seen
+
+
+def test_saved_recipes_list_index_loses_the_included_columns(pg):
+    import importlib
+
+    keys_only = importlib.import_module("app.migrations.versions.034_saved_recipes_list_index_keys_only")
+    included = ("SELECT indnatts - indnkeyatts FROM pg_index "
+                "WHERE indexrelid = to_regclass('idx_saved_recipes_user_created')")
+    assert rows(pg, included) == [(0,)]
+
+    # As 029 first built it
+    rows(pg, "DROP INDEX idx_saved_recipes_user_created")
+    rows(pg, "CREATE INDEX idx_saved_recipes_user_created ON saved_recipes(user_id, created_at DESC, id DESC) "
+             "INCLUDE (menu_id, recipe_name)")
+    keys_only.upgrade()
+
+    assert rows(pg, included) == [(0,)]
@@ -0,0 +1,104 @@
+"""Preference profiles: incremental updates match a rebuild and render the old shape."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.ai import rating_analytics as analytics_module
+from app.ai.preference_profile import apply_rating, empty_profile, profile_to_preferences
+
+NOW = datetime.now()
+
+
+def _rating(recipe_id, score, **fields):
+    row = {"recipe_id": recipe_id, "rating_score": score, "rating_time": NOW}
+    row.update(fields)
+    return row
+
+
+RATINGS = [
+    _rating(1, 5, cuisine="Italian", complexity="easy", total_time=20, made_recipe=True,
+            would_make_again=True, difficulty_rating=2, rating_aspects={"taste": 5, "ease_of_preparation": 4}),
+    _rating(2, 3, cuisine="Italian", complexity="hard", total_time=90, made_recipe=True,
+            would_make_again=False, rating_aspects='{"taste": 3, "presentation": 0}'),
+    _rating(3, 4, cuisine="Thai", total_time=45, time_accuracy=4,
+            rating_time=NOW - timedelta(days=60)),
+    _rating(None, 2, complexity="easy"),  # AI meal rated only in saved_recipes
+]
+
+
+def _build(rows):
+    stats = empty_profile()
+    for row in rows:
+        apply_rating(stats, row)
+    return stats
+
+
+def test_profile_renders_rating_aggregates():
+    prefs = profile_to_preferences(7, _build(RATINGS))
+
+    assert prefs["total_ratings"] == 4
+    assert prefs["average_rating"] == pytest.approx(3.5)
+    assert prefs["cuisine_preferences"]["top_cuisines"] == ["Italian", "Thai"]
+    assert prefs["cuisine_preferences"]["detailed_scores"]["Italian"] == {
+        "average_rating": 4.0, "count": 2, "preference_strength": 8.0
+    }
+    assert prefs["complexity_preferences"]["complexity_scores"] == {"easy": 3.5, "hard": 3.0}
+    assert prefs["complexity_preferences"]["complexity_tolerance"] == pytest.approx(0.5)
+    assert prefs["complexity_preferences"]["preferred_difficulty"] == 2
+    assert prefs["time_preferences"]["time_bucket_preferences"] == {"quick": 5.0, "medium": 4.0, "long": 3.0}
+    assert prefs["time_preferences"]["preferred_time_range"] == "quick"
+    assert prefs["aspect_preferences"]["most_important_aspects"] == ["taste", "ease_of_preparation"]
+    # stdev([5, 3]) = sqrt(2)
+    assert prefs["aspect_preferences"]["aspect_scores"]["taste"]["consistency"] == pytest.approx(1 - 2 ** 0.5 / 5)
+
+    behavior = prefs["behavioral_insights"]
+    assert behavior["cooking_engagement"] == 0.5
+    assert behavior["recipe_satisfaction"] == 0.5
+    assert behavior["rating_distribution"] == {5: 1, 3: 1, 4: 1, 2: 1}
+    assert behavior["recent_activity"] == 3
+    assert behavior["exploration_tendency"] == 0.75
+
+
+def test_changing_a_rating_matches_a_rebuild():
+    stats = _build(RATINGS)
+    changed = _rating(2, 5, cuisine="Italian", complexity="hard", total_time=90, made_recipe=False)
+
+    apply_rating(stats, RATINGS[1], -1)
+    apply_rating(stats, changed, 1)
+
+    expected = _build([RATINGS[0], changed, RATINGS[2], RATINGS[3]])
+    assert profile_to_preferences(7, stats, "t") == profile_to_preferences(7, expected, "t")
+
+
+def test_removing_every_rating_empties_the_profile():
+    stats = _build(RATINGS)
+    for row in RATINGS:
+        apply_rating(stats, row, -1)
+    assert stats == empty_profile()
+
+
+def test_extract_reads_the_stored_profile(monkeypatch):
+    queries = []
+
+    def fake_query(query, params=None, fetch_one=False, fetch_all=False):
+        queries.append(query)
+        return {"stats": _build(RATINGS), "updated_at": NOW}
+
+    analytics = analytics_module.RatingAnalytics()
+    monkeypatch.setattr(analytics, "execute_analytics_query", fake_query)
+    prefs = analytics.extract_user_preferences(7)
+
+    assert len(queries) == 1 and "user_preference_profiles" in queries[0]
+    assert prefs["total_ratings"] == 4
+    assert prefs["last_updated"] == NOW.isoformat()
+
+
+def test_deleting_a_saved_recipe_removes_its_quick_rating(fake_db):
+    cur = fake_db.cur
+    cur.respond = lambda sql, params: 2 if sql.startswith("DELETE") else [RATINGS[3]]
+    update = analytics_module.ProfileUpdate(cur, 7, _build(RATINGS))
+
+    assert update.delete_saved("sv.menu_id = %s", (12,)) == 2
+    assert [(sql.split()[0], params) for sql, params in cur.executed] == [("SELECT", (7, 12)), ("DELETE", (7, 12))]
+    assert update.stats == _build(RATINGS[:3])
@@ -0,0 +1,65 @@
+"""Preference profiles: read-through cache validated by row version, and ETags."""
+
+from starlette.requests import Request
+
+from app.utils import preference_profiles
+from app.utils.http_cache import etag_matches
+from app.utils.preference_profiles import PreferenceProfileCache, get_preference_profile
+
+
+def _install(fake_db, monkeypatch, table):
+    def respond(sql, params):
+        row = table.get(params[0])
+        if row is None:
+            return []
+        if sql == preference_profiles.VERSION_SQL:
+            return [{"version": row["version"]}]
+        return [dict(row)]
+
+    fake_db.cur.respond = respond
+    monkeypatch.setattr(preference_profiles, "preference_profiles", PreferenceProfileCache())
+    return fake_db.cur
+
+
+def _queries(cur):
+    return ["version" if sql == preference_profiles.VERSION_SQL else "profile" for sql, _ in cur.executed]
+
+
+def test_profile_is_reloaded_only_when_the_row_changes(fake_db, monkeypatch):
+    table = {7: {"version": "100", "diet_type": "vegan", "meal_times": {"lunch": True}}}
+    cur = _install(fake_db, monkeypatch, table)
+
+    first = get_preference_profile(7)
+    assert get_preference_profile(7) is first
+    assert _queries(cur) == ["profile", "version"]
+
+    table[7] = {"version": "101", "diet_type": "keto", "meal_times": {"lunch": True}}
+    changed = get_preference_profile(7)
+    assert changed.to_dict()["diet_type"] == "keto"
+    assert changed.etag != first.etag
+    assert _queries(cur) == ["profile", "version", "version", "profile"]
+
+    assert get_preference_profile(8) is None
+
+
+def test_to_dict_hands_out_independent_copies(fake_db, monkeypatch):
+    _install(fake_db, monkeypatch, {7: {"version": "1", "meal_times": {"lunch": True}}})
+    profile = get_preference_profile(7)
+
+    prefs = profile.to_dict(("meal_times",))
+    prefs["meal_times"]["dinner"] = True
+
+    assert prefs.keys() == {"meal_times"}
+    assert profile.to_dict()["meal_times"] == {"lunch": True}
+
+
+def test_etag_matches_if_none_match():
+    def request(value):
+        headers = [(b"if-none-match", value.encode())] if value is not None else []
+        return Request({"type": "http", "headers": headers})
+
+    assert etag_matches(request('"abc"'), '"abc"')
+    assert etag_matches(request('W/"abc", "def"'), '"abc"')
+    assert etag_matches(request("*"), '"abc"')
+    assert not etag_matches(request('"def"'), '"abc"')
+    assert not etag_matches(request(None), '"abc"')
@@ -0,0 +1,81 @@
+"""Rating rollups: incremental refreshes only recompute changed days."""
+
+from datetime import date, datetime
+
+from app.ai import rating_rollups
+from app.utils.periodic import PeriodicTask
+
+NOW = datetime(2026, 10, 18, 12, 0)
+WATERMARK = datetime(2026, 10, 18, 11, 45)
+
+
+def _install(fake_db, watermark, changed_days):
+    def respond(sql, params):
+        if "pg_try_advisory_xact_lock" in sql:
+            return [(True,)]
+        if "CURRENT_TIMESTAMP" in sql and "SELECT" in sql and "INSERT" not in sql:
+            return [(NOW,)]
+        if "FROM rating_rollup_state" in sql:
+            return [(watermark,)] if watermark else []
+        if "SELECT DISTINCT" in sql:
+            return [(day,) for day in changed_days]
+        return []
+
+    fake_db.cur.respond = respond
+    return fake_db.cur
+
+
+def _writes(cursor):
+    statements = [(" ".join(sql.split()), params) for sql, params in cursor.executed]
+    return [(sql, params) for sql, params in statements if sql.startswith(("DELETE", "INSERT"))]
+
+
+def test_incremental_refresh_recomputes_only_changed_days(fake_db):
+    days = [date(2026, 10, 18), date(2026, 9, 2)]
+    cursor = _install(fake_db, WATERMARK, days)
+
+    result = rating_rollups.refresh_rating_rollups()
+
+    assert result["mode"] == "incremental" and result["days_refreshed"] == 2
+    writes = _writes(cursor)
+    assert [sql.split(" WHERE")[0] for sql, _ in writes[:2]] == [
+        "DELETE FROM recipe_rating_daily", "DELETE FROM cuisine_rating_daily"
+    ]
+    assert writes[0][1] == (sorted(days),)
+    inserts = [params for sql, params in writes if "ANY(%(days)s)" in sql]
+    assert inserts == [{"first_day": date(2026, 9, 2), "last_day": date(2026, 10, 18), "days": sorted(days)}] * 2
+    assert writes[-1][1] == (rating_rollups.ROLLUP_STATE_NAME, NOW)
+    assert fake_db.conn.commits == 1
+
+
+def test_quiet_period_only_advances_the_watermark(fake_db):
+    cursor = _install(fake_db, WATERMARK, [])
+
+    rating_rollups.refresh_rating_rollups()
+
+    writes = _writes(cursor)
+    assert len(writes) == 1 and "rating_rollup_state" in writes[0][0]
+
+
+def test_first_refresh_rebuilds_everything(fake_db):
+    cursor = _install(fake_db, None, [])
+
+    result = rating_rollups.refresh_rating_rollups()
+
+    assert result["mode"] == "full"
+    writes = [sql for sql, _ in _writes(cursor)]
+    assert writes[:2] == ["DELETE FROM recipe_rating_daily", "DELETE FROM cuisine_rating_daily"]
+    assert not any("ANY(" in sql for sql in writes)
+
+
+def test_periodic_task_records_failures():
+    def boom():
+        raise RuntimeError("database unavailable")
+
+    task = PeriodicTask("test", boom, interval_s=0)
+    task.start()
+    assert not task.running
+
+    assert task.run_once() is None
+    assert task.stats()["runs"] == 1
+    assert task.stats()["last_error"] == "database unavailable"
@@ -0,0 +1,80 @@
+"""recipe_agent hedging: a slow primary gets a duplicate request, and the loser is cancelled."""
+
+import asyncio
+
+import pytest
+
+from app.ai.agents import recipe_agent
+from app.ai.agents.recipe_agent import HedgeBudget, LatencyTracker
+
+
+@pytest.fixture
+def fast_hedge(monkeypatch):
+    monkeypatch.setattr(recipe_agent, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(recipe_agent, "HEDGE_MODEL", "hedge-model")
+    monkeypatch.setattr(recipe_agent, "HEDGE_DEFAULT_DELAY_S", 0.05)
+    monkeypatch.setattr(recipe_agent, "_latency_tracker", LatencyTracker())
+
+
+def fake_requests(monkeypatch, latencies):
+    """Patch _request_day so each model answers after latencies[model] seconds."""
+    calls = []
+
+    async def fake_request_day(model, system_prompt, user_prompt, day_index):
+        loop = asyncio.get_running_loop()
+        call = {"model": model, "started": loop.time(), "cancelled": False}
+        calls.append(call)
+        try:
+            await asyncio.sleep(latencies[model])
+        except asyncio.CancelledError:
+            call["cancelled"] = True
+            raise
+        return {"day_number": day_index + 1, "meals": [], "model": model}, 100
+
+    monkeypatch.setattr(recipe_agent, "_request_day", fake_request_day)
+    return calls
+
+
+def test_hedge_fires_after_delay_and_loser_is_cancelled(fast_hedge, monkeypatch):
+    calls = fake_requests(monkeypatch, {"gpt-4o": 5, "hedge-model": 0.01})
+    budget = HedgeBudget(max_extra_tokens=recipe_agent.REQUEST_MAX_TOKENS)
+
+    async def scenario():
+        started = asyncio.get_running_loop().time()
+        result = await recipe_agent._hedged_request("gpt-4o", "system", "user", 0, budget)
+        await asyncio.sleep(0)  # let the cancellation reach the primary
+        return started, result
+
+    started, (result, tokens, winner) = asyncio.run(scenario())
+
+    assert winner == "hedge-model" and result["model"] == "hedge-model" and tokens == 100
+    primary, hedge = calls
+    assert hedge["started"] - started >= 0.05
+    assert primary["cancelled"] and not hedge["cancelled"]
+    assert (budget.hedges_launched, budget.hedges_won, budget.remaining) == (1, 1, 0)
+
+
+def test_fast_primary_and_exhausted_budget_skip_the_hedge(fast_hedge, monkeypatch):
+    calls = fake_requests(monkeypatch, {"gpt-4o": 0.01, "hedge-model": 0.01})
+    budget = HedgeBudget(max_extra_tokens=recipe_agent.REQUEST_MAX_TOKENS)
+
+    _, _, winner = asyncio.run(recipe_agent._hedged_request("gpt-4o", "system", "user", 0, budget))
+    assert winner == "gpt-4o" and len(calls) == 1
+
+    calls = fake_requests(monkeypatch, {"gpt-4o": 0.1, "hedge-model": 0.01})
+    _, _, winner = asyncio.run(recipe_agent._hedged_request("gpt-4o", "system", "user", 0, HedgeBudget(0)))
+    assert winner == "gpt-4o" and len(calls) == 1
+
+
+def test_primary_error_is_raised_when_both_requests_fail(fast_hedge, monkeypatch):
+    async def failing_request_day(model, system_prompt, user_prompt, day_index):
+        # The hedge fails first
+        await asyncio.sleep(0.1 if model == "gpt-4o" else 0.01)
+        raise RuntimeError(f"{model} failed")
+
+    monkeypatch.setattr(recipe_agent, "_request_day", failing_request_day)
+    budget = HedgeBudget(max_extra_tokens=recipe_agent.REQUEST_MAX_TOKENS)
+
+    with pytest.raises(RuntimeError, match="gpt-4o failed"):
+        asyncio.run(recipe_agent._hedged_request("gpt-4o", "system", "user", 0, budget))
+    assert budget.hedges_launched == 1
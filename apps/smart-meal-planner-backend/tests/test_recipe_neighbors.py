@@ -0,0 +1,55 @@
+"""Item-item neighbours: adjusted cosine, support threshold, in-memory merge."""
+
+import math
+
+import pytest
+
+from app.ai.recipe_neighbors import compute_item_neighbors, merge_neighbor_lists
+
+RATINGS = [
+    # user, recipe, score
+    (1, 10, 5), (1, 20, 4), (1, 30, 1),
+    (2, 10, 4), (2, 20, 5),
+    (3, 10, 5), (3, 30, 2), (3, 40, 5),
+]
+
+
+def test_adjusted_cosine_similarity_and_support():
+    neighbors = compute_item_neighbors(RATINGS, k=10, min_support=1)
+
+    by_pair = {(r, n): (sim, support) for r, items in neighbors.items() for n, sim, support in items}
+    # Ratings centred on each user's mean (10/3, 4.5 and 4)
+    r10 = [5 - 10 / 3, 4 - 4.5, 5 - 4]
+    r20 = [4 - 10 / 3, 5 - 4.5]
+    expected = (r10[0] * r20[0] + r10[1] * r20[1]) / (
+        math.sqrt(sum(x * x for x in r10)) * math.sqrt(sum(x * x for x in r20))
+    )
+    assert by_pair[(10, 20)] == (pytest.approx(expected, abs=1e-6), 2)
+    assert by_pair[(20, 10)][0] == by_pair[(10, 20)][0]
+    # User 1 loved 10 and disliked 30: rated together, but not similar
+    assert (10, 30) not in by_pair
+    assert all(r != n for r, n in by_pair)
+
+
+def test_min_support_and_top_k():
+    neighbors = compute_item_neighbors(RATINGS, k=1, min_support=2)
+
+    # 10<->40 is positive but only one user rated both
+    assert set(neighbors) == {10, 20}
+    assert [n for n, _, _ in neighbors[10]] == [20]
+    assert [n for n, _, _ in neighbors[20]] == [10]
+
+
+def test_merge_prefers_recipes_close_to_several_loved_recipes():
+    rated = {10: 5.0, 20: 4.0, 30: 1.0}
+    rows = [
+        (10, 50, 0.9), (20, 50, 0.8),   # close to two loved recipes
+        (10, 60, 0.95),                 # close to one
+        (30, 70, 0.99),                 # only near a disliked recipe
+        (10, 20, 0.9),                  # already rated
+    ]
+    ranked = sorted(merge_neighbor_lists(rated, rows), key=lambda rec: rec["score"], reverse=True)
+
+    assert [rec["recipe_id"] for rec in ranked] == [50, 60]
+    assert ranked[0]["because_of"] == [10, 20]
+    assert ranked[0]["predicted_rating"] == pytest.approx((0.9 * 5 + 0.8 * 4) / 1.7, abs=0.01)
@@ -0,0 +1,199 @@
+"""Recipe search: query building, keyset cursors and facet assembly."""
+
+import pytest
+
+from app.utils.recipe_search import build_tsquery, decode_cursor, encode_cursor, search_filter, search_recipes
+
+
+def test_tsquery_prefix_matches_each_word():
+    assert build_tsquery("Chicken  curry!") == "chicken:* & curry:*"
+    assert build_tsquery("  &|! ") is None
+
+
+def test_search_filter_uses_the_index_and_escapes_like_wildcards():
+    sql, params = search_filter("sr.id", "scraped", "50%_off")
+
+    assert sql.startswith("sr.id IN (SELECT s.recipe_id FROM recipe_search_index s WHERE s.source = %s")
+    assert "s.title %% %s" in sql
+    assert params == ["scraped", "50:* & _off:*", "%50\\%\\_off%", "50%_off"]
+
+
+def test_cursor_round_trip_and_mode_check():
+    cursor = encode_cursor(["rank", "0.607927", "user", 12])
+
+    assert decode_cursor(cursor, "rank") == ("0.607927", "user", 12)
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "title")
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor", "rank")
+
+
+def _install(fake_db, page_rows, facet_rows):
+    """The page query answers page_rows, the facet query facet_rows"""
+    results = [page_rows, facet_rows]
+    fake_db.cur.respond = lambda sql, params: results[len(fake_db.cur.executed) - 1]
+    return fake_db.cur
+
+
+def _row(recipe_id, rank):
+    return {"source": "scraped", "id": recipe_id, "title": f"Recipe {recipe_id}", "cuisine": "Thai",
+            "complexity": "easy", "diet_tags": [], "tags": [], "image_url": None, "total_time": 20,
+            "is_verified": True, "is_public": True, "created_by_organization_id": None, "rank": rank}
+
+
+def test_first_page_returns_cursor_total_and_facets(fake_db):
+    facet_rows = [
+        {"facet": "total", "value": None, "count": 41},
+        {"facet": "cuisine", "value": "Thai", "count": 30},
+        {"facet": "cuisine", "value": "Indian", "count": 11},
+        {"facet": "diet_tags", "value": "vegan", "count": 4},
+    ]
+    cur = _install(fake_db, [_row(1, "0.9"), _row(2, "0.8"), _row(3, "0.7")], facet_rows)
+
+    page = search_recipes(query="curry", user_id=7, limit=2)
+
+    assert [r["id"] for r in page["recipes"]] == [1, 2]
+    assert page["recipes"][0]["rank"] == 0.9
+    assert decode_cursor(page["next_cursor"], "rank") == ("0.8", "scraped", 2)
+    assert page["total"] == 41
+    assert page["facets"]["cuisine"] == [{"value": "Thai", "count": 30}, {"value": "Indian", "count": 11}]
+    assert page["facets"]["complexity"] == []
+    # One over the limit is fetched to know whether there is a next page
+    page_sql, page_params = cur.executed[0]
+    assert page_params[-1] == 3
+    # Facets count the same filters, without the rank expression's or the page's parameters
+    assert cur.executed[1][1] == page_params[2:-1]
+
+
+def test_later_pages_skip_facets(fake_db):
+    cur = _install(fake_db, [_row(3, "0.7")], [])
+
+    page = search_recipes(query="curry", limit=2, cursor=encode_cursor(["rank", "0.8", "scraped", 2]))
+
+    assert len(cur.executed) == 1
+    assert cur.executed[0][1][-5:] == ["0.8", "0.8", "scraped", 2, 3]
+    assert page["next_cursor"] is None and page["total"] is None
+
+
+
+def test_search_endpoint_runs_the_query_off_the_event_loop(monkeypatch):
+    import asyncio
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.routers import recipe_search
+    from app.utils.auth_utils import get_user_from_token
+
+    calls = []
+
+    def fake_search_recipes(**kwargs):
+        try:
+            asyncio.get_running_loop()
+            on_loop = True
+        except RuntimeError:
+            on_loop = False
+        calls.append((on_loop, kwargs["query"], kwargs["limit"]))
+        return {"results": [], "next_cursor": None}
+
+    monkeypatch.setattr(recipe_search, "search_recipes", fake_search_recipes)
+    api = FastAPI()
+    api.include_router(recipe_search.router)
+    api.dependency_overrides[get_user_from_token] = lambda: {"user_id": 7}
+
+    response = TestClient(api).get("/api/recipe-search/", params={"q": "curry", "limit": 5})
+
+    assert response.json() == {"results": [], "next_cursor": None}
+    assert calls == [(False, "curry", 5)]
+
+# Postgres tier: the statement triggers from migration 032 and the search query over what they index
+
+def _sql(pg, sql, params=None):
+    with pg.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchall() if cur.description else None
+
+
+def _indexed(pg):
+    return _sql(pg, "SELECT source, recipe_id, title, ingredients FROM recipe_search_index ORDER BY source, recipe_id")
+
+
+def _add_recipe(pg, recipe_id=1, title="Green Curry", ingredients=("coconut milk", "basil", "chicken")):
+    _sql(pg, "INSERT INTO scraped_recipes (id, title, cuisine) VALUES (%s, %s, 'Thai')", (recipe_id, title))
+    _sql(pg, "INSERT INTO recipe_ingredients (recipe_id, name) SELECT %s, unnest(%s::text[])",
+         (recipe_id, list(ingredients)))
+
+
+def test_triggers_index_once_per_statement_and_search_finds_ingredients(pg, pg_schema):
+    conn = pg_schema.connect()
+    try:
+        with conn.cursor() as cur:
+            try:
+                cur.execute("SET LOCAL track_functions = 'pl'")
+            except Exception:
+                pytest.skip("track_functions needs a superuser")
+            cur.execute("INSERT INTO scraped_recipes (id, title, cuisine) VALUES (1, 'Green Curry', 'Thai')")
+            cur.execute("INSERT INTO recipe_ingredients (recipe_id, name) "
+                        "SELECT 1, 'ingredient ' || n FROM generate_series(1, 30) n")
+            cur.execute("SELECT calls FROM pg_stat_xact_user_functions WHERE funcname = 'recipe_search_index_refresh'")
+            # One call for the recipe insert, one for all 30 ingredients
+            assert cur.fetchone() == (2,)
+        conn.commit()
+    finally:
+        conn.close()
+
+    page = search_recipes(query="ingredient 17")
+    assert [(r["source"], r["id"]) for r in page["recipes"]] == [("scraped", 1)]
+    assert page["total"] == 1 and page["facets"]["cuisine"] == [{"value": "Thai", "count": 1}]
+
+
+def test_triggers_follow_updates_and_deletes(pg):
+    _add_recipe(pg, 1)
+    _add_recipe(pg, 2, "Dal", ("lentils",))
+
+    # Columns outside the index leave it alone
+    _sql(pg, "UPDATE recipe_search_index SET ingredients = 'stale' WHERE recipe_id = 1")
+    _sql(pg, "UPDATE scraped_recipes SET servings = 4, instructions = 'Simmer'")
+    assert _indexed(pg)[0][3] == "stale"
+
+    _sql(pg, "UPDATE scraped_recipes SET title = 'Red Curry' WHERE id = 1")
+    _sql(pg, "UPDATE recipe_ingredients SET name = 'red lentils' WHERE name = 'lentils'")
+    _sql(pg, "DELETE FROM recipe_ingredients WHERE name = 'basil'")
+    assert _indexed(pg) == [("scraped", 1, "Red Curry", "coconut milk chicken"),
+                            ("scraped", 2, "Dal", "red lentils")]
+    assert [r["id"] for r in search_recipes(query="lentils")["recipes"]] == [2]
+
+    _sql(pg, "DELETE FROM scraped_recipes WHERE id = 2")
+    assert [row[1] for row in _indexed(pg)] == [1]
+
+
+def test_deactivated_user_recipe_leaves_the_index(pg):
+    _sql(pg, "INSERT INTO user_profiles (id, email) VALUES (7, 'user7@example.com')")
+    _sql(pg, "INSERT INTO user_recipes (id, title, created_by_user_id) VALUES (5, 'Family Chili', 7)")
+    _sql(pg, "INSERT INTO user_recipe_ingredients (recipe_id, name) VALUES (5, 'beans'), (5, 'beef')")
+    assert [r["id"] for r in search_recipes(query="beans", user_id=7)["recipes"]] == [5]
+    assert search_recipes(query="beans", user_id=8)["recipes"] == []
+
+    _sql(pg, "UPDATE user_recipes SET is_active = FALSE WHERE id = 5")
+    assert _indexed(pg) == []
+
+
+def test_failed_refresh_keeps_the_write_and_is_repaired(pg):
+    from app.utils.recipe_search import refresh_pending_recipe_search
+
+    _sql(pg, "ALTER TABLE recipe_search_index ADD CONSTRAINT no_broken CHECK (title <> 'Broken')")
+    try:
+        _add_recipe(pg, 1, "Broken")
+        assert _sql(pg, "SELECT title FROM scraped_recipes") == [("Broken",)]
+        assert _sql(pg, "SELECT source, recipe_id FROM recipe_search_pending") == [("scraped", 1)]
+
+        # Still failing: the recipe stays queued
+        with pytest.raises(Exception):
+            refresh_pending_recipe_search()
+        assert _sql(pg, "SELECT COUNT(*) FROM recipe_search_pending") == [(1,)]
+    finally:
+        _sql(pg, "ALTER TABLE recipe_search_index DROP CONSTRAINT no_broken")
+
+    assert refresh_pending_recipe_search() == {"scraped": 1, "user": 0}
+    assert _indexed(pg) == [("scraped", 1, "Broken", "coconut milk basil chicken")]
+    assert _sql(pg, "SELECT COUNT(*) FROM recipe_search_pending") == [(0,)]
@@ -0,0 +1,78 @@
+"""Regression tests for app.ai.response_parser against captured bad agent responses."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from app.ai.agents.skeleton_agent import _check_skeleton
+from app.ai.response_parser import IncrementalJSONParser, parse_json_response, repair_json
+
+FIXTURES = Path(__file__).parent / "fixtures" / "agent_responses"
+
+
+def _load(name):
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def test_fenced_response_with_prose():
+    result = parse_json_response(_load("fenced_with_prose.txt"))
+    assert result["day_number"] == 2
+    assert result["meals"][0]["title"] == "Greek Yogurt Parfait"
+
+
+def test_trailing_commas_removed():
+    result = parse_json_response(_load("trailing_commas.txt"))
+    assert [m["meal_time"] for m in result["meals"]] == ["breakfast", "lunch"]
+    assert len(result["meals"][0]["ingredients"]) == 2
+
+
+def test_truncated_mid_meal_keeps_completed_meals():
+    parser = IncrementalJSONParser()
+    parser.feed(_load("truncated_mid_meal.txt"))
+    assert not parser.complete
+    meals = parser.completed_items("meals")
+    assert [m["meal_time"] for m in meals] == ["breakfast"]
+    assert meals[0]["title"] == 'Overnight Oats with "Chia"'
+    # The repaired document is still valid JSON
+    assert json.loads(repair_json(_load("truncated_mid_meal.txt")))["day_number"] == 3
+
+
+def test_truncated_mid_key_rolls_back():
+    result = parse_json_response(_load("truncated_mid_key.txt"))
+    assert result["days"][0]["meals"][0]["cuisine"] == "Thai"
+    assert "not" not in result
+
+
+def test_skeleton_truncation_is_an_error_not_a_shorter_plan():
+    with pytest.raises(ValueError):
+        parse_json_response(_load("truncated_mid_key.txt"), repair=False)
+
+    one_day = {"days": [{"day_number": 1, "meals": [{"meal_time": "dinner"}]}]}
+    _check_skeleton(one_day, 1, ["dinner"], 0)
+    with pytest.raises(ValueError, match="1 days, expected 7"):
+        _check_skeleton(one_day, 7, ["dinner"], 0)
+    with pytest.raises(ValueError, match="missing meals: lunch, snack_1"):
+        _check_skeleton(one_day, 1, ["lunch", "dinner"], 1)
+
+
+def test_truncated_after_comma():
+    result = parse_json_response(_load("truncated_after_comma.txt"))
+    assert result["ingredients"] == [{"name": "salmon fillet", "quantity": "6", "unit": "oz"}]
+
+
+@pytest.mark.parametrize("name", sorted(p.name for p in FIXTURES.glob("*.txt")))
+def test_streamed_chunks_match_single_feed(name):
+    raw = _load(name)
+    whole = IncrementalJSONParser()
+    whole.feed(raw)
+    streamed = IncrementalJSONParser()
+    for i in range(0, len(raw), 7):
+        streamed.feed(raw[i:i + 7])
+    assert streamed.repaired() == whole.repaired()
+    assert streamed.completed_items("meals") == whole.completed_items("meals")
+
+
+def test_unrecoverable_response_raises_value_error():
+    with pytest.raises(ValueError):
+        parse_json_response("I'm sorry, I can't help with that.")
@@ -0,0 +1,158 @@
+"""S3 image pipeline tests against moto's in-process S3 stand-in."""
+
+import asyncio
+import io
+import json
+import os
+from contextlib import contextmanager
+
+import pytest
+
+moto = pytest.importorskip("moto")
+PIL_Image = pytest.importorskip("PIL.Image")
+
+from boto3.s3.transfer import TransferConfig
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+import app.db as db
+from app.utils.s3 import s3_utils
+
+BUCKET = "test-meal-planner-images"
+
+
+class VariantTable:
+    """Stands in for the image_variants table."""
+
+    def __init__(self):
+        self.rows = {}
+        self._result = []
+
+    def execute(self, sql, params=None):
+        if sql.lstrip().startswith("INSERT"):
+            self.rows[params[0]] = params[1]
+        elif sql.lstrip().startswith("DELETE"):
+            self.rows.pop(params[0], None)
+        else:
+            self._result = [(key, json.loads(self.rows[key])) for key in params[0] if key in self.rows]
+
+    def fetchall(self):
+        return self._result
+
+
+@pytest.fixture
+def variant_table(monkeypatch):
+    table = VariantTable()
+
+    @contextmanager
+    def fake_cursor(*args, **kwargs):
+        yield table, None
+
+    monkeypatch.setattr(db, "get_db_cursor", fake_cursor)
+    monkeypatch.setattr(db, "session_cursor", fake_cursor)
+    return table
+
+
+@pytest.fixture
+def s3_helper(monkeypatch, variant_table):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("S3_BUCKET_NAME", BUCKET)
+    monkeypatch.setenv("AWS_REGION", "us-east-2")
+    with moto.mock_aws():
+        import boto3
+        boto3.client("s3", region_name="us-east-2").create_bucket(
+            Bucket=BUCKET,
+            CreateBucketConfiguration={"LocationConstraint": "us-east-2"},
+        )
+        yield s3_utils.S3Helper()
+
+
+def _upload_file(data, filename, content_type):
+    return UploadFile(
+        file=io.BytesIO(data),
+        filename=filename,
+        headers=Headers({"content-type": content_type}),
+    )
+
+
+def _jpeg(width, height):
+    buffer = io.BytesIO()
+    PIL_Image.new("RGB", (width, height), (200, 80, 40)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def _object(helper, url):
+    key = s3_utils.key_from_url(url, helper.bucket_name, helper.region)
+    return helper.s3_client.get_object(Bucket=helper.bucket_name, Key=key)
+
+
+def test_upload_creates_webp_variants(s3_helper):
+    upload = _upload_file(_jpeg(1600, 1200), "pasta.jpg", "image/jpeg")
+    result = asyncio.run(s3_helper.upload_image_with_variants(upload))
+
+    assert result["url"].endswith(".jpg")
+    assert set(result["variants"]) == {name for name, _ in s3_utils.VARIANT_SIZES}
+    assert result["variants"] == s3_utils.image_variant_urls(result["url"])
+
+    for name, width in s3_utils.VARIANT_SIZES:
+        obj = _object(s3_helper, result["variants"][name])
+        assert obj["ContentType"] == "image/webp"
+        with PIL_Image.open(io.BytesIO(obj["Body"].read())) as variant:
+            assert variant.format == "WEBP"
+            assert variant.width == width
+            assert variant.height == round(1200 * width / 1600)
+
+
+def test_small_images_are_not_upscaled(s3_helper):
+    upload = _upload_file(_jpeg(200, 100), "tiny.jpg", "image/jpeg")
+    result = asyncio.run(s3_helper.upload_image_with_variants(upload))
+
+    thumb = _object(s3_helper, result["variants"]["thumb"])
+    with PIL_Image.open(io.BytesIO(thumb["Body"].read())) as variant:
+        assert variant.size == (200, 100)
+
+
+def test_large_upload_uses_multipart_and_skips_variants_for_non_images(s3_helper):
+    s3_helper._transfer_config = TransferConfig(
+        multipart_threshold=1024 * 1024,
+        multipart_chunksize=5 * 1024 * 1024,
+    )
+    data = os.urandom(6 * 1024 * 1024)
+    upload = _upload_file(data, "scan.bin", "application/octet-stream")
+    result = asyncio.run(s3_helper.upload_image_with_variants(upload))
+
+    obj = _object(s3_helper, result["url"])
+    # Multipart objects get an ETag of the form "<md5>-<part count>"
+    assert obj["ETag"].strip('"').endswith("-2")
+    assert obj["Body"].read() == data
+    assert result["variants"] == {}
+    assert s3_utils.image_variant_urls(result["url"]) == {}
+
+
+def test_only_recorded_variants_are_advertised(s3_helper, variant_table):
+    svg = _upload_file(b'<svg xmlns="http://www.w3.org/2000/svg"/>', "logo.svg", "image/svg+xml")
+    svg_url = asyncio.run(s3_helper.upload_image_with_variants(svg))["url"]
+    jpeg_url = asyncio.run(s3_helper.upload_image_with_variants(_upload_file(_jpeg(400, 300), "a.jpg", "image/jpeg")))["url"]
+    # Uploaded before variants were recorded, never backfilled
+    legacy_url = s3_helper.object_url("recipe-images/legacy.jpg")
+
+    variants = s3_utils.stored_variant_urls([svg_url, jpeg_url, legacy_url])
+    assert list(variants) == [jpeg_url]
+    assert set(variants[jpeg_url]) == {name for name, _ in s3_utils.VARIANT_SIZES}
+
+
+def test_delete_removes_variants(s3_helper):
+    upload = _upload_file(_jpeg(900, 600), "salad.jpg", "image/jpeg")
+    result = asyncio.run(s3_helper.upload_image_with_variants(upload))
+
+    assert s3_helper.delete_image(result["url"])
+    listing = s3_helper.s3_client.list_objects_v2(Bucket=BUCKET)
+    assert listing.get("KeyCount", 0) == 0
+    assert s3_utils.image_variant_urls(result["url"]) == {}
+
+
+def test_external_urls_have_no_variants(monkeypatch):
+    monkeypatch.setenv("S3_BUCKET_NAME", BUCKET)
+    assert s3_utils.image_variant_urls("https://www.example.com/images/pasta.jpg") == {}
+    assert s3_utils.image_variant_urls(None) == {}
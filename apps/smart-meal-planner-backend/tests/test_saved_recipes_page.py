@@ -0,0 +1,87 @@
+"""Saved-recipe listing: projection, keyset pages and the include flag."""
+
+from datetime import datetime
+
+import pytest
+
+import app.db as db
+from app.routers.saved_recipes import include_details, saved_recipes_page
+
+
+def _rows(count):
+    return [{"id": 100 - i, "created_at": datetime(2026, 10, 1, 12, 0, 59 - i), "recipe_name": f"Recipe {i}"}
+            for i in range(count)]
+
+
+@pytest.fixture
+def cursor(fake_db):
+    fake_db.cur.rows = _rows(3)
+    return fake_db.cur
+
+
+def test_first_page_is_projected_and_returns_a_cursor(cursor):
+    page = db.get_saved_recipes_page(7, limit=2)
+
+    sql, params = cursor.executed[0]
+    assert "sr.recipe_name" in sql and "sr.quick_rating" in sql and "m.nickname AS menu_nickname" in sql
+    assert "sr.ingredients" not in sql and "sr.macros" not in sql and "*" not in sql
+    assert "ORDER BY sr.created_at DESC, sr.id DESC" in sql
+    assert params == [7, 3]
+    assert [r["id"] for r in page["saved_recipes"]] == [100, 99]
+    assert db.decode_saved_recipes_cursor(page["next_cursor"]) == (datetime(2026, 10, 1, 12, 0, 58), 99)
+
+
+def test_next_page_continues_after_the_cursor(cursor):
+    cursor.rows = _rows(1)
+    after = db.encode_saved_recipes_cursor(datetime(2026, 10, 1, 12, 0, 58), 99)
+
+    page = db.get_saved_recipes_page(7, limit=2, cursor=after, include_details=True)
+
+    sql, params = cursor.executed[0]
+    assert "(sr.created_at, sr.id) < (%s, %s)" in sql
+    assert "sr.ingredients" in sql and "sr.macros" in sql
+    assert params == [7, datetime(2026, 10, 1, 12, 0, 58), 99, 3]
+    assert page["next_cursor"] is None
+
+
+def test_undated_rows_page_by_id(cursor):
+    cursor.rows = [{"id": 5, "created_at": None}, {"id": 4, "created_at": None}, {"id": 3, "created_at": None}]
+
+    page = db.get_saved_recipes_page(7, limit=2)
+    assert db.decode_saved_recipes_cursor(page["next_cursor"]) == (None, 4)
+
+    db.get_saved_recipes_page(7, limit=2, cursor=page["next_cursor"])
+    sql, params = cursor.executed[1]
+    assert "(sr.created_at IS NOT NULL OR sr.id < %s)" in sql
+    assert params == [7, 4, 3]
+
+
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        db.get_saved_recipes_page(7, cursor="bm90LWEtY3Vyc29y")
+    assert cursor.executed == []
+
+
+def test_include_details_flag():
+    assert include_details("details")
+    assert include_details("summary, Details")
+    assert not include_details(None)
+    assert not include_details("detail")
+
+
+def test_requests_without_limit_get_every_full_row(cursor):
+    # Older mobile builds call GET /saved-recipes/ with no paging parameters
+    page = saved_recipes_page(7, None, None, None)
+
+    sql, params = cursor.executed[0]
+    assert "sr.*" in sql and "LIMIT" not in sql
+    assert params == (7,)
+    assert len(page["saved_recipes"]) == 3 and page["next_cursor"] is None
+
+
+def test_cursor_without_limit_uses_the_default_page_size(cursor):
+    after = db.encode_saved_recipes_cursor(datetime(2026, 10, 1, 12, 0, 58), 99)
+
+    saved_recipes_page(7, None, after, None)
+
+    assert cursor.executed[0][1][-1] == db.SAVED_RECIPES_PAGE_SIZE + 1
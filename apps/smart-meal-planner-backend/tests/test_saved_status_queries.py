@@ -0,0 +1,137 @@
+"""Saved-status annotation must cost the same number of queries for any menu size."""
+
+import asyncio
+
+import pytest
+
+import app.db as db
+from app.routers import client_resources, menu, saved_recipes
+
+USER_ID = 7
+MENU_ID = 42
+
+
+def _meal_plan(days):
+    return {
+        "days": [
+            {
+                "dayNumber": day,
+                "meals": [
+                    {"id": f"{day}-{meal_time}", "meal_time": meal_time, "title": f"Meal {day} {meal_time}"}
+                    for meal_time in ("breakfast", "lunch", "dinner")
+                ],
+            }
+            for day in range(1, days + 1)
+        ]
+    }
+
+
+SAVED_ROWS = [
+    {"id": 100, "menu_id": MENU_ID, "recipe_id": None, "meal_time": None},
+    {"id": 101, "menu_id": MENU_ID, "recipe_id": "1-lunch", "meal_time": "lunch"},
+]
+
+
+def _respond(meal_plan):
+    """Answers for the handful of statements these endpoints issue"""
+    def respond(sql, params):
+        if "FROM saved_recipes" in sql:
+            return [dict(row) for row in SAVED_ROWS]
+        if "FROM menus" in sql:
+            return [{
+                "menu_id": MENU_ID, "id": MENU_ID, "user_id": USER_ID, "meal_plan_json": meal_plan,
+                "created_at": None, "nickname": "Week", "title": "Week", "description": None, "updated_at": None,
+            }]
+        if "information_schema.tables" in sql:
+            return [{"exists": True}]
+        if "FROM shared_menus" in sql:
+            return [{"share_id": 1, "menu_id": MENU_ID, "client_id": USER_ID}]
+        if "INSERT INTO recipe_interactions" in sql:
+            return [(1,)]
+        return []
+    return respond
+
+
+@pytest.fixture
+def menu_db(fake_db, monkeypatch):
+    fake_db.install(monkeypatch, menu, client_resources)
+
+    def install(days):
+        fake_db.cur.respond = _respond(_meal_plan(days))
+        fake_db.cur.executed.clear()
+        fake_db.checkouts = 0
+        return fake_db
+    return install
+
+
+def _meals(meal_plan):
+    return [meal for day in meal_plan["days"] for meal in day["meals"]]
+
+
+def test_menu_details_query_count_is_constant(menu_db):
+    counts = []
+    for days in (1, 7):
+        database = menu_db(days)
+        result = menu.get_menu_details(MENU_ID, current_user={"user_id": USER_ID})
+        counts.append((len(database.cur.executed), database.checkouts))
+
+        assert result["is_saved"] is True
+        saved = [meal["id"] for meal in _meals(result["meal_plan"]) if meal["is_saved"]]
+        assert saved == ["1-lunch"]
+
+    assert counts[0] == counts[1]
+    # Menu row + saved map on the request's cursor, plus the view interaction
+    assert counts[1][1] == 2
+
+
+def test_client_menu_query_count_is_constant(menu_db):
+    counts = []
+    for days in (1, 7):
+        database = menu_db(days)
+        result = asyncio.run(client_resources.get_client_menu(
+            menu_id=MENU_ID, user={"user_id": USER_ID, "account_type": "client"}
+        ))
+        counts.append((len(database.cur.executed), database.checkouts))
+
+        assert result["is_saved"] is True
+        assert sum(meal["is_saved"] for meal in _meals(result["meal_plan"])) == 1
+
+    assert counts[0] == counts[1]
+    assert counts[1][1] == 1
+
+
+def test_check_endpoint_uses_one_query(menu_db):
+    database = menu_db(1)
+    result = asyncio.run(saved_recipes.check_recipe_saved(
+        menu_id=str(MENU_ID), recipe_id="1-lunch", meal_time="lunch", scraped_recipe_id=None,
+        user={"user_id": USER_ID},
+    ))
+
+    assert result == {"is_saved": True, "saved_id": 101, "recipe_source": "menu"}
+    assert len(database.cur.executed) == 1
+
+
+def test_saved_map_keys_normalize_ids():
+    saved = {db._saved_key(MENU_ID, 5, "dinner"): 9}
+    assert db.saved_id_for(saved, str(MENU_ID), "5", "dinner") == 9
+    # Without a meal_time the lookup is for the whole menu, as is_recipe_saved did
+    assert db.saved_id_for(saved, MENU_ID, "5") is None
+
+
+def test_blank_recipe_id_never_stands_for_the_whole_menu(menu_db):
+    database = menu_db(1)
+    rows = SAVED_ROWS[1:] + [{"id": 102, "menu_id": MENU_ID, "recipe_id": "", "meal_time": "dinner"}]
+    database.cur.respond = lambda sql, params: [dict(row) for row in rows]
+
+    saved = db.get_saved_status_map(USER_ID, MENU_ID)
+
+    assert db.saved_id_for(saved, MENU_ID) is None
+    assert db.saved_id_for(saved, MENU_ID, "", "dinner") is None
+    assert db.save_recipe(USER_ID, menu_id=MENU_ID, recipe_id="", meal_time="dinner") is None
+    with pytest.raises(saved_recipes.HTTPException) as error:
+        asyncio.run(saved_recipes.check_recipe_saved(
+            menu_id=str(MENU_ID), recipe_id="", meal_time="dinner", scraped_recipe_id=None,
+            user={"user_id": USER_ID},
+        ))
+    assert error.value.status_code == 400
+    assert len(database.cur.executed) == 1
@@ -0,0 +1,55 @@
+"""Stripe event worker: per-subscription ordering, retries and giving up."""
+
+from app.utils import stripe_events
+from app.utils.stripe_events import STRIPE_EVENT_MAX_ATTEMPTS, _process_batch, ordering_key
+
+
+def _row(row_id, key, attempts=0):
+    return {"id": row_id, "event_type": "invoice.paid", "event_data": "{}",
+            "provider_event_id": f"evt_{row_id}", "ordering_key": key, "attempts": attempts}
+
+
+def _updated(cur, sql_name):
+    sql = getattr(stripe_events, sql_name)
+    return [params for statement, params in cur.executed if statement == sql]
+
+
+def test_ordering_key_prefers_the_subscription():
+    assert ordering_key({"object": "subscription", "id": "sub_1", "customer": "cus_1"}) == "sub_1"
+    assert ordering_key({"object": "invoice", "id": "in_1", "subscription": "sub_1", "customer": "cus_1"}) == "sub_1"
+    assert ordering_key({"object": "customer", "id": "cus_1"}) == "cus_1"
+
+
+def test_failed_event_holds_back_later_events_for_its_subscription(fake_db, monkeypatch):
+    applied = []
+
+    def fake_apply(row):
+        if row["id"] == 1:
+            raise RuntimeError("stripe timeout")
+        applied.append(row["id"])
+        return 42
+
+    monkeypatch.setattr(stripe_events, "apply_event", fake_apply)
+    cur = fake_db.cur
+    cur.rows = [_row(1, "sub_a"), _row(2, "sub_b"), _row(3, "sub_a"), _row(4, "sub_c")]
+
+    counts = _process_batch(cur, 100)
+
+    assert applied == [2, 4]
+    assert counts == {"fetched": 4, "processed": 2, "retrying": 1, "failed": 0, "deferred": 1}
+    assert _updated(cur, "MARK_PROCESSED_SQL") == [(42, 2), (42, 4)]
+    attempts, error, delay, row_id = _updated(cur, "RETRY_SQL")[0]
+    assert (attempts, error, row_id) == (1, "stripe timeout", 1)
+    assert delay == stripe_events.STRIPE_EVENT_RETRY_BASE_S
+
+
+def test_event_is_given_up_after_max_attempts(fake_db, monkeypatch):
+    def fake_apply(row):
+        raise RuntimeError("bad payload")
+
+    monkeypatch.setattr(stripe_events, "apply_event", fake_apply)
+    cur = fake_db.cur
+    cur.rows = [_row(1, "sub_a", attempts=STRIPE_EVENT_MAX_ATTEMPTS - 1)]
+
+    assert _process_batch(cur, 100)["failed"] == 1
+    assert _updated(cur, "GIVE_UP_SQL") == [(STRIPE_EVENT_MAX_ATTEMPTS, "bad payload", 1)]
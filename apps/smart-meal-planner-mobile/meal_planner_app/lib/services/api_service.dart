@@ -1052,7 +1052,8 @@ class ApiService {
   // Get user's generated menus from database (not saved/favorite recipes)
   static Future<Map<String, dynamic>> getSavedMenus(int userId, String authToken) async {
     try {
-      final result = await _get("/menu/history/$userId", authToken);
+      // Full plans are opt-in; history otherwise returns card summaries only
+      final result = await _get("/menu/history/$userId?include=plan", authToken);
       print("Menu history response: $result");
       
       // If response is a List, wrap it in a Map with 'menus' key
@@ -3612,7 +3613,8 @@ class ApiService {
       }
       
       // Primary endpoint in line with web app and backend implementation
-      final primaryEndpoint = "/organizations/clients/$clientId/menus";
+      // include=plan: list endpoints return card summaries unless full plans are requested
+      final primaryEndpoint = "/organizations/clients/$clientId/menus?include=plan";
       
       // Try using the primary endpoint first (which matches web app and updated backend)
       print("Trying primary endpoint: $primaryEndpoint");
@@ -3627,7 +3629,7 @@ class ApiService {
       // Try client dashboard endpoint which includes shared menus in its response
       print("Trying client dashboard endpoint");
       attemptedEndpoints.add("GET /client/dashboard");
-      final dashboardResult = await _get("/client/dashboard", authToken);
+      final dashboardResult = await _get("/client/dashboard?include=plan", authToken);
       
       if (dashboardResult != null && dashboardResult is Map) {
         final safeDashboardResult = _toStringDynamicMap(dashboardResult);
@@ -3643,7 +3645,7 @@ class ApiService {
       
       // Try alternate endpoints if primary failed
       final alternateEndpoints = [
-        "/clients/$clientId/menus",
+        "/clients/$clientId/menus?include=plan",
         "/menu/client/$clientId",
         "/menu/for-client/$clientId",
         "/client/menus/list/$clientId"
@@ -3667,8 +3669,8 @@ class ApiService {
       
       // Try POST requests to some endpoints as fallback
       final postEndpoints = [
-        "/organizations/clients/$clientId/menus",
-        "/clients/$clientId/menus"
+        "/organizations/clients/$clientId/menus?include=plan",
+        "/clients/$clientId/menus?include=plan"
       ];
       
       for (String endpoint in postEndpoints) {
@@ -3699,7 +3701,7 @@ class ApiService {
       try {
         print("Trying menu history endpoint for client");
         attemptedEndpoints.add("GET /menu/history/$clientId");
-        final result = await _get("/menu/history/$clientId", authToken);
+        final result = await _get("/menu/history/$clientId?include=plan", authToken);
         
         if (result != null) {
           print("✅ Success from menu history endpoint");
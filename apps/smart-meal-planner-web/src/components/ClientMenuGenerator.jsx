@@ -139,7 +139,7 @@ function ClientMenuGenerator({ client, onMenuGenerated }) {
         // Try to fetch the latest menu for this client - the menu might have been saved successfully
         try {
           console.log("Attempting to fetch latest menu despite error...");
-          const latestMenus = await apiService.getClientMenus(client.id);
+          const latestMenus = await apiService.getClientMenus(client.id, { includePlan: true });
           if (latestMenus && latestMenus.length > 0) {
             // Get the most recent menu
             const latestMenu = latestMenus[0];
@@ -14,10 +14,19 @@ import {
 import apiService from '../services/apiService';
 import { useNavigate } from 'react-router-dom';
 
+// Use scraped_title / scraped_complexity where the saved row has no name or complexity
+const withScrapedFallbacks = (recipe) => ({
+  ...recipe,
+  recipe_name: recipe.recipe_name || recipe.scraped_title,
+  complexity_level: recipe.complexity_level || recipe.scraped_complexity
+});
+
 function ClientSavedRecipes({ clientId, clientName }) {
   const navigate = useNavigate();
   const [savedRecipes, setSavedRecipes] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const [selectedRecipe, setSelectedRecipe] = useState(null);
   const [recipeDetailsOpen, setRecipeDetailsOpen] = useState(false);
@@ -42,62 +51,10 @@ function ClientSavedRecipes({ clientId, clientName }) {
         setLoading(true);
         setError('');
         
-        const recipes = await apiService.getClientSavedRecipes(clientId);
-        console.log('Fetched client saved recipes:', recipes);
-        console.log('RECIPE DATA DETAILS:', JSON.stringify(recipes, null, 2));
-        
-        // Enhanced processing to ensure all necessary data is available
-        const recipePromises = recipes.map(async (recipe) => {
-          // Start with basic processing
-          let processedRecipe = { ...recipe };
-          
-          // Use scraped_title as recipe_name if no recipe_name exists
-          if (!processedRecipe.recipe_name && processedRecipe.scraped_title) {
-            processedRecipe.recipe_name = processedRecipe.scraped_title;
-          }
-          
-          // Use scraped_complexity as complexity_level if no complexity_level exists
-          if (!processedRecipe.complexity_level && processedRecipe.scraped_complexity) {
-            processedRecipe.complexity_level = processedRecipe.scraped_complexity;
-          }
-          
-          // If this is a scraped recipe but missing data, fetch details
-          if (processedRecipe.scraped_recipe_id && 
-              (!processedRecipe.image_url || !processedRecipe.ingredients || !processedRecipe.instructions)) {
-            console.log(`Pre-fetching details for recipe ${processedRecipe.id} with scraped_id ${processedRecipe.scraped_recipe_id}`);
-            
-            try {
-              // Fetch complete data
-              const scrapedDetails = await apiService.getScrapedRecipeById(processedRecipe.scraped_recipe_id);
-              
-              // Merge details, preferring scraped data over saved data
-              processedRecipe = {
-                ...processedRecipe,
-                image_url: scrapedDetails.image_url || processedRecipe.image_url,
-                ingredients: scrapedDetails.ingredients || processedRecipe.ingredients,
-                instructions: scrapedDetails.instructions || processedRecipe.instructions,
-                complexity_level: scrapedDetails.complexity || processedRecipe.complexity_level,
-                notes: scrapedDetails.description || processedRecipe.notes,
-                cuisine: scrapedDetails.cuisine || processedRecipe.cuisine,
-                servings: scrapedDetails.servings || processedRecipe.servings,
-                recipe_name: scrapedDetails.title || processedRecipe.recipe_name
-              };
-              
-              console.log(`Enhanced recipe ${processedRecipe.id} with scraped data`);
-            } catch (err) {
-              console.error(`Error pre-fetching scraped recipe details for ${processedRecipe.id}:`, err);
-              // Continue with the data we have
-            }
-          }
-          
-          return processedRecipe;
-        });
-        
-        // Wait for all recipe processing to complete
-        const processedRecipes = await Promise.all(recipePromises);
-        console.log('Processed recipes with enhanced data:', processedRecipes);
-        
-        setSavedRecipes(processedRecipes);
+        // List rows carry card fields only; details are fetched when a recipe is opened
+        const page = await apiService.getClientSavedRecipesPage(clientId);
+        setSavedRecipes(page.recipes.map(withScrapedFallbacks));
+        setNextCursor(page.nextCursor);
       } catch (err) {
         console.error('Error fetching client saved recipes:', err);
         setError('Failed to load saved recipes. Please try again later.');
@@ -111,41 +68,57 @@ function ClientSavedRecipes({ clientId, clientName }) {
     }
   }, [clientId]);
 
-  const handleRecipeClick = async (recipe) => {
-    console.log('Clicked recipe:', recipe);
-    
-    // If this is a scraped recipe, always fetch full details to ensure we have everything
-    if (recipe.scraped_recipe_id) {
-      try {
-        console.log(`Fetching full details for scraped recipe ${recipe.scraped_recipe_id}`);
-        const scrapedDetails = await apiService.getScrapedRecipeById(recipe.scraped_recipe_id);
-        console.log('Scraped recipe details:', scrapedDetails);
-        
-        // Merge the scraped details with the saved recipe, preferring the scraped data
-        const enhancedRecipe = {
-          ...recipe,
-          ingredients: scrapedDetails.ingredients || recipe.ingredients,
-          instructions: scrapedDetails.instructions || recipe.instructions,
-          image_url: scrapedDetails.image_url || recipe.image_url,
-          complexity_level: scrapedDetails.complexity || recipe.complexity_level,
-          notes: scrapedDetails.description || recipe.notes,
-          cuisine: scrapedDetails.cuisine || recipe.cuisine,
-          servings: scrapedDetails.servings || recipe.servings,
-          recipe_name: scrapedDetails.title || recipe.recipe_name
-        };
-        
-        console.log('Enhanced recipe with scraped details:', enhancedRecipe);
-        setSelectedRecipe(enhancedRecipe);
-      } catch (err) {
-        console.error(`Error fetching scraped recipe details: ${err.message}`);
-        // Fall back to just using the saved recipe
-        setSelectedRecipe(recipe);
-      }
-    } else {
-      // No need to fetch scraped details
-      setSelectedRecipe(recipe);
+  const handleLoadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await apiService.getClientSavedRecipesPage(clientId, { cursor: nextCursor });
+      setSavedRecipes(prev => [...prev, ...page.recipes.map(withScrapedFallbacks)]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error('Error fetching client saved recipes:', err);
+      setError('Failed to load saved recipes. Please try again later.');
+    } finally {
+      setLoadingMore(false);
     }
-    
+  };
+
+  // Full saved recipe (ingredients, instructions, macros), merged with the
+  // scraped recipe it came from when there is one, preferring the scraped data
+  const loadRecipeDetails = async (recipe) => {
+    let fullRecipe = recipe;
+    try {
+      const saved = await apiService.getClientSavedRecipe(clientId, recipe.id);
+      fullRecipe = { ...recipe, ...saved };
+    } catch (err) {
+      console.error(`Error fetching saved recipe details for ${recipe.id}:`, err);
+    }
+
+    if (!fullRecipe.scraped_recipe_id) {
+      return fullRecipe;
+    }
+
+    try {
+      const scrapedDetails = await apiService.getScrapedRecipeById(fullRecipe.scraped_recipe_id);
+      return {
+        ...fullRecipe,
+        ingredients: scrapedDetails.ingredients || fullRecipe.ingredients,
+        instructions: scrapedDetails.instructions || fullRecipe.instructions,
+        image_url: scrapedDetails.image_url || fullRecipe.image_url,
+        complexity_level: scrapedDetails.complexity || fullRecipe.complexity_level,
+        notes: scrapedDetails.description || fullRecipe.notes,
+        cuisine: scrapedDetails.cuisine || fullRecipe.cuisine,
+        servings: scrapedDetails.servings || fullRecipe.servings,
+        recipe_name: scrapedDetails.title || fullRecipe.recipe_name
+      };
+    } catch (err) {
+      console.error(`Error fetching scraped recipe details: ${err.message}`);
+      // Fall back to just using the saved recipe
+      return fullRecipe;
+    }
+  };
+
+  const handleRecipeClick = async (recipe) => {
+    setSelectedRecipe(await loadRecipeDetails(recipe));
     setRecipeDetailsOpen(true);
   };
 
@@ -166,12 +139,13 @@ function ClientSavedRecipes({ clientId, clientName }) {
     }
   };
 
-  const handleAddToCustomMenu = (recipe) => {
-    // Set the recipe we want to add to a menu
-    setRecipeForMenu(recipe);
-    
-    // Start by fetching available menus
+  const handleAddToCustomMenu = async (recipe) => {
     setMenuLoading(true);
+
+    // The menu needs the recipe's ingredients and instructions
+    setRecipeForMenu(await loadRecipeDetails(recipe));
+
+    // Then fetch available menus
     fetchMenuOptions()
       .then(menus => {
         // If we have existing menus, set to 'add' mode, otherwise 'create' mode
@@ -424,6 +398,14 @@ function ClientSavedRecipes({ clientId, clientName }) {
                 </Grid>
               ))}
             </Grid>
+
+            {nextCursor && (
+              <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+                <Button variant="outlined" onClick={handleLoadMore} disabled={loadingMore}>
+                  {loadingMore ? <CircularProgress size={24} /> : 'Load More'}
+                </Button>
+              </Box>
+            )}
           </>
         )}
       </Paper>
@@ -230,10 +230,12 @@ const MealShoppingList = ({ menuId }) => {
         });
 
         try {
-          // Search for products first
-          const searchResponse = await axios.post(
-            `${API_BASE_URL}/kroger/search-and-suggest`,
-            { items: ingredientNames },
+          // The backend picks a product for each name: this user's earlier pick at
+          // the store, else the top search result (searches run in parallel there).
+          // Users choose specific products through search and suggest instead.
+          const addResponse = await axios.post(
+            `${API_BASE_URL}/kroger/cart/add`,
+            { items: ingredientNames.map(itemName => ({ name: itemName, quantity: 1 })) },
             {
               headers: {
                 'Content-Type': 'application/json',
@@ -242,53 +244,18 @@ const MealShoppingList = ({ menuId }) => {
             }
           );
 
-          if (searchResponse.data && searchResponse.data.success) {
-            // For now, automatically select the first result for each item
-            // TODO: In the future, show a selection UI for users to choose specific products
-            const itemsWithUpc = [];
-            
-            searchResponse.data.suggestions.forEach(suggestion => {
-              if (suggestion.suggestions && suggestion.suggestions.length > 0) {
-                const bestMatch = suggestion.suggestions[0]; // Take first/best result
-                if (bestMatch.upc) {
-                  itemsWithUpc.push({
-                    name: suggestion.original_item,
-                    upc: bestMatch.upc,
-                    quantity: 1,
-                    store_preference: store
-                  });
-                }
-              }
-            });
-
-            if (itemsWithUpc.length === 0) {
-              setSnackbarMessage('No products found in Kroger for these ingredients');
-              setSnackbarOpen(true);
-              return;
-            }
-
-            // Now add the items with UPC codes to cart
-            const addResponse = await axios.post(
-              `${API_BASE_URL}/kroger/cart/add`,
-              { items: itemsWithUpc },
-              {
-                headers: {
-                  'Content-Type': 'application/json',
-                  'Authorization': formattedToken
-                }
-              }
+          if (addResponse.data && addResponse.data.success) {
+            const added = ingredientNames.length - (addResponse.data.unresolved_items || []).length;
+            setSnackbarMessage(
+              `Added ${added} items from "${meal.title}" to Kroger cart`
             );
-
-            if (addResponse.data && addResponse.data.success) {
-              setSnackbarMessage(
-                `Added ${itemsWithUpc.length} items from "${meal.title}" to Kroger cart`
-              );
-              setSnackbarOpen(true);
-            } else {
-              throw new Error(addResponse.data?.message || 'Failed to add items to Kroger cart');
-            }
+            setSnackbarOpen(true);
+          } else if (addResponse.data && addResponse.data.needs_search) {
+            setSnackbarMessage('No products found in Kroger for these ingredients');
+            setSnackbarOpen(true);
+            return;
           } else {
-            throw new Error(searchResponse.data?.message || 'Failed to search for products');
+            throw new Error(addResponse.data?.message || 'Failed to add items to Kroger cart');
           }
         } catch (krogerError) {
           console.error('Kroger-specific error:', krogerError);
@@ -24,6 +24,8 @@ import { useOrganization } from '../context/OrganizationContext';
 
 const CustomMenuBuilderPage = () => {
   const [savedRecipes, setSavedRecipes] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedRecipes, setSelectedRecipes] = useState({});
   const [menuNickname, setMenuNickname] = useState('');
   const [openDaySelectionDialog, setOpenDaySelectionDialog] = useState(false);
@@ -38,146 +40,15 @@ const CustomMenuBuilderPage = () => {
   const { user } = useAuth();
   const { organization, activeClient } = useOrganization();
 
-  useEffect(() => {
-    if (savedRecipes.length > 0) {
-      console.log("Saved Recipes Data Check:", savedRecipes);
-      
-      // Check first recipe for key fields
-      const firstRecipe = savedRecipes[0];
-      console.log("First recipe ingredients:", firstRecipe.ingredients);
-      console.log("First recipe instructions:", firstRecipe.instructions);
-      console.log("First recipe macros:", firstRecipe.macros);
-    }
-  }, [savedRecipes]);
-
   useEffect(() => {
     const fetchSavedRecipes = async () => {
       try {
         setLoading(true);
         
-        // If an organization admin is creating a menu for a client, use the client's ID
-        const clientId = activeClient?.id;
-        
-        const recipes = await apiService.getSavedRecipes(clientId);
-        
-        // Process each saved recipe to ensure it has complete data
-        const fullRecipes = await Promise.all(
-          recipes.map(async (recipe) => {
-            try {
-              // If it's a scraped recipe, get full details
-              if (recipe.scraped_recipe_id) {
-                const fullRecipeDetails = await apiService.getScrapedRecipeById(recipe.scraped_recipe_id);
-                
-                // Check for ingredients in metadata
-                let ingredients = recipe.ingredients || [];
-                if (fullRecipeDetails.metadata?.ingredients_list) {
-                  ingredients = fullRecipeDetails.metadata.ingredients_list;
-                } else if (fullRecipeDetails.ingredients) {
-                  ingredients = fullRecipeDetails.ingredients;
-                }
-                
-                // Check for nutrition data
-                let macros = recipe.macros || {};
-                if (!macros.perServing && fullRecipeDetails.metadata?.nutrition_per_serving) {
-                  macros = {
-                    perServing: fullRecipeDetails.metadata.nutrition_per_serving
-                  };
-                } else if (!macros.perServing && fullRecipeDetails.nutrition) {
-                  macros = {
-                    perServing: {
-                      calories: fullRecipeDetails.nutrition.calories,
-                      protein: fullRecipeDetails.nutrition.protein,
-                      carbs: fullRecipeDetails.nutrition.carbohydrates || fullRecipeDetails.nutrition.carbs,
-                      fat: fullRecipeDetails.nutrition.fat
-                    }
-                  };
-                }
-                
-                // Combine data from both sources, prioritizing saved recipe data
-                return {
-                  ...recipe,
-                  ...fullRecipeDetails,
-                  macros: recipe.macros || macros,
-                  ingredients: ingredients,
-                  instructions: recipe.instructions || fullRecipeDetails.instructions || [],
-                  complexity_level: recipe.complexity_level || fullRecipeDetails.complexity || 'standard',
-                  appliance_used: recipe.appliance_used || fullRecipeDetails.appliance_used,
-                  servings: recipe.servings || fullRecipeDetails.servings || 1
-                };
-              }
-              
-              // If it's a saved recipe from a menu
-              if (recipe.menu_id && recipe.recipe_id) {
-                // If we already have complete data in saved_recipes, use that
-                if (recipe.ingredients && recipe.instructions && recipe.macros) {
-                  return recipe;
-                }
-                
-                // Otherwise fetch from menu
-                try {
-                  const menuDetails = await apiService.getMenuDetails(recipe.menu_id);
-                  if (menuDetails?.meal_plan?.days) {
-                    // Find the recipe in the menu
-                    for (const day of menuDetails.meal_plan.days) {
-                      // Look in meals
-                      const matchingMeal = (day.meals || []).find(meal => 
-                        (meal.id === recipe.recipe_id || recipe.recipe_name === meal.title) && 
-                        meal.meal_time === recipe.meal_time
-                      );
-                      
-                      if (matchingMeal) {
-                        return {
-                          ...recipe,
-                          ...matchingMeal,
-                          dayNumber: day.dayNumber,
-                          originalSource: 'menu',
-                          // Ensure we have all needed fields
-                          ingredients: recipe.ingredients || matchingMeal.ingredients || [],
-                          instructions: recipe.instructions || matchingMeal.instructions || [],
-                          macros: recipe.macros || matchingMeal.macros,
-                          complexity_level: recipe.complexity_level || matchingMeal.complexity_level || 'standard',
-                          appliance_used: recipe.appliance_used || matchingMeal.appliance_used,
-                          servings: recipe.servings || matchingMeal.servings || 1
-                        };
-                      }
-                      
-                      // Look in snacks
-                      const matchingSnack = (day.snacks || []).find(snack => 
-                        recipe.recipe_name === snack.title
-                      );
-                      
-                      if (matchingSnack) {
-                        return {
-                          ...recipe,
-                          ...matchingSnack,
-                          dayNumber: day.dayNumber,
-                          originalSource: 'menu',
-                          // Ensure we have all needed fields
-                          ingredients: recipe.ingredients || matchingSnack.ingredients || [],
-                          instructions: recipe.instructions || matchingSnack.instructions || [],
-                          macros: recipe.macros || matchingSnack.macros,
-                          complexity_level: recipe.complexity_level || matchingSnack.complexity_level || 'standard',
-                          appliance_used: recipe.appliance_used || matchingSnack.appliance_used,
-                          servings: recipe.servings || matchingSnack.servings || 1
-                        };
-                      }
-                    }
-                  }
-                } catch (menuErr) {
-                  console.error(`Error fetching menu ${recipe.menu_id}:`, menuErr);
-                }
-              }
-              
-              // Return the recipe with whatever data we have
-              return recipe;
-            } catch (err) {
-              console.error(`Error fetching recipe details for ${recipe.id}:`, err);
-              return recipe;
-            }
-          })
-        );
-        
-        setSavedRecipes(fullRecipes);
+        // List rows carry card fields only; a recipe's details are loaded when it is placed on a day
+        const page = await apiService.getSavedRecipesPage();
+        setSavedRecipes(page.recipes);
+        setNextCursor(page.nextCursor);
         setLoading(false);
       } catch (err) {
         console.error('Failed to fetch saved recipes', err);
@@ -189,6 +60,143 @@ const CustomMenuBuilderPage = () => {
     fetchSavedRecipes();
   }, [activeClient]);
 
+  const handleLoadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await apiService.getSavedRecipesPage({ cursor: nextCursor });
+      setSavedRecipes(prev => [...prev, ...page.recipes]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error('Failed to fetch saved recipes', err);
+      setError('Failed to load saved recipes');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Complete a saved recipe's data for the menu: the full saved row, then the
+  // scraped recipe or the menu it came from for anything still missing
+  const loadRecipeDetails = async (savedRecipe) => {
+    let recipe = savedRecipe;
+    try {
+      recipe = { ...savedRecipe, ...(await apiService.getSavedRecipe(savedRecipe.id)) };
+    } catch (err) {
+      console.error(`Error fetching saved recipe ${savedRecipe.id}:`, err);
+    }
+
+    try {
+      // If it's a scraped recipe, get full details
+      if (recipe.scraped_recipe_id) {
+        const fullRecipeDetails = await apiService.getScrapedRecipeById(recipe.scraped_recipe_id);
+        
+        // Check for ingredients in metadata
+        let ingredients = recipe.ingredients || [];
+        if (fullRecipeDetails.metadata?.ingredients_list) {
+          ingredients = fullRecipeDetails.metadata.ingredients_list;
+        } else if (fullRecipeDetails.ingredients) {
+          ingredients = fullRecipeDetails.ingredients;
+        }
+        
+        // Check for nutrition data
+        let macros = recipe.macros || {};
+        if (!macros.perServing && fullRecipeDetails.metadata?.nutrition_per_serving) {
+          macros = {
+            perServing: fullRecipeDetails.metadata.nutrition_per_serving
+          };
+        } else if (!macros.perServing && fullRecipeDetails.nutrition) {
+          macros = {
+            perServing: {
+              calories: fullRecipeDetails.nutrition.calories,
+              protein: fullRecipeDetails.nutrition.protein,
+              carbs: fullRecipeDetails.nutrition.carbohydrates || fullRecipeDetails.nutrition.carbs,
+              fat: fullRecipeDetails.nutrition.fat
+            }
+          };
+        }
+        
+        // Combine data from both sources, prioritizing saved recipe data
+        return {
+          ...recipe,
+          ...fullRecipeDetails,
+          macros: recipe.macros || macros,
+          ingredients: ingredients,
+          instructions: recipe.instructions || fullRecipeDetails.instructions || [],
+          complexity_level: recipe.complexity_level || fullRecipeDetails.complexity || 'standard',
+          appliance_used: recipe.appliance_used || fullRecipeDetails.appliance_used,
+          servings: recipe.servings || fullRecipeDetails.servings || 1
+        };
+      }
+      
+      // If it's a saved recipe from a menu
+      if (recipe.menu_id && recipe.recipe_id) {
+        // If we already have complete data in saved_recipes, use that
+        if (recipe.ingredients && recipe.instructions && recipe.macros) {
+          return recipe;
+        }
+        
+        // Otherwise fetch from menu
+        try {
+          const menuDetails = await apiService.getMenuDetails(recipe.menu_id);
+          if (menuDetails?.meal_plan?.days) {
+            // Find the recipe in the menu
+            for (const day of menuDetails.meal_plan.days) {
+              // Look in meals
+              const matchingMeal = (day.meals || []).find(meal => 
+                (meal.id === recipe.recipe_id || recipe.recipe_name === meal.title) && 
+                meal.meal_time === recipe.meal_time
+              );
+              
+              if (matchingMeal) {
+                return {
+                  ...recipe,
+                  ...matchingMeal,
+                  dayNumber: day.dayNumber,
+                  originalSource: 'menu',
+                  // Ensure we have all needed fields
+                  ingredients: recipe.ingredients || matchingMeal.ingredients || [],
+                  instructions: recipe.instructions || matchingMeal.instructions || [],
+                  macros: recipe.macros || matchingMeal.macros,
+                  complexity_level: recipe.complexity_level || matchingMeal.complexity_level || 'standard',
+                  appliance_used: recipe.appliance_used || matchingMeal.appliance_used,
+                  servings: recipe.servings || matchingMeal.servings || 1
+                };
+              }
+              
+              // Look in snacks
+              const matchingSnack = (day.snacks || []).find(snack => 
+                recipe.recipe_name === snack.title
+              );
+              
+              if (matchingSnack) {
+                return {
+                  ...recipe,
+                  ...matchingSnack,
+                  dayNumber: day.dayNumber,
+                  originalSource: 'menu',
+                  // Ensure we have all needed fields
+                  ingredients: recipe.ingredients || matchingSnack.ingredients || [],
+                  instructions: recipe.instructions || matchingSnack.instructions || [],
+                  macros: recipe.macros || matchingSnack.macros,
+                  complexity_level: recipe.complexity_level || matchingSnack.complexity_level || 'standard',
+                  appliance_used: recipe.appliance_used || matchingSnack.appliance_used,
+                  servings: recipe.servings || matchingSnack.servings || 1
+                };
+              }
+            }
+          }
+        } catch (menuErr) {
+          console.error(`Error fetching menu ${recipe.menu_id}:`, menuErr);
+        }
+      }
+      
+      // Return the recipe with whatever data we have
+      return recipe;
+    } catch (err) {
+      console.error(`Error fetching recipe details for ${recipe.id}:`, err);
+      return recipe;
+    }
+  };
+
   const renderMacroChips = (recipe) => {
     // Try to extract macros from different possible locations
     const macros = recipe.macros?.perServing || 
@@ -245,16 +253,18 @@ const CustomMenuBuilderPage = () => {
     setOpenDaySelectionDialog(true);
   };
 
-  const handleSelectDay = (day) => {
+  const handleSelectDay = async (day) => {
     // Create a unique key for the recipe placement
     const key = `day${day}_${currentMealTime}`;
+    const mealTime = currentMealTime;
+    const recipe = await loadRecipeDetails(currentRecipe);
     
     setSelectedRecipes(prev => ({
       ...prev,
       [key]: {
-        ...currentRecipe,
+        ...recipe,
         day,
-        mealTime: currentMealTime
+        mealTime
       }
     }));
 
@@ -482,6 +492,14 @@ const CustomMenuBuilderPage = () => {
             ))}
           </Grid>
         )}
+
+        {!loading && nextCursor && (
+          <Box sx={{ display: 'flex', justifyContent: 'center', mt: 3 }}>
+            <Button variant="outlined" onClick={handleLoadMore} disabled={loadingMore}>
+              {loadingMore ? <CircularProgress size={24} /> : 'Load More'}
+            </Button>
+          </Box>
+        )}
       </Box>
 
       {/* Day Selection Dialog */}
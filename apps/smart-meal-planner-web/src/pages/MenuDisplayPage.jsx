@@ -148,7 +148,7 @@ function MenuDisplayPage() {
           // Otherwise get the client's latest menu
           else if (!selectedMenuId) {
             console.log('Fetching client menus since no menuId provided');
-            apiService.getClientMenus(clientId)
+            apiService.getClientMenus(clientId, { includePlan: true })
               .then(menus => {
                 console.log('Client menus retrieved:', menus);
                 if (menus && menus.length > 0) {
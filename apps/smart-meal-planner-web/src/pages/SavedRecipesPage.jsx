@@ -45,7 +45,9 @@ const SavedRecipesPage = () => {
   const { user } = useAuth();
   const navigate = useNavigate();
   const [savedRecipes, setSavedRecipes] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const [dialogOpen, setDialogOpen] = useState(false);
   const [selectedRecipe, setSelectedRecipe] = useState(null);
@@ -63,9 +65,9 @@ const SavedRecipesPage = () => {
         setLoading(true);
         setError('');   
 
-        const response = await apiService.getSavedRecipes();
-        console.log('Saved recipes response:', response);
-        setSavedRecipes(response || []);
+        const page = await apiService.getSavedRecipesPage();
+        setSavedRecipes(page.recipes);
+        setNextCursor(page.nextCursor);
       } catch (err) {
         console.error('API error:', err);
         setError(err.message || 'Failed to fetch saved recipes');
@@ -77,6 +79,20 @@ const SavedRecipesPage = () => {
     fetchSavedRecipes();
   }, [user, navigate]);
 
+  const handleLoadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await apiService.getSavedRecipesPage({ cursor: nextCursor });
+      setSavedRecipes(prev => [...prev, ...page.recipes]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error('API error:', err);
+      setError(err.message || 'Failed to fetch saved recipes');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleViewRecipe = async (recipeId, menuId, recipe = null) => {
     try {
       setSelectedRecipe({ recipeId, menuId });
@@ -397,6 +413,14 @@ const SavedRecipesPage = () => {
         ))}
       </Grid>
 
+      {nextCursor && (
+        <Box sx={{ display: 'flex', justifyContent: 'center', mt: 4 }}>
+          <Button variant="outlined" onClick={handleLoadMore} disabled={loadingMore}>
+            {loadingMore ? <CircularProgress size={24} /> : 'Load More'}
+          </Button>
+        </Box>
+      )}
+
       {/* Recipe Details Dialog */}
       <Dialog 
         open={dialogOpen} 
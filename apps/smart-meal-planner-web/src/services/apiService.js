@@ -589,9 +589,12 @@ const apiService = {
     }
   },
   
-  async getMenuHistory(userId) {
+  async getMenuHistory(userId, { includePlan = false } = {}) {
     try {
-      const resp = await axiosInstance.get(`/menu/history/${userId}`);
+      // History returns card summaries; pass includePlan when the full meal plans are needed
+      const resp = await axiosInstance.get(`/menu/history/${userId}`, {
+        params: includePlan ? { include: 'plan' } : undefined
+      });
       return resp.data;
     } catch (err) {
       console.error('Menu history fetch error:', err);
@@ -820,7 +823,7 @@ const apiService = {
         // Check if a new menu was created despite the timeout
         try {
           if (menuRequest.user_id) {
-            const menuHistory = await this.getMenuHistory(menuRequest.user_id);
+            const menuHistory = await this.getMenuHistory(menuRequest.user_id, { includePlan: true });
             
             if (menuHistory && menuHistory.length > 0 && 
                 (latestMenuIdBeforeGeneration === null || 
@@ -1101,7 +1104,7 @@ const apiService = {
         
         // Check if a new menu was created despite the timeout
         try {
-          const clientMenus = await this.getClientMenus(clientId);
+          const clientMenus = await this.getClientMenus(clientId, { includePlan: true });
           
           if (clientMenus && clientMenus.length > 0 && 
               (latestMenuIdBeforeGeneration === null || 
@@ -1432,24 +1435,60 @@ const apiService = {
     }
   },
 
+  // Saved-recipe lists are paged and return card fields only; pass nextCursor back for the
+  // following page, and fetch one recipe's ingredients/instructions/macros by its saved id
+  fetchSavedRecipesPage: async (path, { cursor = null, limit = 50 } = {}) => {
+    const response = await axiosInstance.get(path, {
+      params: { limit, ...(cursor ? { cursor } : {}) }
+    });
+    return {
+      recipes: response.data.saved_recipes || [],
+      nextCursor: response.data.next_cursor || null
+    };
+  },
+
+  getSavedRecipesPage: async (options) => {
+    return await apiService.fetchSavedRecipesPage('/saved-recipes/', options);
+  },
+
+  getClientSavedRecipesPage: async (clientId, options) => {
+    return await apiService.fetchSavedRecipesPage(`/saved-recipes/client/${clientId}`, options);
+  },
+
+  // Card fields of every saved recipe, for marking saved meals on a menu
   getSavedRecipes: async () => {
     try {
-      const response = await axiosInstance.get('/saved-recipes/');
-      return response.data.saved_recipes || [];
+      const recipes = [];
+      let cursor = null;
+      do {
+        const page = await apiService.getSavedRecipesPage({ cursor, limit: 200 });
+        recipes.push(...page.recipes);
+        cursor = page.nextCursor;
+      } while (cursor);
+      return recipes;
     } catch (err) {
       console.error('Error fetching saved recipes:', err);
       return [];
     }
   },
-  
-  getClientSavedRecipes: async (clientId) => {
+
+  getSavedRecipe: async (savedId) => {
     try {
-      console.log(`Fetching saved recipes for client ${clientId}`);
-      const response = await axiosInstance.get(`/saved-recipes/client/${clientId}`);
-      return response.data.saved_recipes || [];
+      const response = await axiosInstance.get(`/saved-recipes/${savedId}`);
+      return response.data.recipe;
     } catch (err) {
-      console.error(`Error fetching saved recipes for client ${clientId}:`, err);
-      return [];
+      console.error(`Error fetching saved recipe ${savedId}:`, err);
+      throw err;
+    }
+  },
+
+  getClientSavedRecipe: async (clientId, savedId) => {
+    try {
+      const response = await axiosInstance.get(`/saved-recipes/client/${clientId}/${savedId}`);
+      return response.data.recipe;
+    } catch (err) {
+      console.error(`Error fetching saved recipe ${savedId} for client ${clientId}:`, err);
+      throw err;
     }
   },
 
@@ -1842,8 +1881,9 @@ const apiService = {
     try {
       console.log('Adding items to Kroger cart:', items);
       
-      // Prepare items for Kroger API
+      // Prepare items for Kroger API (the backend resolves names without a UPC)
       const krogerItems = items.map(item => ({
+        name: item.name || item.description || '',
         upc: item.upc,
         quantity: item.quantity || 1
       }));
@@ -2679,19 +2719,21 @@ const apiService = {
     }
   },  
 
-  getClientMenus: async (clientId) => {
+  getClientMenus: async (clientId, { includePlan = false } = {}) => {
     try {
       console.log(`Fetching menus for client ID: ${clientId}`);
+      // Menus come back as card summaries unless the full meal plans are requested
+      const params = includePlan ? { include: 'plan' } : undefined;
       
       // Try the correct endpoint first
       try {
-        const response = await axiosInstance.get(`/organizations/clients/${clientId}/menus`);
+        const response = await axiosInstance.get(`/organizations/clients/${clientId}/menus`, { params });
         console.log('Client menus response:', response.data);
         return response.data;
       } catch (err) {
         // If that fails, try the POST method (as the backend supports both)
         console.log('GET failed, trying POST method');
-        const postResponse = await axiosInstance.post(`/organizations/clients/${clientId}/menus`);
+        const postResponse = await axiosInstance.post(`/organizations/clients/${clientId}/menus`, null, { params });
         console.log('Client menus response (POST):', postResponse.data);
         return postResponse.data;
       }